@@ -0,0 +1,598 @@
+"""
+Acquisition Process for MCB Testing System
+Runs the ESP32 socket and sample pipeline in a child process, separate from the GUI
+"""
+
+import itertools
+import multiprocessing
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from multiprocessing.connection import wait
+from PyQt5.QtCore import QObject, Qt, pyqtSignal, QTimer
+
+from backend import DEFAULT_ESP_IP, DEFAULT_PORT
+from command_channel import COMMAND_TIMEOUT, latency_summary
+from sample_ring import SampleRing, DEFAULT_CAPACITY
+from stage_metrics import StageMetrics
+
+# ESP32Backend methods the GUI may invoke in the acquisition process
+COMMAND_METHODS = (
+    'send_command', 'start_short_circuit_test', 'start_trip_test', 'start_temperature_test',
+    'set_power_factor', 'configure_rl_circuit', 'set_variable_rl_configuration',
+    'stop_test', 'reset_system', 'get_status', 'calibrate_sensors',
+)
+CLOCK_REPORT_INTERVAL = 1.0  # seconds between device clock fit reports to the GUI process
+METRICS_REPORT_INTERVAL = 0.5  # seconds between stage metrics reports, while they are enabled
+
+
+# ===== Child process =====
+
+def acquisition_main(ring_name, control, emergency, **options):
+    """
+    Entry point of the acquisition process.
+
+    One thread blocks on the controller socket and the control pipe together;
+    every processed sample goes straight into the shared ring. Everything
+    else (status, errors, controller messages) is queued for a sender thread,
+    so a GUI that stops reading the pipe can never block acquisition. A
+    dropped link is retried from the same loop with the backend's backoff.
+    Each command call carries a token; its reply (or failure) is sent back
+    under that token when the backend's future resolves. Emergency stops
+    arrive on their own pipe and are written by a dedicated thread, so they
+    never wait behind queued requests or sample processing. `options` are
+    ESP32Backend keyword arguments (timeout, reconnect_attempts, ...).
+    """
+    from backend import ESP32Backend, prepare_socket, race_connect
+
+    ring = SampleRing.attach(ring_name, writable=True)
+    backend = ESP32Backend(**options)
+    outbox = queue.Queue()
+
+    def sender():
+        while True:
+            message = outbox.get()
+            if message is None:
+                break
+            try:
+                control.send(message)
+            except (OSError, EOFError):
+                break
+
+    sender_thread = threading.Thread(target=sender, name="AcquisitionSender", daemon=True)
+    sender_thread.start()
+
+    # No Qt event loop runs here: every slot is called directly, on whichever
+    # thread emits (the main loop, or the emergency thread below)
+    backend.real_time_waveform.connect(ring.write, Qt.DirectConnection)
+    # Numeric samples are rebuilt from the ring on the GUI side; only messages go over the pipe
+    backend.data_received.connect(lambda data: 'raw' in data and outbox.put(('data_received', data)),
+                                  Qt.DirectConnection)
+    for kind in ('connection_status_changed', 'command_sent', 'error_occurred', 'rl_config_confirmed',
+                 'reconnecting', 'reconnect_finished', 'command_acknowledged', 'emergency_stopped',
+                 'connect_progress', 'first_sample'):
+        getattr(backend, kind).connect(lambda *args, kind=kind: outbox.put((kind,) + args), Qt.DirectConnection)
+
+    def run_command(method, args, token):
+        result = getattr(backend, method)(*args)
+        if not isinstance(result, Future):
+            outbox.put(('command_done', token, None, ConnectionError("Command not sent")))
+            return
+        result.add_done_callback(lambda future: outbox.put(
+            ('command_done', token, None if future.exception() else future.result(), future.exception())))
+
+    stopped_generation = [0]  # Latest emergency stop seen; calls issued before it are dropped
+
+    def emergency_listener():
+        while True:
+            try:
+                token, generation, reason = emergency.recv()
+            except (EOFError, OSError):
+                return
+            stopped_generation[0] = generation
+            run_command('emergency_stop', (reason,), token)
+
+    threading.Thread(target=emergency_listener, name="AcquisitionEmergency", daemon=True).start()
+
+    retry = None  # (retry time, attempt, last error) while reconnecting
+
+    def release_socket():
+        if backend.client is not None:
+            try:
+                backend.client.close()
+            except OSError:
+                pass
+        backend.client = None
+        backend.connected = False
+        backend.running = False
+
+    def close_socket(message):
+        nonlocal retry
+        was_connected = backend.connected or retry is not None
+        if retry is not None:
+            retry = None
+            backend.abandon_outage()
+        release_socket()
+        backend.commands.fail_all(ConnectionError(message))
+        backend.reset_cycle_data()
+        if was_connected:
+            backend.connection_status_changed.emit(False, message)
+
+    def attach_socket(client):
+        client.settimeout(None)
+        backend.client = client
+        backend.running = True
+        backend.connected = True
+
+    def open_socket():
+        attach_socket(backend.open_socket())
+
+    def schedule_reconnect(attempt, error):
+        nonlocal retry
+        delay = backend.reconnect_delay(attempt)
+        retry = (time.monotonic() + delay, attempt, error)
+        backend.reconnecting.emit(attempt, backend.reconnect_attempts, delay)
+
+    def link_dropped(reason):
+        release_socket()
+        if not backend.link_lost():
+            backend.reset_cycle_data()
+            backend.error_occurred.emit(f"Receive error: {reason}")
+            backend.connection_status_changed.emit(False, f"Connection lost: {reason}")
+            return
+        schedule_reconnect(1, reason)
+        backend.connection_status_changed.emit(False, f"Connection lost: {reason} - reconnecting")
+
+    def try_reconnect():
+        nonlocal retry
+        _, attempt, _ = retry
+        retry = None
+        backend.count_reconnect_attempt()
+        try:
+            open_socket()
+        except OSError as e:
+            if attempt < backend.reconnect_attempts:
+                schedule_reconnect(attempt + 1, str(e))
+                return
+            outage = backend.end_outage()
+            backend.reset_cycle_data()
+            backend.reconnect_finished.emit(False, attempt, outage)
+            backend.connection_status_changed.emit(
+                False, f"Reconnect failed after {attempt} attempts: {str(e)}")
+            return
+        outage = backend.link_restored()
+        backend.reconnect_finished.emit(True, attempt, outage)
+        backend.connection_status_changed.emit(
+            True, f"TCP reconnected to {backend.esp_ip}:{backend.port} after {outage:.1f}s")
+
+    clock_reported = 0.0
+    metrics_reported = 0.0
+    dropped_reported = 0
+    running = True
+    while running:
+        sources = [control] if backend.client is None else [control, backend.client]
+        wait_time = None if retry is None else max(0.0, retry[0] - time.monotonic())
+        if backend.commands.pending:
+            # Wake up to time out commands whose reply never comes
+            wait_time = 0.25 if wait_time is None else min(wait_time, 0.25)
+        if backend.metrics.enabled:
+            # Keep reporting while the link is quiet
+            wait_time = METRICS_REPORT_INTERVAL if wait_time is None else min(wait_time, METRICS_REPORT_INTERVAL)
+        for source in wait(sources, wait_time):
+            if source is control:
+                try:
+                    request = control.recv()
+                except (EOFError, OSError):
+                    running = False  # GUI process is gone
+                    break
+                kind = request[0]
+                if kind == 'connect':
+                    close_socket("Disconnected")
+                    backend.connect_started = time.perf_counter()
+                    try:
+                        # Any further request (cancel, disconnect, quit) abandons the race
+                        client, (backend.esp_ip, backend.port) = race_connect(
+                            request[1], backend.timeout, control.poll, backend.connect_progress.emit)
+                    except ConnectionAbortedError:
+                        backend.connect_started = None
+                        continue
+                    except OSError as e:
+                        backend.connection_status_changed.emit(False, f"TCP connection failed: {str(e)}")
+                        continue
+                    prepare_socket(client, backend.timeout)
+                    attach_socket(client)
+                    outbox.put(('connected_to', backend.esp_ip, backend.port))
+                    backend.rx_buffer = ""
+                    backend.reset_cycle_data()
+                    backend.clock.reset()
+                    backend.connection_status_changed.emit(
+                        True, f"TCP connected to {backend.esp_ip}:{backend.port}")
+                elif kind == 'cancel_connect':
+                    if not backend.connected:
+                        backend.connection_status_changed.emit(False, "Connect cancelled")
+                elif kind == 'disconnect':
+                    backend.connect_started = None
+                    if backend.connected or retry is not None:
+                        close_socket("Disconnected")
+                    else:
+                        backend.connection_status_changed.emit(False, "Disconnected")
+                elif kind == 'call' and request[1] in COMMAND_METHODS:
+                    method, args, token, generation = request[1:]
+                    if generation < stopped_generation[0]:
+                        outbox.put(('command_done', token, None,
+                                    ConnectionAbortedError(f"'{method}' dropped: emergency stop")))
+                        continue
+                    run_command(method, args, token)
+                elif kind == 'metrics':
+                    backend.enable_metrics(request[1])
+                    metrics_reported = 0.0
+                elif kind == 'trace':
+                    backend.enable_tracing(request[1])
+                elif kind == 'quit':
+                    running = False
+                    break
+            else:
+                try:
+                    data = backend.client.recv(65536)
+                except OSError as e:
+                    link_dropped(str(e))
+                    break
+                if not data:
+                    link_dropped("Connection closed by controller")
+                    break
+                try:
+                    backend.feed(data)
+                except Exception as e:
+                    backend.error_occurred.emit(f"Receive error: {str(e)}")
+                    close_socket(f"Connection lost: {str(e)}")
+                    break
+        if running and retry is not None and time.monotonic() >= retry[0]:
+            try_reconnect()
+        backend.expire_commands()
+        if backend.commands.dropped != dropped_reported:
+            dropped_reported = backend.commands.dropped
+            outbox.put(('commands_dropped', dropped_reported))
+        if backend.connected and time.monotonic() - clock_reported >= CLOCK_REPORT_INTERVAL:
+            clock_reported = time.monotonic()
+            outbox.put(('clock_stats', backend.clock.stats()))
+        if backend.metrics.enabled and time.monotonic() - metrics_reported >= METRICS_REPORT_INTERVAL:
+            metrics_reported = time.monotonic()
+            outbox.put(('metrics', backend.metrics_snapshot()))
+
+    close_socket("Disconnected")
+    outbox.put(None)
+    sender_thread.join(timeout=2)
+    control.close()
+    emergency.close()
+    ring.close()
+
+
+# ===== GUI side =====
+
+class ProcessBackend(QObject):
+    """
+    Drop-in replacement for ESP32Backend that acquires in a child process.
+
+    The child owns the socket, the DC offset / cycle looping / current
+    pipeline and writes every processed sample to a SampleRing. This object
+    maps the ring read-only and, from a GUI timer, re-emits the samples as
+    real_time_waveform and data_received in order. If the GUI stalls (a slow
+    redraw, a modal dialog) the samples wait in the ring and are delivered
+    on the next tick; only a stall longer than the ring capacity loses
+    samples, and those are counted in `overrun`.
+
+    Commands are forwarded over a pipe and run by the child's ESP32Backend,
+    so connected/esp_ip/port and the command methods behave as before,
+    except that connect() returns immediately and the outcome arrives via
+    connection_status_changed (connect_async() races several addresses the
+    same way, in the child). Command methods return a local Future that
+    resolves when the child's reply (or failure) comes back over the pipe.
+    """
+    connection_status_changed = pyqtSignal(bool, str)  # connected, message
+    data_received = pyqtSignal(dict)  # {time, temp, current, voltage, etc}
+    command_sent = pyqtSignal(str)  # command sent confirmation
+    error_occurred = pyqtSignal(str)  # error message
+    rl_config_confirmed = pyqtSignal(str)  # R-L configuration confirmation
+    voltage_data_received = pyqtSignal(list, list)  # voltage_values, timestamps
+    real_time_waveform = pyqtSignal(dict)  # real-time voltage and calculated current
+    reconnecting = pyqtSignal(int, int, float)  # attempt, max attempts, backoff delay (s)
+    reconnect_finished = pyqtSignal(bool, int, float)  # resumed, attempts used, outage (s)
+    command_acknowledged = pyqtSignal(int, str, str, float)  # sequence ID, command, reply, round-trip (s)
+    emergency_stopped = pyqtSignal(str, float)  # reason, latency inside the acquisition process (s)
+    connect_progress = pyqtSignal(str)  # progress of a connect race in the child
+    first_sample = pyqtSignal(float)  # seconds from connect request (in the child) to first sample
+
+    def __init__(self, esp_ip=DEFAULT_ESP_IP, port=DEFAULT_PORT, capacity=DEFAULT_CAPACITY,
+                 poll_interval=20, max_batch=20000, timeout=10.0, reconnect_attempts=3,
+                 command_timeout=COMMAND_TIMEOUT, current_limit=None, parent=None):
+        super().__init__(parent)
+        self.esp_ip = esp_ip
+        self.port = port
+        self.connected = False
+        # Link statistics, mirrored from the child's reconnect signals
+        self.stats = {'link_drops': 0, 'reconnects': 0, 'reconnect_attempts': 0,
+                      'downtime': 0.0, 'reconnecting': False, 'time_to_first_sample': None,
+                      'clock': None}
+        self.candidates = []  # Further (host, port) pairs connect_async() races against esp_ip:port
+        self.metrics = None  # Latest stage metrics snapshot from the child, while enabled
+        self.outage_start = None
+        self.command_tokens = itertools.count(1)
+        self.stop_counter = itertools.count(1)
+        self.stop_generation = 0
+        self.emergency_lock = threading.Lock()  # emergency_stop() may be called from any thread
+        self.commands = {}  # token -> Future awaiting the child's reply
+        self.command_counts = {'completed': 0, 'timeouts': 0, 'errors': 0, 'dropped': 0}
+        self.round_trips = deque(maxlen=1000)  # Seconds, mirrored from command_acknowledged
+        self.max_batch = max_batch  # Samples emitted per tick; the rest stay queued in the ring
+        self.ring = SampleRing.create(capacity)
+        context = multiprocessing.get_context("spawn")
+        self.control, child_control = context.Pipe()
+        child_emergency, self.emergency = context.Pipe(duplex=False)
+        options = {'timeout': timeout, 'reconnect_attempts': reconnect_attempts,
+                   'command_timeout': command_timeout, 'current_limit': current_limit}
+        self.process = context.Process(target=acquisition_main,
+                                       args=(self.ring.name, child_control, child_emergency),
+                                       kwargs=options, name="Acquisition", daemon=True)
+        self.process.start()
+        child_control.close()
+        child_emergency.close()
+        self.reported_overrun = 0
+        self.poll_timer = QTimer(self)
+        self.poll_timer.timeout.connect(self.poll)
+        self.poll_timer.start(poll_interval)
+
+    @property
+    def overrun(self):
+        """Samples overwritten before the GUI read them"""
+        return self.ring.overrun
+
+    def backlog(self):
+        """Samples acquired but not yet delivered to the GUI"""
+        return self.ring.backlog()
+
+    def connection_stats(self):
+        """Same keys as ESP32Backend.connection_stats()"""
+        stats = dict(self.stats)
+        if self.outage_start is not None:
+            stats['downtime'] += time.monotonic() - self.outage_start
+        return stats
+
+    def command_stats(self):
+        """Same keys as ESP32Backend.command_stats()"""
+        stats = dict(self.command_counts, in_flight=len(self.commands))
+        stats.update(latency_summary(self.round_trips))
+        return stats
+
+    def enable_metrics(self, enabled=True):
+        """Same as ESP32Backend.enable_metrics(); the child reports snapshots while enabled"""
+        self.metrics = None
+        self._request('metrics', enabled)
+
+    def metrics_snapshot(self):
+        """The child's latest StageMetrics snapshot (up to METRICS_REPORT_INTERVAL old)"""
+        if self.metrics is None:
+            return StageMetrics().snapshot()
+        return self.metrics
+
+    def enable_tracing(self, enabled=True):
+        """Same as ESP32Backend.enable_tracing(); stamps cross the ring with the samples"""
+        self._request('trace', enabled)
+
+    # ===== Connection =====
+
+    def connect(self):
+        return self._request('connect', [(self.esp_ip, self.port)])
+
+    def connect_async(self, candidates=None):
+        """Same as ESP32Backend.connect_async(); the race runs in the child"""
+        if candidates is None:
+            candidates = [(self.esp_ip, self.port)] + self.candidates
+        return self._request('connect', list(dict.fromkeys(candidates)))
+
+    def cancel_connect(self):
+        self._request('cancel_connect')
+
+    def disconnect(self):
+        self._request('disconnect')
+
+    def _request(self, *request):
+        if self.control is None:
+            self.error_occurred.emit("Acquisition process is not running.")
+            return False
+        try:
+            self.control.send(request)
+            return True
+        except OSError as e:
+            self.error_occurred.emit(f"Acquisition process error: {str(e)}")
+            return False
+
+    def _call(self, method, *args):
+        if not self.connected:
+            self.error_occurred.emit("Not connected. Cannot send command.")
+            return False
+        token = next(self.command_tokens)
+        if not self._request('call', method, args, token, self.stop_generation):
+            return False
+        future = self.commands[token] = Future()
+        return future
+
+    def emergency_stop(self, reason="Operator stop"):
+        """Bypass the request pipe: the child writes STOP from its emergency thread (any thread may call)"""
+        token = next(self.command_tokens)
+        self.stop_generation = next(self.stop_counter)
+        future = self.commands[token] = Future()
+        try:
+            with self.emergency_lock:
+                self.emergency.send((token, self.stop_generation, reason))
+        except OSError as e:
+            self.commands.pop(token, None)
+            self.error_occurred.emit(f"Emergency stop failed: {str(e)}")
+            return False
+        return future
+
+    # ===== Commands (run by the child's ESP32Backend) =====
+
+    def send_command(self, command):
+        return self._call('send_command', command)
+
+    def start_short_circuit_test(self, current_value, power_factor):
+        return self._call('start_short_circuit_test', current_value, power_factor)
+
+    def start_trip_test(self, mcb_type, current_rating):
+        return self._call('start_trip_test', mcb_type, current_rating)
+
+    def start_temperature_test(self, rated_current):
+        return self._call('start_temperature_test', rated_current)
+
+    def set_power_factor(self, current_value, power_factor):
+        return self._call('set_power_factor', current_value, power_factor)
+
+    def configure_rl_circuit(self, resistance, inductance):
+        return self._call('configure_rl_circuit', resistance, inductance)
+
+    def set_variable_rl_configuration(self, resistance, inductance):
+        return self._call('set_variable_rl_configuration', resistance, inductance)
+
+    def stop_test(self):
+        return self.emergency_stop()
+
+    def reset_system(self):
+        return self._call('reset_system')
+
+    def get_status(self):
+        return self._call('get_status')
+
+    def calibrate_sensors(self):
+        return self._call('calibrate_sensors')
+
+    # ===== Delivery on the GUI thread =====
+
+    def poll(self):
+        """Forward child messages, then every sample that reached the ring since the last tick"""
+        try:
+            while self.control is not None and self.control.poll():
+                self._dispatch(self.control.recv())
+        except (EOFError, OSError):
+            self._on_process_lost()
+
+        samples = self.ring.read(self.max_batch)
+        for (timestamp, host_ns, voltage, current, raw_voltage, dc_offset,
+             power_factor, cycle_samples, cycle_captured, recv_ns, processed_ns) in samples.tolist():
+            waveform_data = {
+                'voltage': voltage,
+                'current': current,
+                'timestamp': timestamp,
+                'host_ns': host_ns,
+                'power_factor': power_factor,
+                'raw_voltage': raw_voltage,
+                'dc_offset': dc_offset,
+                'cycle_captured': cycle_captured,
+                'cycle_samples': cycle_samples
+            }
+            if recv_ns:
+                # monotonic_ns() is system-wide, so the child's stamps compare with ours
+                waveform_data['trace'] = (recv_ns, processed_ns)
+            self.real_time_waveform.emit(waveform_data)
+            self.data_received.emit({
+                'time': timestamp / 1000000.0,  # Convert microseconds to seconds
+                'voltage': voltage,
+                'current': current,
+                'temperature': 25.0,  # Default temp
+                'power_factor': power_factor,
+                'raw_voltage': raw_voltage,
+                'dc_offset': dc_offset
+            })
+
+        if self.ring.overrun > self.reported_overrun:
+            self.error_occurred.emit(
+                f"Display fell behind: {self.ring.overrun - self.reported_overrun} samples skipped")
+            self.reported_overrun = self.ring.overrun
+
+    def _dispatch(self, message):
+        kind = message[0]
+        if kind == 'command_done':
+            self._command_done(*message[1:])
+            return
+        if kind == 'connected_to':
+            # The child raced the candidates; keep the address that answered
+            self.esp_ip, self.port = message[1:]
+            return
+        if kind == 'clock_stats':
+            self.stats['clock'] = message[1]
+            return
+        if kind == 'metrics':
+            self.metrics = message[1]
+            return
+        if kind == 'commands_dropped':
+            self.command_counts['dropped'] = message[1]
+            return
+        if kind == 'command_acknowledged':
+            self.command_counts['completed'] += 1
+            self.round_trips.append(message[4])
+        elif kind == 'first_sample':
+            self.stats['time_to_first_sample'] = message[1]
+        elif kind == 'connection_status_changed':
+            self.connected = message[1]
+        elif kind == 'reconnecting':
+            self.stats['reconnect_attempts'] += 1
+            if message[1] == 1:
+                self.stats['link_drops'] += 1
+                self.outage_start = time.monotonic()
+            self.stats['reconnecting'] = True
+        elif kind == 'reconnect_finished':
+            self.stats['reconnects'] += 1 if message[1] else 0
+            self.stats['downtime'] += message[3]
+            self.stats['reconnecting'] = False
+            self.outage_start = None
+        getattr(self, kind).emit(*message[1:])
+
+    def _command_done(self, token, reply, error):
+        future = self.commands.pop(token, None)
+        if future is None:
+            return
+        if error is None:
+            future.set_result(reply)
+            return
+        if isinstance(error, TimeoutError):
+            self.command_counts['timeouts'] += 1
+        elif not isinstance(error, ConnectionError):
+            self.command_counts['errors'] += 1
+        future.set_exception(error)
+
+    def _fail_commands(self, error):
+        commands, self.commands = self.commands, {}
+        for future in commands.values():
+            future.set_exception(error)
+
+    def _on_process_lost(self):
+        self.control = None
+        self._fail_commands(ConnectionError("Acquisition process stopped"))
+        if self.connected:
+            self.connected = False
+            self.connection_status_changed.emit(False, "Acquisition process stopped")
+
+    def shutdown(self):
+        """Stop the child process and release the ring"""
+        if self.ring is None:
+            return
+        self.poll_timer.stop()
+        if self.control is not None:
+            try:
+                self.control.send(('quit',))
+            except OSError:
+                pass
+        self.process.join(timeout=3)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(timeout=1)
+        if self.control is not None:
+            self.control.close()
+            self.control = None
+        with self.emergency_lock:
+            self.emergency.close()
+        self._fail_commands(ConnectionError("Acquisition process stopped"))
+        self.connected = False
+        self.ring.close()
+        self.ring = None
@@ -0,0 +1,507 @@
+"""
+Analysis Executor for MCB Testing System
+Runs post-test capture analyses in worker processes, passing arrays through shared memory
+"""
+
+import itertools
+import math
+import os
+import threading
+import time
+from PyQt5.QtCore import QObject, pyqtSignal
+
+REPORT_DIRECTORY = "./test_results/reports"
+MAINS_FREQUENCY = 50.0      # Hz
+THD_WINDOW_CYCLES = 10      # 200 ms analysis windows at 50 Hz (IEC 61000-4-7)
+THD_HARMONICS = 40
+BREAK_THRESHOLD = 0.1       # Current counts as flowing above 10% of the peak half-cycle RMS
+
+# Instantaneous-release band per MCB type, in multiples of In (IEC 60898-1 Table 7)
+INSTANTANEOUS_BANDS = {'B': (3, 5), 'C': (5, 10), 'D': (10, 20)}
+
+
+class AnalysisCancelled(Exception):
+    """Raised inside a worker when its job was cancelled"""
+
+
+# ===== Shared-memory transport =====
+
+class SharedArrays:
+    """
+    Named NumPy arrays copied into one SharedMemory block.
+
+    Only `spec` (block name plus offset/shape/dtype per array) is pickled to
+    the worker, so a multi-million-sample capture costs one memcpy instead of
+    a pickle, a pipe transfer and an unpickle. The creator unlinks the block
+    with release() once the job is done.
+    """
+
+    ALIGNMENT = 64
+
+    def __init__(self, arrays):
+        import numpy as np
+        from multiprocessing import shared_memory
+
+        layout = {}
+        offset = 0
+        for name, values in arrays.items():
+            values = np.ascontiguousarray(values)
+            layout[name] = (offset, values.shape, values.dtype.str)
+            offset += -(-values.nbytes // self.ALIGNMENT) * self.ALIGNMENT
+        self.shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        for name, values in arrays.items():
+            start, shape, dtype = layout[name]
+            target = np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=start)
+            target[...] = values
+            del target
+        self.spec = (self.shm.name, layout)
+
+    def release(self):
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+
+def attach_arrays(spec):
+    """Worker side: map a SharedArrays spec read-only. Returns (shm, {name: array})"""
+    import numpy as np
+    from multiprocessing import shared_memory
+
+    name, layout = spec
+    shm = shared_memory.SharedMemory(name=name)
+    arrays = {}
+    for key, (offset, shape, dtype) in layout.items():
+        view = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+        view.flags.writeable = False
+        arrays[key] = view
+    return shm, arrays
+
+
+# ===== Worker process =====
+
+_progress_queue = None
+_generation = None
+
+
+def _init_worker(progress_queue, generation):
+    global _progress_queue, _generation
+    _progress_queue = progress_queue
+    _generation = generation
+
+
+class JobContext:
+    """Handed to every analysis: reports progress and raises if the job was cancelled"""
+
+    def __init__(self, job_id, generation):
+        self.job_id = job_id
+        self.generation = generation
+        self.last_report = 0.0
+
+    def check(self):
+        if _generation is not None and _generation.value != self.generation:
+            raise AnalysisCancelled()
+
+    def progress(self, fraction, stage=""):
+        self.check()
+        now = time.monotonic()
+        # A few updates per second are plenty for a progress bar
+        if _progress_queue is not None and (now - self.last_report >= 0.05 or fraction >= 1.0):
+            self.last_report = now
+            _progress_queue.put((self.job_id, float(fraction), stage))
+
+
+def _run_job(job_id, generation, kind, spec, params):
+    context = JobContext(job_id, generation)
+    context.check()
+    shm, arrays = attach_arrays(spec)
+    try:
+        return ANALYSES[kind](context, **arrays, **params)
+    finally:
+        # Results must not keep views into the block
+        arrays.clear()
+        shm.close()
+
+
+# ===== Analyses (run in the worker; results are plain Python values) =====
+
+def _uniform(times, values):
+    """Resample onto an even grid at the median sample interval"""
+    import numpy as np
+
+    times = np.asarray(times, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    if len(times) < 2:
+        return times, values, 0.0
+    dt = float(np.median(np.diff(times)))
+    if dt <= 0:
+        return times, values, 0.0
+    grid = np.arange(times[0], times[-1], dt)
+    return grid, np.interp(grid, times, values), 1.0 / dt
+
+
+def harmonic_analysis(context, times, values, fundamental=MAINS_FREQUENCY,
+                      window_cycles=THD_WINDOW_CYCLES, harmonics=THD_HARMONICS):
+    """
+    FFT of consecutive windows of `window_cycles` mains cycles.
+
+    Returns the THD and fundamental RMS per window plus the mean amplitude of
+    each harmonic relative to the fundamental. Harmonics above Nyquist are
+    left out.
+    """
+    import numpy as np
+
+    context.progress(0.0, "Resampling")
+    grid, signal, sample_rate = _uniform(times, values)
+    window = int(round(window_cycles / fundamental * sample_rate)) if sample_rate else 0
+    result = {'sample_rate': sample_rate, 'fundamental': fundamental, 'window_start': [],
+              'thd': [], 'fundamental_rms': [], 'harmonics': [], 'thd_mean': None, 'thd_max': None}
+    if window < 8 or len(signal) < window:
+        context.progress(1.0, "Not enough data")
+        return result
+
+    harmonics = max(1, min(harmonics, int(sample_rate / 2 / fundamental) - 1))
+    bin_width = sample_rate / window
+    orders = np.arange(1, harmonics + 1)
+    centres = np.rint(orders * fundamental / bin_width).astype(int)
+    taper = np.hanning(window)
+    scale = 2.0 / taper.sum()
+
+    count = len(signal) // window
+    frames = signal[:count * window].reshape(count, window)
+    thd = np.empty(count)
+    fundamental_rms = np.empty(count)
+    relative = np.zeros(harmonics)
+    batch = 256
+    for first in range(0, count, batch):
+        block = frames[first:first + batch]
+        block = (block - block.mean(axis=1, keepdims=True)) * taper
+        spectrum = np.abs(np.fft.rfft(block, axis=1)) * scale
+        # Take the strongest bin next to each harmonic in case the mains frequency drifted
+        neighbours = np.clip(centres[:, None] + np.array([-1, 0, 1]), 0, spectrum.shape[1] - 1)
+        amplitudes = spectrum[:, neighbours].max(axis=2)
+        base = np.maximum(amplitudes[:, 0], 1e-12)
+        thd[first:first + batch] = np.sqrt((amplitudes[:, 1:] ** 2).sum(axis=1)) / base
+        fundamental_rms[first:first + batch] = amplitudes[:, 0] / math.sqrt(2)
+        relative += (amplitudes / base[:, None]).sum(axis=0)
+        context.progress(min(first + batch, count) / count, "Harmonic analysis")
+
+    result.update(
+        window_start=(grid[0] + np.arange(count) * window / sample_rate).tolist(),
+        thd=thd.tolist(),
+        fundamental_rms=fundamental_rms.tolist(),
+        harmonics=(relative / count).tolist(),
+        thd_mean=float(thd.mean()),
+        thd_max=float(thd.max()),
+    )
+    return result
+
+
+def breaking_time(context, times, current, fundamental=MAINS_FREQUENCY, threshold=BREAK_THRESHOLD):
+    """
+    Fault-current duration from the half-cycle RMS envelope.
+
+    Current flows while the envelope is above `threshold` times its peak;
+    the breaking time runs from the first such half cycle to the first one
+    after the peak where it stays below. breaking_time is None when the
+    current was still flowing at the end of the capture.
+    """
+    import numpy as np
+
+    context.progress(0.0, "Resampling")
+    grid, signal, sample_rate = _uniform(times, current)
+    result = {'start': None, 'end': None, 'breaking_time': None,
+              'peak_current': None, 'peak_rms': None}
+    half_cycle = int(round(sample_rate / fundamental / 2)) if sample_rate else 0
+    if half_cycle < 2 or len(signal) < half_cycle:
+        context.progress(1.0, "Not enough data")
+        return result
+
+    count = len(signal) // half_cycle
+    blocks = signal[:count * half_cycle].reshape(count, half_cycle)
+    envelope = np.sqrt((blocks ** 2).mean(axis=1))
+    context.progress(0.5, "Envelope")
+
+    peak_block = int(envelope.argmax())
+    flowing = envelope > threshold * envelope[peak_block]
+    start_block = int(flowing.argmax())
+    after_peak = np.flatnonzero(flowing[peak_block:])
+    end_block = peak_block + int(after_peak[-1]) + 1
+    block_time = half_cycle / sample_rate
+    result.update(
+        start=float(grid[0] + start_block * block_time),
+        peak_current=float(np.abs(signal).max()),
+        peak_rms=float(envelope[peak_block]),
+    )
+    if end_block < count:
+        result['end'] = float(grid[0] + end_block * block_time)
+        result['breaking_time'] = result['end'] - result['start']
+    context.progress(1.0, "Breaking time")
+    return result
+
+
+def evaluate_trip(mcb_type, rated_current, test_current, trip_time):
+    """
+    Check a trip time against the IEC 60898-1 time-current limits.
+
+    trip_time is None when the breaker did not trip. Returns the multiple of
+    In, the applicable region and its (min_time, max_time) limits in seconds
+    (None: unbounded) and whether the result is inside them.
+    """
+    low, high = INSTANTANEOUS_BANDS.get(mcb_type, INSTANTANEOUS_BANDS['C'])
+    multiple = test_current / rated_current if rated_current else 0.0
+    if multiple >= high:
+        region, limits = "Instantaneous trip", (None, 0.1)
+    elif multiple >= low:
+        region, limits = "Instantaneous no-trip", (0.1, None)
+    elif multiple >= 2.55:
+        region, limits = "Thermal 2.55 In", (1.0, 60.0 if rated_current <= 32 else 120.0)
+    elif multiple >= 1.45:
+        region, limits = "Conventional tripping", (None, 3600.0)
+    elif multiple > 1.13:
+        region, limits = "Between conventional currents", (None, None)
+    else:
+        region, limits = "Conventional non-tripping", (3600.0, None)
+
+    min_time, max_time = limits
+    if trip_time is None:
+        passed = max_time is None
+    else:
+        passed = ((min_time is None or trip_time >= min_time)
+                  and (max_time is None or trip_time <= max_time))
+    return {'multiple': multiple, 'region': region, 'min_time': min_time,
+            'max_time': max_time, 'trip_time': trip_time, 'passed': passed}
+
+
+def trip_analysis(context, times, current, mcb_type='C', rated_current=16.0,
+                  fundamental=MAINS_FREQUENCY):
+    """Trip time and RMS test current from the capture, evaluated against the trip curve"""
+    result = breaking_time(context, times, current, fundamental)
+    test_current = result['peak_rms'] or 0.0
+    result.update(evaluate_trip(mcb_type, rated_current, test_current, result['breaking_time']))
+    result.update(mcb_type=mcb_type, rated_current=rated_current, test_current=test_current)
+    return result
+
+
+def spectrum_report(context, times, voltage, current, path, title="Harmonic Analysis",
+                    fundamental=MAINS_FREQUENCY):
+    """Harmonic spectra and THD trend of both channels, saved as a PNG/PDF report figure"""
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    import numpy as np
+
+    results = {}
+    for index, (name, values) in enumerate((('voltage', voltage), ('current', current))):
+        results[name] = harmonic_analysis(_SubContext(context, index * 0.4, 0.4), times, values, fundamental)
+
+    context.progress(0.8, "Drawing report")
+    figure = Figure(figsize=(12, 8))
+    FigureCanvasAgg(figure)
+    spectrum_ax, trend_ax = figure.subplots(2, 1)
+    for offset, (name, color) in ((-0.2, ('voltage', '#f38ba8')), (0.2, ('current', '#a6e3a1'))):
+        harmonics = np.array(results[name]['harmonics'][1:]) * 100
+        if len(harmonics):
+            spectrum_ax.bar(np.arange(2, len(harmonics) + 2) + offset, harmonics, width=0.4,
+                            color=color, label=f"{name.title()} (THD mean "
+                                                f"{results[name]['thd_mean'] * 100:.2f}%)")
+        trend_ax.plot(results[name]['window_start'], np.array(results[name]['thd']) * 100,
+                      color=color, label=name.title())
+    spectrum_ax.set_xlabel("Harmonic order")
+    spectrum_ax.set_ylabel("% of fundamental")
+    spectrum_ax.legend()
+    trend_ax.set_xlabel("Time (s)")
+    trend_ax.set_ylabel("THD (%)")
+    trend_ax.legend()
+    figure.suptitle(title)
+    figure.tight_layout()
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    figure.savefig(path)
+    context.progress(1.0, "Report saved")
+    return {'path': path, 'voltage_thd_mean': results['voltage']['thd_mean'],
+            'current_thd_mean': results['current']['thd_mean']}
+
+
+def trend_report(context, store_path, path, title="Trend", max_points=2000):
+    """Min/max band and mean of every channel in a TrendStore file, read from its rollups"""
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from trend_store import TrendStore
+
+    store = TrendStore(store_path)
+    try:
+        channels = sorted(store.channels())
+        trends = {}
+        for index, channel in enumerate(channels):
+            trends[channel] = store.query(channel, max_points=max_points)
+            context.progress(0.5 * (index + 1) / len(channels), "Reading trends")
+    finally:
+        store.close()
+    if not channels:
+        return {'path': None, 'points': 0, 'resolution': 0}
+
+    context.progress(0.6, "Drawing report")
+    colors = {'voltage': '#f38ba8', 'current': '#a6e3a1'}
+    figure = Figure(figsize=(12, 3 + 2.5 * len(channels)))
+    FigureCanvasAgg(figure)
+    axes = figure.subplots(len(channels), 1, sharex=True, squeeze=False)[:, 0]
+    for ax, channel in zip(axes, channels):
+        trend = trends[channel]
+        color = colors.get(channel, '#89b4fa')
+        ax.fill_between(trend['t'], trend['min'], trend['max'], color=color, alpha=0.3, linewidth=0,
+                        label="min / max")
+        ax.plot(trend['t'], trend['mean'], color=color, linewidth=1, label="mean")
+        resolution = f"{trend['resolution']} s rollups" if trend['resolution'] else "raw samples"
+        ax.set_ylabel(channel.title())
+        ax.set_title(f"{channel.title()} ({len(trend['t'])} points, {resolution})", fontsize=10)
+        ax.legend(loc='upper right')
+    axes[-1].set_xlabel("Time since test start (s)")
+    figure.suptitle(title)
+    figure.tight_layout()
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    figure.savefig(path)
+    context.progress(1.0, "Report saved")
+    return {'path': path, 'points': sum(len(trend['t']) for trend in trends.values()),
+            'resolution': max(trend['resolution'] for trend in trends.values())}
+
+
+class _SubContext:
+    """Maps a nested analysis' 0..1 progress onto part of the parent job's range"""
+
+    def __init__(self, parent, start, span):
+        self.parent = parent
+        self.start = start
+        self.span = span
+
+    def progress(self, fraction, stage=""):
+        self.parent.progress(self.start + fraction * self.span, stage)
+
+
+ANALYSES = {
+    'harmonics': harmonic_analysis,
+    'breaking_time': breaking_time,
+    'trip': trip_analysis,
+    'report': spectrum_report,
+    'trend_report': trend_report,
+}
+
+
+# ===== GUI side =====
+
+class AnalysisExecutor(QObject):
+    """
+    Post-test analyses on a ProcessPoolExecutor.
+
+    submit() copies the capture arrays into shared memory and returns a job
+    id at once. Workers send progress through a queue that a listener thread
+    turns into analysis_progress; completion comes back from the executor's
+    callback thread. All signals reach GUI-thread slots through queued
+    connections.
+
+    cancel_all() (called when a new test starts) drops queued jobs and bumps
+    a shared generation counter that running jobs check at every progress
+    step, so stale analyses stop within one batch.
+    """
+    analysis_progress = pyqtSignal(int, float, str)   # job id, 0..1, stage
+    analysis_finished = pyqtSignal(int, str, dict)    # job id, kind, result
+    analysis_failed = pyqtSignal(int, str, str)       # job id, kind, error message
+    analysis_cancelled = pyqtSignal(int, str)         # job id, kind
+
+    def __init__(self, max_workers=None, parent=None):
+        super().__init__(parent)
+        # Leave a core for the GUI and acquisition
+        self.max_workers = max_workers or max(1, min(4, (os.cpu_count() or 2) - 1))
+        self.executor = None
+        self.progress_queue = None
+        self.generation = None
+        self.listener = None
+        self.jobs = {}  # job id -> (kind, future, SharedArrays)
+        self.job_ids = itertools.count(1)
+        self.lock = threading.Lock()
+
+    def _start(self):
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        # spawn: forking a process that has Qt running is not safe
+        context = multiprocessing.get_context('spawn')
+        self.progress_queue = context.Queue()
+        self.generation = context.Value('i', 0)
+        self.executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context,
+                                            initializer=_init_worker,
+                                            initargs=(self.progress_queue, self.generation))
+        self.listener = threading.Thread(target=self._forward_progress, args=(self.progress_queue,),
+                                         name="AnalysisProgress", daemon=True)
+        self.listener.start()
+
+    def submit(self, kind, arrays, **params):
+        """Queue one analysis of `arrays` (name -> NumPy array); returns its job id"""
+        if kind not in ANALYSES:
+            raise ValueError(f"Unknown analysis: {kind}")
+        if self.executor is None:
+            self._start()
+        job_id = next(self.job_ids)
+        shared = SharedArrays(arrays)
+        with self.lock:
+            future = self.executor.submit(_run_job, job_id, self.generation.value, kind, shared.spec, params)
+            self.jobs[job_id] = (kind, future, shared)
+        future.add_done_callback(lambda f: self._on_done(job_id))
+        return job_id
+
+    def active_jobs(self):
+        with self.lock:
+            return len(self.jobs)
+
+    def cancel_all(self):
+        """Cancel every queued and running analysis"""
+        if self.executor is None:
+            return
+        with self.lock:
+            with self.generation.get_lock():
+                self.generation.value += 1
+            futures = [future for _, future, _ in self.jobs.values()]
+        for future in futures:
+            future.cancel()
+
+    def shutdown(self):
+        if self.executor is None:
+            return
+        self.cancel_all()
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.executor = None
+        self.progress_queue.put(None)
+        self.listener.join(timeout=2)
+        self.progress_queue.close()
+        self.listener = None
+
+    def _forward_progress(self, progress_queue):
+        while True:
+            message = progress_queue.get()
+            if message is None:
+                break
+            job_id, fraction, stage = message
+            with self.lock:
+                active = job_id in self.jobs
+            if active:
+                self.analysis_progress.emit(job_id, fraction, stage)
+
+    def _on_done(self, job_id):
+        from concurrent.futures import CancelledError
+
+        # Forget the job first so slots calling active_jobs() see it as done
+        with self.lock:
+            kind, future, shared = self.jobs.pop(job_id)
+        shared.release()
+        try:
+            result = future.result()
+        except (CancelledError, AnalysisCancelled):
+            self.analysis_cancelled.emit(job_id, kind)
+        except Exception as e:
+            self.analysis_failed.emit(job_id, kind, str(e))
+        else:
+            self.analysis_finished.emit(job_id, kind, result)
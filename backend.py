@@ -3,11 +3,163 @@ Backend Communication Module for MCB Testing System
 Handles WiFi communication with ESP32 microcontroller
 """
 
+import bisect
+import errno
+import itertools
+import json
+import math
+import os
+import random
+import selectors
 import socket
 import threading
 import time
-import numpy as np
+from collections import deque
 from PyQt5.QtCore import QObject, pyqtSignal, QTimer
+from command_channel import CommandChannel, COMMAND_TIMEOUT
+from device_clock import DeviceClock
+from stage_metrics import StageMetrics
+
+# Reconnect backoff: base * 2**(attempt - 1), capped, with the upper half jittered
+RECONNECT_BASE_DELAY = 0.5   # seconds
+RECONNECT_MAX_DELAY = 30.0   # seconds
+# After a longer outage the bench may have been reconfigured; DSP state restarts
+RESUME_WINDOW = 30.0         # seconds
+
+DEFAULT_ESP_IP = "10.91.136.24"
+DEFAULT_PORT = 8888
+CONNECT_PROGRESS_INTERVAL = 1.0  # seconds between "still connecting" progress messages
+RMS_WINDOW = 20  # Recent processed samples kept for the RMS voltage behind the calculated current
+
+
+def enable_keepalive(sock, timeout):
+    """
+    TCP keepalive probes so a link that vanished silently is noticed within
+    a few timeouts. The controller is quiet between tests, so without them a
+    dropped WiFi link looks like an idle one.
+    """
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    idle = max(1, int(timeout))
+    # Tuning options exist only on some platforms
+    for option, value in (('TCP_KEEPIDLE', idle), ('TCP_KEEPINTVL', max(1, idle // 3)), ('TCP_KEEPCNT', 3)):
+        if hasattr(socket, option):
+            sock.setsockopt(socket.IPPROTO_TCP, getattr(socket, option), value)
+
+
+def prepare_socket(sock, timeout):
+    """Options for every controller link: keepalive, and no Nagle delay on short commands"""
+    enable_keepalive(sock, timeout)
+    # A STOP must leave at once instead of waiting for an earlier segment's ACK
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+
+def send_all(sock, data, timeout):
+    """
+    sendall() for a non-blocking socket (StationManager links): waits for room
+    in the send buffer instead of raising BlockingIOError after a partial
+    write. Raises socket.timeout when `timeout` seconds pass in total.
+    """
+    view = memoryview(data)
+    deadline = time.monotonic() + timeout
+    while view:
+        try:
+            view = view[sock.send(view):]
+        except BlockingIOError:
+            remaining = deadline - time.monotonic()
+            with selectors.DefaultSelector() as selector:
+                selector.register(sock, selectors.EVENT_WRITE)
+                if remaining <= 0 or not selector.select(remaining):
+                    raise socket.timeout(f"send timed out after {timeout:g}s")
+
+
+def parse_candidates(text, default_port=DEFAULT_PORT):
+    """
+    "host[:port], host[:port] ..." (or a list of such strings) -> [(host, port)].
+    Order is kept and duplicates are dropped; entries without a port use default_port.
+    """
+    entries = text.replace(";", ",").split(",") if isinstance(text, str) else text
+    candidates = []
+    for entry in entries:
+        host, _, port = entry.strip().partition(":")
+        if not host:
+            continue
+        candidate = (host, int(port) if port else int(default_port))
+        if candidate not in candidates:
+            candidates.append(candidate)
+    return candidates
+
+
+def race_connect(candidates, timeout, cancelled=None, progress=None, poll=0.05):
+    """
+    Start a non-blocking connect to every (host, port) at once and keep the
+    first that completes; the others are closed. Blocks the calling thread
+    for at most `timeout` seconds. `cancelled()` is checked every `poll`
+    seconds and `progress(message)` reports failures and elapsed time.
+
+    Returns (socket, (host, port)). Raises ConnectionAbortedError when
+    cancelled and OSError when no candidate answered.
+    """
+    selector = selectors.DefaultSelector()
+    errors = []
+    started = time.monotonic()
+    try:
+        for host, port in candidates:
+            try:
+                family, kind, proto, _, address = socket.getaddrinfo(
+                    host, port, socket.AF_INET, socket.SOCK_STREAM)[0]
+                sock = socket.socket(family, kind, proto)
+            except OSError as e:
+                errors.append(f"{host}:{port}: {e}")
+                continue
+            sock.setblocking(False)
+            result = sock.connect_ex(address)
+            if result not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EALREADY):
+                sock.close()
+                errors.append(f"{host}:{port}: {os.strerror(result)}")
+                continue
+            selector.register(sock, selectors.EVENT_WRITE, (host, port))
+        if progress is not None:
+            progress(f"Trying {len(selector.get_map())} of {len(candidates)} address(es)")
+        
+        next_report = started + CONNECT_PROGRESS_INTERVAL
+        while selector.get_map():
+            if cancelled is not None and cancelled():
+                raise ConnectionAbortedError("Connect cancelled")
+            now = time.monotonic()
+            if now - started >= timeout:
+                errors.append("timed out")
+                break
+            if progress is not None and now >= next_report:
+                next_report += CONNECT_PROGRESS_INTERVAL
+                progress(f"Waiting for {len(selector.get_map())} address(es), "
+                         f"{now - started:.0f}s of {timeout:g}s")
+            for key, _ in selector.select(min(poll, timeout - (now - started))):
+                sock = key.fileobj
+                selector.unregister(sock)
+                error = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                if error:
+                    sock.close()
+                    host, port = key.data
+                    errors.append(f"{host}:{port}: {os.strerror(error)}")
+                    if progress is not None:
+                        progress(f"{host}:{port} failed: {os.strerror(error)}")
+                    continue
+                sock.setblocking(True)
+                return sock, key.data
+        raise OSError("; ".join(errors) or "no address to try")
+    finally:
+        for key in list(selector.get_map().values()):
+            key.fileobj.close()
+        selector.close()
+
+
+def load_config(path="config.json"):
+    """Parsed config file (layout as config_example.json); {} when it does not exist"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
 
 class ESP32Backend(QObject):
     # Signals for communication with frontend
@@ -18,23 +170,54 @@ class ESP32Backend(QObject):
     rl_config_confirmed = pyqtSignal(str)  # R-L configuration confirmation
     voltage_data_received = pyqtSignal(list, list)  # voltage_values, timestamps
     real_time_waveform = pyqtSignal(dict)  # real-time voltage and calculated current
+    reconnecting = pyqtSignal(int, int, float)  # attempt, max attempts, backoff delay (s)
+    reconnect_finished = pyqtSignal(bool, int, float)  # resumed, attempts used, outage (s)
+    command_acknowledged = pyqtSignal(int, str, str, float)  # sequence ID, command, reply, round-trip (s)
+    emergency_stopped = pyqtSignal(str, float)  # reason, request-to-wire latency (s)
+    connect_progress = pyqtSignal(str)  # progress of a connect_async() race
+    first_sample = pyqtSignal(float)  # seconds from connect request to first processed sample
 
-    def __init__(self, esp_ip="10.91.136.24", port=8888):
+    def __init__(self, esp_ip=DEFAULT_ESP_IP, port=DEFAULT_PORT, manager=None, timeout=10.0, reconnect_attempts=3,
+                 command_timeout=COMMAND_TIMEOUT, current_limit=None):
         super().__init__()
         self.esp_ip = esp_ip
         self.port = port
+        self.timeout = timeout  # Connect timeout (s); also how long a silent dead link may go unnoticed
+        self.reconnect_attempts = reconnect_attempts  # 0: a dropped link stays down
+        self.reconnect_base_delay = RECONNECT_BASE_DELAY
+        self.reconnect_max_delay = RECONNECT_MAX_DELAY
+        self.candidates = []  # Further (host, port) pairs connect_async() races against esp_ip:port
         self.client = None
         self.connected = False
+        self.connect_lock = threading.Lock()  # Orders a race's winner against cancel_connect()
+        self.connect_cancel = None  # Event of the connect_async() race in progress
+        self.connect_started = None  # perf_counter of the connect request, until the first sample
+        self.time_to_first_sample = None
         self.receive_thread = None
         self.running = False
+        self.stop_event = threading.Event()  # Set to end the current receive thread, even mid-backoff
+        self.rx_buffer = ""  # Partial message between received chunks
+        self.commands = CommandChannel(command_timeout)  # Commands awaiting their reply
+        # Writes are serialised so a STOP never lands inside another command's bytes
+        self.send_lock = threading.Lock()
+        self.stop_counter = itertools.count(1)
+        self.stop_generation = 0  # Bumped by each emergency stop; drops commands still waiting to be written
+        self.current_limit = current_limit  # A; a calculated current beyond it stops the test
+        self.limit_tripped = False
+        # StationManager that drives this socket from its shared event loop
+        # (None: connect() starts a receive thread for this controller alone)
+        self.manager = manager
         # Data storage
         self.time_vals = []
         self.temp_vals = []
         self.current_vals = []
         self.voltage_vals = []
-        # Real-time voltage data
-        self.voltage_readings = []
-        self.timestamps = []
+        # Recent processed voltage; bounded, an hour-long run must not grow with the sample count
+        self.voltage_readings = deque(maxlen=RMS_WINDOW)
+        self.timestamps = deque(maxlen=RMS_WINDOW)
+        self.clock = DeviceClock()  # Unwraps micros() and maps it onto host monotonic time
+        self.metrics = StageMetrics()  # Per-stage timings of the sample pipeline; off until enabled
+        self.tracing = False  # Stamp each block's last sample for latency_tracer.LatencyTracer
         self.current_power_factor = 0.8  # Default power factor
         self.current_target_current = 1000  # Default target current
         # DC offset removal
@@ -50,40 +233,149 @@ class ESP32Backend(QObject):
         self.cycle_duration = 0.02  # 20ms for 50Hz (one complete cycle)
         self.loop_start_time = None  # When to start looping
         self.data_start_time = None  # First data timestamp
+        
+        # Link supervision
+        self.outage_start = None  # monotonic time the current outage began
+        self.link_drops = 0
+        self.reconnects = 0
+        self.reconnect_attempts_made = 0
+        self.outage_attempts = 0
+        self.total_downtime = 0.0
+
+    @classmethod
+    def from_config(cls, config, **kwargs):
+        """Backend from the "esp32" section of the config file"""
+        backend = cls(esp_ip=config.get('ip_address', DEFAULT_ESP_IP),
+                      port=int(config.get('port', DEFAULT_PORT)),
+                      timeout=float(config.get('timeout', 10.0)),
+                      reconnect_attempts=int(config.get('reconnect_attempts', 3)),
+                      command_timeout=float(config.get('command_timeout', COMMAND_TIMEOUT)),
+                      **kwargs)
+        backend.candidates = parse_candidates(config.get('candidates', []), backend.port)
+        return backend
+
+    def open_socket(self):
+        """Blocking TCP connect with the configured timeout"""
+        client = socket.create_connection((self.esp_ip, self.port), timeout=self.timeout)
+        prepare_socket(client, self.timeout)
+        return client
 
     def connect(self):
         """Create TCP connection to ESP32 and start receive thread."""
+        self.connect_started = time.perf_counter()
+        if self.manager is not None:
+            return self.manager.connect_station(self)
+        self._prepare_connect()
         try:
-            # Use SOCK_STREAM for TCP
-            self.client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.client.settimeout(10)  # 10 second connection timeout
-            
             # Connect to ESP32
-            self.client.connect((self.esp_ip, self.port))
-            self.connected = True
-            self.running = True
-            
-            # Reset cycle data for new connection
-            self.reset_cycle_data()
-            
-            # Start receive thread for confirmations
-            self.receive_thread = threading.Thread(target=self._receive_data, daemon=True)
-            self.receive_thread.start()
-            
-            self.connection_status_changed.emit(True, f"TCP connected to {self.esp_ip}:{self.port}")
-            return True
+            client = self.open_socket()
         except Exception as e:
             self.connected = False
             self.connection_status_changed.emit(False, f"TCP connection failed: {str(e)}")
             return False
+        self._start_session(client)
+        return True
+    
+    def connect_async(self, candidates=None):
+        """
+        Connect without blocking the caller: every candidate (host, port) is
+        tried at once from a worker thread and the first that answers is kept.
+        Defaults to esp_ip:port followed by `candidates`. Progress arrives via
+        connect_progress and the outcome via connection_status_changed;
+        cancel_connect() abandons the attempt.
+        """
+        if candidates is None:
+            candidates = list(dict.fromkeys([(self.esp_ip, self.port)] + self.candidates))
+        self.connect_started = time.perf_counter()
+        if self.manager is not None:
+            # The station loop connects without blocking already; a station has one address
+            self.esp_ip, self.port = candidates[0]
+            return self.manager.connect_station(self)
+        self._prepare_connect()
+        cancel = self.connect_cancel = threading.Event()
+        threading.Thread(target=self._race_connect, args=(list(candidates), cancel),
+                         name="ConnectRace", daemon=True).start()
+        return True
+    
+    def cancel_connect(self):
+        """Abandon a connect_async() still in progress"""
+        if self.manager is not None:
+            self.manager.disconnect_station(self)
+            return
+        with self.connect_lock:
+            cancel, self.connect_cancel = self.connect_cancel, None
+            if cancel is None:
+                return
+            cancel.set()
+        self.connect_started = None
+        self.connection_status_changed.emit(False, "Connect cancelled")
+    
+    def _race_connect(self, candidates, cancel):
+        try:
+            client, (host, port) = race_connect(candidates, self.timeout, cancel.is_set,
+                                                self.connect_progress.emit)
+            prepare_socket(client, self.timeout)
+        except ConnectionAbortedError:
+            return  # cancel_connect() reported it
+        except OSError as e:
+            with self.connect_lock:
+                if cancel.is_set():
+                    return
+                self.connect_cancel = None
+            self.connection_status_changed.emit(False, f"TCP connection failed: {str(e)}")
+            return
+        with self.connect_lock:
+            if cancel.is_set():
+                client.close()
+                return
+            self.connect_cancel = None
+            self.esp_ip, self.port = host, port
+            self._start_session(client)
+    
+    def _end_race(self):
+        """Silently stop a connect_async() race superseded by connect() or disconnect()"""
+        with self.connect_lock:
+            if self.connect_cancel is not None:
+                self.connect_cancel.set()
+                self.connect_cancel = None
+    
+    def _prepare_connect(self):
+        self._end_race()
+        # An operator connect replaces any reconnect still in progress
+        self._stop_receive_thread()
+        # Fresh event per receive thread: a stale thread still blocked in a
+        # reconnect attempt keeps seeing its own, already set, event
+        self.stop_event = threading.Event()
+        if self.outage_start is not None:
+            self.abandon_outage()
+    
+    def _start_session(self, client):
+        self.client = client
+        self.connected = True
+        self.running = True
+        
+        # Reset cycle data for new connection; the controller may be a different one
+        self.reset_cycle_data()
+        self.clock.reset()
+        
+        # Start receive thread for confirmations
+        self.receive_thread = threading.Thread(target=self._receive_data, args=(self.stop_event,),
+                                               daemon=True)
+        self.receive_thread.start()
+        
+        self.connection_status_changed.emit(True, f"TCP connected to {self.esp_ip}:{self.port}")
 
     def disconnect(self):
         """Disconnect from ESP32"""
-        self.connected = False
-        self.running = False
-        
-        if self.receive_thread and self.receive_thread.is_alive():
-            self.receive_thread.join(timeout=1)
+        self.connect_started = None
+        if self.manager is not None:
+            self.manager.disconnect_station(self)
+            return
+        self._end_race()
+        self._stop_receive_thread()
+        if self.outage_start is not None:
+            self.abandon_outage()
+        self.commands.fail_all(ConnectionError("Disconnected"))
             
         if self.client:
             try:
@@ -108,123 +400,350 @@ class ESP32Backend(QObject):
         self.dc_offset = None
         self.voltage_window = []
     
-    def _receive_data(self):
-        """Receive data from ESP32 in background thread"""
-        buffer = ""
-        while self.running and self.connected:
+    def _stop_receive_thread(self):
+        self.connected = False
+        self.running = False
+        self.stop_event.set()
+        if (self.receive_thread and self.receive_thread.is_alive()
+                and self.receive_thread is not threading.current_thread()):
+            self.receive_thread.join(timeout=1)
+    
+    def _receive_data(self, stop_event):
+        """Receive data from ESP32 in background thread; reconnects when the link drops"""
+        self.rx_buffer = ""
+        while not stop_event.is_set():
+            lost = None
+            self.expire_commands()
             try:
                 if self.client:
                     # Set socket timeout for non-blocking receive
                     self.client.settimeout(1.0)
                     data = self.client.recv(4096)  # Larger buffer for voltage data
                     if data:
-                        message = data.decode('utf-8')
-                        buffer += message
-                        
-                        # Process complete messages delimited by '@'
-                        while '@' in buffer:
-                            line, buffer = buffer.split('@', 1)
-                            line = line.strip()
-                            
-                            if line:
-                                # Parse voltage data format: "voltage,timestamp"
-                                if ',' in line and line.replace(',', '').replace('.', '').replace('-', '').isdigit():
-                                    try:
-                                        parts = line.split(',')
-                                        if len(parts) == 2:
-                                            raw_voltage = float(parts[0])
-                                            timestamp = int(parts[1])
-                                            
-                                            # Update DC offset calculation
-                                            self.update_dc_offset(raw_voltage)
-                                            
-                                            # Remove DC offset to get AC waveform
-                                            voltage_ac = self.remove_dc_offset(raw_voltage)
-                                            
-                                            # Initialize voltage with AC voltage as default (ensures voltage is always defined)
-                                            voltage = voltage_ac
-                                            
-                                            try:
-                                                # Capture cycle data for looping
-                                                cycle_ready = self.capture_cycle_data(voltage_ac, timestamp)
-                                                
-                                                # Use looped voltage if cycle is captured and available
-                                                if cycle_ready:
-                                                    looped_voltage = self.get_looped_voltage(timestamp)
-                                                    if looped_voltage is not None:
-                                                        voltage = looped_voltage
-                                                    # If looped_voltage is None, keep using voltage_ac
-                                            except Exception as cycle_error:
-                                                # If cycle processing fails, use original AC voltage
-                                                print(f"Cycle processing error: {cycle_error}")
-                                                voltage = voltage_ac
-                                            
-                                            # Store processed voltage data
-                                            self.voltage_readings.append(voltage)
-                                            self.timestamps.append(timestamp)
-                                            
-                                            # Calculate current from voltage and power factor
-                                            try:
-                                                current = self.calculate_current_from_voltage(voltage, timestamp)
-                                            except Exception as current_error:
-                                                print(f"Current calculation error: {current_error}")
-                                                current = 0.0  # Default current value
-                                            
-                                            # Emit real-time waveform data
-                                            waveform_data = {
-                                                'voltage': voltage,
-                                                'current': current,
-                                                'timestamp': timestamp,
-                                                'power_factor': self.current_power_factor,
-                                                'raw_voltage': raw_voltage,
-                                                'dc_offset': self.dc_offset if self.dc_offset is not None else 0.0,
-                                                'cycle_captured': self.cycle_captured,
-                                                'cycle_samples': len(self.cycle_data) if self.cycle_captured else 0
-                                            }
-                                            self.real_time_waveform.emit(waveform_data)
-                                            
-                                            # Also emit as regular data
-                                            data_dict = {
-                                                'time': timestamp / 1000000.0,  # Convert microseconds to seconds
-                                                'voltage': voltage,
-                                                'current': current,
-                                                'temperature': 25.0,  # Default temp
-                                                'power_factor': self.current_power_factor,
-                                                'raw_voltage': raw_voltage,
-                                                'dc_offset': self.dc_offset if self.dc_offset is not None else 0.0
-                                            }
-                                            self.data_received.emit(data_dict)
-                                            
-                                    except (ValueError, IndexError) as e:
-                                        # Not voltage data, handle as message
-                                        self._handle_message(line)
-                                else:
-                                    # Handle other messages
-                                    self._handle_message(line)
-                        
-                        # Also handle newline characters for robustness
-                        while '\n' in buffer or '\r' in buffer:
-                            if '\n' in buffer:
-                                line, buffer = buffer.split('\n', 1)
-                            else:
-                                line, buffer = buffer.split('\r', 1)
-                            line = line.strip()
-                            
-                            if line and line not in ['', ' ']:
-                                self._handle_message(line)
+                        self.feed(data)
+                    else:
+                        lost = "Connection closed by controller"
                                 
             except socket.timeout:
                 # Normal timeout, continue loop
                 continue
             except Exception as e:
-                if self.running:  # Only emit error if we're still supposed to be running
-                    self.error_occurred.emit(f"Receive error: {str(e)}")
-                break
+                lost = str(e)
+            
+            if lost is not None:
+                if stop_event.is_set():
+                    break  # disconnect() closed the socket under us
+                if not self._reconnect(lost, stop_event):
+                    break
+                continue
                 
             time.sleep(0.01)  # Faster polling for real-time data
     
+    # ===== Link supervision =====
+    
+    def reconnect_delay(self, attempt):
+        """Backoff before reconnect attempt n (1-based): exponential, capped, jittered"""
+        delay = min(self.reconnect_max_delay, self.reconnect_base_delay * 2 ** (attempt - 1))
+        # Jitter spreads out benches that lost the same access point together
+        return delay / 2 + random.uniform(0, delay / 2)
+    
+    def link_lost(self):
+        """Record a dropped link; returns True when reconnect attempts will follow"""
+        self.connected = False
+        self.link_drops += 1
+        # Replies to anything sent before the drop are gone with the old socket
+        self.commands.fail_all(ConnectionError("Link lost"))
+        if self.reconnect_attempts <= 0:
+            return False
+        self.outage_start = time.monotonic()
+        self.outage_attempts = 0
+        return True
+    
+    def count_reconnect_attempt(self):
+        self.reconnect_attempts_made += 1
+        self.outage_attempts += 1
+    
+    def end_outage(self):
+        """Add the current outage to the downtime total; returns its length (s)"""
+        outage = time.monotonic() - self.outage_start
+        self.total_downtime += outage
+        self.outage_start = None
+        return outage
+    
+    def abandon_outage(self):
+        """Operator connect/disconnect during a reconnect: the outage ends unresumed"""
+        self.reconnect_finished.emit(False, self.outage_attempts, self.end_outage())
+    
+    def link_restored(self):
+        """Close the outage; keep DSP state unless the gap makes it stale"""
+        outage = self.end_outage()
+        self.reconnects += 1
+        self.rx_buffer = ""  # A partial line from before the drop can never complete
+        if outage > RESUME_WINDOW:
+            self.reset_cycle_data()
+        elif not self.cycle_captured:
+            # A half-captured cycle would mix samples from both sides of the gap
+            self.cycle_data = []
+            self.cycle_timestamps = []
+            self.cycle_start_time = None
+            self.data_start_time = None
+        return outage
+    
+    def _reconnect(self, reason, stop_event):
+        """Receive-thread side of a dropped link; True once streaming resumed"""
+        try:
+            self.client.close()
+        except Exception:
+            pass
+        self.client = None
+        if not self.link_lost():
+            self.running = False
+            self.reset_cycle_data()
+            self.error_occurred.emit(f"Receive error: {reason}")
+            self.connection_status_changed.emit(False, f"Connection lost: {reason}")
+            return False
+        
+        last_error = reason
+        for attempt in range(1, self.reconnect_attempts + 1):
+            delay = self.reconnect_delay(attempt)
+            self.reconnecting.emit(attempt, self.reconnect_attempts, delay)
+            if attempt == 1:
+                self.connection_status_changed.emit(False, f"Connection lost: {reason} - reconnecting")
+            if stop_event.wait(delay):
+                return False
+            self.count_reconnect_attempt()
+            try:
+                client = self.open_socket()
+            except OSError as e:
+                last_error = str(e)
+                continue
+            if stop_event.is_set():
+                client.close()
+                return False
+            self.client = client
+            self.connected = True
+            outage = self.link_restored()
+            self.reconnect_finished.emit(True, attempt, outage)
+            self.connection_status_changed.emit(
+                True, f"TCP reconnected to {self.esp_ip}:{self.port} after {outage:.1f}s")
+            return True
+        
+        self.running = False
+        outage = self.end_outage()
+        self.reset_cycle_data()
+        self.reconnect_finished.emit(False, self.reconnect_attempts, outage)
+        self.connection_status_changed.emit(
+            False, f"Reconnect failed after {self.reconnect_attempts} attempts: {last_error}")
+        return False
+    
+    def connection_stats(self):
+        """Link drops, successful reconnects, attempts and total downtime (s), incl. a current outage"""
+        downtime = self.total_downtime
+        if self.outage_start is not None:
+            downtime += time.monotonic() - self.outage_start
+        return {
+            'link_drops': self.link_drops,
+            'reconnects': self.reconnects,
+            'reconnect_attempts': self.reconnect_attempts_made,
+            'downtime': downtime,
+            'reconnecting': self.outage_start is not None,
+            'time_to_first_sample': self.time_to_first_sample,
+            'clock': self.clock.stats(),
+        }
+    
+    def enable_metrics(self, enabled=True):
+        """Start (from zero) or stop the per-stage timing of the sample pipeline"""
+        self.metrics.enable(enabled)
+    
+    def metrics_snapshot(self):
+        """Counters and per-stage latency summaries, see stage_metrics.StageMetrics.snapshot()"""
+        return self.metrics.snapshot()
+    
+    def enable_tracing(self, enabled=True):
+        """Add a (recv_ns, processed_ns) 'trace' to the last sample of every received block"""
+        self.tracing = enabled
+    
+    def feed(self, data, received_ns=None):
+        """
+        Parse one received chunk. Called by the receive thread, or by a
+        StationManager when several controllers share one event loop.
+        received_ns: time.monotonic_ns() when it arrived (default: now).
+        """
+        received_ns = time.monotonic_ns() if received_ns is None else received_ns
+        timed = self.metrics.enabled
+        if timed:
+            parse_started = time.perf_counter_ns()
+        self.rx_buffer += data.decode('utf-8')
+        # Samples and messages in arrival order; sample timestamps are mapped as one block
+        events = []
+        parse_errors = 0
+        
+        # Process complete messages delimited by '@'
+        while '@' in self.rx_buffer:
+            line, self.rx_buffer = self.rx_buffer.split('@', 1)
+            if '\n' in line or '\r' in line:
+                # Newline-terminated replies can share a segment with the sample after them
+                *messages, line = line.replace('\r', '\n').split('\n')
+                for message in messages:
+                    message = message.strip()
+                    if message:
+                        events.append(message)
+            line = line.strip()
+            
+            if line:
+                # Parse voltage data format: "voltage,timestamp"
+                if ',' in line and line.replace(',', '').replace('.', '').replace('-', '').isdigit():
+                    try:
+                        parts = line.split(',')
+                        if len(parts) == 2:
+                            events.append((float(parts[0]), int(parts[1])))
+                        else:
+                            parse_errors += 1
+                    except (ValueError, IndexError) as e:
+                        # Not voltage data, handle as message
+                        parse_errors += 1
+                        events.append(line)
+                else:
+                    # Handle other messages
+                    events.append(line)
+        
+        raw_timestamps = [event[1] for event in events if type(event) is tuple]
+        if raw_timestamps:
+            device_us, host_ns = self.clock.map_block(raw_timestamps, received_ns)
+            mapped = iter(zip(device_us.tolist(), host_ns.tolist()))
+        # Tracing stamps one sample per block: the last, which waited longest in this chunk
+        traced = len(raw_timestamps) if self.tracing else None
+        if timed:
+            self.metrics.record('parse', time.perf_counter_ns() - parse_started)
+            self.metrics.count('chunks')
+            self.metrics.count('bytes', len(data))
+            self.metrics.count('samples', len(raw_timestamps))
+            if parse_errors:
+                self.metrics.count('parse_errors', parse_errors)
+        for event in events:
+            if type(event) is tuple:
+                timestamp, sample_host_ns = next(mapped)
+                if traced is not None:
+                    traced -= 1
+                self._process_sample(event[0], timestamp, sample_host_ns, received_ns if traced == 0 else None)
+            else:
+                self._handle_message(event)
+        
+        # Also handle newline characters for robustness
+        while '\n' in self.rx_buffer or '\r' in self.rx_buffer:
+            if '\n' in self.rx_buffer:
+                line, self.rx_buffer = self.rx_buffer.split('\n', 1)
+            else:
+                line, self.rx_buffer = self.rx_buffer.split('\r', 1)
+            line = line.strip()
+            
+            if line and line not in ['', ' ']:
+                self._handle_message(line)
+    
+    def _process_sample(self, raw_voltage, timestamp, host_ns=None, received_ns=None):
+        """
+        Per-sample pipeline: DC offset, cycle looping, current, signals.
+        timestamp: unwrapped device µs; host_ns: host-aligned time.monotonic_ns()
+        received_ns: arrival of the block, given for the sample that carries its trace
+        """
+        if self.connect_started is not None:
+            self.time_to_first_sample = time.perf_counter() - self.connect_started
+            self.connect_started = None
+            self.first_sample.emit(self.time_to_first_sample)
+        
+        metrics = self.metrics if self.metrics.enabled else None
+        if metrics is not None:
+            mark = time.perf_counter_ns()
+        
+        # Update DC offset calculation
+        self.update_dc_offset(raw_voltage)
+        
+        # Remove DC offset to get AC waveform
+        voltage_ac = self.remove_dc_offset(raw_voltage)
+        if metrics is not None:
+            now = time.perf_counter_ns()
+            metrics.record('dc_offset', now - mark)
+            mark = now
+        
+        # Initialize voltage with AC voltage as default (ensures voltage is always defined)
+        voltage = voltage_ac
+        
+        try:
+            # Capture cycle data for looping
+            cycle_ready = self.capture_cycle_data(voltage_ac, timestamp)
+            
+            # Use looped voltage if cycle is captured and available
+            if cycle_ready:
+                looped_voltage = self.get_looped_voltage(timestamp)
+                if looped_voltage is not None:
+                    voltage = looped_voltage
+                # If looped_voltage is None, keep using voltage_ac
+        except Exception as cycle_error:
+            # If cycle processing fails, use original AC voltage
+            print(f"Cycle processing error: {cycle_error}")
+            voltage = voltage_ac
+        if metrics is not None:
+            now = time.perf_counter_ns()
+            metrics.record('cycle_loop', now - mark)
+            mark = now
+        
+        # Store processed voltage data
+        self.voltage_readings.append(voltage)
+        self.timestamps.append(timestamp)
+        
+        # Calculate current from voltage and power factor
+        try:
+            current = self.calculate_current_from_voltage(voltage, timestamp)
+        except Exception as current_error:
+            print(f"Current calculation error: {current_error}")
+            current = 0.0  # Default current value
+        if metrics is not None:
+            now = time.perf_counter_ns()
+            metrics.record('current', now - mark)
+            mark = now
+        
+        if self.current_limit is not None and abs(current) > self.current_limit and not self.limit_tripped:
+            self.limit_tripped = True  # Latched: one STOP, not one per sample
+            self.emergency_stop(f"Current limit exceeded: {abs(current):.0f} A > {self.current_limit:g} A")
+        
+        # Emit real-time waveform data
+        waveform_data = {
+            'voltage': voltage,
+            'current': current,
+            'timestamp': timestamp,
+            'host_ns': host_ns if host_ns is not None else time.monotonic_ns(),
+            'power_factor': self.current_power_factor,
+            'raw_voltage': raw_voltage,
+            'dc_offset': self.dc_offset if self.dc_offset is not None else 0.0,
+            'cycle_captured': self.cycle_captured,
+            'cycle_samples': len(self.cycle_data) if self.cycle_captured else 0
+        }
+        if received_ns is not None:
+            waveform_data['trace'] = (received_ns, time.monotonic_ns())
+        self.real_time_waveform.emit(waveform_data)
+        
+        # Also emit as regular data
+        data_dict = {
+            'time': timestamp / 1000000.0,  # Convert microseconds to seconds
+            'voltage': voltage,
+            'current': current,
+            'temperature': 25.0,  # Default temp
+            'power_factor': self.current_power_factor,
+            'raw_voltage': raw_voltage,
+            'dc_offset': self.dc_offset if self.dc_offset is not None else 0.0
+        }
+        self.data_received.emit(data_dict)
+        if metrics is not None:
+            # Queued to the GUI thread this is only the posting; DirectConnection slots run inside it
+            metrics.record('emit', time.perf_counter_ns() - mark)
+    
     def _handle_message(self, message):
         """Handle non-voltage messages"""
+        if self.commands.is_reply(message):
+            pending = self.commands.on_reply(message)
+            if pending is not None:
+                self.command_acknowledged.emit(pending.seq, pending.command, pending.reply,
+                                               pending.round_trip)
         if "R-L_CONFIG_COMPLETE" in message:
             self.rl_config_confirmed.emit("R-L Configuration completed successfully!")
         elif "CONFIRMATION:" in message:
@@ -298,14 +817,15 @@ class ESP32Backend(QObject):
         # Find closest sample in captured cycle
         if len(self.cycle_timestamps) > 1:
             # Interpolate to find voltage at cycle_time
-            cycle_times = np.array(self.cycle_timestamps)
-            cycle_voltages = np.array(self.cycle_data)
+            cycle_times = self.cycle_timestamps
+            cycle_voltages = self.cycle_data
             
-            # Find the closest time index
-            time_idx = np.searchsorted(cycle_times, cycle_time)
+            # Find the closest time index (timestamps are sorted)
+            time_idx = bisect.bisect_left(cycle_times, cycle_time)
             
             if time_idx >= len(cycle_voltages):
-                time_idx = len(cycle_voltages) - 1
+                # Past the last captured sample: hold it until the cycle wraps
+                voltage = cycle_voltages[-1]
             elif time_idx > 0:
                 # Linear interpolation between two points
                 t1, t2 = cycle_times[time_idx-1], cycle_times[time_idx]
@@ -329,17 +849,17 @@ class ESP32Backend(QObject):
             time_sec = timestamp / 1000000.0
             
             # Calculate phase angle from power factor
-            phase_angle = np.arccos(np.clip(self.current_power_factor, 0, 1))
+            phase_angle = math.acos(min(max(self.current_power_factor, 0.0), 1.0))
             
             # Assume 50Hz frequency
             frequency = 50.0
-            omega = 2 * np.pi * frequency
+            omega = 2 * math.pi * frequency
             
             # Calculate current based on voltage and impedance
             if len(self.voltage_readings) > 10:  # Need some history for RMS calculation
                 # Calculate RMS voltage from recent readings
-                recent_voltages = self.voltage_readings[-20:] if len(self.voltage_readings) >= 20 else self.voltage_readings
-                voltage_rms = np.sqrt(np.mean(np.array(recent_voltages)**2)) if recent_voltages else 230.0
+                recent_voltages = self.voltage_readings
+                voltage_rms = math.sqrt(sum(v * v for v in recent_voltages) / len(recent_voltages)) if recent_voltages else 230.0
                 
                 # Calculate impedance based on target current and RMS voltage
                 if voltage_rms > 1.0 and self.current_target_current > 0:
@@ -351,7 +871,7 @@ class ESP32Backend(QObject):
                 if impedance > 0:
                     current_amplitude = voltage / impedance
                     # Apply phase shift based on power factor
-                    current = current_amplitude * np.cos(phase_angle)
+                    current = current_amplitude * math.cos(phase_angle)
                 else:
                     current = 0.0
             else:
@@ -364,23 +884,91 @@ class ESP32Backend(QObject):
             return 0.0
 
     def send_command(self, command):
-        """Send command to ESP32 via TCP"""
+        """
+        Send command to ESP32 via TCP.
+        Returns a Future resolved with the controller's reply (False when not sent),
+        so callers can pipeline commands and wait only where they need the answer.
+        """
         if not self.connected or not self.client:
             self.error_occurred.emit("Not connected. Cannot send command.")
             return False
         
-        try:
-            # Add newline character to the end of command
-            if not command.endswith('\n'):
-                command += '\n'
-            
-            # For TCP, we use send()
-            self.client.send(command.encode('utf-8'))
-            self.command_sent.emit(command.strip())
-            return True
-        except Exception as e:
-            self.error_occurred.emit(f"Send error: {str(e)}")
+        # Add newline character to the end of command
+        if not command.endswith('\n'):
+            command += '\n'
+        
+        # The controller answers each line once, so multi-line commands expect several replies
+        lines = [line for line in command.split('\n') if line.strip()]
+        generation = self.stop_generation
+        with self.send_lock:
+            if generation != self.stop_generation:
+                # An emergency stop overtook this command; it must not follow the STOP
+                self.error_occurred.emit(f"Command '{command.strip()}' dropped: emergency stop")
+                return False
+            # Registered before writing, in write order: a fast reply must find its command queued
+            pending = self.commands.register(command.strip(), len(lines))
+            try:
+                # sendall(): send() may write only part of the command
+                self._write(self.client, command.encode('utf-8'))
+            except Exception as e:
+                self.commands.discard(pending, e)
+                self.error_occurred.emit(f"Send error: {str(e)}")
+                return False
+        self.command_sent.emit(command.strip())
+        return pending.future
+    
+    def emergency_stop(self, reason="Operator stop"):
+        """
+        Write STOP straight to the socket; safe to call from any thread.
+        
+        Nothing is queued on the way: the caller's thread does the write,
+        so a busy GUI thread cannot delay a stop raised by the receive loop,
+        and one raised on the GUI thread does not wait for an event loop.
+        Commands issued before the stop but not yet written are dropped.
+        Returns the reply future (False when there is no link).
+        """
+        requested = time.perf_counter()
+        self.stop_generation = next(self.stop_counter)
+        client = self.client
+        if client is None:
+            self.error_occurred.emit(f"Emergency stop not sent ({reason}): not connected")
             return False
+        with self.send_lock:
+            pending = self.commands.register("STOP")
+            try:
+                self._write(client, b"STOP\n")
+            except OSError as e:
+                self.commands.discard(pending, e)
+                self.error_occurred.emit(f"Emergency stop failed: {str(e)}")
+                return False
+        latency = time.perf_counter() - requested
+        self.emergency_stopped.emit(reason, latency)
+        self.command_sent.emit("STOP")
+        return pending.future
+    
+    def _write(self, client, data):
+        """Whole-buffer write on the caller's thread; station sockets are non-blocking"""
+        if self.manager is not None:
+            send_all(client, data, self.timeout)
+        else:
+            client.sendall(data)
+    
+    def set_current_limit(self, limit):
+        """Arm (or with None, disarm) the over-current stop; also clears a previous trip"""
+        self.current_limit = limit
+        self.limit_tripped = False
+    
+    def expire_commands(self):
+        """Fail commands whose reply is overdue (called from the receive loop)"""
+        if not self.commands.pending:
+            return
+        for pending in self.commands.expire():
+            self.error_occurred.emit(f"Command timeout: no reply to '{pending.command}' "
+                                     f"within {self.commands.timeout:g}s")
+    
+    def command_stats(self):
+        """Reply round-trip statistics (ms) for commands sent on this link"""
+        return self.commands.latency_stats()
 
     # ===== TEST-SPECIFIC COMMANDS =====
 
@@ -394,6 +982,7 @@ class ESP32Backend(QObject):
         # Store for current calculation
         self.current_target_current = float(current_value)
         self.current_power_factor = float(power_factor)
+        self.limit_tripped = False  # A new test re-arms the over-current stop
         
         # Format matches ESP32 sscanf: "%f,%f"
         command = f"{float(current_value)},{float(power_factor)}"
@@ -446,9 +1035,9 @@ class ESP32Backend(QObject):
             inductance: Inductance in Henries (0.0000 to 0.0214)
         """
         # Calculate power factor from R and L for current calculation
-        omega = 2 * np.pi * 50  # 50Hz
+        omega = 2 * math.pi * 50  # 50Hz
         reactance = omega * inductance
-        impedance = np.sqrt(resistance**2 + reactance**2)
+        impedance = math.sqrt(resistance**2 + reactance**2)
         self.current_power_factor = resistance / impedance if impedance > 0 else 0.8
         
         # Format: "R:value,L:value"
@@ -457,8 +1046,7 @@ class ESP32Backend(QObject):
     
     def stop_test(self):
         """Emergency stop current test"""
-        command = "STOP"
-        return self.send_command(command)
+        return self.emergency_stop()
     
     def reset_system(self):
         """Reset ESP32 system"""
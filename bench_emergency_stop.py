@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Emergency-stop benchmark for the MCB Testing System
+Measures request-to-wire latency of STOP while a local controller streams at full rate and the GUI thread is busy
+
+Usage:
+    python bench_emergency_stop.py                       # 20 stops per path, print summary
+    python bench_emergency_stop.py --runs 50 --frame-ms 50 --json stop_latency.json
+    python bench_emergency_stop.py --process             # acquisition in a child process
+"""
+
+import argparse
+import json
+import os
+import random
+import socket
+import statistics
+import sys
+import threading
+import time
+
+
+class BlastingController:
+    """Sends samples as fast as the socket accepts them and timestamps each STOP it receives"""
+
+    def __init__(self):
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.bind(("127.0.0.1", 0))
+        self.listener.listen(1)
+        self.port = self.listener.getsockname()[1]
+        self.client = None
+        self.stops = []  # perf_counter at arrival
+        self.samples_sent = 0
+        self.running = True
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def run(self):
+        try:
+            self.client, _ = self.listener.accept()
+        except OSError:
+            return
+        self.client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        threading.Thread(target=self.read, daemon=True).start()
+        timestamp = 0
+        try:
+            while self.running:
+                burst = []
+                for _ in range(500):
+                    timestamp += 50
+                    burst.append(f"{2048 + (timestamp // 50) % 400},{timestamp}@")
+                self.client.sendall("".join(burst).encode())
+                self.samples_sent += 500
+        except OSError:
+            pass
+
+    def read(self):
+        buffer = b""
+        try:
+            while True:
+                data = self.client.recv(4096)
+                if not data:
+                    return
+                arrived = time.perf_counter()
+                buffer += data
+                while b"\n" in buffer:
+                    line, buffer = buffer.split(b"\n", 1)
+                    # No reply: with the stream saturating the link a reply write would block this reader
+                    if line == b"STOP":
+                        self.stops.append(arrived)
+        except OSError:
+            pass
+
+    def close(self):
+        self.running = False
+        for sock in (self.client, self.listener):
+            if sock is not None:
+                sock.close()
+
+
+def summarise(latencies):
+    ordered = sorted(latencies)
+    return {
+        'runs': len(ordered),
+        'median_ms': statistics.median(ordered) * 1000,
+        'p95_ms': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+        'max_ms': ordered[-1] * 1000,
+    }
+
+
+def run_benchmark(runs, frame_ms, use_process):
+    from PyQt5.QtWidgets import QApplication
+    from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    controller = BlastingController()
+    if use_process:
+        from acquisition_process import ProcessBackend
+        backend = ProcessBackend("127.0.0.1", controller.port)
+    else:
+        from backend import ESP32Backend
+        backend = ESP32Backend("127.0.0.1", controller.port, reconnect_attempts=0)
+    samples = [0]
+    backend.real_time_waveform.connect(lambda data: samples.__setitem__(0, samples[0] + 1))
+
+    class Button(QObject):
+        """Stands in for the Stop button: the click is handled on the GUI thread"""
+        clicked = pyqtSignal()
+
+    button = Button()
+    button.clicked.connect(backend.stop_test)
+
+    # Simulated redraws keep the GUI thread busy most of the time
+    def busy_frame():
+        time.sleep(frame_ms / 1000.0)
+    frames = QTimer()
+    frames.timeout.connect(busy_frame)
+
+    def arm_limit():
+        backend.set_current_limit(1.0)
+
+    paths = {
+        'gui_click': button.clicked.emit,
+        'any_thread': lambda: backend.emergency_stop("Benchmark"),
+    }
+    if not use_process:
+        backend.current_target_current = 1000.0
+        paths['limit_trip'] = arm_limit  # Tripped by the receive loop on the next sample
+    results = {name: [] for name in paths}
+    failures = []
+
+    def driver():
+        deadline = time.monotonic() + 15
+        while not backend.connected or samples[0] < 1000:
+            if time.monotonic() > deadline:
+                failures.append("no stream from the controller")
+                QTimer.singleShot(0, app.quit)
+                return
+            time.sleep(0.05)
+        for name, trigger in paths.items():
+            for _ in range(runs):
+                # Land the request at a random point of the GUI's busy frame
+                time.sleep(random.uniform(0.01, 0.01 + frame_ms / 1000.0))
+                count = len(controller.stops)
+                requested = time.perf_counter()
+                trigger()
+                wait_until = time.monotonic() + 5
+                while len(controller.stops) == count and time.monotonic() < wait_until:
+                    time.sleep(0.0002)
+                if len(controller.stops) == count:
+                    failures.append(f"{name}: STOP never arrived")
+                    break
+                results[name].append(controller.stops[count] - requested)
+                if name == 'limit_trip':
+                    backend.set_current_limit(None)
+        app.quit()
+
+    backend.connect()
+    frames.start(0)
+    threading.Thread(target=driver, daemon=True).start()
+    started = time.perf_counter()
+    app.exec_()
+    elapsed = time.perf_counter() - started
+    frames.stop()
+
+    if use_process:
+        backend.shutdown()
+    else:
+        backend.disconnect()
+    controller.close()
+
+    summary = {name: summarise(values) for name, values in results.items() if values}
+    load = {'samples_per_s': controller.samples_sent / elapsed, 'frame_ms': frame_ms,
+            'acquisition': 'process' if use_process else 'thread'}
+    return summary, load, failures
+
+
+def main(runs, frame_ms, budget_ms, use_process, json_path):
+    print("🛑 Emergency Stop Latency Benchmark")
+    print("=" * 40)
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+    summary, load, failures = run_benchmark(runs, frame_ms, use_process)
+    print(f"Load: {load['samples_per_s']:,.0f} samples/s offered, GUI busy {frame_ms:.0f}ms per frame, "
+          f"{load['acquisition']} acquisition")
+    print(f"\n{'path':12s} {'median':>9s} {'p95':>9s} {'max':>9s}  (ms, request to bytes at controller)")
+    for name, stats in summary.items():
+        print(f"{name:12s} {stats['median_ms']:9.2f} {stats['p95_ms']:9.2f} {stats['max_ms']:9.2f}")
+
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump({'budget_ms': budget_ms, 'load': load, 'paths': summary, 'failures': failures}, f, indent=2)
+        print(f"\n📄 Results saved to {json_path}")
+
+    ok = not failures
+    for failure in failures:
+        print(f"\n❌ {failure}")
+    stop_path = summary.get('any_thread')
+    if stop_path is None or stop_path['p95_ms'] > budget_ms:
+        print(f"\n❌ Priority stop over budget ({stop_path and stop_path['p95_ms']} > {budget_ms}ms)")
+        ok = False
+    elif ok:
+        print(f"\n✅ Priority stop p95 {stop_path['p95_ms']:.2f}ms <= {budget_ms}ms "
+              f"(GUI click path waits for the frame: p95 {summary['gui_click']['p95_ms']:.1f}ms)")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Emergency-stop request-to-wire latency under streaming load")
+    parser.add_argument("--runs", type=int, default=20, help="Stops per path")
+    parser.add_argument("--frame-ms", type=float, default=30.0, help="Simulated GUI redraw time per frame")
+    parser.add_argument("--budget-ms", type=float, default=20.0,
+                        help="Maximum p95 latency of a stop requested off the GUI thread")
+    parser.add_argument("--process", action="store_true", help="Use the acquisition-process backend")
+    parser.add_argument("--json", help="Write machine-readable results to this file")
+    args = parser.parse_args()
+
+    sys.exit(main(args.runs, args.frame_ms, args.budget_ms, args.process, args.json))
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Ingest benchmark for the MCB Testing System
+Streams synthetic "voltage,timestamp@" data through a loopback socket at rising rates and measures each pipeline
+
+For every pipeline and rate step it reports the delivered samples/s, the
+CPU time per sample of the receiving side, dropped samples (sent but not
+delivered by the end of the drain period), and p50/p99
+latency from the controller's send to the real_time_waveform slot on the
+GUI thread. The highest rate a pipeline delivers completely, within the
+latency budget, is its sustained rate.
+
+Usage:
+    python bench_ingest.py                                   # all pipelines, default rate steps
+    python bench_ingest.py --pipelines thread --rates 5000 20000 80000 --json ingest.json
+    python bench_ingest.py --min-rate 20000                  # exit 1 if the thread pipeline sustains less
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import socket
+import sys
+import time
+
+PIPELINES = ('thread', 'process', 'station')
+DEFAULT_RATES = (2000, 5000, 10000, 20000, 50000, 100000)
+WRAP_US = 1 << 32
+LATENCY_EVERY = 8  # Record the latency of every 8th delivered sample
+
+
+def controller_main(conn, rate, duration):
+    """
+    Child process: accept one client and stream `rate` samples/s for
+    `duration` seconds. Each burst's timestamp field is the send time
+    (perf_counter µs, wrapped like micros()), so the receiver can compute
+    latency without a lookup table.
+    """
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(1)
+    conn.send(listener.getsockname()[1])
+    client, _ = listener.accept()
+    client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    wave = [f"{2048 + 1000 * math.sin(2 * math.pi * i / 200):.2f}," for i in range(200)]
+    sent = 0
+    started = time.perf_counter()
+    try:
+        while True:
+            elapsed = time.perf_counter() - started
+            if elapsed >= duration:
+                break
+            due = int(rate * elapsed) - sent
+            if due <= 0:
+                time.sleep(0.0005)
+                continue
+            stamp = f"{(time.perf_counter_ns() // 1000) % WRAP_US}@"
+            client.sendall("".join(wave[(sent + i) % 200] + stamp for i in range(due)).encode())
+            sent += due
+    except OSError:
+        pass
+    conn.send(sent)
+    time.sleep(0.2)  # Let the receiver drain before the close
+    client.close()
+    listener.close()
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def run_step(app, pipeline, rate, duration, drain):
+    """One rate step on a fresh backend; returns the step's measurements"""
+    from PyQt5.QtCore import QTimer
+
+    context = multiprocessing.get_context("spawn")
+    parent_conn, child_conn = context.Pipe()
+    controller = context.Process(target=controller_main, args=(child_conn, rate, duration), daemon=True)
+    controller.start()
+    port = parent_conn.recv()
+
+    manager = None
+    if pipeline == 'process':
+        from acquisition_process import ProcessBackend
+        backend = ProcessBackend("127.0.0.1", port, reconnect_attempts=0)
+    elif pipeline == 'station':
+        from station_manager import StationManager
+        manager = StationManager()
+        backend = manager.add_station("bench", "127.0.0.1", port, reconnect_attempts=0)
+    else:
+        from backend import ESP32Backend
+        backend = ESP32Backend("127.0.0.1", port, reconnect_attempts=0)
+
+    delivered = [0]
+    latencies = []
+
+    def on_sample(data):
+        delivered[0] += 1
+        if delivered[0] % LATENCY_EVERY == 0:
+            latencies.append(((time.perf_counter_ns() // 1000) - data['timestamp']) % WRAP_US)
+
+    backend.real_time_waveform.connect(on_sample)
+    children_before = os.times()
+    cpu_before = time.process_time()
+    started = time.perf_counter()
+    backend.connect()
+
+    # Run the GUI loop for the stream plus a drain period; stop early once everything arrived
+    sent = [None]
+
+    def check():
+        if sent[0] is None and parent_conn.poll():
+            sent[0] = parent_conn.recv()
+        if sent[0] is not None and delivered[0] >= sent[0]:
+            app.quit()
+    checker = QTimer()
+    checker.timeout.connect(check)
+    checker.start(20)
+    deadline = QTimer()  # Not a singleShot: it must not outlive this step and end the next one
+    deadline.setSingleShot(True)
+    deadline.timeout.connect(app.quit)
+    deadline.start(int((duration + drain) * 1000))
+    app.exec_()
+    checker.stop()
+    deadline.stop()
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_before
+
+    if sent[0] is None and parent_conn.poll(2):
+        sent[0] = parent_conn.recv()
+    controller.join(timeout=5)
+    controller_cpu = sum(os.times()[2:4]) - sum(children_before[2:4])
+    overrun = 0
+    if pipeline == 'process':
+        overrun = backend.ring.overrun
+        mark = os.times()
+        backend.shutdown()
+        cpu += sum(os.times()[2:4]) - sum(mark[2:4])  # Acquisition child, once joined
+    elif manager is not None:
+        manager.stop()
+    else:
+        backend.disconnect()
+    backend.real_time_waveform.disconnect(on_sample)
+
+    sent = sent[0] or 0
+    ordered = sorted(latencies)
+    return {
+        'rate': rate,
+        'sent': sent,
+        'delivered': delivered[0],
+        'dropped': max(0, sent - delivered[0]),
+        'overrun': overrun,
+        'samples_per_s': delivered[0] / min(elapsed, duration + drain),
+        'cpu_us_per_sample': cpu / delivered[0] * 1e6 if delivered[0] else None,
+        # Child CPU is only visible to os.times() on POSIX
+        'cpu_includes_child': pipeline != 'process' or os.name == 'posix',
+        'controller_cpu_s': controller_cpu,
+        'p50_ms': percentile(ordered, 0.50) / 1000 if ordered else None,
+        'p99_ms': percentile(ordered, 0.99) / 1000 if ordered else None,
+    }
+
+
+def sustained(step, latency_budget_ms):
+    return (step['sent'] > 0 and step['dropped'] == 0 and step['overrun'] == 0
+            and step['p99_ms'] is not None and step['p99_ms'] <= latency_budget_ms)
+
+
+def main(pipelines, rates, duration, drain, latency_budget_ms, min_rate, json_path):
+    print("📈 Ingest Throughput Benchmark")
+    print("=" * 40)
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication(sys.argv)
+
+    results = {}
+    for pipeline in pipelines:
+        print(f"\n{pipeline} pipeline")
+        print(f"{'rate':>8s} {'delivered/s':>12s} {'dropped':>8s} {'µs CPU':>7s} {'p50 ms':>8s} {'p99 ms':>8s}")
+        steps = []
+        for rate in rates:
+            step = run_step(app, pipeline, rate, duration, drain)
+            steps.append(step)
+            cpu = f"{step['cpu_us_per_sample']:.1f}" if step['cpu_us_per_sample'] is not None else "-"
+            p50 = f"{step['p50_ms']:.2f}" if step['p50_ms'] is not None else "-"
+            p99 = f"{step['p99_ms']:.2f}" if step['p99_ms'] is not None else "-"
+            mark = "" if sustained(step, latency_budget_ms) else "  ← falls behind"
+            print(f"{rate:8d} {step['samples_per_s']:12,.0f} {step['dropped']:8d} {cpu:>7s} {p50:>8s} {p99:>8s}{mark}")
+            if not sustained(step, latency_budget_ms) and step['dropped'] > step['sent'] // 2:
+                break  # Higher rates only fall further behind
+        best = max((step['rate'] for step in steps if sustained(step, latency_budget_ms)), default=0)
+        results[pipeline] = {'sustained_rate': best, 'steps': steps}
+        print(f"Sustained: {best:,} samples/s")
+
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump({'duration_s': duration, 'latency_budget_ms': latency_budget_ms, 'min_rate': min_rate,
+                       'pipelines': results}, f, indent=2)
+        print(f"\n📄 Results saved to {json_path}")
+
+    reference = 'thread' if 'thread' in results else pipelines[0]
+    achieved = results[reference]['sustained_rate']
+    if achieved < min_rate:
+        print(f"\n❌ {reference} pipeline sustains {achieved:,} samples/s, below {min_rate:,}")
+        return 1
+    print(f"\n✅ {reference} pipeline sustains {achieved:,} samples/s (floor {min_rate:,})")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest throughput and latency of the acquisition pipelines")
+    parser.add_argument("--pipelines", nargs="+", choices=PIPELINES, default=list(PIPELINES),
+                        help="Receive-thread backend, acquisition process, StationManager loop")
+    parser.add_argument("--rates", nargs="+", type=int, default=list(DEFAULT_RATES), help="Samples/s per step")
+    parser.add_argument("--duration", type=float, default=3.0, help="Seconds of streaming per step")
+    parser.add_argument("--drain", type=float, default=2.0, help="Seconds allowed for the backlog to clear")
+    parser.add_argument("--latency-budget-ms", type=float, default=250.0,
+                        help="p99 latency above which a step counts as falling behind")
+    parser.add_argument("--min-rate", type=int, default=5000,
+                        help="Minimum sustained samples/s for the first pipeline (regression check)")
+    parser.add_argument("--json", help="Write machine-readable results to this file")
+    args = parser.parse_args()
+
+    sys.exit(main(args.pipelines, args.rates, args.duration, args.drain, args.latency_budget_ms,
+                  args.min_rate, args.json))
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Soak benchmark for the MCB Testing System
+Runs the backend and GUI against a simulated controller for hours and fails on memory or frame-time growth
+
+A simulated abcd.ino streams samples faster than the real controller
+does, so an hour of soak covers several hours of bench use. Meanwhile
+the harness drives the app the way an operator does. It reopens the
+power factor window, asks for STATUS, triggers short-circuit tests
+(their capture dumps fill the event log) and starts a new session every
+few minutes. At every interval it records RSS, tracemalloc's traced
+memory, the gc object count and the live plot frame time.
+
+After the warm-up, the growth of each series is fitted as a per-hour
+slope and checked against its limit. The session waveform history grows
+by design (it is cleared on each new session), so the bytes written to
+it so far are subtracted from RSS. Its arrays live in their own
+anonymous mappings: untouched spare capacity is never resident, a new
+session hands the old arrays back to the OS, and tracemalloc does not
+see them at all. When a slope fails, the tracemalloc lines and object
+types that grew most since the warm-up point at the leak.
+
+tracemalloc slows allocation-heavy code such as matplotlib drawing
+several times over. Frame times are only realistic, and rates well above
+2000 samples/s only keep up, with --no-tracemalloc. The growth checks
+still apply to such runs; only the attribution is lost.
+
+Usage:
+    python bench_soak.py                                     # 2 hours, thread pipeline, 2000 samples/s
+    python bench_soak.py --duration 600 --warmup 60 --json soak.json
+    python bench_soak.py --pipeline process --rate 20000 --no-tracemalloc --session-minutes 2
+    python bench_soak.py --duration 120 --leak-kb-per-second 64   # self-check: must exit 1
+"""
+
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import sys
+import time
+import tracemalloc
+from collections import Counter
+
+# Object types whose counts are reported at every interval (the usual suspects for GUI leaks)
+WATCHED_TYPES = ('Figure', 'FigureCanvasQTAgg', 'PowerFactorWindow', 'QTimer', 'Future')
+TOP_GROWTH = 10  # tracemalloc lines and object types listed in the report
+
+try:
+    import psutil
+except ImportError:  # Optional; /proc is used on Linux
+    psutil = None
+
+
+def rss_bytes(pid=None):
+    """Resident set size of this (or another) process, None where it cannot be read"""
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).memory_info().rss
+        except psutil.Error:
+            return None
+    try:
+        with open(f"/proc/{pid or 'self'}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def type_census():
+    """Live gc-tracked objects per type name"""
+    return Counter(type(obj).__name__ for obj in gc.get_objects())
+
+
+def slope_per_hour(points):
+    """Least-squares slope of (seconds, value) points, per hour (None with fewer than 3 points)"""
+    import numpy as np
+    points = [(t, value) for t, value in points if value is not None]
+    if len(points) < 3:
+        return None
+    seconds, values = zip(*points)
+    return float(np.polyfit(np.array(seconds) / 3600.0, np.array(values, dtype=float), 1)[0])
+
+
+def simulator_main(rate, report):
+    """Child process: one abcd.ino simulator, kept away from this process's memory accounting"""
+    from esp32_simulator import run_fleet
+    run_fleet(1, 'abcd', 0, {'rate': rate}, report)
+
+
+class SoakRun:
+    """Drives the app on its event loop and samples memory and frame time every interval"""
+
+    def __init__(self, app, window, backend, args):
+        self.app = app
+        self.window = window
+        self.backend = backend
+        self.args = args
+        self.samples = []
+        self.leak = []  # --leak-kb-per-second lands here
+        self.baseline_snapshot = None
+        self.baseline_census = None
+        self.top_lines = []
+        self.top_types = []
+        self.sessions = 1
+        self.triggers = 0
+        self.reopens = 0
+        self.errors = []
+        self.started = time.monotonic()
+        self.last_sample = self.started
+        self.last_reopen = self.started
+        self.last_trigger = self.started
+        self.last_session = self.started
+        self.last_snapshot = None
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    # ===== Operator actions =====
+
+    def act(self):
+        """Called every 100 ms: every operator action that is due, then a measurement if due"""
+        now = time.monotonic()
+        args = self.args
+        try:
+            if args.session_minutes and now - self.last_session >= args.session_minutes * 60:
+                self.last_session = now
+                self.new_session()
+            if args.reopen_every and now - self.last_reopen >= args.reopen_every:
+                self.last_reopen = now
+                self.reopens += 1
+                self.window.show_power_factor_window(10, 0.8)
+            if args.trigger_every and now - self.last_trigger >= args.trigger_every:
+                self.last_trigger = now
+                self.triggers += 1
+                self.backend.get_status()
+                self.backend.start_short_circuit_test(10, 0.8)
+        except Exception as e:
+            self.errors.append(f"{self.elapsed():.0f}s: {e}")
+
+        if now - self.last_sample >= args.interval:
+            if args.leak_kb_per_second:
+                self.leak.append(b"x" * int(args.leak_kb_per_second * 1024 * (now - self.last_sample)))
+            self.last_sample = now
+            self.sample()
+        if self.elapsed() >= args.duration:
+            self.app.quit()
+
+    def new_session(self):
+        """Disconnect and connect again: the frontend starts a fresh waveform history"""
+        self.sessions += 1
+        self.backend.disconnect()
+        self.backend.connect()
+
+    # ===== Measurements =====
+
+    def sample(self):
+        from stage_metrics import gui_metrics
+
+        gc.collect()
+        elapsed = self.elapsed()
+        if elapsed >= self.args.warmup and self.baseline_census is None:
+            # The snapshot is native memory tracemalloc does not count: take it before the first
+            # steady measurement so its RSS is not read as growth
+            self.baseline_census = type_census()
+            if tracemalloc.is_tracing():
+                self.baseline_snapshot = tracemalloc.take_snapshot()
+            self.last_snapshot = elapsed
+        history = self.window.waveform_history
+        capacity_bytes = history.nbytes if history is not None else 0
+        written_bytes = history.written_nbytes if history is not None else 0
+        rss = rss_bytes()
+        traced = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+        objects = gc.get_objects()
+        watched = Counter(type(obj).__name__ for obj in objects if type(obj).__name__ in WATCHED_TYPES)
+        frame = gui_metrics.snapshot()['stages']['frame']
+        delivered = gui_metrics.counters.get('delivered', 0)
+        interval = gui_metrics.snapshot()['elapsed_s']
+        gui_metrics.reset()
+
+        record = {
+            'elapsed_s': elapsed,
+            'rss_mb': (rss - written_bytes) / 2**20 if rss is not None else None,
+            'traced_mb': traced / 2**20 if traced is not None else None,
+            'history_mb': written_bytes / 2**20,
+            'history_capacity_mb': capacity_bytes / 2**20,
+            'objects': len(objects),
+            'frame_p50_ms': frame['p50_us'] / 1000 if frame['count'] else None,
+            'frame_p99_ms': frame['p99_us'] / 1000 if frame['count'] else None,
+            'delivered_per_s': delivered / interval if interval > 0 else 0.0,
+            'backlog': self.backend.backlog() if hasattr(self.backend, 'backlog') else None,
+        }
+        del objects
+        if self.args.pipeline == 'process':
+            child = rss_bytes(self.backend.process.pid)
+            record['child_rss_mb'] = child / 2**20 if child is not None else None
+        record.update({f"n_{name}": watched.get(name, 0) for name in WATCHED_TYPES})
+        self.samples.append(record)
+        print(self.format(record))
+
+        if (self.args.snapshot_every and self.baseline_census is not None
+                and elapsed - self.last_snapshot >= self.args.snapshot_every):
+            self.compare_snapshots()
+            self.last_snapshot = elapsed
+
+    def compare_snapshots(self):
+        """Lines and types that grew most since the warm-up (only the baseline and latest are kept)"""
+        if self.baseline_census is None:
+            return
+        if self.baseline_snapshot is not None:
+            snapshot = tracemalloc.take_snapshot()
+            self.top_lines = [
+                {'line': str(stat.traceback), 'size_kb': stat.size_diff / 1024, 'count': stat.count_diff}
+                for stat in snapshot.compare_to(self.baseline_snapshot, 'lineno')[:TOP_GROWTH]
+            ]
+            del snapshot
+        growth = type_census()
+        growth.subtract(self.baseline_census)
+        self.top_types = [{'type': name, 'count': count}
+                          for name, count in growth.most_common(TOP_GROWTH) if count > 0]
+
+    @staticmethod
+    def format(record):
+        def value(key, spec):
+            return format(record[key], spec) if record.get(key) is not None else "-"
+        return (f"{record['elapsed_s']:7.0f}s RSS {value('rss_mb', '7.1f')} MB  traced {value('traced_mb', '7.1f')} MB  "
+                f"history {record['history_mb']:6.1f}/{record['history_capacity_mb']:.1f} MB  objects {record['objects']:8d}  "
+                f"frame {value('frame_p50_ms', '.1f')}/{value('frame_p99_ms', '.1f')} ms  "
+                f"{record['delivered_per_s']:8,.0f} samples/s")
+
+
+def check_growth(samples, warmup, limits):
+    """Per-hour slope of each limited series after the warm-up"""
+    steady = [record for record in samples if record['elapsed_s'] >= warmup]
+    checks = {}
+    for key, limit in limits.items():
+        slope = slope_per_hour([(record['elapsed_s'], record.get(key)) for record in steady])
+        checks[key] = {'slope_per_hour': slope, 'limit_per_hour': limit,
+                       'passed': slope is None or slope <= limit}
+    return checks
+
+
+def main(args):
+    print("🧪 Soak Benchmark")
+    print("=" * 40)
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+    from PyQt5.QtCore import QTimer
+    app = QApplication.instance() or QApplication(sys.argv)
+
+    context = multiprocessing.get_context("spawn")
+    report = context.Queue()
+    simulator = context.Process(target=simulator_main, args=(args.rate, report), daemon=True)
+    simulator.start()
+    host, port = report.get(timeout=30)[0].rsplit(":", 1)
+
+    from frontend import MCBTestingSoftware
+    from stage_metrics import gui_metrics
+    if args.pipeline == 'process':
+        from acquisition_process import ProcessBackend
+        backend = ProcessBackend(host, int(port), reconnect_attempts=3)
+    else:
+        from backend import ESP32Backend
+        backend = ESP32Backend(host, int(port), reconnect_attempts=3)
+    window = MCBTestingSoftware(backend)
+    gui_metrics.enable(True)
+    backend.enable_metrics(True)  # Queue depth of the acquisition process
+    if not args.no_tracemalloc:
+        tracemalloc.start(args.traceback_frames)
+    backend.connect()
+    window.show_power_factor_window(10, 0.8)
+
+    print(f"{args.pipeline} pipeline, {args.rate:,} samples/s for {args.duration:.0f}s "
+          f"(warm-up {args.warmup:.0f}s, sample every {args.interval:g}s, "
+          f"RSS from {'psutil' if psutil is not None else '/proc'})\n")
+    run = SoakRun(app, window, backend, args)
+    ticker = QTimer()
+    ticker.timeout.connect(run.act)
+    ticker.start(100)
+    app.exec_()
+    ticker.stop()
+    run.compare_snapshots()
+
+    if window.pf_window is not None:
+        window.pf_window.close()
+    if args.pipeline == 'process':
+        backend.shutdown()
+    else:
+        backend.disconnect()
+    simulator.terminate()
+    simulator.join(timeout=5)
+
+    limits = {'rss_mb': args.max_rss_mb_per_hour, 'traced_mb': args.max_traced_mb_per_hour,
+              'objects': args.max_objects_per_hour, 'frame_p99_ms': args.max_frame_ms_per_hour}
+    checks = check_growth(run.samples, args.warmup, limits)
+    print(f"\n{'series':>14s} {'slope/h':>12s} {'limit/h':>10s}")
+    for key, check in checks.items():
+        slope = f"{check['slope_per_hour']:+.2f}" if check['slope_per_hour'] is not None else "-"
+        mark = "" if check['passed'] else "  ← grows"
+        print(f"{key:>14s} {slope:>12s} {check['limit_per_hour']:10g}{mark}")
+    print(f"\n{run.sessions} sessions, {run.reopens} window reopens, {run.triggers} triggers, "
+          f"{len(run.errors)} errors")
+    if run.top_lines:
+        print("\nTop allocation growth since warm-up:")
+        for line in run.top_lines:
+            print(f"  {line['size_kb']:+10.1f} KB {line['count']:+8d}  {line['line']}")
+    if run.top_types:
+        print("Top object growth since warm-up: " +
+              ", ".join(f"{entry['type']} {entry['count']:+d}" for entry in run.top_types))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({'pipeline': args.pipeline, 'rate': args.rate, 'duration_s': args.duration,
+                       'warmup_s': args.warmup, 'sessions': run.sessions, 'reopens': run.reopens,
+                       'triggers': run.triggers, 'errors': run.errors, 'checks': checks,
+                       'top_lines': run.top_lines, 'top_types': run.top_types,
+                       'samples': run.samples}, f, indent=2)
+        print(f"\n📄 Results saved to {args.json}")
+
+    failed = [key for key, check in checks.items() if not check['passed']]
+    if failed:
+        print(f"\n❌ Growth beyond the limit: {', '.join(failed)}")
+        return 1
+    print("\n✅ No memory or frame-time growth beyond the limits")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Long-running soak of the backend and GUI with growth checks")
+    parser.add_argument("--pipeline", choices=('thread', 'process'), default='thread',
+                        help="Receive-thread backend or acquisition process")
+    parser.add_argument("--rate", type=int, default=2000, help="Simulated samples/s (the controller streams ~1000)")
+    parser.add_argument("--duration", type=float, default=7200.0, help="Seconds to run")
+    parser.add_argument("--warmup", type=float, default=300.0,
+                        help="Seconds before growth is measured (caches, pools and the first session fill up)")
+    parser.add_argument("--interval", type=float, default=10.0, help="Seconds between measurements")
+    parser.add_argument("--snapshot-every", type=float, default=0.0,
+                        help="Seconds between tracemalloc snapshot comparisons (0: once at the end; "
+                             "each one leaves its memory in RSS)")
+    parser.add_argument("--reopen-every", type=float, default=60.0, help="Seconds between power factor window reopens")
+    parser.add_argument("--trigger-every", type=float, default=30.0, help="Seconds between STATUS + test triggers")
+    parser.add_argument("--session-minutes", type=float, default=5.0, help="Minutes between reconnects (0: one session)")
+    parser.add_argument("--no-tracemalloc", action="store_true", help="Measure without tracemalloc's overhead")
+    parser.add_argument("--traceback-frames", type=int, default=1, help="Frames kept per tracemalloc allocation")
+    parser.add_argument("--max-rss-mb-per-hour", type=float, default=64.0)
+    parser.add_argument("--max-traced-mb-per-hour", type=float, default=16.0)
+    parser.add_argument("--max-objects-per-hour", type=float, default=50000.0)
+    parser.add_argument("--max-frame-ms-per-hour", type=float, default=20.0, help="Growth of the p99 frame time")
+    parser.add_argument("--leak-kb-per-second", type=float, default=0.0,
+                        help="Deliberately leak memory to check that the harness catches it")
+    parser.add_argument("--json", help="Write machine-readable results to this file")
+    args = parser.parse_args()
+
+    sys.exit(main(args))
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark for frontend.py
+Measures import and first-paint times in fresh interpreters and checks them against a budget
+
+Usage:
+    python bench_startup.py                  # 5 cold starts, print summary
+    python bench_startup.py --runs 10 --budget-ms 1500 --json startup.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Modules that must not be loaded before the connection screen is painted
+HEAVY_MODULES = ["numpy", "matplotlib", "waveform_history"]
+
+
+def run_child():
+    """Measure one cold start inside this (fresh) interpreter and print JSON"""
+    timings = {}
+    start = time.perf_counter()
+
+    from PyQt5.QtWidgets import QApplication
+    from PyQt5.QtCore import QObject, QEvent, QTimer
+    from PyQt5.QtGui import QFont
+    timings['import_qt_ms'] = (time.perf_counter() - start) * 1000
+
+    app = QApplication(sys.argv)
+
+    mark = time.perf_counter()
+    import frontend
+    timings['import_frontend_ms'] = (time.perf_counter() - mark) * 1000
+
+    mark = time.perf_counter()
+    app.setFont(QFont("Segoe UI", 10))
+    frontend.set_global_style(app)
+    window = frontend.MCBTestingSoftware()
+    timings['construct_window_ms'] = (time.perf_counter() - mark) * 1000
+
+    class FirstPaintFilter(QObject):
+        def __init__(self):
+            super().__init__()
+            self.painted_at = None
+
+        def eventFilter(self, obj, event):
+            if event.type() == QEvent.Paint and self.painted_at is None:
+                self.painted_at = time.perf_counter()
+                QTimer.singleShot(0, app.quit)
+            return False
+
+    paint_filter = FirstPaintFilter()
+    window.installEventFilter(paint_filter)
+    window.show()
+    QTimer.singleShot(10000, app.quit)  # Safety net if no paint arrives
+    app.exec_()
+
+    if paint_filter.painted_at is not None:
+        timings['first_paint_ms'] = (paint_filter.painted_at - start) * 1000
+    else:
+        timings['first_paint_ms'] = None
+
+    timings['modules_loaded'] = len(sys.modules)
+    timings['heavy_modules_loaded'] = [name for name in HEAVY_MODULES if name in sys.modules]
+    print(json.dumps(timings))
+
+
+def run_parent(runs, budget_ms, json_path):
+    print("🚀 Frontend Startup Benchmark")
+    print("=" * 40)
+
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    here = os.path.dirname(os.path.abspath(__file__))
+
+    results = []
+    for i in range(runs):
+        launched = time.perf_counter()
+        proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--child"],
+                              cwd=here, env=env, capture_output=True, text=True)
+        total_ms = (time.perf_counter() - launched) * 1000
+        lines = [line for line in proc.stdout.splitlines() if line.startswith("{")]
+        if proc.returncode != 0 or not lines:
+            print(f"❌ Run {i + 1} failed:\n{proc.stderr}")
+            return 1
+        result = json.loads(lines[-1])
+        result['process_total_ms'] = total_ms
+        results.append(result)
+        print(f"Run {i + 1}: first paint {result['first_paint_ms']:.0f}ms "
+              f"(frontend import {result['import_frontend_ms']:.0f}ms, process {total_ms:.0f}ms)")
+
+    def median(key):
+        values = [r[key] for r in results if r[key] is not None]
+        return statistics.median(values) if values else None
+
+    summary = {
+        'runs': runs,
+        'budget_ms': budget_ms,
+        'import_qt_ms': median('import_qt_ms'),
+        'import_frontend_ms': median('import_frontend_ms'),
+        'construct_window_ms': median('construct_window_ms'),
+        'first_paint_ms': median('first_paint_ms'),
+        'process_total_ms': median('process_total_ms'),
+        'modules_loaded': median('modules_loaded'),
+        'heavy_modules_loaded': sorted({m for r in results for m in r['heavy_modules_loaded']}),
+        'results': results,
+    }
+
+    print("\nMedian of runs:")
+    for key in ('import_qt_ms', 'import_frontend_ms', 'construct_window_ms', 'first_paint_ms', 'process_total_ms'):
+        print(f"  {key:22s} {summary[key]:8.1f}")
+    print(f"  {'modules_loaded':22s} {summary['modules_loaded']:8.0f}")
+
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"\n📄 Results saved to {json_path}")
+
+    ok = True
+    if summary['heavy_modules_loaded']:
+        print(f"\n❌ Heavy modules loaded before first paint: {summary['heavy_modules_loaded']}")
+        ok = False
+    if summary['first_paint_ms'] is None or summary['first_paint_ms'] > budget_ms:
+        print(f"\n❌ First paint over budget ({summary['first_paint_ms']} > {budget_ms}ms)")
+        ok = False
+    if ok:
+        print(f"\n✅ Startup within budget ({summary['first_paint_ms']:.0f}ms <= {budget_ms}ms)")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Frontend cold-start benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=1500.0,
+                        help="Maximum median time from interpreter start of Qt import to first paint")
+    parser.add_argument("--json", help="Write machine-readable results to this file")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child()
+    else:
+        sys.exit(run_parent(args.runs, args.budget_ms, args.json))
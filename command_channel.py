@@ -0,0 +1,168 @@
+"""
+Command Channel for MCB Testing System
+Matches controller replies to in-flight commands and records round-trip times
+"""
+
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+# Lines the controllers send in answer to a command (abcd.ino, esp32_controller.ino,
+# esp32_receiver.ino). Everything else is stream data or unsolicited output.
+REPLY_PREFIXES = ("ACK:", "STATUS|", "ERROR:", "CONFIRMATION:", "Data received and processed")
+COMMAND_TIMEOUT = 5.0  # seconds without a reply before a command's future fails
+REPLY_GRACE = 2.0      # timeouts after which an unanswered command gives up its place in the queue
+
+
+class CommandError(Exception):
+    """The controller answered a command with ERROR: ..."""
+
+
+class PendingCommand:
+    __slots__ = ('seq', 'command', 'future', 'sent_at', 'expected', 'replies', 'timed_out', 'round_trip')
+
+    def __init__(self, seq, command, expected):
+        self.seq = seq
+        self.command = command
+        self.future = Future()
+        self.sent_at = time.perf_counter()
+        self.expected = expected  # One reply per command line
+        self.replies = []
+        self.timed_out = False
+        self.round_trip = None  # Seconds from send to last reply line
+
+    @property
+    def reply(self):
+        return "\n".join(self.replies)
+
+
+class CommandChannel:
+    """
+    FIFO of commands waiting for their replies.
+
+    The controllers do not echo an identifier. abcd.ino and
+    esp32_controller.ino answer each command line once, in order, over one
+    TCP stream, so the oldest pending command owns the next reply line.
+    Not every firmware does: esp32_receiver.ino only confirms R-L commands
+    (over UDP), and the reply behaviour of the streaming firmware is not
+    known. Each command gets a local sequence ID and a
+    concurrent.futures.Future that resolves with the reply text (or
+    CommandError for an ERROR: reply), so several commands can be in flight
+    at once and callers wait only where they need the answer.
+
+    A command that times out fails its future but keeps its place in the
+    queue for `grace` timeouts: a late reply is still consumed by it instead
+    of being matched to the next command. After that it is dropped, so a
+    line the firmware never answers cannot take every later reply.
+    """
+
+    def __init__(self, timeout=COMMAND_TIMEOUT, history=1000, grace=REPLY_GRACE):
+        self.timeout = timeout
+        self.grace = grace
+        self.pending = deque()
+        self.lock = threading.Lock()
+        self.sequence = itertools.count(1)
+        self.round_trips = deque(maxlen=history)  # Seconds, most recent last
+        self.completed = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.dropped = 0  # Timed-out commands removed from the queue without a reply
+
+    @staticmethod
+    def is_reply(line):
+        return line.startswith(REPLY_PREFIXES)
+
+    def register(self, command, lines=1):
+        """Queue a command before it is written, so even an instant reply finds it"""
+        pending = PendingCommand(next(self.sequence), command, max(1, lines))
+        with self.lock:
+            self.pending.append(pending)
+        return pending
+
+    def discard(self, pending, error):
+        """The command never reached the controller"""
+        with self.lock:
+            try:
+                self.pending.remove(pending)
+            except ValueError:
+                return
+        pending.future.set_exception(error)
+
+    def on_reply(self, line):
+        """Give a reply line to the oldest command; returns it once all its replies are in"""
+        with self.lock:
+            if not self.pending:
+                return None
+            pending = self.pending[0]
+            pending.replies.append(line)
+            if len(pending.replies) < pending.expected:
+                return None
+            self.pending.popleft()
+            if pending.timed_out:
+                return None  # Its future already failed
+            pending.round_trip = time.perf_counter() - pending.sent_at
+            self.completed += 1
+            self.round_trips.append(pending.round_trip)
+            failed = any(reply.startswith("ERROR:") for reply in pending.replies)
+            if failed:
+                self.errors += 1
+        if failed:
+            pending.future.set_exception(CommandError(pending.reply))
+        else:
+            pending.future.set_result(pending.reply)
+        return pending
+
+    def expire(self):
+        """Fail commands older than the timeout; returns the ones that just expired"""
+        now = time.perf_counter()
+        limit = now - self.timeout
+        drop_limit = now - self.timeout * self.grace
+        expired = []
+        with self.lock:
+            for pending in self.pending:
+                if not pending.timed_out and pending.sent_at < limit:
+                    pending.timed_out = True
+                    self.timeouts += 1
+                    expired.append(pending)
+            # The queue is in send order, so the commands past the grace period are at its head
+            while self.pending and self.pending[0].timed_out and self.pending[0].sent_at < drop_limit:
+                self.pending.popleft()
+                self.dropped += 1
+        for pending in expired:
+            pending.future.set_exception(
+                TimeoutError(f"No reply to '{pending.command}' within {self.timeout:g}s"))
+        return expired
+
+    def fail_all(self, error):
+        """Link closed: nothing pending can be answered any more"""
+        with self.lock:
+            pending, self.pending = list(self.pending), deque()
+        for command in pending:
+            if not command.timed_out:
+                command.future.set_exception(error)
+
+    def in_flight(self):
+        with self.lock:
+            return sum(1 for pending in self.pending if not pending.timed_out)
+
+    def latency_stats(self):
+        """Round-trip summary in milliseconds over the recent history"""
+        stats = {'completed': self.completed, 'timeouts': self.timeouts, 'errors': self.errors,
+                 'dropped': self.dropped, 'in_flight': self.in_flight()}
+        stats.update(latency_summary(self.round_trips))
+        return stats
+
+
+def latency_summary(round_trips):
+    """mean/p50/p95/max in milliseconds of round-trip times given in seconds ({} when empty)"""
+    samples = sorted(round_trips)
+    if not samples:
+        return {}
+    return {
+        'mean_ms': sum(samples) / len(samples) * 1000,
+        'p50_ms': samples[len(samples) // 2] * 1000,
+        'p95_ms': samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000,
+        'max_ms': samples[-1] * 1000,
+    }
@@ -2,22 +2,22 @@
 """
 Demo: Variable Resistance and Inductance Configuration
 Shows how to use the new R-L configuration feature
+Run with --simulate to use a local abcd.ino simulator instead of the bench
 """
 
 import sys
-import time
 from PyQt5.QtWidgets import QApplication
 from PyQt5.QtCore import QTimer
 from backend import ESP32Backend
 
-def demo_variable_rl():
+def demo_variable_rl(address=("10.91.136.24", 8888)):
     """Demonstrate the new Variable R-L Configuration feature"""
     
     print("🔧 Variable R-L Configuration Demo")
     print("=" * 50)
     
     # Create backend instance (updated for your controller)
-    backend = ESP32Backend(esp_ip="10.91.136.24", port=8888)
+    backend = ESP32Backend(esp_ip=address[0], port=address[1])
     
     # Connect signals to see what happens
     backend.connection_status_changed.connect(
@@ -38,8 +38,13 @@ def demo_variable_rl():
     if backend.connect():
         print("   ✅ Connected successfully!")
         
-        # Wait a moment for connection to stabilize
-        time.sleep(2)
+        # A STATUS round trip shows the controller is ready for commands
+        status = backend.get_status()
+        try:
+            if status:
+                print(f"   📋 {status.result(timeout=backend.commands.timeout + 1)}")
+        except Exception as e:
+            print(f"   ⚠️ No status reply: {e}")
         
         # Test different R-L configurations (within new ranges)
         test_configs = [
@@ -51,21 +56,34 @@ def demo_variable_rl():
         
         print(f"\n2. Testing {len(test_configs)} different R-L configurations...")
         
+        # All configurations are sent back to back; each returns a future
+        # that resolves with the controller's reply, so nothing sleeps
+        pending = []
         for i, (resistance, inductance) in enumerate(test_configs, 1):
             print(f"\n   Test {i}/4: R={resistance}Ω, L={inductance}H")
             print(f"   📤 Sending configuration to ESP32...")
             
-            success = backend.set_variable_rl_configuration(resistance, inductance)
+            future = backend.set_variable_rl_configuration(resistance, inductance)
             
-            if success:
+            if future:
                 print(f"   ✅ Command sent successfully")
-                print(f"   ⏳ Waiting for ESP32 confirmation...")
-                time.sleep(3)  # Wait for confirmation
+                pending.append((i, future))
             else:
                 print(f"   ❌ Failed to send command")
-            
+        
+        print(f"\n   ⏳ Waiting for {len(pending)} ESP32 confirmations...")
+        for i, future in pending:
+            try:
+                reply = future.result(timeout=backend.commands.timeout + 1)
+                print(f"   ✅ Test {i}/4 confirmed: {reply}")
+            except Exception as e:
+                print(f"   ❌ Test {i}/4 not confirmed: {e}")
             print(f"   " + "-" * 40)
         
+        stats = backend.command_stats()
+        if 'mean_ms' in stats:
+            print(f"   📈 Round trip: mean {stats['mean_ms']:.1f}ms, max {stats['max_ms']:.1f}ms")
+        
         print(f"\n3. Demo completed!")
         
         # Disconnect
@@ -82,7 +100,15 @@ if __name__ == "__main__":
     app = QApplication(sys.argv)
     
     # Run demo
-    demo_variable_rl()
+    if "--simulate" in sys.argv:
+        from esp32_simulator import SimulatorFleet
+        fleet = SimulatorFleet()
+        # Short captures: abcd.ino dumps every captured sample (1ms each) before the next command
+        simulator = fleet.add('abcd', capture_samples=200)
+        demo_variable_rl((simulator.host, simulator.port))
+        fleet.stop()
+    else:
+        demo_variable_rl()
     
     # Keep app running briefly to process any remaining signals
     QTimer.singleShot(2000, app.quit)
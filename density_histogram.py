@@ -0,0 +1,98 @@
+"""
+Density Histogram for MCB Testing System
+Fixed-size 2-D count grid for scatter-style views that grow without bound
+"""
+
+import numpy as np
+
+
+class DensityHistogram:
+    """
+    Counts (x, y) samples into a fixed nx-by-ny grid.
+
+    add() is O(1) for samples inside the current range. When a sample lands
+    outside, that axis doubles its bin width (adjacent bin pairs are merged)
+    until it fits, so the grid covers every sample ever added while staying
+    the same size. A doubling costs O(nx * ny) and happens O(log range)
+    times, independent of how many samples have been added.
+    """
+
+    def __init__(self, bins=(128, 96), bin_size=(1.0, 1.0)):
+        nx, ny = bins
+        if nx % 2 or ny % 2:
+            raise ValueError("Bin counts must be even so bins can be merged in pairs")
+        self.nx, self.ny = nx, ny
+        self.bin_size = (float(bin_size[0]), float(bin_size[1]))
+        self.dx, self.dy = self.bin_size
+        self.x0 = None  # Set by the first sample
+        self.y0 = None
+        self.counts = np.zeros((ny, nx), dtype=np.int64)  # Row = y bin, like imshow
+        self.total = 0
+        self.version = 0  # Bumped on every change so views can skip redundant redraws
+
+    def add(self, x, y):
+        if self.x0 is None:
+            # Centre the grid on the first sample
+            self.x0 = x - self.nx * self.dx / 2
+            self.y0 = y - self.ny * self.dy / 2
+        while not self.x0 <= x < self.x0 + self.nx * self.dx:
+            self._grow_x(x < self.x0)
+        while not self.y0 <= y < self.y0 + self.ny * self.dy:
+            self._grow_y(y < self.y0)
+        ix = min(int((x - self.x0) / self.dx), self.nx - 1)
+        iy = min(int((y - self.y0) / self.dy), self.ny - 1)
+        self.counts[iy, ix] += 1
+        self.total += 1
+        self.version += 1
+
+    def _grow_x(self, extend_left):
+        merged = self.counts[:, 0::2] + self.counts[:, 1::2]
+        self.counts[:] = 0
+        half = self.nx // 2
+        if extend_left:
+            # Old range becomes the right half of the new one
+            self.x0 -= self.nx * self.dx
+            self.counts[:, half:] = merged
+        else:
+            self.counts[:, :half] = merged
+        self.dx *= 2
+
+    def _grow_y(self, extend_down):
+        merged = self.counts[0::2, :] + self.counts[1::2, :]
+        self.counts[:] = 0
+        half = self.ny // 2
+        if extend_down:
+            self.y0 -= self.ny * self.dy
+            self.counts[half:, :] = merged
+        else:
+            self.counts[:half, :] = merged
+        self.dy *= 2
+
+    def extent(self):
+        """(left, right, bottom, top) for imshow"""
+        if self.x0 is None:
+            return (0.0, 1.0, 0.0, 1.0)
+        return (self.x0, self.x0 + self.nx * self.dx,
+                self.y0, self.y0 + self.ny * self.dy)
+
+    def occupied_extent(self, margin=1):
+        """Extent trimmed to the bins that hold samples (plus a margin of bins)"""
+        if self.total == 0:
+            return self.extent()
+        cols = np.flatnonzero(self.counts.any(axis=0))
+        rows = np.flatnonzero(self.counts.any(axis=1))
+        c0, c1 = max(cols[0] - margin, 0), min(cols[-1] + 1 + margin, self.nx)
+        r0, r1 = max(rows[0] - margin, 0), min(rows[-1] + 1 + margin, self.ny)
+        return (self.x0 + c0 * self.dx, self.x0 + c1 * self.dx,
+                self.y0 + r0 * self.dy, self.y0 + r1 * self.dy)
+
+    def image(self):
+        """Counts with empty bins masked, ready for imshow/set_data"""
+        return np.ma.masked_equal(self.counts, 0)
+
+    def clear(self):
+        self.x0 = self.y0 = None
+        self.dx, self.dy = self.bin_size
+        self.counts[:] = 0
+        self.total = 0
+        self.version += 1
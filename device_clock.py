@@ -0,0 +1,141 @@
+"""
+Device Clock for MCB Testing System
+Maps ESP32 micros() timestamps onto host monotonic time, unwrapping the 32-bit counter and tracking drift
+"""
+
+import time
+from collections import OrderedDict
+
+WRAP_US = 1 << 32  # micros() is an unsigned 32-bit counter: wraps every ~71.6 minutes
+HALF_WRAP_US = WRAP_US // 2
+BUCKET_S = 1.0     # One fit point (the least-delayed block) per second of device time
+WINDOW = 600       # Fit points kept: drift is estimated over the last ten minutes
+MIN_FIT_POINTS = 3
+
+
+class DeviceClock:
+    """
+    Streaming map from raw device micros() to host time.
+
+    unwrap() turns the 32-bit counter into a continuous int64 count of
+    device microseconds. A wrap is a backward step of more than half the
+    counter range. A smaller backward step means the controller restarted.
+    The count then carries on from where it was, and the fit starts over.
+
+    Each received block adds one (device time of its newest sample,
+    host arrival time) pair. A sample cannot arrive before it was sent, so
+    per bucket the pair with the smallest host - device delay is kept, and
+    a line through these minima gives offset and drift:
+
+        host_ns = device_ns + offset_ns + drift * (device_ns - ref_ns)
+
+    Host time is time.monotonic_ns(), shared by every station and process
+    of the application. The offset includes the link's minimum latency.
+    """
+
+    def __init__(self, bucket_s=BUCKET_S, window=WINDOW):
+        self.bucket_ns = int(bucket_s * 1e9)
+        self.window = window
+        self.reset()
+
+    def reset(self):
+        """Forget the counter and the fit (a new controller, or a fresh session)"""
+        self.last_raw = None
+        self.base_us = 0  # Added to raw micros(): wraps and restarts so far
+        self.wraps = 0
+        self.restarts = 0
+        self.buckets = OrderedDict()  # bucket index -> (device_ns, delay_ns)
+        self.offset_ns = None
+        self.drift = 0.0
+        self.ref_ns = 0
+
+    # ===== Device counter =====
+
+    def unwrap(self, raw_us):
+        """int64 device microseconds for a block of raw micros() values"""
+        # NumPy is imported on first use: backend.py (and so this module) loads before the first paint
+        import numpy as np
+
+        raw = np.asarray(raw_us, dtype=np.int64)
+        if raw.size == 0:
+            return raw
+        previous = np.empty_like(raw)
+        previous[0] = raw[0] if self.last_raw is None else self.last_raw
+        previous[1:] = raw[:-1]
+        steps = raw - previous
+        wrapped = steps < -HALF_WRAP_US
+        restarted = (steps < 0) & ~wrapped
+        increments = np.where(wrapped, WRAP_US, 0)
+        if restarted.any():
+            # Continue the count just after the last value before the restart
+            increments = increments + np.where(restarted, 1 - steps, 0)
+            self.restarts += int(restarted.sum())
+            self.buckets.clear()
+            self.offset_ns = None
+        base = self.base_us + np.cumsum(increments)
+        self.wraps += int(wrapped.sum())
+        self.base_us = int(base[-1])
+        self.last_raw = int(raw[-1])
+        return raw + base
+
+    # ===== Offset and drift =====
+
+    def observe(self, device_ns, host_ns):
+        """One block: its newest sample (device ns) arrived at host_ns"""
+        delay = host_ns - device_ns
+        key = device_ns // self.bucket_ns
+        best = self.buckets.get(key)
+        if best is not None and delay >= best[1]:
+            return
+        self.buckets[key] = (device_ns, delay)
+        if best is None:
+            while len(self.buckets) > self.window:
+                self.buckets.popitem(last=False)
+        # Refit when a bucket opens; while the fit is young, on every better point
+        if best is None or len(self.buckets) < MIN_FIT_POINTS or self.offset_ns is None:
+            self._fit()
+
+    def _fit(self):
+        import numpy as np
+
+        points = np.array(list(self.buckets.values()), dtype=np.float64)
+        self.ref_ns = int(points[-1, 0])
+        if len(points) < MIN_FIT_POINTS:
+            self.drift = 0.0
+            self.offset_ns = int(points[:, 1].min())
+            return
+        slope, intercept = np.polyfit(points[:, 0] - self.ref_ns, points[:, 1], 1)
+        self.drift = float(slope)
+        self.offset_ns = int(round(intercept))
+
+    def to_host_ns(self, device_ns):
+        """Host-aligned int64 ns for int64 device ns (scalar or array)"""
+        import numpy as np
+
+        device_ns = np.asarray(device_ns, dtype=np.int64)
+        if self.offset_ns is None:
+            return device_ns.copy()
+        correction = np.rint(self.drift * (device_ns - self.ref_ns).astype(np.float64)).astype(np.int64)
+        return device_ns + self.offset_ns + correction
+
+    def map_block(self, raw_us, received_ns=None):
+        """
+        Raw micros() of one received block -> (device µs, host ns), both int64
+        arrays. received_ns is when the block arrived (default: now).
+        """
+        received_ns = time.monotonic_ns() if received_ns is None else received_ns
+        device_us = self.unwrap(raw_us)
+        if device_us.size == 0:
+            return device_us, device_us.copy()
+        device_ns = device_us * 1000
+        self.observe(int(device_ns[-1]), received_ns)
+        return device_us, self.to_host_ns(device_ns)
+
+    def stats(self):
+        return {
+            'offset_ms': None if self.offset_ns is None else self.offset_ns / 1e6,
+            'drift_ppm': self.drift * 1e6,
+            'wraps': self.wraps,
+            'restarts': self.restarts,
+            'fit_points': len(self.buckets),
+        }
@@ -0,0 +1,151 @@
+"""
+Controller Discovery for MCB Testing System
+Finds ESP32 controllers on the bench subnet with concurrent asyncio probes
+"""
+
+import asyncio
+import ipaddress
+import socket
+import threading
+import time
+from PyQt5.QtCore import QObject, pyqtSignal
+
+# Port -> firmware listening on it. Only abcd.ino treats STATUS as a read-only
+# query; esp32_controller.ino re-runs its relay selection on any line it
+# receives, so that port is identified by the open port alone.
+PORT_PROFILES = {8888: 'abcd', 5000: 'esp32_controller'}
+STATUS_PROFILES = ('abcd',)
+CONNECT_TIMEOUT = 0.4  # seconds; LAN controllers answer in a few ms
+STATUS_TIMEOUT = 0.5   # seconds for the STATUS reply
+MAX_CONCURRENT = 512   # open probe sockets at once (a /24 on both ports fits)
+
+
+def parse_status(reply):
+    """"STATUS|Relay6:ACTIVE|Path_L:2|..." -> {'Relay6': 'ACTIVE', 'Path_L': '2', ...}"""
+    fields = {}
+    for part in reply.split("|")[1:]:
+        key, _, value = part.partition(":")
+        fields[key.strip()] = value.strip()
+    return fields
+
+
+def local_subnet(prefix=24):
+    """The /prefix network of this machine's outbound interface (no packet is sent)"""
+    probe = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        probe.connect(("10.255.255.255", 1))
+        address = probe.getsockname()[0]
+    except OSError:
+        address = "127.0.0.1"
+    finally:
+        probe.close()
+    return str(ipaddress.ip_network(f"{address}/{prefix}", strict=False))
+
+
+async def _read_status(reader):
+    """First STATUS| line, skipping streamed samples and other controller output"""
+    pending = ""
+    while True:
+        chunk = await reader.read(4096)
+        if not chunk:
+            return None
+        pending += chunk.decode('utf-8', errors='replace').replace('@', '\n')
+        *lines, pending = pending.split('\n')
+        for line in lines:
+            if line.strip().startswith("STATUS|"):
+                return line.strip()
+
+
+async def probe(host, port, profile, semaphore, connect_timeout=CONNECT_TIMEOUT, status_timeout=STATUS_TIMEOUT):
+    """One host:port; returns a controller dict, or None when the port is closed or silent"""
+    async with semaphore:
+        started = time.perf_counter()
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), connect_timeout)
+        except (OSError, asyncio.TimeoutError):
+            return None
+        found = {
+            'host': host,
+            'port': port,
+            'firmware': profile,
+            'connect_ms': (time.perf_counter() - started) * 1000,
+            'status': None,
+        }
+        try:
+            if profile in STATUS_PROFILES:
+                writer.write(b"STATUS\n")
+                await writer.drain()
+                reply = await asyncio.wait_for(_read_status(reader), status_timeout)
+                if reply is None:
+                    found['firmware'] = 'unknown'
+                else:
+                    found['status'] = parse_status(reply)
+        except (OSError, asyncio.TimeoutError):
+            # Port open but no STATUS reply: a different service, or a controller busy with a client
+            found['firmware'] = 'unknown'
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+        return found
+
+
+async def discover_async(network, ports=None, exclude=(), connect_timeout=CONNECT_TIMEOUT,
+                         status_timeout=STATUS_TIMEOUT, max_concurrent=MAX_CONCURRENT):
+    ports = PORT_PROFILES if ports is None else ports
+    semaphore = asyncio.Semaphore(max_concurrent)
+    excluded = set(exclude)
+    probes = [probe(str(host), port, profile, semaphore, connect_timeout, status_timeout)
+              for host in ipaddress.ip_network(network, strict=False).hosts()
+              for port, profile in ports.items()
+              if (str(host), port) not in excluded]
+    found = [result for result in await asyncio.gather(*probes) if result is not None]
+    return sorted(found, key=lambda c: (ipaddress.ip_address(c['host']), c['port']))
+
+
+def discover(network, ports=None, exclude=(), connect_timeout=CONNECT_TIMEOUT,
+             status_timeout=STATUS_TIMEOUT, max_concurrent=MAX_CONCURRENT):
+    """
+    Probe every host of `network` (e.g. "192.168.1.0/24") on each port of
+    `ports` ({port: firmware profile}, default PORT_PROFILES) concurrently.
+    Hosts in `exclude` ((host, port) pairs) are skipped: abcd.ino drops its
+    current client when another connects, so a bench in use must not be probed.
+
+    Blocks for about connect_timeout + status_timeout; returns a list of
+    {'host', 'port', 'firmware', 'connect_ms', 'status'} sorted by address.
+    """
+    return asyncio.run(discover_async(network, ports, exclude, connect_timeout,
+                                      status_timeout, max_concurrent))
+
+
+class ControllerDiscovery(QObject):
+    """Runs discover() off the GUI thread and reports the result as a signal"""
+    discovery_finished = pyqtSignal(str, list, float)  # network, controllers, elapsed (s)
+    discovery_failed = pyqtSignal(str, str)  # network, error
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.thread = None
+
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, network, **options):
+        if self.running():
+            return False
+        ipaddress.ip_network(network, strict=False)  # ValueError here rather than in the thread
+        self.thread = threading.Thread(target=self._run, args=(network, options),
+                                       name="ControllerDiscovery", daemon=True)
+        self.thread.start()
+        return True
+
+    def _run(self, network, options):
+        started = time.perf_counter()
+        try:
+            found = discover(network, **options)
+        except Exception as e:
+            self.discovery_failed.emit(network, str(e))
+            return
+        self.discovery_finished.emit(network, found, time.perf_counter() - started)
@@ -0,0 +1,565 @@
+#!/usr/bin/env python3
+"""
+ESP32 Simulator for MCB Testing System
+Stand-ins for the abcd.ino, esp32_controller.ino and esp32_receiver.ino controllers, for tests without hardware
+
+Each ControllerSimulator answers its firmware's commands as the .ino does:
+the same sscanf formats, relay path tables, reply strings, client takeover
+rules and blocking delays. TCP controllers can also stream
+"voltage,micros@" samples, the format ESP32Backend parses. The rate,
+jitter, sample loss, forced disconnects, micros() start value (to reach
+the 32-bit wrap quickly) and crystal drift are all configurable.
+
+A SimulatorFleet runs many simulators on one asyncio loop thread. The
+command line can spread a fleet over several processes for multi-station
+scale tests.
+
+Usage:
+    python esp32_simulator.py                                  # one abcd.ino on 127.0.0.1:8888, 1 kHz stream
+    python esp32_simulator.py --firmware esp32_controller --port 5000 --rate 0
+    python esp32_simulator.py --count 50 --port 9000 --rate 2000 --jitter-ms 5 --loss 0.001 --disconnect-every 30
+    python esp32_simulator.py --count 200 --processes 4 --addresses stations.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import sys
+import threading
+import time
+
+FIRMWARES = ('abcd', 'esp32_controller', 'esp32_receiver')
+DEFAULT_PORTS = {'abcd': 8888, 'esp32_controller': 5000, 'esp32_receiver': 5000}
+
+# Relay paths: inductors (mH, winding Ω) and series resistors (Ω)
+ABCD_INDUCTORS = [(40.0, 1.9), (30.0, 0.5), (70.0, 1.3)]
+LEGACY_INDUCTORS = [(30.0, 0.5), (50.0, 1.0), (70.0, 1.3)]  # esp32_controller.ino / esp32_receiver.ino
+RESISTORS = [14.0, 24.0, 34.0, 44.0]
+
+OMEGA = 2 * math.pi * 50.0
+MAX_SAMPLES = 2000        # abcd.ino capture buffer
+RELAY_6_PULSE = 0.1       # seconds
+VRMS_READ_TIME = 0.05     # getVRms(): 100 reads 500µs apart
+MICROS_WRAP = 1 << 32
+
+FLOAT = re.compile(r'\s*([+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)')
+
+
+def scan_floats(text, literals):
+    """
+    sscanf(text, "<literals[0]>%f<literals[1]>%f...") as the firmware calls
+    it: the floats converted before the first mismatch.
+    """
+    values, position = [], 0
+    for literal in literals:
+        if not text.startswith(literal, position):
+            break
+        position += len(literal)
+        match = FLOAT.match(text, position)
+        if match is None:
+            break
+        values.append(float(match.group(1)))
+        position = match.end()
+    return values
+
+
+def c_div(a, b):
+    """float division with IEEE results instead of ZeroDivisionError, like the firmware's"""
+    if b != 0:
+        return a / b
+    if a == 0 or math.isnan(a):
+        return math.nan
+    return math.copysign(math.inf, a) * math.copysign(1.0, b)
+
+
+def c_sqrt(x):
+    return math.sqrt(x) if x >= 0 else math.nan
+
+
+class ControllerSimulator:
+    """One simulated controller; start() and stop() run on the fleet's event loop"""
+
+    def __init__(self, firmware='abcd', host="127.0.0.1", port=0, rate=1000.0, burst_ms=10.0,
+                 jitter_ms=0.0, loss=0.0, disconnect_every=0.0, reboot_on_disconnect=False,
+                 micros_start=0, drift_ppm=0.0, mains_vrms=230.0, noise=0.5,
+                 capture_samples=MAX_SAMPLES, dump_captures=True, seed=None):
+        if firmware not in FIRMWARES:
+            raise ValueError(f"Unknown firmware '{firmware}' (one of {', '.join(FIRMWARES)})")
+        self.firmware = firmware
+        self.host = host
+        self.port = port
+        self.rate = rate if firmware != 'esp32_receiver' else 0  # The UDP receiver never streams
+        self.burst_ms = burst_ms
+        self.jitter_ms = jitter_ms
+        self.loss = loss
+        self.disconnect_every = disconnect_every
+        self.reboot_on_disconnect = reboot_on_disconnect
+        self.drift_ppm = drift_ppm
+        self.mains_vrms = mains_vrms
+        self.noise = noise
+        self.capture_samples = min(capture_samples, MAX_SAMPLES)
+        self.dump_captures = dump_captures
+        self.random = random.Random(seed)
+
+        self.booted = time.perf_counter()
+        self.micros_start = micros_start
+        self.server = None
+        self.transport = None  # esp32_receiver's UDP endpoint
+        self.client = None  # StreamWriter of the client being served
+        self.serving = None  # esp32_controller.ino serves one client; others wait
+        self.busy = None  # Held while the firmware's loop() is blocked (command delays, capture dump)
+        self.tasks = set()
+
+        # Firmware state
+        inductors = ABCD_INDUCTORS if firmware == 'abcd' else LEGACY_INDUCTORS
+        self.inductors = inductors
+        self.target_current = 0.0  # Uninitialised globals are zero
+        self.target_pf = 0.0
+        self.path_l = -1 if firmware == 'abcd' else None
+        self.path_r = -1 if firmware == 'abcd' else None
+        self.relay6_active = False
+        self.sample_count = 0
+
+        # Observations for tests
+        self.received = []
+        self.connections = 0
+        self.kicked = 0
+        self.forced_disconnects = 0
+        self.samples_sent = 0
+        self.samples_lost = 0
+
+    # ===== Clock and analog front end =====
+
+    def micros(self):
+        elapsed = (time.perf_counter() - self.booted) * (1 + self.drift_ppm * 1e-6)
+        return (self.micros_start + int(elapsed * 1e6)) % MICROS_WRAP
+
+    def reboot(self):
+        self.booted = time.perf_counter()
+        self.micros_start = 0
+
+    def voltage_at(self, micros):
+        """Mains waveform with the firmware's DC level (it never goes negative) and ADC noise"""
+        peak = self.mains_vrms * math.sqrt(2)
+        return peak + peak * math.sin(OMEGA * micros / 1e6) + self.random.gauss(0.0, self.noise)
+
+    # ===== Relay path selection =====
+
+    def select_best_path(self, target_l, target_r):
+        """abcd.ino: best of all 12 inductor/resistor combinations"""
+        best_error, best = 100000.0, (0, 0)
+        for l, (inductance, winding) in enumerate(self.inductors):
+            for r, resistance in enumerate(RESISTORS):
+                error = abs(target_l - inductance) + abs(target_r - (winding + resistance))
+                if error < best_error:
+                    best_error, best = error, (l, r)
+        self.path_l, self.path_r = best
+
+    def select_path_legacy(self, target_l, target_r):
+        """esp32_controller.ino / esp32_receiver.ino: inductor first, then resistor"""
+        best_l = best_r = None
+        smallest = 10000.0
+        for l, (inductance, _) in enumerate(self.inductors):
+            if abs(target_l - inductance) < smallest:
+                smallest, best_l = abs(target_l - inductance), l
+        if best_l is None:
+            return  # NaN target: the firmware switches on an uninitialised index; relays left as they were
+        smallest = 10000.0
+        for r, resistance in enumerate(RESISTORS):
+            difference = abs(target_r - self.inductors[best_l][1] - resistance)
+            if difference < smallest:
+                smallest, best_r = difference, r
+        if best_r is None:
+            return
+        self.path_l, self.path_r = best_l, best_r
+
+    def targets_from_current(self):
+        """Target R and XL from the measured mains voltage and the target current and pf"""
+        target_z = c_div(self.mains_vrms, self.target_current)
+        target_r = self.target_pf * target_z
+        return target_r, c_sqrt(target_z * target_z - target_r * target_r)
+
+    # ===== Lifecycle =====
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        if self.firmware == 'esp32_receiver':
+            self.transport, _ = await loop.create_datagram_endpoint(
+                lambda: ReceiverProtocol(self), local_addr=(self.host, self.port))
+            self.port = self.transport.get_extra_info('sockname')[1]
+        else:
+            self.serving = asyncio.Lock()
+            self.busy = asyncio.Lock()
+            self.server = await asyncio.start_server(self._client_connected, self.host, self.port)
+            self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self.transport is not None:
+            self.transport.close()
+        if self.server is not None:
+            self.server.close()
+        for task in list(self.tasks):
+            task.cancel()
+        if self.client is not None:
+            self.client.close()
+        if self.server is not None:
+            await self.server.wait_closed()
+
+    def _spawn(self, coroutine):
+        task = asyncio.get_running_loop().create_task(coroutine)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    # ===== TCP firmwares =====
+
+    async def _client_connected(self, reader, writer):
+        task = asyncio.current_task()
+        self.tasks.add(task)  # stop() must also end clients still waiting for esp32_controller.ino
+        task.add_done_callback(self.tasks.discard)
+        try:
+            if self.firmware == 'esp32_controller':
+                # server.hasClient() is only acted on once the current client is gone
+                async with self.serving:
+                    await self._serve(reader, writer)
+            else:
+                # abcd.ino: a new client replaces the connected one
+                if self.client is not None:
+                    self.kicked += 1
+                    self.client.close()
+                await self._serve(reader, writer)
+        except asyncio.CancelledError:
+            writer.close()  # Simulator stopped; asyncio's stream callback must not see the cancel
+
+    async def _serve(self, reader, writer):
+        self.client = writer
+        self.connections += 1
+        helpers = [self._spawn(self._stream(writer))] if self.rate > 0 else []
+        if self.disconnect_every > 0:
+            helpers.append(self._spawn(self._disconnect_later(writer)))
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode('utf-8', errors='replace')
+                async with self.busy:
+                    if self.firmware == 'abcd':
+                        await self._abcd_command(writer, command.strip())
+                    else:
+                        await self._controller_command(writer, command.rstrip('\n'))
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            for helper in helpers:
+                helper.cancel()
+            writer.close()
+            if self.client is writer:
+                self.client = None
+
+    def _println(self, writer, text):
+        if not writer.is_closing():
+            writer.write((text + "\r\n").encode())
+
+    async def _abcd_command(self, writer, command):
+        self.received.append(command)
+        if command.upper() == "TRIGGER":
+            self._trigger(writer)
+            self._println(writer, "ACK: TRIGGER command received.")
+        elif command.upper() == "STATUS":
+            self._println(writer, f"STATUS|Relay6:{'ACTIVE' if self.relay6_active else 'INACTIVE'}"
+                                  f"|Path_L:{self.path_l}|Path_R:{self.path_r}|LastCapture:{self.sample_count}")
+        else:
+            values = scan_floats(command, ("", ","))
+            if len(values) >= 1:
+                self.target_current = values[0]
+            if len(values) == 2:
+                self.target_pf = values[1]
+                await asyncio.sleep(VRMS_READ_TIME)
+                target_r, target_xl = self.targets_from_current()
+                self.select_best_path(c_div(target_xl, OMEGA) * 1000.0, target_r)
+                self._println(writer, "ACK: Power Factor command processed.")
+                await asyncio.sleep(RELAY_6_PULSE)  # delay(100) before the auto-trigger
+                self._trigger(writer)
+                return
+            values = scan_floats(command, ("R:", ",L:"))
+            if len(values) == 2:
+                self.select_best_path(values[1] * 1000.0, values[0])
+                self._println(writer, "ACK: R-L command processed.")
+                await asyncio.sleep(RELAY_6_PULSE)
+                self._trigger(writer)
+            else:
+                self._println(writer, "ERROR: Unknown command format.")
+
+    def _trigger(self, writer):
+        """Relay 6 closes for 100ms and the capture runs; the samples are dumped when it opens"""
+        self.relay6_active = True
+        self.sample_count = 0
+        self._spawn(self._end_pulse(writer))
+
+    async def _end_pulse(self, writer):
+        await asyncio.sleep(RELAY_6_PULSE)
+        self.relay6_active = False
+        self.sample_count = self.capture_samples
+        if not self.dump_captures:
+            return
+        # sendVoltageData(): one println per sample with delay(1) between them; commands wait
+        async with self.busy:
+            started = self.micros()
+            for first in range(0, self.sample_count, 50):
+                if writer.is_closing():
+                    return
+                lines = [f"{self.voltage_at(started + i * 50):.2f}\r\n"
+                         for i in range(first, min(first + 50, self.sample_count))]
+                writer.write("".join(lines).encode())
+                await asyncio.sleep(len(lines) * 0.001)
+
+    async def _controller_command(self, writer, command):
+        """esp32_controller.ino: every line is parsed as "Current,Pf" and acted on"""
+        command = command[:254]
+        self.received.append(command)
+        values = scan_floats(command, ("", ","))
+        if len(values) >= 1:
+            self.target_current = values[0]
+        if len(values) == 2:
+            self.target_pf = values[1]
+        await asyncio.sleep(VRMS_READ_TIME)
+        target_r, target_xl = self.targets_from_current()
+        self.select_path_legacy(c_div(target_xl, 0.31416), target_r)
+        self._println(writer, "Data received and processed.")
+
+    # ===== Streaming and fault injection =====
+
+    async def _stream(self, writer):
+        """'voltage,micros@' at self.rate, in bursts of burst_ms plus jitter"""
+        interval = self.burst_ms / 1000.0
+        period_us = 1e6 / self.rate
+        next_us = self.micros()
+        started = time.perf_counter()
+        burst = 0
+        while not writer.is_closing():
+            burst += 1
+            delay = started + burst * interval - time.perf_counter()
+            if self.jitter_ms > 0:
+                delay += self.random.uniform(0.0, self.jitter_ms / 1000.0)
+            await asyncio.sleep(max(0.0, delay))
+            now_us = self.micros()
+            if now_us < next_us and next_us - now_us > MICROS_WRAP // 2:
+                next_us -= MICROS_WRAP  # micros() wrapped since the last burst
+            elif now_us < next_us - 1e6:
+                next_us = now_us  # Rebooted
+            parts = []
+            while next_us <= now_us:
+                stamp = int(next_us) % MICROS_WRAP
+                next_us += period_us
+                if self.loss > 0 and self.random.random() < self.loss:
+                    self.samples_lost += 1
+                    continue
+                parts.append(f"{self.voltage_at(stamp):.2f},{stamp}@")
+            if parts:
+                writer.write("".join(parts).encode())
+                self.samples_sent += len(parts)
+                try:
+                    await writer.drain()
+                except (ConnectionError, OSError):
+                    return
+
+    async def _disconnect_later(self, writer):
+        await asyncio.sleep(self.random.expovariate(1.0 / self.disconnect_every))
+        self.forced_disconnects += 1
+        if self.reboot_on_disconnect:
+            self.reboot()
+        transport = writer.transport
+        transport.abort()  # Like a WiFi drop or reset: no orderly close
+
+    # ===== UDP firmware =====
+
+    def datagram(self, data, address):
+        """esp32_receiver.ino: "Current,Pf" silently, "R:..,L:.." with a confirmation"""
+        text = data[:255].decode('utf-8', errors='replace')
+        self.received.append(text)
+        values = scan_floats(text, ("", ","))
+        if len(values) == 2:
+            self.target_current, self.target_pf = values
+            target_r, target_xl = self.targets_from_current()
+            self.select_path_legacy(c_div(target_xl, 0.31416), target_r)
+            return
+        values = scan_floats(text, ("R:", ",L:"))
+        if len(values) != 2:
+            return  # "Failed to parse packet in any known format." goes to Serial only
+        self.select_path_legacy(values[1], values[0])
+        if self.path_l is None:
+            return
+        actual_r = self.inductors[self.path_l][1] + RESISTORS[self.path_r]
+        actual_l = self.inductors[self.path_l][0]
+        confirmation = ("CONFIRMATION: R-L Configuration Applied Successfully\n"
+                        f"Inductance Path: {self.path_l}\n"
+                        f"Resistance Path: {self.path_r}\n"
+                        f"Actual R: {actual_r:.4f} Ohms\n"
+                        f"Actual L: {actual_l:.4f} H\n"
+                        "R-L_CONFIG_COMPLETE")
+        self.transport.sendto(confirmation.encode(), address)
+
+    def stats(self):
+        return {
+            'firmware': self.firmware,
+            'address': f"{self.host}:{self.port}",
+            'connections': self.connections,
+            'kicked': self.kicked,
+            'forced_disconnects': self.forced_disconnects,
+            'samples_sent': self.samples_sent,
+            'samples_lost': self.samples_lost,
+            'commands': len(self.received),
+        }
+
+
+class ReceiverProtocol(asyncio.DatagramProtocol):
+    def __init__(self, simulator):
+        self.simulator = simulator
+
+    def datagram_received(self, data, address):
+        self.simulator.datagram(data, address)
+
+
+class SimulatorFleet:
+    """
+    Many simulators on one asyncio loop in a background thread.
+
+        with SimulatorFleet() as fleet:
+            sim = fleet.add('abcd', rate=2000)
+            backend = ESP32Backend(sim.host, sim.port)
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="SimulatorFleet", daemon=True)
+        self.thread.start()
+        self.simulators = []
+
+    def _run(self, coroutine, timeout=10):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result(timeout)
+
+    def add(self, firmware='abcd', **options):
+        """Start one simulator; its port is bound when this returns"""
+        simulator = self._run(ControllerSimulator(firmware, **options).start())
+        self.simulators.append(simulator)
+        return simulator
+
+    def spawn(self, count, firmware='abcd', port=0, **options):
+        """`count` simulators on consecutive ports from `port` (0: any free ports)"""
+        return [self.add(firmware, port=port + i if port else 0, seed=i, **options) for i in range(count)]
+
+    def call(self, function, *args):
+        """Run function(*args) on the loop thread (to read or change simulator state safely)"""
+        async def call():
+            return function(*args)
+        return self._run(call())
+
+    def addresses(self):
+        return [(simulator.host, simulator.port) for simulator in self.simulators]
+
+    def stop(self):
+        if not self.loop.is_running():
+            return
+        for simulator in self.simulators:
+            self._run(simulator.stop())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=2)
+        self.loop.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+# ===== Command line =====
+
+def run_fleet(count, firmware, port, options, report=None):
+    """Host `count` simulators until interrupted; addresses go to `report` (a Queue) or stdout"""
+    fleet = SimulatorFleet()
+    simulators = fleet.spawn(count, firmware, port, **options)
+    addresses = [f"{s.host}:{s.port}" for s in simulators]
+    if report is not None:
+        report.put(addresses)
+    else:
+        for address in addresses:
+            print(f"📡 {firmware} listening on {address}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        fleet.stop()
+
+
+def main(args):
+    options = {'host': args.host, 'rate': args.rate, 'burst_ms': args.burst_ms, 'jitter_ms': args.jitter_ms,
+               'loss': args.loss, 'disconnect_every': args.disconnect_every,
+               'reboot_on_disconnect': args.reboot_on_disconnect, 'micros_start': args.micros_start,
+               'drift_ppm': args.drift_ppm, 'dump_captures': not args.no_capture_dump}
+    port = DEFAULT_PORTS[args.firmware] if args.port is None and args.count == 1 else (args.port or 0)
+    print(f"🧪 ESP32 Simulator: {args.count} x {args.firmware}, {args.rate:g} samples/s each")
+    if args.processes <= 1:
+        if args.addresses:
+            print("--addresses needs --processes 2 or more; listing on stdout")
+        run_fleet(args.count, args.firmware, port, options)
+        return 0
+
+    import multiprocessing
+    context = multiprocessing.get_context("spawn")
+    report = context.Queue()
+    workers = []
+    share = math.ceil(args.count / args.processes)
+    for index in range(args.processes):
+        count = min(share, args.count - index * share)
+        if count <= 0:
+            break
+        first_port = port + index * share if port else 0
+        worker = context.Process(target=run_fleet, args=(count, args.firmware, first_port, options, report),
+                                 daemon=True)
+        worker.start()
+        workers.append(worker)
+    addresses = [address for _ in workers for address in report.get(timeout=30)]
+    for address in addresses:
+        print(f"📡 {args.firmware} listening on {address}")
+    if args.addresses:
+        with open(args.addresses, "w") as f:
+            json.dump(addresses, f, indent=2)
+        print(f"📄 Addresses saved to {args.addresses}")
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.join(timeout=3)
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulated ESP32 controllers for tests without hardware")
+    parser.add_argument("--firmware", choices=FIRMWARES, default='abcd', help="Command set to speak")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--port", type=int, help="First port (default: the firmware's port for one "
+                                                 "instance, free ports for several)")
+    parser.add_argument("--count", type=int, default=1, help="Number of simulated controllers")
+    parser.add_argument("--processes", type=int, default=1, help="Spread the controllers over processes")
+    parser.add_argument("--rate", type=float, default=1000.0, help="Streamed samples/s per controller (0: off)")
+    parser.add_argument("--burst-ms", type=float, default=10.0, help="Stream write interval")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Random extra delay per burst, up to this")
+    parser.add_argument("--loss", type=float, default=0.0, help="Probability of dropping each sample")
+    parser.add_argument("--disconnect-every", type=float, default=0.0,
+                        help="Mean seconds between forced disconnects (0: never)")
+    parser.add_argument("--reboot-on-disconnect", action="store_true", help="Restart micros() at each disconnect")
+    parser.add_argument("--micros-start", type=int, default=0,
+                        help="micros() at start (e.g. 4294000000 to wrap after ~16 minutes)")
+    parser.add_argument("--drift-ppm", type=float, default=0.0, help="Device crystal error")
+    parser.add_argument("--no-capture-dump", action="store_true", help="Skip abcd.ino's post-TRIGGER sample dump")
+    parser.add_argument("--addresses", help="With --processes: write the listening addresses to this JSON file")
+    sys.exit(main(parser.parse_args()))
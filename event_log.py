@@ -0,0 +1,124 @@
+"""
+Event Log Model for MCB Testing System
+Capped, batched list model behind the ESP32 output log, with an on-disk tail
+"""
+
+import os
+import time
+from collections import deque
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, Qt, QTimer
+
+
+class EventLogModel(QAbstractListModel):
+    """
+    Log model that keeps only the last `max_rows` lines in memory.
+
+    Lines passed to append() are queued and inserted in one batch per frame
+    (flush_interval ms), so a fast stream costs one row insertion per frame
+    instead of one layout per line. Every flushed line is also written to
+    the tail file, so nothing is lost when it drops out of the window.
+    """
+
+    def __init__(self, max_rows=5000, log_directory=None, flush_interval=33, parent=None):
+        super().__init__(parent)
+        self.max_rows = max_rows
+        self.log_directory = log_directory
+        self.rows = deque()
+        self.pending = []
+        self.total_lines = 0
+        self.tail_file = None
+        self.tail_path = None
+
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setInterval(flush_interval)
+        self.flush_timer.timeout.connect(self.flush)
+        self.flush_timer.start()
+
+    # ===== QAbstractListModel interface =====
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.rows):
+            return None
+        if role == Qt.DisplayRole:
+            return self.rows[index.row()]
+        return None
+
+    # ===== Log operations =====
+
+    def append(self, text):
+        """Queue a line; it is shown on the next flush"""
+        self.pending.append(f"[{time.strftime('%H:%M:%S')}] {text}")
+
+    def flush(self):
+        """Insert all queued lines in one batch and trim the in-memory window"""
+        if not self.pending:
+            return
+        batch = self.pending
+        self.pending = []
+        self.total_lines += len(batch)
+        self._write_tail(batch)
+
+        # Lines that would be trimmed straight away never enter the model
+        if len(batch) > self.max_rows:
+            batch = batch[-self.max_rows:]
+
+        overflow = len(self.rows) + len(batch) - self.max_rows
+        if overflow > 0:
+            self.beginRemoveRows(QModelIndex(), 0, overflow - 1)
+            for _ in range(overflow):
+                self.rows.popleft()
+            self.endRemoveRows()
+
+        first = len(self.rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(batch) - 1)
+        self.rows.extend(batch)
+        self.endInsertRows()
+
+    def clear(self, session_name=None):
+        """Drop all lines and start a new tail file for the next session"""
+        self.pending = []
+        self.beginResetModel()
+        self.rows.clear()
+        self.endResetModel()
+        self.total_lines = 0
+        self.close_tail()
+        if session_name and self.log_directory:
+            self.open_tail(session_name)
+
+    # ===== On-disk tail =====
+
+    def open_tail(self, session_name):
+        """Open a new tail file named after the session (e.g. the test name)"""
+        safe_name = "".join(c if c.isalnum() else "_" for c in session_name).strip("_") or "session"
+        try:
+            os.makedirs(self.log_directory, exist_ok=True)
+            self.tail_path = os.path.join(
+                self.log_directory, f"{time.strftime('%Y%m%d_%H%M%S')}_{safe_name}.log")
+            self.tail_file = open(self.tail_path, "a", encoding="utf-8")
+        except OSError as e:
+            print(f"Could not open log tail file: {e}")
+            self.tail_file = None
+            self.tail_path = None
+
+    def close_tail(self):
+        if self.tail_file:
+            try:
+                self.tail_file.close()
+            except OSError:
+                pass
+        self.tail_file = None
+
+    def _write_tail(self, lines):
+        if not self.tail_file:
+            return
+        try:
+            self.tail_file.write("\n".join(lines) + "\n")
+            self.tail_file.flush()
+        except OSError as e:
+            print(f"Log tail write failed: {e}")
+            self.close_tail()
@@ -0,0 +1,56 @@
+"""
+Figure Pool for MCB Testing System
+Reuses prepared matplotlib figures/canvases across short-lived plot windows
+"""
+
+
+class FigurePool:
+    """
+    Keeps released (figure, axes, canvas) triples and hands them out again.
+
+    Figures are created with matplotlib.figure.Figure rather than pyplot, so
+    they never enter pyplot's global figure registry and are freed as soon as
+    the pool drops them. matplotlib is imported on first acquire().
+    """
+
+    def __init__(self, figsize=(12, 5), facecolor='#1e1e2e', axes_facecolor='#313244', max_idle=2):
+        self.figsize = figsize
+        self.facecolor = facecolor
+        self.axes_facecolor = axes_facecolor
+        self.max_idle = max_idle
+        self.idle = []
+        self.created = 0
+
+    def acquire(self):
+        """Return (figure, axes, canvas), reusing an idle canvas if there is one"""
+        if self.idle:
+            figure, ax, canvas = self.idle.pop()
+        else:
+            from matplotlib.figure import Figure
+            from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+
+            figure = Figure(figsize=self.figsize, facecolor=self.facecolor)
+            ax = figure.add_subplot(111)
+            canvas = FigureCanvas(figure)
+            self.created += 1
+        ax.clear()
+        ax.set_facecolor(self.axes_facecolor)
+        return figure, ax, canvas
+
+    def release(self, figure, ax, canvas):
+        """Detach the canvas from its window and keep it for the next acquire()"""
+        canvas.setParent(None)
+        ax.clear()
+        if len(self.idle) < self.max_idle:
+            self.idle.append((figure, ax, canvas))
+        else:
+            canvas.deleteLater()
+
+    def clear(self):
+        for _, _, canvas in self.idle:
+            canvas.deleteLater()
+        self.idle = []
+
+
+# Shared pool for PowerFactorWindow waveform canvases
+waveform_figure_pool = FigurePool()
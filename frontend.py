@@ -1,20 +1,32 @@
 """
 Enhanced Frontend for MCB Testing System
 Integrates with backend.py for ESP32 communication
+
+Only Qt modules are imported before the first paint; NumPy, matplotlib and
+the waveform/analysis helpers are imported where they are first used.
+Run bench_startup.py to check the startup budget.
 """
 
+import os
 import sys
+import math
+import time
+from collections import OrderedDict
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                              QHBoxLayout, QPushButton, QLabel, QStackedWidget,
                              QFrame, QScrollArea, QGridLayout, QTextEdit, QGraphicsDropShadowEffect,
                              QSizePolicy, QLineEdit, QSpinBox, QDoubleSpinBox, QComboBox,
-                             QGroupBox, QMessageBox, QDialog, QDialogButtonBox, QFormLayout)
-from PyQt5.QtGui import (QFont, QColor)
+                             QGroupBox, QMessageBox, QDialog, QDialogButtonBox, QFormLayout,
+                             QListView, QCheckBox, QAbstractItemView, QFileDialog, QProgressBar)
+from PyQt5.QtGui import (QFont, QColor, QPainter)
 from PyQt5.QtCore import (Qt, QTimer, QPropertyAnimation, QEasingCurve, QPoint, QSize, 
-                          QParallelAnimationGroup, QSequentialAnimationGroup)
+                          QParallelAnimationGroup, QSequentialAnimationGroup, pyqtProperty, QEvent)
 
 # Import backend
-from backend import ESP32Backend
+from backend import ESP32Backend, DEFAULT_ESP_IP, DEFAULT_PORT, load_config, parse_candidates
+from event_log import EventLogModel
+from ui_state import UIStateBinder
+from stage_metrics import gui_metrics
 
 # Color scheme (same as a1.py)
 COLOR_BACKGROUND_PRIMARY = "#0A0E27"
@@ -40,6 +52,28 @@ COLOR_TEXT_MUTED = "#808080"
 COLOR_BORDER = "#2A3150"
 COLOR_BORDER_FOCUS = COLOR_PRIMARY
 
+# Errors that mean the link to the ESP32 is gone
+FATAL_ERROR_PREFIXES = ("Receive error",)
+
+# Waveform export file types (rendered in a worker by waveform_export.py)
+EXPORT_FILE_FILTER = "PNG Image (*.png);;PDF Document (*.pdf)"
+
+# Output log settings
+LOG_DIRECTORY = "./test_results/logs"  # On-disk tail of the ESP32 output log
+LOG_MAX_ROWS = 5000                     # Lines kept in memory / shown in the log view
+
+# Trend store (raw samples + 1/10/60 s rollups per test run, see trend_store.py)
+TREND_DIRECTORY = "./test_results/trends"
+TREND_CHANNELS = ('current', 'voltage')
+TREND_FLUSH_MS = 500  # Samples queued by the waveform slot are written as one block per period
+
+# Post-test analysis reports (harmonic spectra, THD trend)
+REPORT_DIRECTORY = "./test_results/reports"
+
+# Diagnostics panel (per-stage hot-path metrics, exported as JSON)
+DIAGNOSTICS_DIRECTORY = "./test_results/diagnostics"
+DIAGNOSTICS_REFRESH_MS = 500
+
 
 # ===== Test Configuration Dialog =====
 class TestConfigDialog(QDialog):
@@ -242,18 +276,110 @@ class TestConfigDialog(QDialog):
         return config
 
 
+# ===== Slide Overlay (snapshot transitions) =====
+class SlideOverlay(QWidget):
+    """Paints two page snapshots side by side; only `offset` is animated"""
+    def __init__(self, old_pixmap, new_pixmap, forward, parent=None):
+        super().__init__(parent)
+        self.old_pixmap = old_pixmap
+        self.new_pixmap = new_pixmap
+        self.forward = forward
+        self.m_offset = 0
+        self.setAttribute(Qt.WA_OpaquePaintEvent)
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+
+    def getOffset(self):
+        return self.m_offset
+
+    def setOffset(self, value):
+        self.m_offset = value
+        self.update()
+
+    offset = pyqtProperty(int, fget=getOffset, fset=setOffset)
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        width = self.width()
+        if self.forward:
+            painter.drawPixmap(-self.m_offset, 0, self.old_pixmap)
+            painter.drawPixmap(width - self.m_offset, 0, self.new_pixmap)
+        else:
+            painter.drawPixmap(self.m_offset, 0, self.old_pixmap)
+            painter.drawPixmap(self.m_offset - width, 0, self.new_pixmap)
+        painter.end()
+
+
 # ===== Animated Stacked Widget (from a1.py) =====
 class AnimatedStackedWidget(QStackedWidget):
+    TRANSITION_LIVE = "live"          # Animate the real page widgets
+    TRANSITION_SNAPSHOT = "snapshot"  # Animate pixmaps of the pages on an overlay
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.m_duration = 400
         self.m_direction = Qt.Horizontal
         self.m_current_index = 0
+        self.m_transition_mode = self.TRANSITION_SNAPSHOT
+        self.anim_group = None
+        self.m_overlay = None
+
+    def setTransitionMode(self, mode):
+        self.m_transition_mode = mode
 
     def slideIn(self, index):
         if index == self.m_current_index:
             return
 
+        # Finish a transition that is still running before starting the next one
+        if self.anim_group is not None and self.anim_group.state() == QPropertyAnimation.Running:
+            self.anim_group.stop()
+            self._finishSlide(self.m_current_index)
+
+        if self.m_transition_mode == self.TRANSITION_SNAPSHOT:
+            self._slideSnapshot(index)
+        else:
+            self._slideLive(index)
+
+    def _slideSnapshot(self, index):
+        """
+        Grab both pages once and slide the pixmaps on an overlay. Frame cost
+        is two pixmap blits, independent of how heavy the pages are; the
+        real target page is only shown when the animation ends.
+        """
+        old_widget = self.widget(self.m_current_index)
+        new_widget = self.widget(index)
+        new_widget.resize(self.size())
+
+        old_pixmap = old_widget.grab()
+        new_pixmap = new_widget.grab()
+
+        self.m_overlay = SlideOverlay(old_pixmap, new_pixmap, index > self.m_current_index, self)
+        self.m_overlay.setGeometry(self.rect())
+        self.m_overlay.show()
+        self.m_overlay.raise_()
+
+        anim = QPropertyAnimation(self.m_overlay, b"offset")
+        anim.setDuration(self.m_duration)
+        anim.setStartValue(0)
+        anim.setEndValue(self.width())
+        anim.setEasingCurve(QEasingCurve.OutCubic)
+
+        self.anim_group = QParallelAnimationGroup()
+        self.anim_group.addAnimation(anim)
+        self.anim_group.finished.connect(lambda: self._finishSlide(index))
+        self.m_current_index = index
+        self.anim_group.start()
+
+    def _finishSlide(self, index):
+        self.widget(index).move(0, 0)
+        self.setCurrentIndex(index)
+        if self.m_overlay is not None:
+            self.m_overlay.hide()
+            self.m_overlay.deleteLater()
+            self.m_overlay = None
+
+    def _slideLive(self, index):
+
         old_widget = self.widget(self.m_current_index)
         new_widget = self.widget(index)
         
@@ -288,7 +414,7 @@ class AnimatedStackedWidget(QStackedWidget):
         self.anim_group.addAnimation(anim_old)
         self.anim_group.addAnimation(anim_new)
         
-        self.anim_group.finished.connect(lambda: self.setCurrentIndex(index))
+        self.anim_group.finished.connect(lambda: self._finishSlide(index))
         self.m_current_index = index
         self.anim_group.start()
 
@@ -481,6 +607,121 @@ class TestCard(QFrame):
         self.setLayout(layout)
 
 
+# ===== Notification Area (non-modal error queue) =====
+class NotificationArea(QFrame):
+    """
+    Non-modal banner stack for backend errors.
+
+    Repeated messages are de-duplicated into one entry with a count, and the
+    visible banners are refreshed at most once per `min_interval` seconds, so
+    a flaky link that reports an error on every receive attempt never blocks
+    the event loop or floods the screen.
+    """
+    LEVEL_COLORS = {
+        'error': COLOR_DANGER,
+        'warning': COLOR_WARNING,
+        'info': COLOR_INFO,
+    }
+
+    def __init__(self, max_visible=3, min_interval=1.0, expire_after=15.0, parent=None):
+        super().__init__(parent)
+        self.max_visible = max_visible
+        self.min_interval = min_interval
+        self.expire_after = expire_after
+        self.entries = OrderedDict()  # message -> {level, count, first, last}
+        self.dirty = False
+        self.last_refresh = 0.0
+        
+        self.setStyleSheet(f"""
+            QFrame {{
+                background: {COLOR_BACKGROUND_SECONDARY};
+                border: none;
+            }}
+        """)
+        layout = QHBoxLayout()
+        layout.setContentsMargins(16, 6, 16, 6)
+        
+        self.banner_layout = QVBoxLayout()
+        self.banner_layout.setSpacing(4)
+        self.banners = []
+        for _ in range(self.max_visible):
+            banner = QLabel()
+            banner.setWordWrap(True)
+            banner.hide()
+            self.banner_layout.addWidget(banner)
+            self.banners.append(banner)
+        
+        dismiss_btn = QPushButton("✕")
+        dismiss_btn.setCursor(Qt.PointingHandCursor)
+        dismiss_btn.setFixedSize(28, 28)
+        dismiss_btn.setStyleSheet(f"""
+            QPushButton {{
+                background: transparent;
+                color: {COLOR_TEXT_SECONDARY};
+                border: none;
+                font-size: 14px;
+            }}
+            QPushButton:hover {{
+                color: {COLOR_TEXT_PRIMARY};
+            }}
+        """)
+        dismiss_btn.clicked.connect(self.clear)
+        
+        layout.addLayout(self.banner_layout, 1)
+        layout.addWidget(dismiss_btn, 0, Qt.AlignTop)
+        self.setLayout(layout)
+        self.hide()
+        
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(250)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.refresh_timer.start()
+    
+    def notify(self, message, level='error'):
+        """Queue a message; cheap enough to call for every emitted error"""
+        now = time.monotonic()
+        entry = self.entries.pop(message, None)
+        if entry is None:
+            entry = {'level': level, 'count': 0, 'first': now, 'last': now}
+        entry['count'] += 1
+        entry['last'] = now
+        self.entries[message] = entry  # Most recent last
+        self.dirty = True
+    
+    def refresh(self):
+        """Rate-limited repaint of the visible banners"""
+        now = time.monotonic()
+        expired = [msg for msg, entry in self.entries.items()
+                   if now - entry['last'] > self.expire_after]
+        for msg in expired:
+            del self.entries[msg]
+            self.dirty = True
+        
+        if not self.dirty or now - self.last_refresh < self.min_interval:
+            return
+        self.dirty = False
+        self.last_refresh = now
+        
+        visible = list(self.entries.items())[-self.max_visible:]
+        for banner, (message, entry) in zip(self.banners, reversed(visible)):
+            count = f"  (×{entry['count']})" if entry['count'] > 1 else ""
+            banner.setText(f"⚠ {message}{count}")
+            color = self.LEVEL_COLORS.get(entry['level'], COLOR_DANGER)
+            if banner.property('level_color') != color:
+                banner.setProperty('level_color', color)
+                banner.setStyleSheet(f"color: {color}; font-size: 13px; font-weight: 600;")
+            banner.show()
+        for banner in self.banners[len(visible):]:
+            banner.hide()
+        self.setVisible(bool(visible))
+    
+    def clear(self):
+        self.entries.clear()
+        self.dirty = True
+        self.last_refresh = 0.0
+        self.refresh()
+
+
 def set_global_style(app):
     app.setStyleSheet(f"""
         QMainWindow {{
@@ -547,9 +788,31 @@ def set_global_style(app):
 
 
 
-import numpy as np
 from collections import deque
 
+# Cycle status label styles (applied only on a capturing <-> looping transition)
+CYCLE_STYLE_CAPTURING = """
+    font-size: 12px;
+    color: #f9e2af;
+    padding: 2px;
+"""
+CYCLE_STYLE_LOOPING = """
+    font-size: 12px;
+    color: #a6e3a1;
+    padding: 2px;
+"""
+
+
+def safe_file_name(name):
+    """Session name reduced to characters safe in file names"""
+    return "".join(c if c.isalnum() else "_" for c in name).strip("_") or "session"
+
+def add_export_extension(path, selected_filter):
+    """Append .png/.pdf when the user typed a bare file name"""
+    if path.lower().endswith(('.png', '.pdf')):
+        return path
+    return path + ('.pdf' if 'PDF' in selected_filter else '.png')
+
 # ===== Power Factor Visualization Window (Standalone - Exact copy of recieve.py) =====
 class PowerFactorWindow(QMainWindow):
     def __init__(self, current_value, power_factor, backend, parent=None):
@@ -565,10 +828,16 @@ class PowerFactorWindow(QMainWindow):
         self.time_data = deque(maxlen=500)     # Corresponding time points
         self.start_time = None
         
+        # Sample-to-pixel latency of the blocks shown, stamped by the backend while this window is open
+        from latency_tracer import LatencyTracer
+        self.latency_tracer = LatencyTracer()
+        self.paint_pending = False  # A drawn frame is waiting for the canvas widget to paint it
+        
         # Connect to backend signals for real-time data
         if self.backend:
             self.backend.real_time_waveform.connect(self.handle_real_time_data)
             self.backend.connection_status_changed.connect(self.update_connection_status)
+            self.backend.enable_tracing(True)
         
         self.setWindowTitle("⚡ ESP32 Power Factor Monitor")
         self.resize(1200, 850)
@@ -670,8 +939,7 @@ class PowerFactorWindow(QMainWindow):
         """)
         self.pf_value_label.setAlignment(Qt.AlignCenter)
         
-        import numpy as np
-        phase_diff = np.degrees(np.arccos(np.clip(self.power_factor, 0, 1)))
+        phase_diff = self.calculate_phase_diff(self.power_factor)
         self.phase_diff_label = QLabel(f"Phase Difference: {phase_diff:.1f}°")
         self.phase_diff_label.setStyleSheet("""
             font-size: 16px;
@@ -696,6 +964,14 @@ class PowerFactorWindow(QMainWindow):
         self.connect_button = QPushButton("Connect to ESP32")
         self.connect_button.clicked.connect(self.toggle_connection)
         
+        # Export renders in a worker thread; the live plot keeps updating
+        self.exporter = None
+        self.export_button = QPushButton("💾 Export PNG/PDF")
+        self.export_button.clicked.connect(self.export_waveform)
+        self.export_status_label = QLabel("")
+        self.export_status_label.setStyleSheet("font-size: 12px; color: #a6adc8; padding: 2px;")
+        self.export_status_label.setAlignment(Qt.AlignCenter)
+        
         # DC Offset Display
         self.dc_offset_label = QLabel("DC Offset: Calculating...")
         self.dc_offset_label.setStyleSheet("""
@@ -714,14 +990,32 @@ class PowerFactorWindow(QMainWindow):
         """)
         self.cycle_status_label.setAlignment(Qt.AlignCenter)
         
+        # End-to-end latency (receive -> drawn) of the newest data on screen
+        self.latency_label = QLabel("Display latency: waiting for data...")
+        self.latency_label.setStyleSheet("""
+            font-size: 12px;
+            color: #89dceb;
+            padding: 2px;
+        """)
+        self.latency_label.setAlignment(Qt.AlignCenter)
+        
+        # Per-sample status updates are coalesced and applied once per frame
+        self.ui_state = UIStateBinder(parent=self)
+        self.ui_state.bind('dc_offset', self.dc_offset_label)
+        self.ui_state.bind('cycle_status', self.cycle_status_label)
+        self.ui_state.bind('latency', self.latency_label)
+        
         pf_display_layout.addWidget(self.pf_value_label)
         pf_display_layout.addWidget(self.phase_diff_label)
         pf_display_layout.addLayout(current_layout)
         pf_display_layout.addWidget(self.dc_offset_label)
         pf_display_layout.addWidget(self.cycle_status_label)
+        pf_display_layout.addWidget(self.latency_label)
         pf_display_layout.addSpacing(10)
         pf_display_layout.addWidget(self.connection_status_label)
         pf_display_layout.addWidget(self.connect_button)
+        pf_display_layout.addWidget(self.export_button)
+        pf_display_layout.addWidget(self.export_status_label)
         
         # Right side - Slider
         pf_slider_layout = QVBoxLayout()
@@ -757,23 +1051,23 @@ class PowerFactorWindow(QMainWindow):
         
         pf_layout.addLayout(pf_control_layout)
         
-        # Waveform canvas
+        # Waveform canvas (reused from the shared pool, released on close)
+        self.canvas_waveform = None
+        self.plot_timer = None
         try:
-            import matplotlib.pyplot as plt
-            from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-            import time
-
-            self.fig_waveform, self.ax_waveform = plt.subplots(figsize=(12, 5), facecolor='#1e1e2e')
-            self.ax_waveform.set_facecolor('#313244')
-            self.canvas_waveform = FigureCanvas(self.fig_waveform)
+            from figure_pool import waveform_figure_pool
+            
+            self.fig_waveform, self.ax_waveform, self.canvas_waveform = waveform_figure_pool.acquire()
             self.canvas_waveform.setMinimumHeight(400)
+            # Pooled canvases can't be subclassed, so their paint events are watched instead
+            self.canvas_waveform.installEventFilter(self)
             pf_layout.addWidget(self.canvas_waveform)
             
             pf_group.setLayout(pf_layout)
             main_layout.addWidget(pf_group)
             
-            # Update timer for the plot
-            self.plot_timer = QTimer()
+            # Update timer for the plot (owned by the window, stopped on close)
+            self.plot_timer = QTimer(self)
             self.plot_timer.timeout.connect(self.draw_waveform)
             self.plot_timer.start(100) # Update plot 10 times per second
             
@@ -807,8 +1101,8 @@ class PowerFactorWindow(QMainWindow):
     
     def calculate_phase_diff(self, pf):
         """Calculate phase difference in degrees from power factor"""
-        phase_rad = np.arccos(np.clip(pf, 0, 1))
-        phase_deg = np.degrees(phase_rad)
+        phase_rad = math.acos(min(max(pf, 0.0), 1.0))
+        phase_deg = math.degrees(phase_rad)
         return phase_deg
 
     def toggle_connection(self):
@@ -853,48 +1147,89 @@ class PowerFactorWindow(QMainWindow):
             self.voltage_data.append(voltage)
             self.current_data.append(current)
             self.time_data.append(current_time)
+            self.latency_tracer.delivered(waveform_data)
             
-            # Update DC offset display
+            # Update DC offset display (applied at the frame cadence)
             if dc_offset is not None:
-                self.dc_offset_label.setText(f"DC Offset: {dc_offset:.1f}V (Raw: {raw_voltage:.1f}V)")
+                self.ui_state.set('dc_offset', f"DC Offset: {dc_offset:.1f}V (Raw: {raw_voltage:.1f}V)")
             else:
-                self.dc_offset_label.setText("DC Offset: Calculating...")
+                self.ui_state.set('dc_offset', "DC Offset: Calculating...")
             
             # Update cycle status display
             cycle_captured = waveform_data.get('cycle_captured', False)
             cycle_samples = waveform_data.get('cycle_samples', 0)
             
             if cycle_captured:
-                self.cycle_status_label.setText(f"Cycle: Looping ({cycle_samples} samples)")
-                self.cycle_status_label.setStyleSheet("""
-                    font-size: 12px;
-                    color: #a6e3a1;
-                    padding: 2px;
-                """)
+                self.ui_state.set('cycle_status', f"Cycle: Looping ({cycle_samples} samples)",
+                                  CYCLE_STYLE_LOOPING)
             else:
-                self.cycle_status_label.setText("Cycle: Capturing first cycle...")
-                self.cycle_status_label.setStyleSheet("""
-                    font-size: 12px;
-                    color: #f9e2af;
-                    padding: 2px;
-                """)
+                self.ui_state.set('cycle_status', "Cycle: Capturing first cycle...",
+                                  CYCLE_STYLE_CAPTURING)
             
         except Exception as e:
             print(f"Error handling real-time data: {e}")
 
+    def export_waveform(self):
+        """Ask for a file name and export the current waveform"""
+        from waveform_export import default_export_path
+        
+        path, selected_filter = QFileDialog.getSaveFileName(
+            self, "Export Waveform", default_export_path('power_factor'), EXPORT_FILE_FILTER)
+        if path:
+            self.start_export(add_export_extension(path, selected_filter))
+    
+    def start_export(self, path):
+        """Snapshot the plotted buffers and render them in the background"""
+        from waveform_export import WaveformExporter, snapshot_live
+        
+        if self.exporter is None:
+            self.exporter = WaveformExporter()
+            self.exporter.export_finished.connect(self.on_export_finished)
+            self.exporter.export_failed.connect(self.on_export_failed)
+        
+        title = f"Voltage & Current Waveforms (PF = {self.power_factor:.2f}, I = {self.current_value} A)"
+        snapshot = snapshot_live(self.time_data, self.voltage_data, self.current_data, title)
+        self.exporter.export(snapshot, path)
+        self.export_status_label.setText("Exporting...")
+    
+    def on_export_finished(self, path, seconds):
+        self.export_status_label.setText(f"Saved {path} ({seconds:.1f}s)")
+    
+    def on_export_failed(self, path, error):
+        self.export_status_label.setText(f"Export failed: {error}")
+    
     def closeEvent(self, event):
         """Clean up when window is closed."""
+        if self.plot_timer is not None:
+            self.plot_timer.stop()
+        self.ui_state.stop()
+        
         # Disconnect from backend signals
         if self.backend:
+            self.backend.enable_tracing(False)
             try:
                 self.backend.real_time_waveform.disconnect(self.handle_real_time_data)
                 self.backend.connection_status_changed.disconnect(self.update_connection_status)
             except:
                 pass  # Signals might already be disconnected
+        
+        # Queued exports still finish; the worker process exits afterwards
+        if self.exporter is not None:
+            self.exporter.shutdown()
+        
+        # Hand the canvas back to the pool before the window is deleted
+        if self.canvas_waveform is not None:
+            from figure_pool import waveform_figure_pool
+            self.canvas_waveform.removeEventFilter(self)
+            waveform_figure_pool.release(self.fig_waveform, self.ax_waveform, self.canvas_waveform)
+            self.canvas_waveform = None
         super().closeEvent(event)
 
     def draw_waveform(self):
         """Draw waveform from real-time data"""
+        import numpy as np
+        
+        frame_started = time.perf_counter_ns() if gui_metrics.enabled else None
         self.ax_waveform.clear()
 
         if not self.voltage_data or len(self.voltage_data) < 2:
@@ -992,22 +1327,423 @@ class PowerFactorWindow(QMainWindow):
         
         self.fig_waveform.tight_layout()
         self.canvas_waveform.draw()
+        if frame_started is not None:
+            gui_metrics.record('frame', time.perf_counter_ns() - frame_started)
+        
+        # draw() only renders into the Agg buffer; the frame is stamped once the widget has painted it
+        self.paint_pending = len(self.voltage_data) >= 2
+
+    def eventFilter(self, obj, event):
+        """Stamp the pending frame after the canvas widget has painted it into the window"""
+        if obj is self.canvas_waveform and event.type() == QEvent.Paint and self.paint_pending:
+            obj.event(event)
+            self.paint_pending = False
+            self.on_frame_painted()
+            return True
+        return super().eventFilter(obj, event)
+
+    def on_frame_painted(self):
+        """Everything delivered before the last draw is now on screen"""
+        if self.latency_tracer.painted() is not None:
+            latest = self.latency_tracer.latest
+            total = self.latency_tracer.histograms['total']
+            self.ui_state.set('latency', f"Display latency: {latest['total']:.0f} ms "
+                                         f"(p50 {total.percentile_ns(0.5) / 1e6:.0f} / "
+                                         f"p99 {total.percentile_ns(0.99) / 1e6:.0f} ms)")
+
+
+# ===== Oscilloscope Window (whole-session history) =====
+class OscilloscopeWindow(QMainWindow):
+    """
+    Zoomable view over the whole session history.
+
+    Every redraw asks the min/max pyramid for about one bin per horizontal
+    pixel, so zoom and pan cost the same for a second or an hour of data.
+    In live mode the view follows the newest samples; any zoom/pan pauses the
+    display while the history keeps ingesting.
+    """
+    def __init__(self, history, parent=None):
+        super().__init__(parent)
+        self.history = history
+        self.live = True
+        self.live_span = 0.5  # Seconds shown in live mode
+        self.updating_limits = False
+        
+        self.setWindowTitle("📈 Waveform History")
+        self.resize(1200, 600)
+        self.setStyleSheet("""
+            QWidget {
+                background-color: #1e1e2e;
+                color: #cdd6f4;
+                font-family: 'Segoe UI', Arial, sans-serif;
+            }
+            QPushButton {
+                background-color: #89b4fa;
+                color: #1e1e2e;
+                border: none;
+                border-radius: 8px;
+                padding: 8px 18px;
+                font-size: 13px;
+                font-weight: bold;
+            }
+            QPushButton:hover {
+                background-color: #74c7ec;
+            }
+            QDoubleSpinBox {
+                background-color: #313244;
+                border: 1px solid #45475a;
+                border-radius: 6px;
+                padding: 4px;
+            }
+        """)
+        
+        central_widget = QWidget()
+        self.setCentralWidget(central_widget)
+        layout = QVBoxLayout(central_widget)
+        layout.setContentsMargins(15, 15, 15, 15)
+        
+        controls = QHBoxLayout()
+        self.live_btn = QPushButton("⏸ Pause")
+        self.live_btn.clicked.connect(self.toggle_live)
+        fit_btn = QPushButton("↔ Fit All")
+        fit_btn.clicked.connect(self.fit_all)
+        self.span_input = QDoubleSpinBox()
+        self.span_input.setRange(0.02, 3600.0)
+        self.span_input.setDecimals(2)
+        self.span_input.setValue(self.live_span)
+        self.span_input.setSuffix(" s")
+        self.span_input.valueChanged.connect(self.set_live_span)
+        self.info_label = QLabel("No data")
+        controls.addWidget(self.live_btn)
+        controls.addWidget(fit_btn)
+        controls.addWidget(QLabel("Live span:"))
+        controls.addWidget(self.span_input)
+        controls.addStretch()
+        controls.addWidget(self.info_label)
+        layout.addLayout(controls)
+        
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_qt5agg import (FigureCanvasQTAgg as FigureCanvas,
+                                                        NavigationToolbar2QT)
+        
+        self.figure = Figure(figsize=(12, 5), facecolor='#1e1e2e')
+        self.ax = self.figure.add_subplot(111)
+        self.ax.set_facecolor('#313244')
+        self.canvas = FigureCanvas(self.figure)
+        self.toolbar = NavigationToolbar2QT(self.canvas, self)
+        layout.addWidget(self.toolbar)
+        layout.addWidget(self.canvas, 1)
+        
+        self.voltage_line, = self.ax.plot([], [], color='#f38ba8', linewidth=1.2, label='Voltage')
+        self.current_line, = self.ax.plot([], [], color='#a6e3a1', linewidth=1.2, label='Current')
+        self.ax.set_xlabel("Time (s)", fontsize=12, color='#cdd6f4', fontweight='bold')
+        self.ax.set_ylabel("Amplitude (V/A)", fontsize=12, color='#cdd6f4', fontweight='bold')
+        self.ax.grid(True, alpha=0.3, linestyle='--', linewidth=0.5)
+        self.ax.legend(loc='upper right', framealpha=0.9, facecolor='#313244',
+                       edgecolor='#89b4fa', fontsize=11, frameon=True)
+        self.ax.tick_params(colors='#cdd6f4', labelsize=10)
+        self.figure.tight_layout()
+        
+        # Re-query the pyramid whenever the user zooms or pans
+        self.ax.callbacks.connect('xlim_changed', self.on_xlim_changed)
+        
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.refresh_timer.start(100)
+    
+    def toggle_live(self):
+        self.set_live(not self.live)
+    
+    def set_live(self, live):
+        self.live = live
+        self.live_btn.setText("⏸ Pause" if live else "▶ Live")
+        if live:
+            self.refresh()
+    
+    def set_live_span(self, value):
+        self.live_span = value
+        if self.live:
+            self.refresh()
+    
+    def fit_all(self):
+        self.set_live(False)
+        t_start, t_end = self.history.time_range()
+        if t_end > t_start:
+            self.ax.set_xlim(t_start, t_end)
+    
+    def on_xlim_changed(self, ax):
+        if self.updating_limits:
+            return
+        # User interaction (toolbar zoom/pan or Fit All) freezes the display
+        if self.live:
+            self.set_live(False)
+        self.render(*ax.get_xlim())
+    
+    def refresh(self):
+        """Timer tick: follow the newest samples while live"""
+        if not self.live or not self.isVisible():
+            return
+        t_start, t_end = self.history.time_range()
+        if t_end <= t_start:
+            return
+        left = max(t_start, t_end - self.live_span)
+        self.updating_limits = True
+        try:
+            self.ax.set_xlim(left, t_end)
+        finally:
+            self.updating_limits = False
+        self.render(left, t_end)
+    
+    def render(self, t_start, t_stop):
+        """Draw the envelope at the pyramid level matching the canvas width"""
+        from waveform_history import envelope_to_line
+        
+        max_points = max(100, int(self.ax.bbox.width))
+        x, envelopes = self.history.window(t_start, t_stop, max_points)
+        
+        y_low, y_high = None, None
+        for line, name in ((self.voltage_line, 'voltage'), (self.current_line, 'current')):
+            ymin, ymax = envelopes[name]
+            xs, ys = envelope_to_line(x, ymin, ymax)
+            line.set_data(xs, ys)
+            if len(ys):
+                y_low = ys.min() if y_low is None else min(y_low, ys.min())
+                y_high = ys.max() if y_high is None else max(y_high, ys.max())
+        
+        if y_low is not None:
+            margin = (y_high - y_low) * 0.1 or 1.0
+            self.ax.set_ylim(y_low - margin, y_high + margin)
+        
+        self.info_label.setText(f"{len(self.history):,} samples | showing {len(x):,} bins"
+                                f"{'' if self.live else ' | paused'}")
+        self.canvas.draw_idle()
+    
+    def closeEvent(self, event):
+        self.refresh_timer.stop()
+        super().closeEvent(event)
+
+
+# ===== Diagnostics Window (hot-path metrics) =====
+class DiagnosticsWindow(QMainWindow):
+    """
+    Live view of the sample pipeline's stage metrics.
+
+    While the window is shown, the backend times parsing, DC removal, cycle
+    looping, current calculation and signal emission per sample, and the
+    GUI thread times delivery (host arrival to slot) and live plot frames.
+    Hiding the window switches collection off again. Queue depth is the
+    acquisition ring's backlog for ProcessBackend; otherwise it is the
+    number of samples emitted but not yet delivered to the GUI thread.
+    """
+    def __init__(self, backend, parent=None):
+        super().__init__(parent)
+        self.backend = backend
+        self.previous = {}  # 'backend'/'gui' -> snapshot the current rates were measured from
+        self.rates = {}  # Counter name -> per second, over the last refresh interval
+        
+        self.setWindowTitle("🩺 Diagnostics")
+        self.resize(760, 560)
+        self.setStyleSheet("""
+            QWidget {
+                background-color: #1e1e2e;
+                color: #cdd6f4;
+                font-family: 'Segoe UI', Arial, sans-serif;
+            }
+            QPushButton {
+                background-color: #89b4fa;
+                color: #1e1e2e;
+                border: none;
+                border-radius: 8px;
+                padding: 8px 18px;
+                font-size: 13px;
+                font-weight: bold;
+            }
+            QPushButton:hover {
+                background-color: #74c7ec;
+            }
+            QLabel#value {
+                font-size: 18px;
+                font-weight: bold;
+                color: #89b4fa;
+            }
+        """)
+        
+        central_widget = QWidget()
+        self.setCentralWidget(central_widget)
+        layout = QVBoxLayout(central_widget)
+        layout.setContentsMargins(15, 15, 15, 15)
+        
+        summary = QGridLayout()
+        self.value_labels = {}
+        for index, (name, title) in enumerate((('samples', "Samples/s"), ('bytes', "Bytes/s"),
+                                                ('parse_errors', "Parse errors"), ('queue', "Queue depth"),
+                                                ('frame', "Frame time"), ('deliver', "Delivery latency"))):
+            label = QLabel("-")
+            label.setObjectName("value")
+            self.value_labels[name] = label
+            summary.addWidget(QLabel(title), (index // 3) * 2, index % 3)
+            summary.addWidget(label, (index // 3) * 2 + 1, index % 3)
+        layout.addLayout(summary)
+        
+        self.stage_table = QLabel()
+        self.stage_table.setFont(QFont("Consolas", 10))
+        self.stage_table.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        self.stage_table.setAlignment(Qt.AlignTop | Qt.AlignLeft)
+        layout.addWidget(self.stage_table, 1)
+        
+        controls = QHBoxLayout()
+        reset_btn = QPushButton("↺ Reset")
+        reset_btn.clicked.connect(self.reset)
+        export_btn = QPushButton("💾 Export JSON")
+        export_btn.clicked.connect(self.export_report)
+        self.status_label = QLabel("")
+        controls.addWidget(reset_btn)
+        controls.addWidget(export_btn)
+        controls.addStretch()
+        controls.addWidget(self.status_label)
+        layout.addLayout(controls)
+        
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh)
+    
+    def showEvent(self, event):
+        if not self.refresh_timer.isActive():  # Not on every restore from minimised
+            self.reset()
+            self.refresh_timer.start(DIAGNOSTICS_REFRESH_MS)
+        super().showEvent(event)
+    
+    def closeEvent(self, event):
+        self.refresh_timer.stop()
+        self.backend.enable_metrics(False)
+        gui_metrics.enable(False)
+        super().closeEvent(event)
+    
+    def reset(self):
+        """Start collecting from zero on both sides"""
+        self.backend.enable_metrics(False)
+        self.backend.enable_metrics(True)
+        gui_metrics.enable(False)
+        gui_metrics.enable(True)
+        self.previous = {}
+        self.rates = {}
+        self.stage_table.setText("Collecting...")
+    
+    def queue_depth(self, backend_snapshot, gui_snapshot):
+        if hasattr(self.backend, 'backlog'):
+            return self.backend.backlog()
+        emitted = backend_snapshot['counters'].get('samples', 0)
+        return max(0, emitted - gui_snapshot['counters'].get('delivered', 0))
+    
+    def report(self):
+        """Everything the panel shows, plus link and command statistics, as one JSON-ready dict"""
+        backend_snapshot = self.backend.metrics_snapshot()
+        gui_snapshot = gui_metrics.snapshot()
+        pf_window = getattr(self.parent(), 'pf_window', None)
+        return {
+            'generated': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'controller': f"{self.backend.esp_ip}:{self.backend.port}",
+            'station': getattr(self.backend, 'station_name', None),
+            'backend': backend_snapshot,
+            'gui': gui_snapshot,
+            'rates': dict(self.rates),
+            'queue_depth': self.queue_depth(backend_snapshot, gui_snapshot),
+            # Sample-to-pixel legs of the live plot, while it is open
+            'latency_trace': pf_window.latency_tracer.summary() if pf_window is not None else None,
+            'connection': self.backend.connection_stats(),
+            'commands': self.backend.command_stats(),
+        }
+    
+    def refresh(self):
+        from stage_metrics import rates
+        
+        report = self.report()
+        backend_snapshot, gui_snapshot = report['backend'], report['gui']
+        # A ProcessBackend snapshot only changes when the child reports; keep the last rates until then
+        for source, snapshot in (('backend', backend_snapshot), ('gui', gui_snapshot)):
+            if not snapshot['enabled']:
+                continue
+            changed = rates(self.previous.get(source), snapshot)
+            if changed:
+                self.rates.update(changed)
+                self.previous[source] = snapshot
+        
+        per_second = self.rates
+        counters = backend_snapshot['counters']
+        self.value_labels['samples'].setText(f"{per_second.get('samples', 0.0):,.0f}")
+        self.value_labels['bytes'].setText(f"{per_second.get('bytes', 0.0):,.0f}")
+        self.value_labels['parse_errors'].setText(f"{counters.get('parse_errors', 0):,}")
+        self.value_labels['queue'].setText(f"{report['queue_depth']:,}")
+        for name in ('frame', 'deliver'):
+            stage = gui_snapshot['stages'].get(name, {})
+            self.value_labels[name].setText(
+                f"{stage['p50_us'] / 1000:.1f} / {stage['p99_us'] / 1000:.1f} ms" if stage.get('count') else "-")
+        
+        rows = [f"{'stage':<16}{'count':>10}{'mean µs':>11}{'p50 µs':>11}{'p99 µs':>11}{'max µs':>11}"]
+        stage_groups = [backend_snapshot['stages'], gui_snapshot['stages']]
+        if report['latency_trace'] is not None:
+            stage_groups.append({f"e2e:{leg}": stage for leg, stage in report['latency_trace']['legs'].items()})
+        for stages in stage_groups:
+            for name, stage in stages.items():
+                if not stage.get('count'):
+                    rows.append(f"{name:<16}{0:>10}")
+                    continue
+                rows.append(f"{name:<16}{stage['count']:>10,}{stage['mean_us']:>11.1f}{stage['p50_us']:>11.1f}"
+                            f"{stage['p99_us']:>11.1f}{stage['max_us']:>11.1f}")
+        self.stage_table.setText("\n".join(rows))
+    
+    def export_report(self):
+        from stage_metrics import export_json
+        
+        default = os.path.join(DIAGNOSTICS_DIRECTORY, f"diagnostics_{time.strftime('%Y%m%d_%H%M%S')}.json")
+        path, _ = QFileDialog.getSaveFileName(self, "Export Diagnostics", default, "JSON File (*.json)")
+        if not path:
+            return
+        try:
+            export_json(path, self.report())
+        except OSError as e:
+            self.status_label.setText(f"Export failed: {e}")
+            return
+        self.status_label.setText(f"Saved {path}")
 
 
 # ===== Main MCB Testing Software =====
 class MCBTestingSoftware(QMainWindow):
-    def __init__(self):
+    def __init__(self, backend=None):
         super().__init__()
         self.setWindowTitle("MCB Testing System - IEC 60898-1:2015 | WiFi Integrated")
         self.setGeometry(100, 100, 1400, 900)
         
-        # Initialize backend
-        self.backend = ESP32Backend()
+        # Initialize backend (a StationManager station when several benches share this process)
+        self.backend = backend if backend is not None else ESP32Backend()
+        self.station_name = getattr(self.backend, 'station_name', None)
+        if self.station_name:
+            self.setWindowTitle(f"{self.windowTitle()} | Station {self.station_name}")
         self.setup_backend_connections()
         
         # Current test info
         self.current_test_name = ""
         self.test_running = False
+        self.link_resuming = False  # Backend is reconnecting a dropped link; the session continues
+        self.connecting = False  # connect_async() in progress; the Connect button cancels it
+        self.discovery = None  # Subnet scan for controllers (created on first use)
+        self.discovery_subnet = None  # Network to scan; default: the /24 of the first address entered
+        
+        # Whole-session waveform history for the oscilloscope view (created on first sample)
+        self.waveform_history = None
+        self.history_start_time = None
+        self.scope_window = None
+        self.pf_window = None
+        self.diagnostics_window = None
+        self.exporter = None  # Background PNG/PDF export (created on first use)
+        self.trend_store = None  # On-disk trend of the running test
+        self.trend_start_ns = None  # host_ns at Start Test; trend times count from here
+        self.trend_pending = []  # (host_ns, current, voltage) since the last flush
+        self.trend_timer = QTimer(self)
+        self.trend_timer.timeout.connect(self.flush_trend)
+        self.analysis = None  # Post-test analyses in worker processes (created on first use)
+        self.analysis_jobs = {}  # job id -> progress 0..1
+        self.test_config = {}
+        self.test_history_start = None  # History time at Start Test; the analysed capture begins here
         
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
@@ -1016,6 +1752,11 @@ class MCBTestingSoftware(QMainWindow):
         main_layout.setContentsMargins(0, 0, 0, 0)
         central_widget.setLayout(main_layout)
         
+        # Non-modal error notifications (replaces per-error message boxes)
+        self.notifications = NotificationArea()
+        self.fatal_dialog = None
+        main_layout.addWidget(self.notifications)
+        
         self.stacked_widget = AnimatedStackedWidget()
         main_layout.addWidget(self.stacked_widget)
         
@@ -1033,6 +1774,11 @@ class MCBTestingSoftware(QMainWindow):
         self.backend.error_occurred.connect(self.on_error_occurred)
         self.backend.rl_config_confirmed.connect(self.on_rl_config_confirmed)
         self.backend.real_time_waveform.connect(self.on_real_time_waveform)
+        self.backend.reconnecting.connect(self.on_reconnecting)
+        self.backend.reconnect_finished.connect(self.on_reconnect_finished)
+        self.backend.emergency_stopped.connect(self.on_emergency_stopped)
+        self.backend.connect_progress.connect(self.on_connect_progress)
+        self.backend.first_sample.connect(self.on_first_sample)
     
     def create_connection_screen(self):
         screen = QWidget()
@@ -1129,8 +1875,10 @@ class MCBTestingSoftware(QMainWindow):
         
         config_layout = QFormLayout()
         
-        self.ip_input = QLineEdit("10.91.136.24")
-        self.ip_input.setPlaceholderText("ESP32 IP Address")
+        addresses = [f"{host}:{port}" for host, port in
+                     dict.fromkeys([(self.backend.esp_ip, self.backend.port)] + self.backend.candidates)]
+        self.ip_input = QLineEdit(self.backend.esp_ip if len(addresses) == 1 else ", ".join(addresses))
+        self.ip_input.setPlaceholderText("ESP32 IP Address (several: host:port, host:port)")
         self.ip_input.setStyleSheet(f"""
             QLineEdit {{
                 background: {COLOR_BACKGROUND_ELEVATED};
@@ -1147,7 +1895,7 @@ class MCBTestingSoftware(QMainWindow):
         
         self.port_input = QSpinBox()
         self.port_input.setRange(1000, 65535)
-        self.port_input.setValue(8888)
+        self.port_input.setValue(self.backend.port)
         self.port_input.setStyleSheet(f"""
             QSpinBox {{
                 background: {COLOR_BACKGROUND_ELEVATED};
@@ -1184,6 +1932,10 @@ class MCBTestingSoftware(QMainWindow):
         self.connect_btn = ModernButton("Connect to Device", primary=True)
         self.connect_btn.clicked.connect(self.connect_to_esp32)
         
+        # Scan button: fills the address field with the controllers found on the subnet
+        self.scan_btn = ModernButton("Scan Network")
+        self.scan_btn.clicked.connect(self.scan_for_controllers)
+        
         # Continue button (initially hidden)
         self.continue_btn = ModernButton("Continue to Testing →", primary=True)
         self.continue_btn.clicked.connect(lambda: self.stacked_widget.slideIn(1))
@@ -1198,6 +1950,7 @@ class MCBTestingSoftware(QMainWindow):
         container_layout.addWidget(self.connection_status)
         container_layout.addSpacing(16)
         container_layout.addWidget(self.connect_btn)
+        container_layout.addWidget(self.scan_btn)
         container_layout.addWidget(self.continue_btn)
         
         container.setLayout(container_layout)
@@ -1425,10 +2178,14 @@ class MCBTestingSoftware(QMainWindow):
             }}
         """)
         log_layout = QVBoxLayout()
-        self.log_box = QTextEdit()
-        self.log_box.setReadOnly(True)
-        self.log_box.setStyleSheet(f"""
-            QTextEdit {{
+        self.log_model = EventLogModel(max_rows=LOG_MAX_ROWS, log_directory=LOG_DIRECTORY, parent=self)
+        self.log_view = QListView()
+        self.log_view.setModel(self.log_model)
+        self.log_view.setUniformItemSizes(True)  # Fixed row height keeps layout O(visible rows)
+        self.log_view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.log_view.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.log_view.setStyleSheet(f"""
+            QListView {{
                 background: {COLOR_BACKGROUND_SECONDARY};
                 color: {COLOR_TEXT_SECONDARY};
                 border: none;
@@ -1437,9 +2194,18 @@ class MCBTestingSoftware(QMainWindow):
                 padding: 10px;
             }}
         """)
-        self.log_box.setPlaceholderText("Waiting for data from ESP32...")
-        self.log_box.setMinimumHeight(150)
-        log_layout.addWidget(self.log_box)
+        self.log_view.setMinimumHeight(150)
+        self.log_follow_tail = True
+        self.log_model.rowsAboutToBeInserted.connect(self.on_log_rows_about_to_be_inserted)
+        self.log_model.rowsInserted.connect(self.on_log_rows_inserted)
+        
+        # Raw waveform samples are hidden from the human log by default
+        self.log_samples_checkbox = QCheckBox("Show raw waveform samples")
+        self.log_samples_checkbox.setStyleSheet(f"color: {COLOR_TEXT_SECONDARY}; font-size: 12px;")
+        self.log_samples_checkbox.setChecked(False)
+        
+        log_layout.addWidget(self.log_view)
+        log_layout.addWidget(self.log_samples_checkbox)
         log_group.setLayout(log_layout)
         
         # Action buttons
@@ -1459,9 +2225,30 @@ class MCBTestingSoftware(QMainWindow):
         self.stop_btn.clicked.connect(self.stop_test)
         self.stop_btn.hide()
         
+        self.scope_btn = ModernButton("📈 Waveform History", primary=False)
+        self.scope_btn.setMinimumWidth(160)
+        self.scope_btn.clicked.connect(self.show_oscilloscope_window)
+        
         action_layout.addWidget(self.start_btn)
         action_layout.addWidget(self.configure_btn)
         action_layout.addWidget(self.stop_btn)
+        action_layout.addWidget(self.scope_btn)
+        
+        self.export_btn = ModernButton("💾 Export Waveform", primary=False)
+        self.export_btn.setMinimumWidth(160)
+        self.export_btn.clicked.connect(self.export_session_waveform)
+        action_layout.addWidget(self.export_btn)
+        
+        self.diagnostics_btn = ModernButton("🩺 Diagnostics", primary=False)
+        self.diagnostics_btn.setMinimumWidth(160)
+        self.diagnostics_btn.clicked.connect(self.show_diagnostics_window)
+        action_layout.addWidget(self.diagnostics_btn)
+        
+        self.analysis_progress_bar = QProgressBar()
+        self.analysis_progress_bar.setRange(0, 100)
+        self.analysis_progress_bar.setMinimumWidth(220)
+        self.analysis_progress_bar.hide()
+        action_layout.addWidget(self.analysis_progress_bar)
         action_layout.addStretch()
         
         details_layout.addWidget(self.test_details_text)
@@ -1480,7 +2267,16 @@ class MCBTestingSoftware(QMainWindow):
     
     def on_connection_status_changed(self, connected, message):
         """Handle connection status changes"""
+        self.connecting = False
         if connected:
+            if self.link_resuming:
+                # Same session after a reconnect: keep the history
+                self.link_resuming = False
+            else:
+                # New session: start a fresh history
+                if self.waveform_history is not None:
+                    self.waveform_history.clear()
+                self.history_start_time = None
             self.connection_status.setText(f"✓ {message}")
             self.connection_status.setStyleSheet(f"""
                 QLabel {{
@@ -1506,6 +2302,10 @@ class MCBTestingSoftware(QMainWindow):
                 }}
             """)
         else:
+            # A drop the backend is reconnecting only becomes fatal if every attempt fails
+            if self.test_running and not self.link_resuming:
+                self.escalate_fatal("Connection Lost",
+                                    f"Connection to ESP32 lost during {self.current_test_name}.\n\n{message}")
             self.connection_status.setText(f"⚠ {message}")
             self.connection_status.setStyleSheet(f"""
                 QLabel {{
@@ -1534,12 +2334,36 @@ class MCBTestingSoftware(QMainWindow):
     def on_data_received(self, data):
         """Handle data received from ESP32"""
         if 'raw' in data:
-            self.log_box.append(data['raw'])
-        else:
-            # Handle other data formats if needed
-            self.log_box.append(str(data))
-        # Auto-scroll to the bottom
-        self.log_box.verticalScrollBar().setValue(self.log_box.verticalScrollBar().maximum())
+            self.log_model.append(data['raw'])
+            return
+        if self.log_samples_checkbox.isChecked():
+            # Waveform samples are only logged on request
+            self.log_model.append(str(data))
+    
+    def on_log_rows_about_to_be_inserted(self, parent, first, last):
+        """Remember whether the log was scrolled to the bottom before a batch"""
+        scrollbar = self.log_view.verticalScrollBar()
+        self.log_follow_tail = scrollbar.value() >= scrollbar.maximum() - 2
+    
+    def on_log_rows_inserted(self, parent, first, last):
+        """Auto-scroll to the bottom unless the operator scrolled back"""
+        if self.log_follow_tail:
+            self.log_view.scrollToBottom()
+    
+    def on_reconnecting(self, attempt, attempts, delay):
+        """Backend lost the link and is about to retry"""
+        self.link_resuming = True
+        self.notifications.notify(f"Connection lost - reconnect attempt {attempt}/{attempts} in {delay:.1f}s",
+                                  'warning')
+    
+    def on_reconnect_finished(self, resumed, attempts, outage):
+        """Reconnect outcome; a failure is reported by the following disconnected status"""
+        self.link_resuming = resumed
+        if resumed:
+            stats = self.backend.connection_stats()
+            self.notifications.notify(
+                f"Reconnected after {outage:.1f}s ({stats['reconnects']} reconnects, "
+                f"{stats['downtime']:.1f}s total downtime)", 'info')
     
     def on_command_sent(self, command):
         """Handle command sent confirmation"""
@@ -1547,8 +2371,27 @@ class MCBTestingSoftware(QMainWindow):
     
     
     def on_error_occurred(self, error):
-        """Handle errors"""
-        QMessageBox.critical(self, "Error", error)
+        """Handle errors without blocking the event loop"""
+        self.notifications.notify(error, 'error')
+        
+        # A dead receive loop while a test is running means the link is gone
+        if self.test_running and error.startswith(FATAL_ERROR_PREFIXES):
+            self.escalate_fatal("Connection Lost",
+                                f"Connection to ESP32 lost during {self.current_test_name}.\n\n{error}")
+    
+    def escalate_fatal(self, title, message):
+        """Show one non-modal critical dialog and drop the test back to idle"""
+        self.test_running = False
+        self.start_btn.show()
+        self.configure_btn.show()
+        self.stop_btn.hide()
+        
+        if self.fatal_dialog is not None and self.fatal_dialog.isVisible():
+            self.fatal_dialog.setText(message)
+            return
+        self.fatal_dialog = QMessageBox(QMessageBox.Critical, title, message, QMessageBox.Ok, self)
+        self.fatal_dialog.setWindowModality(Qt.NonModal)
+        self.fatal_dialog.show()
     
     def on_rl_config_confirmed(self, message):
         """Handle R-L configuration confirmation from ESP32"""
@@ -1558,22 +2401,92 @@ class MCBTestingSoftware(QMainWindow):
     
     def on_real_time_waveform(self, waveform_data):
         """Handle real-time waveform data"""
-        # This data is automatically handled by PowerFactorWindow if it's open
-        # We can add additional processing here if needed
-        pass
+        # PowerFactorWindow draws the live view; here every sample goes into the session history
+        if gui_metrics.enabled:
+            gui_metrics.count('delivered')
+            if 'host_ns' in waveform_data:
+                gui_metrics.record('deliver', time.monotonic_ns() - waveform_data['host_ns'])
+        time_sec = waveform_data.get('timestamp', 0) / 1000000.0
+        if self.waveform_history is None:
+            self.get_waveform_history()
+        if self.history_start_time is None:
+            self.history_start_time = time_sec
+        self.waveform_history.add_sample(time_sec - self.history_start_time,
+                                         waveform_data.get('voltage', 0.0),
+                                         waveform_data.get('current', 0.0))
+        if self.trend_store is not None:
+            # Keyed by the sample's host time (the device's micros() wraps after ~71 minutes,
+            # shorter than a long run); written in blocks by flush_trend()
+            self.trend_pending.append((waveform_data.get('host_ns') or time.monotonic_ns(),
+                                       waveform_data.get('current', 0.0),
+                                       waveform_data.get('voltage', 0.0)))
     
     # ===== Connection Management =====
     
     def connect_to_esp32(self):
         """Connect or disconnect from ESP32"""
-        if self.backend.connected:
+        if self.connecting:
+            self.backend.cancel_connect()
+        elif self.backend.connected:
             self.backend.disconnect()
         else:
-            esp_ip = self.ip_input.text()
-            port = self.port_input.value()
-            self.backend.esp_ip = esp_ip
-            self.backend.port = port
-            self.backend.connect()
+            # Several "host[:port]" entries are raced; the first controller to answer is kept
+            candidates = parse_candidates(self.ip_input.text(), self.port_input.value())
+            if not candidates:
+                self.notifications.notify("Enter the controller's IP address", 'warning')
+                return
+            self.backend.esp_ip, self.backend.port = candidates[0]
+            self.connecting = True
+            self.connect_btn.setText("Cancel")
+            self.backend.connect_async(candidates)
+    
+    def on_connect_progress(self, message):
+        if self.connecting:
+            self.connection_status.setText(f"⏳ {message}")
+    
+    def on_first_sample(self, seconds):
+        self.notifications.notify(f"First sample from {self.backend.esp_ip}:{self.backend.port} "
+                                  f"{seconds * 1000:.0f}ms after connecting", 'info')
+    
+    def scan_for_controllers(self):
+        """Probe the bench subnet in the background; the controllers found replace the address list"""
+        if self.discovery is None:
+            from discovery import ControllerDiscovery
+            self.discovery = ControllerDiscovery(self)
+            self.discovery.discovery_finished.connect(self.on_discovery_finished)
+            self.discovery.discovery_failed.connect(self.on_discovery_failed)
+        if self.discovery.running():
+            return
+        network = self.discovery_subnet
+        if not network:
+            from discovery import local_subnet
+            candidates = parse_candidates(self.ip_input.text(), self.port_input.value())
+            network = f"{candidates[0][0]}/24" if candidates else local_subnet()
+        # A controller in use is not probed: abcd.ino drops its client when another connects
+        exclude = [(self.backend.esp_ip, self.backend.port)] if self.backend.connected else []
+        try:
+            self.discovery.start(network, exclude=exclude)
+        except ValueError as e:
+            self.notifications.notify(f"Cannot scan {network}: {e}", 'warning')
+            return
+        self.scan_btn.setEnabled(False)
+        self.scan_btn.setText("Scanning...")
+    
+    def on_discovery_finished(self, network, controllers, elapsed):
+        self.scan_btn.setEnabled(True)
+        self.scan_btn.setText("Scan Network")
+        if not controllers:
+            self.notifications.notify(f"No controllers found on {network} ({elapsed:.1f}s)", 'warning')
+            return
+        # Identified controllers first; Connect races the whole list
+        ordered = sorted(controllers, key=lambda c: c['firmware'] == 'unknown')
+        self.ip_input.setText(", ".join(f"{c['host']}:{c['port']}" for c in ordered))
+        self.notifications.notify(f"Found {len(controllers)} controller(s) on {network} in {elapsed:.1f}s", 'info')
+    
+    def on_discovery_failed(self, network, error):
+        self.scan_btn.setEnabled(True)
+        self.scan_btn.setText("Scan Network")
+        self.notifications.notify(f"Scan of {network} failed: {error}", 'error')
     
     # ===== Test Management =====
     
@@ -1598,7 +2511,7 @@ class MCBTestingSoftware(QMainWindow):
         """
         
         self.test_details_text.setHtml(details)
-        self.log_box.clear() # Clear logs for the new test
+        self.log_model.clear(self.session_name(test_name)) # Clear logs for the new test
         self.stacked_widget.slideIn(2)
     
     def configure_test(self):
@@ -1623,6 +2536,10 @@ class MCBTestingSoftware(QMainWindow):
         
         config = dialog.get_config()
         
+        # Analyses of the previous run are stale once a new test starts
+        if self.analysis is not None:
+            self.analysis.cancel_all()
+        
         # Send appropriate command based on test type
         success = False
         if "Short-Circuit" in self.current_test_name or "R-XL" in self.current_test_name:
@@ -1679,6 +2596,11 @@ class MCBTestingSoftware(QMainWindow):
         
         if success:
             self.test_running = True
+            self.test_config = config
+            self.test_history_start = (self.waveform_history.time_range()[1]
+                                       if self.waveform_history is not None and len(self.waveform_history)
+                                       else 0.0)
+            self.open_trend_store(self.session_name(self.current_test_name))
             self.start_btn.hide()
             self.configure_btn.hide()
             self.stop_btn.show()
@@ -1689,28 +2611,312 @@ class MCBTestingSoftware(QMainWindow):
     
     def stop_test(self):
         """Stop the current test"""
+        # Cleared before the STOP: ESP32Backend emits emergency_stopped synchronously from
+        # the write, and on_emergency_stopped must not take this for a backend-raised stop
+        self.test_running = False
         if self.backend.stop_test():
-            self.test_running = False
-            self.start_btn.show()
-            self.configure_btn.show()
-            self.stop_btn.hide()
+            self.finish_test()
             QMessageBox.information(self, "Test Stopped", "Test has been stopped.")
+        else:
+            self.test_running = True  # STOP not sent: the test is still on
+    
+    def finish_test(self):
+        self.test_running = False
+        trend_path = self.close_trend_store()
+        self.start_test_analyses()
+        self.start_trend_report(trend_path)
+        self.start_btn.show()
+        self.configure_btn.show()
+        self.stop_btn.hide()
+    
+    def on_emergency_stopped(self, reason, latency):
+        """STOP went out; a stop the backend raised itself also ends the test here"""
+        if not self.test_running:
+            return  # Operator stop (stop_test() finishes the test itself), or no test running
+        self.finish_test()
+        self.notifications.notify(f"Test stopped: {reason} (STOP sent in {latency * 1000:.1f}ms)", 'error')
+    
+    def session_name(self, test_name):
+        """Name for per-test files; prefixed with the station so benches never share a file"""
+        return f"{self.station_name}_{test_name}" if self.station_name else test_name
+    
+    def open_trend_store(self, session_name):
+        """Start a new trend file for a test run, named like the log tail"""
+        from trend_store import TrendStore
+        
+        self.close_trend_store()
+        path = os.path.join(TREND_DIRECTORY, f"{time.strftime('%Y%m%d_%H%M%S')}_{safe_file_name(session_name)}.sqlite")
+        try:
+            self.trend_store = TrendStore(path)
+            self.trend_start_ns = time.monotonic_ns()
+            self.trend_pending = []
+            self.trend_timer.start(TREND_FLUSH_MS)
+        except Exception as e:
+            self.trend_store = None
+            self.notifications.notify(f"Could not open trend store: {e}", 'warning')
+    
+    def flush_trend(self):
+        """Write the samples queued since the last flush as one block"""
+        if self.trend_store is None or not self.trend_pending:
+            return
+        import numpy as np
+        
+        columns = np.array(self.trend_pending, dtype=np.float64)
+        self.trend_pending = []
+        times = (columns[:, 0] - self.trend_start_ns) / 1e9
+        try:
+            self.trend_store.extend(times, {name: columns[:, index + 1]
+                                            for index, name in enumerate(TREND_CHANNELS)})
+        except Exception as e:
+            print(f"Trend store write failed: {e}")
+    
+    def close_trend_store(self):
+        """Write what is queued and close the store; returns its path (None if none was open)"""
+        if self.trend_store is None:
+            return None
+        self.trend_timer.stop()
+        self.flush_trend()
+        path = self.trend_store.path
+        try:
+            self.trend_store.close()
+        except Exception as e:
+            print(f"Trend store close failed: {e}")
+        self.trend_store = None
+        return path
+    
+    def closeEvent(self, event):
+        self.close_trend_store()
+        if self.analysis is not None:
+            self.analysis.shutdown()
+        super().closeEvent(event)
+    
+    # ===== Post-test Analysis =====
+    
+    def get_analysis_executor(self):
+        """Create the analysis worker pool on first use"""
+        if self.analysis is None:
+            from analysis_executor import AnalysisExecutor
+            self.analysis = AnalysisExecutor()
+            self.analysis.analysis_progress.connect(self.on_analysis_progress)
+            self.analysis.analysis_finished.connect(self.on_analysis_finished)
+            self.analysis.analysis_failed.connect(self.on_analysis_failed)
+            self.analysis.analysis_cancelled.connect(self.on_analysis_cancelled)
+        return self.analysis
+    
+    def start_test_analyses(self):
+        """Queue the analyses of the capture recorded since Start Test"""
+        if self.waveform_history is None or self.test_history_start is None:
+            return
+        times, channels = self.waveform_history.capture(self.test_history_start, float('inf'))
+        self.test_history_start = None
+        if len(times) < 2:
+            return
+        
+        analysis = self.get_analysis_executor()
+        name = self.current_test_name
+        jobs = [analysis.submit('harmonics', {'times': times, 'values': channels['current']})]
+        capture = {'times': times, 'current': channels['current']}
+        if "Breaking Time" in name or "Short-Circuit" in name:
+            jobs.append(analysis.submit('breaking_time', capture))
+        elif "Trip" in name:
+            jobs.append(analysis.submit('trip', capture,
+                                        mcb_type=self.test_config.get('mcb_type', 'C'),
+                                        rated_current=float(self.test_config.get('current_rating', 16))))
+        report_path = os.path.join(REPORT_DIRECTORY, f"{time.strftime('%Y%m%d_%H%M%S')}_"
+                                                     f"{safe_file_name(self.session_name(name))}_harmonics.png")
+        jobs.append(analysis.submit('report', {'times': times, 'voltage': channels['voltage'],
+                                               'current': channels['current']},
+                                    path=report_path, title=f"{name} - Harmonic Analysis"))
+        for job_id in jobs:
+            self.analysis_jobs[job_id] = 0.0
+        self.update_analysis_progress("Analysing")
+    
+    def start_trend_report(self, store_path):
+        """Plot the finished test's trend from its rollups in an analysis worker"""
+        if store_path is None:
+            return
+        name = os.path.splitext(os.path.basename(store_path))[0]
+        job_id = self.get_analysis_executor().submit(
+            'trend_report', {}, store_path=store_path,
+            path=os.path.join(REPORT_DIRECTORY, f"{name}_trend.png"),
+            title=f"{self.current_test_name} - Trend")
+        self.analysis_jobs[job_id] = 0.0
+        self.update_analysis_progress("Analysing")
+    
+    def update_analysis_progress(self, stage):
+        if not self.analysis_jobs:
+            self.analysis_progress_bar.hide()
+            return
+        overall = sum(self.analysis_jobs.values()) / len(self.analysis_jobs)
+        self.analysis_progress_bar.setValue(int(overall * 100))
+        self.analysis_progress_bar.setFormat(f"{stage} %p%")
+        self.analysis_progress_bar.show()
+    
+    def on_analysis_progress(self, job_id, fraction, stage):
+        if job_id in self.analysis_jobs:
+            self.analysis_jobs[job_id] = fraction
+            self.update_analysis_progress(stage)
+    
+    def on_analysis_finished(self, job_id, kind, result):
+        self.analysis_jobs.pop(job_id, None)
+        self.update_analysis_progress("Analysing")
+        if kind == 'harmonics':
+            if result['thd_mean'] is None:
+                return
+            summary = (f"Current THD: mean {result['thd_mean'] * 100:.2f}%, "
+                       f"max {result['thd_max'] * 100:.2f}%")
+        elif kind == 'breaking_time':
+            if result['breaking_time'] is None:
+                summary = "Breaking time: current not interrupted during the capture"
+            else:
+                summary = (f"Breaking time: {result['breaking_time'] * 1000:.1f} ms "
+                           f"(peak {result['peak_current']:.1f} A)")
+        elif kind == 'trip':
+            tripped = ("did not trip" if result['trip_time'] is None
+                       else f"tripped after {result['trip_time']:.3f} s")
+            summary = (f"Trip curve {result['mcb_type']}: {result['multiple']:.2f} In, {tripped} - "
+                       f"{result['region']}: {'PASS' if result['passed'] else 'FAIL'}")
+        elif kind == 'trend_report':
+            if result['path'] is None:
+                return
+            resolution = f"{result['resolution']} s rollups" if result['resolution'] else "raw samples"
+            summary = f"Trend report saved to {result['path']} ({result['points']} points from {resolution})"
+        else:
+            summary = f"Analysis report saved to {result['path']}"
+        self.log_model.append(summary)
+        self.notifications.notify(summary, 'info')
+    
+    def on_analysis_failed(self, job_id, kind, error):
+        self.analysis_jobs.pop(job_id, None)
+        self.update_analysis_progress("Analysing")
+        self.notifications.notify(f"Analysis '{kind}' failed: {error}", 'error')
+    
+    def on_analysis_cancelled(self, job_id, kind):
+        self.analysis_jobs.pop(job_id, None)
+        self.update_analysis_progress("Analysing")
     
     def show_power_factor_window(self, current_value, power_factor):
         """Show power factor visualization window"""
+        # Only one window at a time; closing it releases its canvas and timers
+        if self.pf_window is not None:
+            self.pf_window.destroyed.disconnect(self.on_power_factor_window_destroyed)
+            self.pf_window.close()
         self.pf_window = PowerFactorWindow(current_value, power_factor, self.backend, self)
+        self.pf_window.setAttribute(Qt.WA_DeleteOnClose)
+        self.pf_window.destroyed.connect(self.on_power_factor_window_destroyed)
         self.pf_window.show()
+    
+    def on_power_factor_window_destroyed(self):
+        self.pf_window = None
+    
+    def get_waveform_history(self):
+        """Create the session history on first use (pulls in NumPy)"""
+        if self.waveform_history is None:
+            from waveform_history import WaveformHistory
+            self.waveform_history = WaveformHistory()
+        return self.waveform_history
+    
+    def export_session_waveform(self):
+        """Export the whole-session waveform history as PNG/PDF in the background"""
+        from waveform_export import default_export_path
+        
+        if self.waveform_history is None or len(self.waveform_history) == 0:
+            self.notifications.notify("No waveform data recorded yet - nothing to export", 'info')
+            return
+        path, selected_filter = QFileDialog.getSaveFileName(
+            self, "Export Waveform History", default_export_path('session_waveform'), EXPORT_FILE_FILTER)
+        if path:
+            self.start_session_export(add_export_extension(path, selected_filter))
+    
+    def start_session_export(self, path):
+        """Snapshot the history envelope on the GUI thread, render it in a worker"""
+        from waveform_export import WaveformExporter, snapshot_history
+        
+        if self.exporter is None:
+            self.exporter = WaveformExporter()
+            self.exporter.export_finished.connect(self.on_export_finished)
+            self.exporter.export_failed.connect(self.on_export_failed)
+        
+        title = f"{self.current_test_name or 'Session'} - Waveform History"
+        self.exporter.export(snapshot_history(self.waveform_history, title), path)
+    
+    def on_export_finished(self, path, seconds):
+        self.notifications.notify(f"Waveform exported to {path} ({seconds:.1f}s)", 'info')
+    
+    def on_export_failed(self, path, error):
+        self.notifications.notify(f"Waveform export to {path} failed: {error}", 'error')
+    
+    def show_oscilloscope_window(self):
+        """Show the zoomable whole-session waveform history"""
+        if self.scope_window is None:
+            self.scope_window = OscilloscopeWindow(self.get_waveform_history(), self)
+        self.scope_window.show()
+        self.scope_window.raise_()
+    
+    def show_diagnostics_window(self):
+        """Show live hot-path metrics; collection runs only while the panel is open"""
+        if self.diagnostics_window is None:
+            self.diagnostics_window = DiagnosticsWindow(self.backend, self)
+        self.diagnostics_window.show()
+        self.diagnostics_window.raise_()
 
 
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
+    # Waveform exports render in a spawned worker; needed for the frozen build
+    import multiprocessing
+    multiprocessing.freeze_support()
+    
+    # Several benches in one process:
+    #   python frontend.py --station A=10.91.136.24:8888 --station B=10.91.136.25:8888
+    # Acquisition in a separate process, samples shared through memory:
+    #   python frontend.py --acquisition-process
+    import argparse
+    parser = argparse.ArgumentParser(description="MCB Testing System")
+    parser.add_argument("--station", action="append", default=[], metavar="NAME=HOST:PORT",
+                        help="Open one window per bench, all driven by a single event loop")
+    parser.add_argument("--config", default="config.json",
+                        help="Settings file laid out like config_example.json (ESP32 address, timeout, reconnects)")
+    parser.add_argument("--acquisition-process", action="store_true",
+                        help="Receive and process samples in a child process so redraws never delay acquisition")
+    args, qt_args = parser.parse_known_args()
+    
+    app = QApplication(sys.argv[:1] + qt_args)
     
     font = QFont("Segoe UI", 10)
     app.setFont(font)
     
     set_global_style(app)
     
-    window = MCBTestingSoftware()
-    window.show()
+    config = load_config(args.config)
+    esp32_config = config.get('esp32', {})
+    # The bench's maximum short-circuit current is a hard ceiling: beyond it the backend sends STOP itself
+    max_current = config.get('tests', {}).get('short_circuit', {}).get('max_current')
+    link_options = {'timeout': float(esp32_config.get('timeout', 10.0)),
+                    'reconnect_attempts': int(esp32_config.get('reconnect_attempts', 3)),
+                    'current_limit': float(max_current) if max_current is not None else None}
+    
+    windows = []
+    if args.station:
+        from station_manager import StationManager
+        station_manager = StationManager()
+        for spec in args.station:
+            name, _, address = spec.partition("=")
+            host, _, port = address.partition(":")
+            backend = station_manager.add_station(name, host, int(port or 8888), **link_options)
+            windows.append(MCBTestingSoftware(backend))
+        app.aboutToQuit.connect(station_manager.stop)
+    elif args.acquisition_process:
+        from acquisition_process import ProcessBackend
+        backend = ProcessBackend(esp32_config.get('ip_address', DEFAULT_ESP_IP),
+                                 int(esp32_config.get('port', DEFAULT_PORT)), **link_options)
+        backend.candidates = parse_candidates(esp32_config.get('candidates', []), backend.port)
+        windows.append(MCBTestingSoftware(backend))
+        app.aboutToQuit.connect(backend.shutdown)
+    else:
+        windows.append(MCBTestingSoftware(ESP32Backend.from_config(esp32_config,
+                                                                   current_limit=link_options['current_limit'])))
+    for window in windows:
+        window.discovery_subnet = esp32_config.get('discovery_subnet')
+        window.show()
     
     sys.exit(app.exec_())
@@ -8,11 +8,19 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[('backend.py', '.')] + collect_data_files('PyQt5'),
-    hiddenimports=['numpy', 'matplotlib.backends.backend_qt5agg', 'PyQt5.sip'],
+    # numpy/matplotlib are imported lazily inside functions; keep them bundled
+    hiddenimports=['numpy', 'matplotlib.backends.backend_qt5agg', 'PyQt5.sip',
+                   'matplotlib.backends.backend_agg', 'matplotlib.backends.backend_pdf',
+                   'event_log', 'ui_state', 'waveform_history', 'figure_pool', 'waveform_export',
+                   'trend_store', 'station_manager', 'sample_ring', 'acquisition_process',
+                   'analysis_executor', 'command_channel', 'discovery',
+                   'device_clock', 'stage_metrics', 'latency_tracer'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    # Only PyQt5 is used; keep the other Qt bindings and unused GUI toolkits out of the graph
+    excludes=['PyQt6', 'PySide6', 'PySide2', 'shiboken6', 'shiboken2', 'pyqtgraph',
+              'tkinter', 'matplotlib.backends.backend_tkagg', 'IPython', 'openpyxl'],
     noarchive=False,
     optimize=0,
 )
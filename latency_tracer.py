@@ -0,0 +1,75 @@
+"""
+Latency Tracer for MCB Testing System
+Follows traced sample blocks from the socket to the painted frame and keeps the latency distribution
+"""
+
+import time
+from collections import deque
+from stage_metrics import LatencyHistogram
+
+# Legs of a traced block, all on the host's time.monotonic_ns() clock
+TRACE_LEGS = (
+    'process',     # recv -> last sample of the block processed (parse, DC removal, looping, current)
+    'deliver',     # processed -> real_time_waveform slot on the GUI thread
+    'paint',       # slot -> frame containing the block painted by the canvas widget
+    'total',       # recv -> drawn: how stale the newest data on screen is
+    'sample_age',  # the block's last sample (DeviceClock host time) -> drawn; adds time spent on the ESP32
+)
+MAX_PENDING = 1000  # Delivered blocks awaiting a frame; older ones are dropped if nothing is drawn
+
+
+class LatencyTracer:
+    """
+    Sample-to-pixel latency of traced blocks.
+
+    With tracing enabled, the backend stamps the last sample of every
+    received block with (recv_ns, processed_ns) under the 'trace' key of its
+    real_time_waveform dict. delivered() adds the stamp taken in the slot,
+    and painted(), called once the canvas widget has painted a frame, closes every block
+    delivered since the previous frame.
+    """
+
+    def __init__(self, max_pending=MAX_PENDING):
+        self.pending = deque(maxlen=max_pending)
+        self.reset()
+
+    def reset(self):
+        self.pending.clear()
+        self.histograms = {leg: LatencyHistogram() for leg in TRACE_LEGS}
+        self.latest = None  # ms per leg for the newest block on screen
+
+    def delivered(self, waveform_data, now_ns=None):
+        """Slot side: remember a traced block until the frame that shows it"""
+        trace = waveform_data.get('trace')
+        if trace is None:
+            return
+        now_ns = time.monotonic_ns() if now_ns is None else now_ns
+        recv_ns, processed_ns = trace
+        self.pending.append((recv_ns, processed_ns, now_ns, waveform_data.get('host_ns')))
+
+    def painted(self, now_ns=None):
+        """A frame with everything delivered so far is drawn; returns `latest` (None if no block was pending)"""
+        if not self.pending:
+            return None
+        now_ns = time.monotonic_ns() if now_ns is None else now_ns
+        for recv_ns, processed_ns, delivered_ns, host_ns in self.pending:
+            legs = {
+                'process': processed_ns - recv_ns,
+                'deliver': delivered_ns - processed_ns,
+                'paint': now_ns - delivered_ns,
+                'total': now_ns - recv_ns,
+            }
+            if host_ns is not None:
+                legs['sample_age'] = now_ns - host_ns
+            for leg, ns in legs.items():
+                self.histograms[leg].record(ns)
+        self.pending.clear()
+        self.latest = {leg: ns / 1e6 for leg, ns in legs.items()}
+        return self.latest
+
+    def summary(self):
+        """Newest block's legs (ms) and the distribution of every leg (µs, see LatencyHistogram.summary())"""
+        return {
+            'latest_ms': self.latest,
+            'legs': {leg: histogram.summary() for leg, histogram in self.histograms.items()},
+        }
@@ -8,15 +8,29 @@ from PyQt5.QtGui import QFont, QPalette, QColor
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.animation import FuncAnimation
+from matplotlib.colors import LogNorm
+from density_histogram import DensityHistogram
 
 # ========= ESP INPUT ==========
 ESP_IP = "10.116.213.78"
 PORT = 5000
 
+# ========= WAVEFORM ANIMATION =========
+WAVEFORM_SAMPLES_PER_PERIOD = 500  # Samples in one precomputed period table
+ANIMATION_STEP = 4                 # Table samples per frame (~0.05 rad)
+
+# ========= LIVE GRAPH =========
+PLOT_REFRESH_MS = 200              # Redraw period of the sensor graph; received lines only mark it stale
+
+# ========= CURRENT vs TEMP DENSITY =========
+DENSITY_BINS = (120, 80)           # Temperature bins x current bins (image size)
+DENSITY_BIN_SIZE = (1.0, 1.0)      # Initial bin width: 1 °C x 1 mA (doubles as the range grows)
+
 # ========= DATA ARRAYS =========
 temp = []
 curr = []
 time_vals = []
+curr_temp_density = DensityHistogram(DENSITY_BINS, DENSITY_BIN_SIZE)
 
 # ========= SOCKET CONNECTION =========
 client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -33,9 +47,8 @@ class LivePlot(QWidget):
         self.setWindowTitle("📊 ESP32 Live Sensor Monitor")
         self.resize(1200, 850)
         
-        # Power factor value and animation time
+        # Power factor value
         self.power_factor = 0.8
-        self.animation_time = 0
         
         # Set modern dark theme
         self.setStyleSheet("""
@@ -340,9 +353,16 @@ class LivePlot(QWidget):
         self.anim_timer = QTimer()
         self.anim_timer.timeout.connect(self.animate_waveform)
         self.anim_timer.start(50)  # 20 FPS animation
+
+        # Timer for the sensor graph: one redraw per period however many lines arrived
+        self.plot_stale = False
+        self.plot_timer = QTimer()
+        self.plot_timer.timeout.connect(self.refresh_stale_plot)
+        self.plot_timer.start(PLOT_REFRESH_MS)
         
         # Initialize first plot
         self.plot_temp_time()
+        self.init_waveform_plot()
         self.draw_waveform()
 
     # ===== SWITCH VIEW =====
@@ -378,6 +398,9 @@ class LivePlot(QWidget):
         self.pf_value_label.setText(f"Power Factor: {self.power_factor:.1f}")
         self.phase_diff_label.setText(f"Phase Difference: {phase_diff:.2f}°")
         
+        # Redraw title and phase annotation for the new power factor
+        self.draw_waveform()
+        
         # Send to ESP32
         self.send_power_factor_to_esp()
 
@@ -390,70 +413,135 @@ class LivePlot(QWidget):
         except Exception as e:
             print(f"Error sending power factor: {e}")
 
+    # ===== PRECOMPUTED WAVEFORM TABLES =====
+    def get_current_table(self, pf):
+        """Return the (cached) one-period current table for a power factor"""
+        key = round(pf, 2)
+        table = self.current_tables.get(key)
+        if table is None:
+            phase_rad = np.arccos(np.clip(key, 0, 1))
+            period = np.sin(self.waveform_theta - phase_rad)
+            # Three periods back to back so any rotation is a plain slice (no copy)
+            table = np.concatenate([period, period, period])
+            self.current_tables[key] = table
+        return table
+
+    def init_waveform_plot(self):
+        """Build the period tables and the persistent waveform artists once"""
+        n = WAVEFORM_SAMPLES_PER_PERIOD
+        self.waveform_theta = np.arange(n) * (2 * np.pi / n)
+        self.waveform_t = np.arange(2 * n) * (2 * np.pi / n)  # 2 complete cycles
+        voltage_period = np.sin(self.waveform_theta)
+        self.voltage_table = np.concatenate([voltage_period, voltage_period, voltage_period])
+        self.current_tables = {}
+        for value in range(self.pf_slider.minimum(), self.pf_slider.maximum() + 1):
+            self.get_current_table(value / 100.0)
+        self.animation_index = 0
+        self.waveform_background = None
+
+        ax = self.ax_waveform
+        t = self.waveform_t
+        self.voltage_line, = ax.plot(t, self.voltage_table[:2 * n], color='#f38ba8', linewidth=3,
+                                     label='Voltage', alpha=0.9, animated=True)
+        self.current_line, = ax.plot(t, self.get_current_table(self.power_factor)[:2 * n], color='#a6e3a1',
+                                     linewidth=3, label='Current', alpha=0.9, animated=True)
+
+        self.voltage_peak_line = ax.axvline(x=0, color='#f38ba8', linestyle='--', alpha=0.4,
+                                            linewidth=1.5, animated=True)
+        self.current_peak_line = ax.axvline(x=0, color='#a6e3a1', linestyle='--', alpha=0.4,
+                                            linewidth=1.5, animated=True)
+
+        # Phase difference arrow and label are kept and moved, never rebuilt
+        arrow_y = -0.5
+        self.phase_arrow = ax.annotate('', xy=(0, arrow_y), xytext=(0, arrow_y),
+                                       arrowprops=dict(arrowstyle='<->', color='#fab387', lw=2.5),
+                                       animated=True)
+        self.phase_text = ax.text(0, arrow_y - 0.25, '', color='#fab387', fontsize=12, ha='center',
+                                  fontweight='bold', animated=True,
+                                  bbox=dict(boxstyle='round,pad=0.5', facecolor='#1e1e2e',
+                                            edgecolor='#fab387', linewidth=2))
+
+        ax.set_xlabel("Time (radians)", fontsize=12, color='#cdd6f4', fontweight='bold')
+        ax.set_ylabel("Amplitude", fontsize=12, color='#cdd6f4', fontweight='bold')
+        ax.grid(True, alpha=0.3, linestyle='--', linewidth=0.5)
+        self.waveform_legend = ax.legend(loc='upper right', framealpha=0.9, facecolor='#313244',
+                                         edgecolor='#89b4fa', fontsize=11, frameon=True)
+        self.waveform_legend.set_animated(True)
+        ax.set_ylim(-1.4, 1.4)
+        ax.set_xlim(0, 4 * np.pi)
+        ax.tick_params(colors='#cdd6f4', labelsize=10)
+
+        self.waveform_artists = [self.voltage_peak_line, self.current_peak_line,
+                                 self.voltage_line, self.current_line,
+                                 self.phase_arrow, self.phase_text, self.waveform_legend]
+
+        # Cache the static background after every full draw (resize, title change)
+        self.canvas_waveform.mpl_connect('draw_event', self.on_waveform_draw)
+
+    def on_waveform_draw(self, event):
+        """Capture the static background and paint the animated artists on top"""
+        self.waveform_background = self.canvas_waveform.copy_from_bbox(self.ax_waveform.bbox)
+        self.render_waveform_artists()
+
+    def render_waveform_artists(self):
+        for artist in self.waveform_artists:
+            self.ax_waveform.draw_artist(artist)
+
+    def update_waveform_artists(self):
+        """Rotate the period tables and move the peak markers for the current frame"""
+        n = WAVEFORM_SAMPLES_PER_PERIOD
+        idx = self.animation_index
+        current_table = self.get_current_table(self.power_factor)
+        self.voltage_line.set_ydata(self.voltage_table[idx:idx + 2 * n])
+        self.current_line.set_ydata(current_table[idx:idx + 2 * n])
+
+        # Peaks are known analytically: sin peaks at a quarter period, current lags by phi
+        phase_rad = np.arccos(np.clip(round(self.power_factor, 2), 0, 1))
+        phase_idx = int(round(phase_rad / (2 * np.pi / n)))
+        v_peak_idx = (n // 4 - idx) % n
+        c_peak_idx = (n // 4 + phase_idx - idx) % n
+        t = self.waveform_t
+
+        self.voltage_peak_line.set_xdata([t[v_peak_idx], t[v_peak_idx]])
+        self.current_peak_line.set_xdata([t[c_peak_idx], t[c_peak_idx]])
+
+        # Phase difference arrow
+        show_arrow = c_peak_idx > v_peak_idx
+        self.phase_arrow.set_visible(show_arrow)
+        self.phase_text.set_visible(show_arrow)
+        if show_arrow:
+            arrow_y = -0.5
+            self.phase_arrow.xy = (t[c_peak_idx], arrow_y)
+            self.phase_arrow.set_position((t[v_peak_idx], arrow_y))
+            mid_point = (t[v_peak_idx] + t[c_peak_idx]) / 2
+            self.phase_text.set_position((mid_point, arrow_y - 0.25))
+
     # ===== ANIMATE WAVEFORM =====
     def animate_waveform(self):
-        self.animation_time += 0.05
-        if self.animation_time > 2 * np.pi:
-            self.animation_time = 0
-        self.draw_waveform()
+        self.animation_index = (self.animation_index + ANIMATION_STEP) % WAVEFORM_SAMPLES_PER_PERIOD
+
+        # Nothing to do while the power factor view is hidden
+        if not self.canvas_waveform.isVisible():
+            return
+        if self.waveform_background is None:
+            self.canvas_waveform.draw_idle()
+            return
+
+        self.update_waveform_artists()
+        self.canvas_waveform.restore_region(self.waveform_background)
+        self.render_waveform_artists()
+        self.canvas_waveform.blit(self.ax_waveform.bbox)
 
     # ===== DRAW VOLTAGE AND CURRENT WAVEFORM (ANIMATED) =====
     def draw_waveform(self):
-        self.ax_waveform.clear()
-        
-        # Generate time array for 2 complete cycles
-        t = np.linspace(0, 4 * np.pi, 1000)
-        
-        # Voltage waveform (reference, phase = 0) - animated
-        voltage = np.sin(t + self.animation_time)
-        
-        # Current waveform (lagging by phase difference) - animated
-        phase_rad = np.arccos(np.clip(self.power_factor, 0, 1))
-        current = np.sin(t - phase_rad + self.animation_time)
-        
-        # Plot waveforms
-        self.ax_waveform.plot(t, voltage, color='#f38ba8', linewidth=3, label='Voltage', alpha=0.9)
-        self.ax_waveform.plot(t, current, color='#a6e3a1', linewidth=3, label='Current', alpha=0.9)
-        
-        # Find peaks in visible range for annotation
-        visible_range = slice(0, 500)
-        voltage_peaks = np.where((voltage[1:-1] > voltage[:-2]) & (voltage[1:-1] > voltage[2:]))[0] + 1
-        current_peaks = np.where((current[1:-1] > current[:-2]) & (current[1:-1] > current[2:]))[0] + 1
-        
-        if len(voltage_peaks) > 0 and len(current_peaks) > 0:
-            v_peak_idx = voltage_peaks[0]
-            c_peak_idx = current_peaks[0]
-            
-            # Draw vertical lines at peaks
-            self.ax_waveform.axvline(x=t[v_peak_idx], color='#f38ba8', linestyle='--', alpha=0.4, linewidth=1.5)
-            self.ax_waveform.axvline(x=t[c_peak_idx], color='#a6e3a1', linestyle='--', alpha=0.4, linewidth=1.5)
-            
-            # Phase difference arrow
-            if c_peak_idx > v_peak_idx:
-                arrow_y = -0.5
-                self.ax_waveform.annotate('', xy=(t[c_peak_idx], arrow_y), xytext=(t[v_peak_idx], arrow_y),
-                                          arrowprops=dict(arrowstyle='<->', color='#fab387', lw=2.5))
-                
-                phase_deg = self.calculate_phase_diff(self.power_factor)
-                mid_point = (t[v_peak_idx] + t[c_peak_idx]) / 2
-                self.ax_waveform.text(mid_point, arrow_y - 0.25, f'φ = {phase_deg:.1f}°', 
-                                     color='#fab387', fontsize=12, ha='center', fontweight='bold',
-                                     bbox=dict(boxstyle='round,pad=0.5', facecolor='#1e1e2e', 
-                                              edgecolor='#fab387', linewidth=2))
-        
-        self.ax_waveform.set_xlabel("Time (radians)", fontsize=12, color='#cdd6f4', fontweight='bold')
-        self.ax_waveform.set_ylabel("Amplitude", fontsize=12, color='#cdd6f4', fontweight='bold')
+        """Full redraw; only needed when the title/power factor changes"""
+        phase_deg = self.calculate_phase_diff(self.power_factor)
+        self.phase_text.set_text(f'φ = {phase_deg:.1f}°')
         self.ax_waveform.set_title(f"⚡ Live Voltage & Current Waveforms (PF = {self.power_factor:.1f})", 
                                    fontsize=14, color='#89b4fa', pad=15, fontweight='bold')
-        self.ax_waveform.grid(True, alpha=0.3, linestyle='--', linewidth=0.5)
-        self.ax_waveform.legend(loc='upper right', framealpha=0.9, facecolor='#313244', 
-                               edgecolor='#89b4fa', fontsize=11, frameon=True)
-        self.ax_waveform.set_ylim(-1.4, 1.4)
-        self.ax_waveform.set_xlim(0, 4 * np.pi)
-        self.ax_waveform.tick_params(colors='#cdd6f4', labelsize=10)
-        
+        self.update_waveform_artists()
         self.fig_waveform.tight_layout()
-        self.canvas_waveform.draw()
+        self.canvas_waveform.draw_idle()
 
     # ===== SEND COMMAND TO ESP32 =====
     def send_command(self):
@@ -495,14 +583,15 @@ class LivePlot(QWidget):
                     time_vals.append(x)
                     temp.append(y)
                     curr.append(z)
+                    curr_temp_density.add(y, z)  # O(1): one bin per sample
                     
                     # Update live data display
                     self.temp_label.setText(f"🌡️ Temp: {y} °C")
                     self.curr_label.setText(f"⚡ Current: {z} mA")
                     self.time_label.setText(f"⏱️ Time: {x} s")
                     
-                    # Auto-refresh current graph
-                    self.refresh_current_plot()
+                    # Redrawn by plot_timer
+                    self.plot_stale = True
 
                 except ValueError:
                     print("Invalid frame skipped:", line)
@@ -515,6 +604,11 @@ class LivePlot(QWidget):
         if hasattr(self, 'current_plot'):
             self.current_plot()
 
+    def refresh_stale_plot(self):
+        if self.plot_stale:
+            self.plot_stale = False
+            self.refresh_current_plot()
+
     # ========= GRAPH FUNCTIONS ==========
     def plot_temp_time(self):
         self.current_plot = self.plot_temp_time
@@ -545,18 +639,37 @@ class LivePlot(QWidget):
         self.canvas.draw()
 
     def plot_curr_temp(self):
-        self.current_plot = self.plot_curr_temp
-        self.ax.clear()
-        if len(temp) > 0:
-            self.ax.plot(temp, curr, color='#89dceb', linewidth=2.5, marker='o', 
-                        markersize=5, markevery=max(1, len(temp)//20), alpha=0.9)
-        self.ax.set_xlabel("Temperature (°C)", fontsize=12, color='#cdd6f4', fontweight='bold')
-        self.ax.set_ylabel("Current (mA)", fontsize=12, color='#cdd6f4', fontweight='bold')
-        self.ax.set_title("📉 Current vs Temperature", fontsize=14, color='#89b4fa', pad=15, fontweight='bold')
-        self.ax.grid(True, alpha=0.3, linestyle='--')
-        self.ax.tick_params(colors='#cdd6f4')
-        self.fig.tight_layout()
-        self.canvas.draw()
+        # Density image of every (temp, current) pair; redraw cost depends on
+        # the grid size, not on how many samples the test has collected
+        if getattr(self, 'current_plot', None) != self.plot_curr_temp:
+            self.current_plot = self.plot_curr_temp
+            self.ax.clear()
+            self.density_image = self.ax.imshow(curr_temp_density.image(), origin='lower',
+                                                aspect='auto', interpolation='nearest',
+                                                cmap='magma', norm=LogNorm(vmin=1, vmax=2))
+            self.density_version = None
+            self.ax.set_xlabel("Temperature (°C)", fontsize=12, color='#cdd6f4', fontweight='bold')
+            self.ax.set_ylabel("Current (mA)", fontsize=12, color='#cdd6f4', fontweight='bold')
+            self.ax.grid(True, alpha=0.3, linestyle='--')
+            self.ax.tick_params(colors='#cdd6f4')
+            self.density_layout_pending = True
+        elif self.density_version == curr_temp_density.version:
+            return
+
+        self.density_version = curr_temp_density.version
+        self.density_image.set_data(curr_temp_density.image())
+        self.density_image.set_extent(curr_temp_density.extent())
+        self.density_image.set_clim(1, max(2, int(curr_temp_density.counts.max())))
+        left, right, bottom, top = curr_temp_density.occupied_extent()
+        self.ax.set_xlim(left, right)
+        self.ax.set_ylim(bottom, top)
+        self.ax.set_title(f"📉 Current vs Temperature ({curr_temp_density.total:,} samples)",
+                          fontsize=14, color='#89b4fa', pad=15, fontweight='bold')
+        if self.density_layout_pending:
+            # Fixed-size image: lay out once when the view is set up, not on every redraw
+            self.fig.tight_layout()
+            self.density_layout_pending = False
+        self.canvas.draw_idle()
 
 
 # ========= MAIN APP ==========
@@ -0,0 +1,134 @@
+"""
+Sample Ring for MCB Testing System
+Single-writer shared-memory ring carrying processed samples between processes
+"""
+
+import numpy as np
+from multiprocessing import shared_memory
+
+# One processed sample, as emitted by ESP32Backend.real_time_waveform
+SAMPLE_DTYPE = np.dtype([
+    ('timestamp', np.int64),  # Unwrapped device µs
+    ('host_ns', np.int64),    # Host-aligned time.monotonic_ns() (DeviceClock)
+    ('voltage', np.float64),
+    ('current', np.float64),
+    ('raw_voltage', np.float64),
+    ('dc_offset', np.float64),
+    ('power_factor', np.float64),
+    ('cycle_samples', np.int32),
+    ('cycle_captured', np.bool_),
+    ('recv_ns', np.int64),       # 'trace' of a traced block's last sample (0: not traced)
+    ('processed_ns', np.int64),
+])
+
+HEADER_DTYPE = np.dtype([
+    ('capacity', np.uint64),
+    ('written', np.uint64),  # Total samples ever written; slot = written % capacity
+])
+
+DEFAULT_CAPACITY = 1 << 18  # ~10 MB, over a minute of samples at a few kHz
+
+
+class SampleRing:
+    """
+    Fixed-size ring of SAMPLE_DTYPE records in a SharedMemory block.
+
+    The writer never waits for readers: it fills the next slot and then bumps
+    the `written` counter. Each reader keeps its own position, so a reader
+    that falls more than `capacity` samples behind skips ahead and counts the
+    skipped samples as overrun, instead of stalling acquisition.
+    """
+
+    def __init__(self, shm, owner, writable):
+        self.shm = shm
+        self.owner = owner
+        self.header = np.ndarray((1,), dtype=HEADER_DTYPE, buffer=shm.buf)
+        self.capacity = int(self.header['capacity'][0])
+        self.records = np.ndarray((self.capacity,), dtype=SAMPLE_DTYPE, buffer=shm.buf,
+                                  offset=HEADER_DTYPE.itemsize)
+        if not writable:
+            # Readers map the ring read-only
+            self.header.flags.writeable = False
+            self.records.flags.writeable = False
+        self.read_position = 0
+        self.overrun = 0
+
+    @classmethod
+    def create(cls, capacity=DEFAULT_CAPACITY):
+        size = HEADER_DTYPE.itemsize + capacity * SAMPLE_DTYPE.itemsize
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        header = np.ndarray((1,), dtype=HEADER_DTYPE, buffer=shm.buf)
+        header['capacity'] = capacity
+        header['written'] = 0
+        del header
+        return cls(shm, owner=True, writable=False)
+
+    @classmethod
+    def attach(cls, name, writable=False):
+        return cls(shared_memory.SharedMemory(name=name), owner=False, writable=writable)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def written(self):
+        return int(self.header['written'][0])
+
+    # ===== Writer side (acquisition process) =====
+
+    def write(self, waveform_data):
+        """Append one real_time_waveform dict"""
+        written = int(self.header['written'][0])
+        self.records[written % self.capacity] = (
+            waveform_data['timestamp'],
+            waveform_data['host_ns'],
+            waveform_data['voltage'],
+            waveform_data['current'],
+            waveform_data['raw_voltage'],
+            waveform_data['dc_offset'],
+            waveform_data['power_factor'],
+            waveform_data['cycle_samples'],
+            waveform_data['cycle_captured'],
+            *waveform_data.get('trace', (0, 0)),
+        )
+        # Publish only after the record is complete
+        self.header['written'] = written + 1
+
+    # ===== Reader side (GUI process) =====
+
+    def read(self, max_samples=None):
+        """Copy of every record written since the last read (oldest first)"""
+        written = self.written
+        start = self.read_position
+        if written - start > self.capacity:
+            # Reader was lapped: the oldest samples are already overwritten
+            self.overrun += written - self.capacity - start
+            start = written - self.capacity
+        if max_samples is not None:
+            written = min(written, start + max_samples)
+        self.read_position = written
+        if written == start:
+            return np.empty(0, dtype=SAMPLE_DTYPE)
+        first = start % self.capacity
+        last = written % self.capacity
+        if first < last:
+            samples = self.records[first:last].copy()
+        else:
+            samples = np.concatenate((self.records[first:], self.records[:last]))
+        # The writer may have lapped us while we copied; drop what it overwrote
+        overwritten = self.written - self.capacity - start
+        if overwritten > 0:
+            self.overrun += overwritten
+            samples = samples[overwritten:]
+        return samples
+
+    def backlog(self):
+        return self.written - self.read_position
+
+    def close(self):
+        del self.header
+        del self.records
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
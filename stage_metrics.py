@@ -0,0 +1,146 @@
+"""
+Stage Metrics for MCB Testing System
+Per-stage counters and latency histograms for the sample hot path, cheap enough to leave in place
+"""
+
+import json
+import os
+import time
+
+# Stages timed by ESP32Backend (parse is per received chunk, the rest per sample)
+BACKEND_STAGES = ('parse', 'dc_offset', 'cycle_loop', 'current', 'emit')
+# Stages timed on the GUI thread: sample-to-slot delivery and a live plot frame
+GUI_STAGES = ('deliver', 'frame')
+
+SUB_BUCKETS = 4  # Histogram buckets per power of two: values are resolved to within 25%
+BUCKETS = 64 * SUB_BUCKETS
+
+
+def bucket_index(ns):
+    """Histogram bucket of a non-negative duration in ns"""
+    bits = ns.bit_length()
+    if bits <= 2:
+        return ns
+    # The two bits below the leading one pick the sub-bucket within the octave
+    return bits * SUB_BUCKETS + ((ns >> (bits - 3)) & (SUB_BUCKETS - 1))
+
+
+def bucket_upper_ns(index):
+    """Largest duration (ns) counted in bucket `index`"""
+    if index < 3 * SUB_BUCKETS:
+        return index  # 0..3 ns are counted exactly
+    bits, sub = divmod(index, SUB_BUCKETS)
+    return ((SUB_BUCKETS + sub + 1) << (bits - 3)) - 1
+
+
+class LatencyHistogram:
+    """Log-linear histogram of durations in ns; count, mean and max are exact"""
+
+    def __init__(self):
+        self.buckets = [0] * BUCKETS
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def record(self, ns):
+        if ns < 0:
+            ns = 0
+        self.buckets[bucket_index(ns)] += 1
+        self.count += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+
+    def percentile_ns(self, fraction):
+        """Upper bound of the bucket holding the given fraction of samples (None when empty)"""
+        if not self.count:
+            return None
+        rank = max(1, int(self.count * fraction + 0.5))
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(bucket_upper_ns(index), self.max_ns)
+        return self.max_ns
+
+    def summary(self):
+        """count and mean/p50/p99/max in µs ({'count': 0} when empty)"""
+        if not self.count:
+            return {'count': 0}
+        return {
+            'count': self.count,
+            'mean_us': self.total_ns / self.count / 1000,
+            'p50_us': self.percentile_ns(0.50) / 1000,
+            'p99_us': self.percentile_ns(0.99) / 1000,
+            'max_us': self.max_ns / 1000,
+        }
+
+
+class StageMetrics:
+    """
+    Counters and per-stage latency histograms for one pipeline.
+
+    Disabled by default. Instrumented code reads `enabled` once per chunk
+    or sample and skips all timing when it is False, so the cost left in
+    the hot path is a single attribute test. Writers (the receive thread)
+    and readers (the GUI) share the object without a lock: a snapshot may
+    be one sample out of date, which is fine for diagnostics.
+    """
+
+    def __init__(self, stages=BACKEND_STAGES):
+        self.stages = stages
+        self.enabled = False
+        self.reset()
+
+    def reset(self):
+        self.started = time.perf_counter()
+        self.counters = {}
+        self.histograms = {stage: LatencyHistogram() for stage in self.stages}
+
+    def enable(self, enabled=True):
+        """Switch collection on (from a fresh start) or off"""
+        if enabled and not self.enabled:
+            self.reset()
+        self.enabled = enabled
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def record(self, stage, ns):
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            histogram = self.histograms[stage] = LatencyHistogram()
+        histogram.record(ns)
+
+    def snapshot(self):
+        """JSON-ready copy: seconds since reset, counters and a summary per stage"""
+        return {
+            'enabled': self.enabled,
+            'elapsed_s': time.perf_counter() - self.started,
+            'counters': dict(self.counters),
+            'stages': {stage: histogram.summary() for stage, histogram in list(self.histograms.items())},
+        }
+
+
+def rates(previous, current):
+    """Per-second rate of each counter between two snapshots of the same StageMetrics"""
+    if previous is None:
+        previous = {'elapsed_s': 0.0, 'counters': {}}
+    elapsed = current['elapsed_s'] - previous['elapsed_s']
+    if elapsed <= 0:
+        return {}  # Same snapshot, or the metrics were reset in between
+    return {name: (value - previous['counters'].get(name, 0)) / elapsed
+            for name, value in current['counters'].items()}
+
+
+def export_json(path, report):
+    """Write a diagnostics report (nested dicts of snapshots and stats) to `path`"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, default=str)
+
+
+# GUI-thread metrics shared by the main window and the live plot windows
+gui_metrics = StageMetrics(GUI_STAGES)
@@ -0,0 +1,293 @@
+"""
+Station Manager for MCB Testing System
+Drives many ESP32 bench connections from one selector thread
+"""
+
+import errno
+import os
+import selectors
+import socket
+import threading
+import time
+from collections import deque
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from backend import ESP32Backend, prepare_socket
+
+
+class StationManager(QObject):
+    """
+    Owns the sockets of several ESP32Backend stations and services them
+    from a single thread blocked in one selector.
+
+    Each station is an ordinary ESP32Backend created with manager=self, so it
+    keeps its own processing pipeline (DC offset, cycle looping, current
+    calculation) and its own signals; the frontend uses it exactly like a
+    stand-alone backend. Instead of one receive thread and a 10 ms poll per
+    controller, connects are non-blocking and reads happen only when a
+    socket is readable, so an idle station costs one registered socket.
+
+    Socket registration is only touched on the loop thread: connect and
+    disconnect requests from the GUI thread are queued and the loop is
+    woken through a socketpair.
+
+    A dropped link is retried on the loop with the station's own backoff
+    and attempt limit (see ESP32Backend.reconnect_delay), so one bench
+    reconnecting never delays the others.
+    """
+    station_added = pyqtSignal(str)  # station name
+    station_removed = pyqtSignal(str)  # station name
+    station_status_changed = pyqtSignal(str, bool, str)  # station name, connected, message
+
+    def __init__(self, recv_size=65536, connect_timeout=10.0, parent=None):
+        super().__init__(parent)
+        self.recv_size = recv_size
+        self.connect_timeout = connect_timeout
+        self.stations = {}  # name -> ESP32Backend
+        self.connecting = {}  # ESP32Backend -> (socket, deadline, reconnect attempt or 0)
+        self.retrying = {}  # ESP32Backend -> (retry time, attempt, last error)
+        self.requests = deque()  # (function, args) to run on the loop thread
+        self.selector = selectors.DefaultSelector()
+        self.wake_reader, self.wake_writer = socket.socketpair()
+        self.wake_reader.setblocking(False)
+        self.wake_writer.setblocking(False)
+        self.selector.register(self.wake_reader, selectors.EVENT_READ, None)
+        self.thread = None
+        self.running = False
+
+    # ===== Stations =====
+
+    def add_station(self, name, esp_ip, port=8888, **options):
+        """Create a managed backend for one bench; call connect() on it to go online"""
+        if name in self.stations:
+            raise ValueError(f"Station '{name}' already exists")
+        backend = ESP32Backend(esp_ip, port, manager=self, **options)
+        backend.station_name = name
+        backend.connection_status_changed.connect(
+            lambda connected, message, name=name: self.station_status_changed.emit(name, connected, message))
+        self.stations[name] = backend
+        self.station_added.emit(name)
+        return backend
+
+    def remove_station(self, name):
+        backend = self.stations.pop(name, None)
+        if backend is None:
+            return
+        if backend.connected or backend in self.connecting or backend in self.retrying:
+            self.disconnect_station(backend)
+        self.station_removed.emit(name)
+
+    def station(self, name):
+        return self.stations.get(name)
+
+    def connected_count(self):
+        return sum(1 for backend in self.stations.values() if backend.connected)
+
+    # ===== Called by ESP32Backend.connect() / disconnect() =====
+
+    def connect_station(self, backend):
+        """Start a non-blocking connect; the result arrives via connection_status_changed"""
+        self.start()
+        self._call(self._open, backend)
+        return True
+
+    def disconnect_station(self, backend):
+        self._call(self._close, backend, "Disconnected")
+
+    # ===== Event loop =====
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="StationManager", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Close every station socket and end the loop thread"""
+        if not self.running:
+            return
+        for backend in list(self.stations.values()):
+            self._call(self._close, backend, "Disconnected")
+        self._call(self._stop_loop)
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout=2)
+        self.thread = None
+
+    def _call(self, function, *args):
+        self.requests.append((function, args))
+        try:
+            self.wake_writer.send(b"\0")
+        except (BlockingIOError, OSError):
+            pass  # Wake-up already pending
+
+    def _stop_loop(self):
+        self.running = False
+
+    def _run(self):
+        while self.running:
+            for key, mask in self.selector.select(timeout=0.25):
+                if key.data is None:
+                    self._drain_wakeup()
+                elif key.data in self.connecting:
+                    self._finish_connect(key.data)
+                else:
+                    self._read(key.fileobj, key.data)
+            self._run_requests()
+            self._expire_connects()
+            for backend in list(self.stations.values()):
+                backend.expire_commands()
+
+    def _drain_wakeup(self):
+        try:
+            while self.wake_reader.recv(4096):
+                pass
+        except (BlockingIOError, OSError):
+            pass
+
+    def _run_requests(self):
+        while self.requests:
+            function, args = self.requests.popleft()
+            try:
+                function(*args)
+            except Exception as e:
+                print(f"Station manager request failed: {e}")
+
+    # ===== Per-station socket handling (loop thread only) =====
+
+    def _open(self, backend, attempt=0):
+        if backend.connected or backend in self.connecting:
+            return
+        if attempt == 0 and backend in self.retrying:
+            # Operator connect during a reconnect: start over with this attempt
+            del self.retrying[backend]
+            backend.abandon_outage()
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setblocking(False)
+        try:
+            result = sock.connect_ex((backend.esp_ip, backend.port))
+        except OSError as e:
+            sock.close()
+            self._connect_failed(backend, attempt, str(e))
+            return
+        if result not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EALREADY):
+            sock.close()
+            self._connect_failed(backend, attempt, os.strerror(result))
+            return
+        self.connecting[backend] = (sock, time.monotonic() + self.connect_timeout, attempt)
+        self.selector.register(sock, selectors.EVENT_WRITE, backend)
+
+    def _finish_connect(self, backend):
+        sock, _, attempt = self.connecting.pop(backend)
+        error = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+        if error:
+            self.selector.unregister(sock)
+            sock.close()
+            self._connect_failed(backend, attempt, os.strerror(error))
+            return
+        self.selector.modify(sock, selectors.EVENT_READ, backend)
+        prepare_socket(sock, backend.timeout)
+        backend.client = sock
+        backend.running = True
+        backend.connected = True
+        if attempt:
+            outage = backend.link_restored()
+            backend.reconnect_finished.emit(True, attempt, outage)
+            backend.connection_status_changed.emit(
+                True, f"TCP reconnected to {backend.esp_ip}:{backend.port} after {outage:.1f}s")
+            return
+        # Fresh session, as in ESP32Backend._start_session(): the controller may be a different one
+        backend.rx_buffer = ""
+        backend.reset_cycle_data()
+        backend.clock.reset()
+        backend.connection_status_changed.emit(True, f"TCP connected to {backend.esp_ip}:{backend.port}")
+
+    def _connect_failed(self, backend, attempt, error):
+        if attempt == 0:
+            backend.connection_status_changed.emit(False, f"TCP connection failed: {error}")
+        elif attempt < backend.reconnect_attempts:
+            self._schedule_reconnect(backend, attempt + 1, error)
+        else:
+            outage = backend.end_outage()
+            backend.reset_cycle_data()
+            backend.reconnect_finished.emit(False, attempt, outage)
+            backend.connection_status_changed.emit(
+                False, f"Reconnect failed after {attempt} attempts: {error}")
+
+    def _schedule_reconnect(self, backend, attempt, error):
+        delay = backend.reconnect_delay(attempt)
+        self.retrying[backend] = (time.monotonic() + delay, attempt, error)
+        backend.reconnecting.emit(attempt, backend.reconnect_attempts, delay)
+
+    def _expire_connects(self):
+        now = time.monotonic()
+        for backend, (sock, deadline, attempt) in list(self.connecting.items()):
+            if now >= deadline:
+                del self.connecting[backend]
+                self.selector.unregister(sock)
+                sock.close()
+                self._connect_failed(backend, attempt, "timed out")
+        for backend, (retry_time, attempt, _) in list(self.retrying.items()):
+            if now >= retry_time:
+                del self.retrying[backend]
+                backend.count_reconnect_attempt()
+                self._open(backend, attempt)
+
+    def _read(self, sock, backend):
+        try:
+            data = sock.recv(self.recv_size)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError as e:
+            self._link_lost(backend, str(e))
+            return
+        if not data:
+            self._link_lost(backend, "Connection closed by controller")
+            return
+        try:
+            backend.feed(data)
+        except Exception as e:
+            backend.error_occurred.emit(f"Receive error: {str(e)}")
+            self._close(backend, f"Connection lost: {str(e)}")
+
+    def _link_lost(self, backend, reason):
+        """Close a dropped socket and start reconnecting if the station allows it"""
+        self._release_socket(backend.client)
+        backend.client = None
+        backend.running = False
+        if not backend.link_lost():
+            backend.reset_cycle_data()
+            backend.error_occurred.emit(f"Receive error: {reason}")
+            backend.connection_status_changed.emit(False, f"Connection lost: {reason}")
+            return
+        self._schedule_reconnect(backend, 1, reason)
+        backend.connection_status_changed.emit(False, f"Connection lost: {reason} - reconnecting")
+
+    def _close(self, backend, message):
+        pending = self.connecting.pop(backend, None)
+        sock = pending[0] if pending else backend.client
+        was_online = backend.connected or pending is not None
+        self.retrying.pop(backend, None)
+        if backend.outage_start is not None:
+            backend.abandon_outage()
+            was_online = True
+        backend.connected = False
+        backend.running = False
+        backend.client = None
+        backend.commands.fail_all(ConnectionError(message))
+        self._release_socket(sock)
+        backend.reset_cycle_data()
+        if was_online:
+            backend.connection_status_changed.emit(False, message)
+
+    def _release_socket(self, sock):
+        if sock is None:
+            return
+        try:
+            self.selector.unregister(sock)
+        except (KeyError, ValueError):
+            pass
+        try:
+            sock.close()
+        except OSError:
+            pass
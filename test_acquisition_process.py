@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the acquisition process keeps every sample while the GUI stalls
+"""
+
+import sys
+import time
+import socket
+import threading
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QTimer, QEventLoop
+
+SAMPLES = 20000
+
+def sample(i):
+    return {'timestamp': i * 500, 'host_ns': i * 500000, 'voltage': float(i), 'current': 2.0 * i,
+            'raw_voltage': float(i), 'dc_offset': 0.0, 'power_factor': 0.8, 'cycle_samples': 0, 'cycle_captured': False}
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        loop = QEventLoop()
+        QTimer.singleShot(20, loop.quit)
+        loop.exec_()
+    return condition()
+
+def test_sample_ring():
+    """Wrap-around reads are in order; a lapped reader counts what it missed"""
+
+    print("🧪 Testing Sample Ring")
+    print("=" * 40)
+
+    from sample_ring import SampleRing
+
+    ring = SampleRing.create(capacity=1000)
+    writer = SampleRing.attach(ring.name, writable=True)
+    try:
+        for i in range(700):
+            writer.write(sample(i))
+        assert list(ring.read()['timestamp']) == [i * 500 for i in range(700)]
+        for i in range(700, 1500):
+            writer.write(sample(i))
+        wrapped = ring.read()
+        assert list(wrapped['voltage']) == [float(i) for i in range(700, 1500)]
+        assert ring.overrun == 0
+        print("✅ Reads across the wrap are complete and ordered")
+
+        for i in range(1500, 4000):
+            writer.write(sample(i))
+        assert ring.backlog() == 2500
+        partial = ring.read(max_samples=10)
+        assert ring.overrun == 1500 and list(partial['voltage']) == [float(i) for i in range(3000, 3010)]
+        assert ring.backlog() == 990
+        print(f"✅ Lapped reader skipped {ring.overrun} overwritten samples")
+
+        try:
+            ring.records[0] = ring.records[1]
+            assert False, "The reader side must be read-only"
+        except ValueError:
+            pass
+    finally:
+        writer.close()
+        ring.close()
+
+    return True
+
+def test_gui_stall_loses_nothing():
+    """Samples streamed while the GUI thread is blocked all arrive afterwards"""
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    from acquisition_process import ProcessBackend
+
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(1)
+    received_commands = []
+    streamed = threading.Event()
+
+    def controller():
+        client, _ = listener.accept()
+        client.settimeout(10)
+        # Stream in 100-sample bursts: "voltage,timestamp@"
+        for start in range(0, SAMPLES, 100):
+            client.sendall("".join(f"{i % 1000},{i * 500}@" for i in range(start, start + 100)).encode())
+            time.sleep(0.001)
+        streamed.set()
+        received_commands.append(client.recv(1024))
+        client.sendall(b"ACK: TRIGGER command received.\n")
+        client.recv(1024)  # Wait for the GUI side to disconnect
+        client.close()
+
+    server = threading.Thread(target=controller, daemon=True)
+    server.start()
+
+    backend = ProcessBackend("127.0.0.1", listener.getsockname()[1], capacity=1 << 16)
+    timestamps = []
+    raw_messages = []
+    statuses = []
+    backend.real_time_waveform.connect(lambda data: timestamps.append(data['timestamp']))
+    backend.data_received.connect(lambda data: 'raw' in data and raw_messages.append(data['raw']))
+    backend.connection_status_changed.connect(lambda connected, message: statuses.append(connected))
+    try:
+        backend.connect()
+        assert wait_for(lambda: backend.connected, timeout=30), "Acquisition process did not connect"
+
+        # Block the GUI thread, as a long redraw would, for the whole stream
+        assert streamed.wait(timeout=30)
+        backend.send_command("TRIGGER")
+        stall_backlog = backend.backlog()
+        print(f"✅ {stall_backlog:,} samples waited in the ring while the GUI was blocked")
+        assert stall_backlog > 0
+
+        assert wait_for(lambda: len(timestamps) >= SAMPLES and raw_messages)
+        assert timestamps == [i * 500 for i in range(SAMPLES)], "Every sample, in order"
+        assert backend.overrun == 0
+        assert raw_messages == ["ACK: TRIGGER command received."]
+        assert received_commands == [b"TRIGGER\n"]
+        print(f"✅ All {len(timestamps):,} samples delivered in order after the stall")
+
+        backend.disconnect()
+        assert wait_for(lambda: statuses[-1] is False)
+    finally:
+        backend.shutdown()
+        listener.close()
+    assert not backend.process.is_alive()
+    print("✅ Acquisition process stopped and ring released")
+
+    return True
+
+if __name__ == "__main__":
+    success = test_sample_ring() and test_gui_stall_loses_nothing()
+
+    if success:
+        print("\n✅ Acquisition process test PASSED!")
+    else:
+        print("\n❌ Acquisition process test FAILED!")
+
+    print("\n✅ Test completed!")
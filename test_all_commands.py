@@ -19,7 +19,7 @@ def test_all_command_methods():
         sent_commands = []
         
         class MockClient:
-            def send(self, data):
+            def sendall(self, data):
                 sent_commands.append(data.decode('utf-8'))
                 return len(data)
         
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Test script to verify post-test analyses run in worker processes with progress and cancellation
+"""
+
+import os
+import sys
+import time
+import pickle
+import numpy as np
+from multiprocessing import shared_memory
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QTimer, QEventLoop
+
+SAMPLE_RATE = 5000.0
+
+def capture(duration, fault=None):
+    """50 Hz current with 5% 3rd and 3% 5th harmonic; `fault` limits flow to (start, end)"""
+    t = np.arange(0, duration, 1 / SAMPLE_RATE)
+    w = 2 * np.pi * 50 * t
+    current = 100 * (np.sin(w) + 0.05 * np.sin(3 * w) + 0.03 * np.sin(5 * w))
+    voltage = 230 * np.sqrt(2) * np.sin(w + 0.6)
+    if fault is not None:
+        current[(t < fault[0]) | (t >= fault[1])] = 0.0
+    return t, voltage, current
+
+def wait_for(condition, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        loop = QEventLoop()
+        QTimer.singleShot(20, loop.quit)
+        loop.exec_()
+    return condition()
+
+def test_analyses_in_workers():
+    """THD, breaking time, trip evaluation and report figure, with progress signals"""
+
+    print("🧪 Testing Analysis Executor")
+    print("=" * 40)
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    from analysis_executor import AnalysisExecutor, evaluate_trip
+
+    executor = AnalysisExecutor(max_workers=1)
+    finished, failed, progress = {}, [], {}
+    executor.analysis_finished.connect(lambda job_id, kind, result: finished.__setitem__(job_id, result))
+    executor.analysis_failed.connect(lambda job_id, kind, error: failed.append(error))
+    executor.analysis_progress.connect(
+        lambda job_id, fraction, stage: progress.setdefault(job_id, []).append(fraction))
+
+    t, voltage, current = capture(60.0)
+    ft, _, fault_current = capture(2.0, fault=(0.5, 0.58))
+    report = os.path.join("test_results", "reports", "test_harmonics.png")
+    try:
+        harmonics = executor.submit('harmonics', {'times': t, 'values': current})
+        block_name, layout = executor.jobs[harmonics][2].spec
+        assert len(pickle.dumps(executor.jobs[harmonics][2].spec)) < 1000, "Only the layout is pickled"
+        breaking = executor.submit('breaking_time', {'times': ft, 'current': fault_current})
+        trip = executor.submit('trip', {'times': ft, 'current': fault_current},
+                               mcb_type='C', rated_current=6.0)
+        figure = executor.submit('report', {'times': t[:50000], 'voltage': voltage[:50000],
+                                            'current': current[:50000]}, path=report)
+        assert wait_for(lambda: len(finished) + len(failed) == 4), "Analyses did not complete"
+        assert not failed, failed
+        assert executor.active_jobs() == 0
+
+        thd = finished[harmonics]['thd_mean']
+        print(f"✅ THD over {len(finished[harmonics]['thd'])} windows: {thd * 100:.2f}% (expected 5.83%)")
+        assert abs(thd - np.sqrt(0.05 ** 2 + 0.03 ** 2)) < 0.002
+        assert abs(finished[harmonics]['harmonics'][2] - 0.05) < 0.002
+        assert progress[harmonics][-1] == 1.0 and progress[harmonics] == sorted(progress[harmonics])
+        print(f"✅ {sum(len(v) for v in progress.values())} progress updates, ending at 100%")
+
+        measured = finished[breaking]['breaking_time']
+        print(f"✅ Breaking time: {measured * 1000:.1f}ms (fault lasted 80ms)")
+        assert abs(measured - 0.08) <= 0.011
+
+        assert finished[trip]['region'] == "Instantaneous trip" and finished[trip]['passed'] is True
+        assert os.path.getsize(finished[figure]['path']) > 0
+        print(f"✅ Trip evaluation: {finished[trip]['region']} at {finished[trip]['multiple']:.1f} In, report written")
+
+        try:
+            shared_memory.SharedMemory(name=block_name).close()
+            assert False, "Shared memory must be unlinked after the job"
+        except FileNotFoundError:
+            pass
+    finally:
+        executor.shutdown()
+
+    assert evaluate_trip('C', 16, 1.13 * 16, None)['passed']
+    assert not evaluate_trip('C', 16, 1.45 * 16, None)['passed']
+    assert evaluate_trip('B', 16, 2.55 * 16, 12.0)['passed']
+    assert not evaluate_trip('B', 16, 3 * 16, 0.05)['passed']
+    print("✅ IEC 60898-1 trip limits evaluated")
+
+    return True
+
+def test_cancel_on_new_test():
+    """Queued jobs are cancelled and a running job stops at its next progress step"""
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    import multiprocessing
+    import analysis_executor
+    from analysis_executor import AnalysisExecutor, AnalysisCancelled, JobContext, harmonic_analysis
+
+    executor = AnalysisExecutor(max_workers=1)
+    cancelled, done = [], []
+    executor.analysis_cancelled.connect(lambda job_id, kind: cancelled.append(job_id))
+    executor.analysis_finished.connect(lambda job_id, kind, result: done.append(job_id))
+    executor.analysis_failed.connect(lambda job_id, kind, error: done.append(job_id))
+
+    t, _, current = capture(120.0)
+    try:
+        jobs = [executor.submit('harmonics', {'times': t, 'values': current}) for _ in range(3)]
+        executor.cancel_all()
+        assert wait_for(lambda: len(cancelled) + len(done) == 3)
+        assert set(jobs[1:]) <= set(cancelled), "Queued jobs must be cancelled"
+        print(f"✅ {len(cancelled)} of 3 jobs cancelled when the next test started")
+
+        # The pool keeps working for the next test's analyses
+        after = executor.submit('harmonics', {'times': t[:10000], 'values': current[:10000]})
+        assert wait_for(lambda: after in done)
+    finally:
+        executor.shutdown()
+
+    # A running job sees the bumped generation at its next progress call
+    analysis_executor._generation = multiprocessing.Value('i', 1)
+    try:
+        harmonic_analysis(JobContext(1, generation=0), t, current)
+        assert False, "Stale job must stop"
+    except AnalysisCancelled:
+        pass
+    finally:
+        analysis_executor._generation = None
+    print("✅ Running job stops at its next progress step")
+
+    return True
+
+if __name__ == "__main__":
+    success = test_analyses_in_workers() and test_cancel_on_new_test()
+
+    if success:
+        print("\n✅ Analysis executor test PASSED!")
+    else:
+        print("\n❌ Analysis executor test FAILED!")
+
+    print("\n✅ Test completed!")
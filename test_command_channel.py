@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Test script to verify pipelined commands resolve their futures from in-order controller replies
+"""
+
+import sys
+import time
+import socket
+import threading
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QTimer, QEventLoop
+
+REPLY_DELAY = 0.03  # seconds the fake controller takes per command line
+
+def abcd_reply(line):
+    """Replies as abcd.ino sends them, one per received line"""
+    if line == "TRIGGER":
+        return "ACK: TRIGGER command received."
+    if line == "STATUS":
+        return "STATUS|Relay6:OFF,Relay7:OFF"
+    if line.startswith("R:"):
+        return "ACK: R-L command processed."
+    try:
+        float(line)
+        return "ACK: Power Factor command processed."
+    except ValueError:
+        pass
+    if line.count(",") == 1:
+        return "ACK: Power Factor command processed."
+    return "ERROR: Unknown command format."
+
+class FakeController:
+    """Streams samples and answers each command line in order, after a delay"""
+
+    def __init__(self):
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.bind(("127.0.0.1", 0))
+        self.listener.listen(1)
+        self.port = self.listener.getsockname()[1]
+        self.client = None
+        self.received = []
+        self.silent = False  # Stop answering commands
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        try:
+            self.client, _ = self.listener.accept()
+        except OSError:
+            return
+        self.client.settimeout(0.005)
+        buffer, replies, timestamp = "", [], 0
+        try:
+            while True:
+                try:
+                    data = self.client.recv(4096)
+                    if not data:
+                        return
+                    buffer += data.decode()
+                    while "\n" in buffer:
+                        line, buffer = buffer.split("\n", 1)
+                        self.received.append(line)
+                        if not self.silent:
+                            replies.append((time.monotonic() + REPLY_DELAY * (len(replies) + 1), abcd_reply(line)))
+                except socket.timeout:
+                    pass
+                # Replies share the stream with samples, as on the bench
+                timestamp += 1000
+                out = f"{1000 + timestamp % 7},{timestamp}@"
+                while replies and replies[0][0] <= time.monotonic():
+                    out += replies.pop(0)[1] + "\n"
+                self.client.sendall(out.encode())
+        except OSError:
+            pass
+
+    def drop(self):
+        if self.client:
+            self.client.close()
+
+    def stop(self):
+        self.drop()
+        self.listener.close()
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        loop = QEventLoop()
+        QTimer.singleShot(20, loop.quit)
+        loop.exec_()
+    return condition()
+
+def test_reply_matching():
+    """FIFO matching, multi-line commands, ERROR replies and late replies after a timeout"""
+
+    print("🧪 Testing Command Channel")
+    print("=" * 40)
+
+    from command_channel import CommandChannel, CommandError
+
+    channel = CommandChannel(timeout=0.05)
+    status = channel.register("STATUS")
+    power_factor = channel.register("1000.0\n0.800", lines=2)
+    bogus = channel.register("BOGUS")
+    assert [status.seq, power_factor.seq, bogus.seq] == [1, 2, 3]
+    assert channel.in_flight() == 3
+
+    assert channel.on_reply("STATUS|Relay6:ON") is status
+    assert status.future.result(0) == "STATUS|Relay6:ON" and status.round_trip >= 0
+    assert channel.on_reply("ACK: Power Factor command processed.") is None, "Waits for its second reply"
+    assert channel.on_reply("ACK: Power Factor command processed.") is power_factor
+    assert channel.on_reply("ERROR: Unknown command format.") is bogus
+    try:
+        bogus.future.result(0)
+        assert False, "ERROR: reply must fail the future"
+    except CommandError as e:
+        assert "Unknown command" in str(e)
+    print("✅ Replies matched in order, two-line command waited for both, ERROR raised CommandError")
+
+    # A timed-out command keeps its slot, so its late reply is not given to the next command
+    slow = channel.register("TRIGGER")
+    time.sleep(0.06)
+    follow = channel.register("STATUS")
+    assert channel.expire() == [slow]
+    assert isinstance(slow.future.exception(0), TimeoutError)
+    assert channel.on_reply("ACK: TRIGGER command received.") is None
+    assert channel.on_reply("STATUS|Relay6:OFF") is follow and follow.future.result(0).startswith("STATUS|")
+    stats = channel.latency_stats()
+    assert stats['completed'] == 4 and stats['timeouts'] == 1 and stats['errors'] == 1 and stats['in_flight'] == 0
+    print("✅ Late reply after a timeout stays with its own command")
+
+    # A line the firmware never answers gives up its slot after the grace period
+    unanswered = channel.register("6.0,0.6")
+    time.sleep(0.06)
+    assert channel.expire() == [unanswered] and len(channel.pending) == 1, "Within the grace period"
+    time.sleep(0.05)
+    answered = channel.register("STATUS")
+    assert channel.expire() == [] and list(channel.pending) == [answered]
+    assert channel.on_reply("STATUS|Relay6:OFF") is answered
+    assert answered.future.result(0) == "STATUS|Relay6:OFF"
+    assert isinstance(unanswered.future.exception(0), TimeoutError)
+    stats = channel.latency_stats()
+    assert stats['dropped'] == 1 and stats['timeouts'] == 2 and stats['completed'] == 5
+    print("✅ Unanswered command dropped after the grace period; the next reply went to the next command")
+
+    return True
+
+def test_pipelined_backend():
+    """Several commands in flight over TCP, each future resolved by its own reply"""
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    from backend import ESP32Backend
+    from command_channel import CommandError
+
+    controller = FakeController()
+    backend = ESP32Backend("127.0.0.1", controller.port, timeout=2.0, reconnect_attempts=0,
+                           command_timeout=2.0)
+    acknowledged = []
+    samples = []
+    backend.command_acknowledged.connect(
+        lambda seq, command, reply, round_trip: acknowledged.append((seq, command, reply, round_trip)))
+    backend.real_time_waveform.connect(lambda data: samples.append(data['timestamp']))
+    try:
+        assert backend.connect()
+        futures = [
+            backend.send_command("TRIGGER"),
+            backend.get_status(),
+            backend.set_power_factor(1000, 0.8),  # Two lines, two replies
+            backend.set_variable_rl_configuration(25, 0.01),
+            backend.send_command("BOGUS"),
+        ]
+        assert all(futures), "Commands must be sent"
+        assert backend.commands.in_flight() == 5, "Nothing waits for a reply before the next send"
+
+        assert futures[0].result(3) == "ACK: TRIGGER command received."
+        assert futures[1].result(3).startswith("STATUS|")
+        assert futures[2].result(3).count("ACK: Power Factor") == 2
+        assert futures[3].result(3) == "ACK: Power Factor command processed."
+        assert isinstance(futures[4].exception(3), CommandError)
+        print(f"✅ 5 pipelined commands resolved in order: {controller.received}")
+
+        assert wait_for(lambda: len(acknowledged) == 5)
+        assert [seq for seq, *_ in acknowledged] == sorted(seq for seq, *_ in acknowledged)
+        assert all(round_trip >= REPLY_DELAY for *_, round_trip in acknowledged)
+        stats = backend.command_stats()
+        assert stats['completed'] == 5 and stats['errors'] == 1 and stats['in_flight'] == 0
+        print(f"✅ Round trip p50 {stats['p50_ms']:.0f}ms, p95 {stats['p95_ms']:.0f}ms over {stats['completed']} commands")
+        assert wait_for(lambda: len(samples) > 20)
+        assert samples == sorted(samples), "Samples sharing a segment with a reply are not lost"
+
+        # Unanswered commands fail when the link drops
+        controller.silent = True
+        pending = backend.get_status()
+        controller.drop()
+        assert isinstance(pending.exception(3), ConnectionError)
+        print("✅ Pending command failed with ConnectionError when the link dropped")
+    finally:
+        backend.disconnect()
+        controller.stop()
+
+    return True
+
+def test_unanswered_command():
+    """Over TCP: a command that never gets a reply does not take the reply of the next one"""
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    from backend import ESP32Backend
+
+    controller = FakeController()
+    backend = ESP32Backend("127.0.0.1", controller.port, timeout=2.0, reconnect_attempts=0,
+                           command_timeout=0.2)
+    errors = []
+    backend.error_occurred.connect(errors.append)
+    try:
+        assert backend.connect()
+        controller.silent = True
+        unanswered = backend.send_command("TRIGGER")
+        assert isinstance(unanswered.exception(3), TimeoutError)
+        assert wait_for(lambda: backend.command_stats()['dropped'] == 1)
+        controller.silent = False
+        answered = backend.get_status()
+        assert answered.result(3).startswith("STATUS|"), "The STATUS reply must reach STATUS"
+        assert [error for error in errors if error.startswith("Command timeout")] == \
+            ["Command timeout: no reply to 'TRIGGER' within 0.2s"], "One report per unanswered command"
+        print("✅ Unanswered TRIGGER dropped; the following STATUS got its own reply")
+    finally:
+        backend.disconnect()
+        controller.stop()
+
+    return True
+
+if __name__ == "__main__":
+    success = test_reply_matching() and test_pipelined_backend() and test_unanswered_command()
+
+    if success:
+        print("\n✅ Command channel test PASSED!")
+    else:
+        print("\n❌ Command channel test FAILED!")
+
+    print("\n✅ Test completed!")
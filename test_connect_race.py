@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Test script to verify connecting races candidate addresses without blocking the window and can be cancelled
+"""
+
+import sys
+import math
+import time
+import socket
+import threading
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QTimer, QEventLoop
+
+class StreamingController:
+    """Accepts one client and streams a 50Hz waveform"""
+
+    def __init__(self):
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.bind(("127.0.0.1", 0))
+        self.listener.listen(1)
+        self.port = self.listener.getsockname()[1]
+        self.client = None
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def run(self):
+        try:
+            self.client, _ = self.listener.accept()
+            timestamp = 0
+            while True:
+                burst = []
+                for _ in range(10):
+                    timestamp += 1000
+                    burst.append(f"{1000 + 500 * math.sin(2 * math.pi * 50 * timestamp / 1e6):.2f},{timestamp}@")
+                self.client.sendall("".join(burst).encode())
+                time.sleep(0.01)
+        except OSError:
+            pass
+
+    def stop(self):
+        if self.client:
+            self.client.close()
+        self.listener.close()
+
+class SilentAddress:
+    """A listener whose backlog is full: further connects neither succeed nor fail"""
+
+    def __init__(self):
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.bind(("127.0.0.1", 0))
+        self.listener.listen(0)
+        self.port = self.listener.getsockname()[1]
+        self.filler = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.filler.connect(("127.0.0.1", self.port))
+
+    def close(self):
+        self.filler.close()
+        self.listener.close()
+
+def refused_port():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        loop = QEventLoop()
+        QTimer.singleShot(20, loop.quit)
+        loop.exec_()
+    return condition()
+
+def test_race_connect():
+    """First answering candidate wins; refused and silent ones do not hold it up"""
+
+    print("🧪 Testing Connect Race")
+    print("=" * 40)
+
+    from backend import parse_candidates, race_connect
+
+    assert parse_candidates("10.0.0.1, 10.0.0.2:5000; 10.0.0.1:8888", 8888) == \
+        [("10.0.0.1", 8888), ("10.0.0.2", 5000)]
+    assert parse_candidates(["192.168.1.100:5000"]) == [("192.168.1.100", 5000)]
+    print("✅ Candidate lists parsed, duplicates dropped")
+
+    silent = SilentAddress()
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(1)
+    good = listener.getsockname()[1]
+    try:
+        candidates = [("127.0.0.1", silent.port), ("127.0.0.1", refused_port()), ("127.0.0.1", good)]
+        messages = []
+        started = time.monotonic()
+        sock, winner = race_connect(candidates, 5.0, progress=messages.append)
+        elapsed = time.monotonic() - started
+        sock.close()
+        assert winner == ("127.0.0.1", good)
+        assert elapsed < 1.0, "A silent candidate must not delay the one that answers"
+        print(f"✅ {winner[0]}:{winner[1]} won in {elapsed * 1000:.1f}ms; progress: {messages}")
+
+        started = time.monotonic()
+        try:
+            race_connect([("127.0.0.1", silent.port)], 0.3)
+            assert False, "Nothing answered"
+        except ConnectionAbortedError:
+            assert False, "Not cancelled"
+        except OSError as e:
+            assert "timed out" in str(e) and time.monotonic() - started < 1.0
+
+        stop = threading.Event()
+        threading.Timer(0.1, stop.set).start()
+        try:
+            race_connect([("127.0.0.1", silent.port)], 10.0, cancelled=stop.is_set)
+            assert False, "Must be cancelled"
+        except ConnectionAbortedError:
+            pass
+        print("✅ Silent address times out, and a race can be cancelled")
+    finally:
+        listener.close()
+        silent.close()
+
+    return True
+
+def test_window_connect():
+    """The Connect button returns at once, keeps the answering controller and reports time to first sample"""
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    from backend import ESP32Backend
+    from frontend import MCBTestingSoftware
+
+    controller = StreamingController()
+    silent = SilentAddress()
+    backend = ESP32Backend("127.0.0.1", silent.port, timeout=5.0, reconnect_attempts=0)
+    window = MCBTestingSoftware(backend)
+    first = []
+    backend.first_sample.connect(first.append)
+    try:
+        # Only a silent address: the click must not freeze the window, and Cancel ends it
+        window.ip_input.setText(f"127.0.0.1:{silent.port}")
+        started = time.perf_counter()
+        window.connect_to_esp32()
+        blocked = time.perf_counter() - started
+        assert blocked < 0.1, f"Connect blocked the GUI thread for {blocked:.2f}s"
+        assert window.connecting and window.connect_btn.text() == "Cancel"
+        window.connect_to_esp32()
+        assert wait_for(lambda: not window.connecting)
+        assert not backend.connected and "cancelled" in window.connection_status.text()
+        print(f"✅ Click returned in {blocked * 1000:.1f}ms; connect cancelled")
+
+        window.ip_input.setText(f"127.0.0.1:{silent.port}, 127.0.0.1:{refused_port()}, "
+                                f"127.0.0.1:{controller.port}")
+        window.connect_to_esp32()
+        assert wait_for(lambda: backend.connected)
+        assert (backend.esp_ip, backend.port) == ("127.0.0.1", controller.port)
+        assert wait_for(lambda: first)
+        stats = backend.connection_stats()
+        assert stats['time_to_first_sample'] == first[0]
+        assert wait_for(lambda: any(message.startswith("First sample from")
+                                    for message in window.notifications.entries))
+        print(f"✅ Raced 3 addresses, kept port {backend.port}; first sample after {first[0] * 1000:.1f}ms")
+    finally:
+        backend.disconnect()
+        window.close()
+        window.deleteLater()
+        controller.stop()
+        silent.close()
+
+    return True
+
+if __name__ == "__main__":
+    success = test_race_connect() and test_window_connect()
+
+    if success:
+        print("\n✅ Connect race test PASSED!")
+    else:
+        print("\n❌ Connect race test FAILED!")
+
+    print("\n✅ Test completed!")
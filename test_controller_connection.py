@@ -2,8 +2,10 @@
 """
 Test script to verify TCP connection with your ESP32 controller
 This will connect and receive the voltage data format: "voltage,timestamp@"
+Run with --simulate to use a local abcd.ino simulator instead of the bench
 """
 
+import sys
 import socket
 import time
 import threading
@@ -108,7 +110,15 @@ def main():
     print("🧪 ESP32 Controller Connection Test")
     print("=" * 50)
     
-    tester = ControllerTester()
+    fleet = None
+    if "--simulate" in sys.argv:
+        from esp32_simulator import SimulatorFleet
+        fleet = SimulatorFleet()
+        simulator = fleet.add('abcd')
+        print(f"🧪 Simulated controller on {simulator.host}:{simulator.port}")
+        tester = ControllerTester(simulator.host, simulator.port)
+    else:
+        tester = ControllerTester()
     
     if tester.connect():
         try:
@@ -124,6 +134,8 @@ def main():
         finally:
             tester.disconnect()
     
+    if fleet is not None:
+        fleet.stop()
     print("\n✅ Test completed!")
 
 if __name__ == "__main__":
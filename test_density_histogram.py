@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the incremental Current vs Temperature density grid
+"""
+
+import time
+import numpy as np
+
+def test_density_matches_histogram2d():
+    """Incremental counts equal a one-shot histogram over the final bin edges"""
+
+    print("🧪 Testing Density Histogram")
+    print("=" * 40)
+
+    from density_histogram import DensityHistogram
+
+    rng = np.random.default_rng(7)
+    # Temperature drifts upwards over the test, current follows with noise
+    temps = np.round(25 + np.cumsum(rng.normal(0.01, 0.3, 20000))).astype(int)
+    currents = np.round(1000 + 5 * (temps - 25) + rng.normal(0, 20, 20000)).astype(int)
+
+    density = DensityHistogram(bins=(120, 80), bin_size=(1.0, 1.0))
+    for t, c in zip(temps, currents):
+        density.add(t, c)
+
+    left, right, bottom, top = density.extent()
+    expected, _, _ = np.histogram2d(currents, temps, bins=(density.ny, density.nx),
+                                    range=((bottom, top), (left, right)))
+    print(f"✅ {density.total:,} samples in a {density.nx}x{density.ny} grid, "
+          f"bin size {density.dx:g} °C x {density.dy:g} mA")
+    assert density.total == len(temps)
+    assert density.counts.sum() == len(temps), "Growing the range must not drop samples"
+    assert np.array_equal(density.counts, expected.astype(np.int64))
+    assert left <= temps.min() and temps.max() < right
+    assert bottom <= currents.min() and currents.max() < top
+
+    o_left, o_right, o_bottom, o_top = density.occupied_extent()
+    assert left <= o_left <= temps.min() and temps.max() < o_right <= right
+    assert density.image().count() == np.count_nonzero(density.counts)
+
+    density.clear()
+    assert density.total == 0 and density.counts.sum() == 0 and density.dx == 1.0
+
+    return True
+
+def test_density_cost_is_flat():
+    """Adding samples late in a long test costs the same as early on"""
+
+    from density_histogram import DensityHistogram
+
+    density = DensityHistogram()
+    rng = np.random.default_rng(3)
+    points = rng.normal((60, 1500), (10, 200), size=(200000, 2))
+
+    def time_block(block):
+        start = time.perf_counter()
+        for x, y in block:
+            density.add(x, y)
+        return (time.perf_counter() - start) / len(block) * 1e6
+
+    early = time_block(points[:10000])
+    for x, y in points[10000:190000]:
+        density.add(x, y)
+    late = time_block(points[190000:])
+    start = time.perf_counter()
+    image = density.image()
+    image_ms = (time.perf_counter() - start) * 1000
+
+    print(f"✅ add(): {early:.2f}µs early vs {late:.2f}µs after {len(points):,} samples")
+    print(f"✅ Image: {image.shape} in {image_ms:.2f}ms")
+    assert image.shape == (density.ny, density.nx)
+    assert late < early * 3 + 2
+
+    return True
+
+if __name__ == "__main__":
+    success = test_density_matches_histogram2d() and test_density_cost_is_flat()
+
+    if success:
+        print("\n✅ Density histogram test PASSED!")
+    else:
+        print("\n❌ Density histogram test FAILED!")
+
+    print("\n✅ Test completed!")
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Test script to verify device micros() timestamps are unwrapped and mapped onto host time with drift
+"""
+
+import time
+import numpy as np
+
+WRAP_US = 1 << 32
+
+def test_unwrap():
+    """32-bit wraps and controller restarts give a continuous count, however the stream is split"""
+
+    print("🧪 Testing Device Clock")
+    print("=" * 40)
+
+    from device_clock import DeviceClock
+
+    # Five minutes of 1kHz samples, wrapping after 30 seconds
+    true_us = np.arange(0, 300_000_000, 1000, dtype=np.int64) + WRAP_US - 30_000_000
+    raw = true_us % WRAP_US
+
+    whole = DeviceClock().unwrap(raw)
+    assert np.array_equal(whole - whole[0], true_us - true_us[0])
+
+    clock = DeviceClock()
+    rng = np.random.default_rng(1)
+    cuts = np.sort(rng.choice(np.arange(1, len(raw)), size=400, replace=False))
+    blocks = [clock.unwrap(block) for block in np.split(raw, cuts)]
+    assert np.array_equal(np.concatenate(blocks), whole), "Block boundaries must not matter"
+    assert clock.wraps == 1 and clock.restarts == 0
+    print(f"✅ {len(raw):,} samples across a micros() wrap unwrapped identically in {len(blocks)} blocks")
+
+    # The controller restarts: micros() starts again near zero, the count carries on
+    restarted = clock.unwrap([5000, 6000])
+    assert clock.restarts == 1
+    assert list(restarted) == [int(whole[-1]) + 1, int(whole[-1]) + 1001]
+    print("✅ Restart continued the count instead of stepping back")
+
+    return True
+
+def test_offset_and_drift():
+    """Offset and drift are recovered from jittery block arrivals; mapping is cheap"""
+
+    from device_clock import DeviceClock
+
+    drift = 80e-6                  # Device crystal 80 ppm slow against the host
+    host_start_ns = 5_000_000_000_000
+    min_latency_ns = 2_000_000
+    rng = np.random.default_rng(7)
+    clock = DeviceClock()
+    errors = []
+    raw_start = WRAP_US - 60_000_000  # Wraps one minute in
+    # 10 minutes of 100-sample blocks at 10kHz (one block every 10ms)
+    for block in range(60_000):
+        device_us = np.arange(block * 100, (block + 1) * 100, dtype=np.int64) * 100
+        sent_ns = host_start_ns + (device_us * 1000 * (1 + drift)).astype(np.int64)
+        received_ns = int(sent_ns[-1]) + min_latency_ns + int(rng.exponential(3_000_000))
+        _, host_ns = clock.map_block((raw_start + device_us) % WRAP_US, received_ns)
+        if block > 12_000:
+            errors.append(np.abs(host_ns - (sent_ns + min_latency_ns)).max())
+
+    stats = clock.stats()
+    print(f"✅ Fit: drift {stats['drift_ppm']:.1f} ppm (true 80), offset {stats['offset_ms']:.1f}ms, "
+          f"{stats['wraps']} wrap, max error {max(errors) / 1e6:.3f}ms after two minutes")
+    assert abs(stats['drift_ppm'] - 80) < 5
+    assert max(errors) < 500_000, "Host-aligned times within 0.5ms of arrival at minimum latency"
+    assert stats['wraps'] == 1
+
+    raw = np.arange(100, dtype=np.int64) * 100 + 10_000
+    started = time.perf_counter()
+    for _ in range(1000):
+        clock.map_block(raw, time.monotonic_ns())
+        raw += 10_000
+    per_block = (time.perf_counter() - started) / 1000
+    print(f"✅ map_block: {per_block * 1e6:.0f}µs per 100-sample block")
+    assert per_block < 0.002
+
+    return True
+
+def test_backend_across_wrap():
+    """ESP32Backend keeps cycle looping and emits host-aligned times while micros() wraps"""
+
+    from backend import ESP32Backend
+
+    backend = ESP32Backend()
+    samples = []
+    backend.real_time_waveform.connect(samples.append)
+    start = WRAP_US - 10_000  # 10ms before the wrap
+    now_ns = time.monotonic_ns()
+    for chunk in range(20):
+        data = "".join(f"{1000 + 500 * np.sin(2 * np.pi * 50 * i / 1000):.2f},{(start + i * 1000) % WRAP_US}@"
+                       for i in range(chunk * 5, chunk * 5 + 5))
+        backend.feed(data.encode(), now_ns + chunk * 5_000_000)
+
+    timestamps = [sample['timestamp'] for sample in samples]
+    assert len(timestamps) == 100 and all(b - a == 1000 for a, b in zip(timestamps, timestamps[1:]))
+    assert backend.cycle_captured, "A wrap must not break the relative-time math of cycle capture"
+    host = [sample['host_ns'] for sample in samples]
+    assert all(isinstance(value, int) for value in host) and host == sorted(host)
+    assert backend.connection_stats()['clock']['wraps'] == 1
+    print(f"✅ Backend: {len(samples)} samples across the wrap, cycle captured, host times increasing")
+
+    return True
+
+if __name__ == "__main__":
+    success = test_unwrap() and test_offset_and_drift() and test_backend_across_wrap()
+
+    if success:
+        print("\n✅ Device clock test PASSED!")
+    else:
+        print("\n❌ Device clock test FAILED!")
+
+    print("\n✅ Test completed!")
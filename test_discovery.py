@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Test script to verify subnet discovery finds and fingerprints controllers within about a second
+"""
+
+import sys
+import time
+import socket
+import threading
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QTimer, QEventLoop
+
+class FakeController:
+    """Listens on host:port like a bench controller; answers STATUS as abcd.ino, or records lines only"""
+
+    def __init__(self, host, port=0, answers_status=True):
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.bind((host, port))
+        self.listener.listen(8)
+        self.host, self.port = self.listener.getsockname()
+        self.answers_status = answers_status
+        self.connections = 0
+        self.received = []
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def run(self):
+        while True:
+            try:
+                client, _ = self.listener.accept()
+            except OSError:
+                return
+            self.connections += 1
+            threading.Thread(target=self.serve, args=(client,), daemon=True).start()
+
+    def serve(self, client):
+        buffer = ""
+        try:
+            # Streaming starts before any command, as on the bench
+            client.sendall(b"1000.00,1000@1001.00,2000@")
+            while True:
+                data = client.recv(4096)
+                if not data:
+                    return
+                buffer += data.decode()
+                while "\n" in buffer:
+                    line, buffer = buffer.split("\n", 1)
+                    self.received.append(line)
+                    if self.answers_status and line == "STATUS":
+                        client.sendall(b"1002.00,3000@STATUS|Relay6:INACTIVE|Path_L:2|Path_R:5|LastCapture:0\n")
+        except OSError:
+            pass
+        finally:
+            client.close()
+
+    def stop(self):
+        self.listener.close()
+
+class SilentHost:
+    """A listener whose backlog is full: probes of it neither connect nor fail"""
+
+    def __init__(self, host, port):
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.bind((host, port))
+        self.listener.listen(0)
+        self.filler = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.filler.connect((host, port))
+
+    def stop(self):
+        self.filler.close()
+        self.listener.close()
+
+def start_bench():
+    """abcd.ino on two hosts and esp32_controller.ino on one, each kind on its own port, plus a silent host"""
+    first = FakeController("127.0.0.23")
+    abcd_port = first.port
+    second = FakeController("127.0.0.57", abcd_port)
+    busy = FakeController("127.0.0.30", abcd_port)
+    esp32 = FakeController("127.0.0.41", answers_status=False)
+    silent = SilentHost("127.0.0.99", abcd_port)
+    ports = {abcd_port: 'abcd', esp32.port: 'esp32_controller'}
+    return [first, second, busy, esp32, silent], ports
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        loop = QEventLoop()
+        QTimer.singleShot(20, loop.quit)
+        loop.exec_()
+    return condition()
+
+def test_discover_subnet():
+    """A /24 is scanned on both ports in about a second; controllers are told apart"""
+
+    print("🧪 Testing Controller Discovery")
+    print("=" * 40)
+
+    from discovery import discover, parse_status
+
+    assert parse_status("STATUS|Relay6:ACTIVE|Path_L:2|Path_R:5|LastCapture:1") == \
+        {'Relay6': 'ACTIVE', 'Path_L': '2', 'Path_R': '5', 'LastCapture': '1'}
+
+    bench, ports = start_bench()
+    first, second, busy, esp32, silent = bench
+    try:
+        started = time.perf_counter()
+        found = discover("127.0.0.0/24", ports, exclude=[("127.0.0.30", busy.port)])
+        elapsed = time.perf_counter() - started
+        print(f"✅ Scanned 254 hosts x {len(ports)} ports in {elapsed * 1000:.0f}ms")
+        assert elapsed < 1.5, f"A /24 scan took {elapsed:.2f}s"
+
+        by_host = {c['host']: c for c in found}
+        assert sorted(by_host) == ["127.0.0.23", "127.0.0.41", "127.0.0.57"], by_host
+        assert by_host["127.0.0.23"]['firmware'] == 'abcd'
+        assert by_host["127.0.0.23"]['status']['Path_R'] == '5'
+        assert by_host["127.0.0.41"]['firmware'] == 'esp32_controller'
+        assert by_host["127.0.0.41"]['status'] is None
+        for controller in found:
+            print(f"   {controller['host']}:{controller['port']} {controller['firmware']} "
+                  f"({controller['connect_ms']:.1f}ms) {controller['status']}")
+
+        # esp32_controller.ino acts on any line it receives, and a controller in use must keep its client
+        time.sleep(0.05)
+        assert esp32.received == [], "Nothing may be sent to esp32_controller.ino"
+        assert busy.connections == 0, "Excluded controller must not be probed"
+        assert first.received == ["STATUS"]
+        print("✅ Only abcd.ino was queried; esp32_controller.ino and the excluded host were left alone")
+    finally:
+        for device in bench:
+            device.stop()
+
+    return True
+
+def test_window_scan():
+    """The Scan button runs off the GUI thread and fills the address list for Connect to race"""
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    from backend import ESP32Backend
+    from frontend import MCBTestingSoftware
+
+    import discovery
+    bench, ports = start_bench()
+    default_profiles, discovery.PORT_PROFILES = discovery.PORT_PROFILES, ports
+    backend = ESP32Backend("127.0.0.1", 8888, reconnect_attempts=0)
+    window = MCBTestingSoftware(backend)
+    window.discovery_subnet = "127.0.0.0/24"
+    try:
+        started = time.perf_counter()
+        window.scan_for_controllers()
+        blocked = time.perf_counter() - started
+        assert blocked < 0.1, f"Scan blocked the GUI thread for {blocked:.2f}s"
+        assert not window.scan_btn.isEnabled() and window.discovery.running()
+        assert wait_for(lambda: window.scan_btn.isEnabled())
+        addresses = [address.strip() for address in window.ip_input.text().split(",")]
+        assert sorted(addresses) == sorted(f"{host}:{port}" for host, port in
+                                           [("127.0.0.23", bench[0].port), ("127.0.0.30", bench[2].port),
+                                            ("127.0.0.41", bench[3].port), ("127.0.0.57", bench[1].port)])
+        assert any(message.startswith("Found 4 controller(s)") for message in window.notifications.entries)
+        print(f"✅ Click returned in {blocked * 1000:.1f}ms; scan filled the address list: {window.ip_input.text()}")
+    finally:
+        discovery.PORT_PROFILES = default_profiles
+        window.close()
+        window.deleteLater()
+        for device in bench:
+            device.stop()
+
+    return True
+
+if __name__ == "__main__":
+    success = test_discover_subnet() and test_window_scan()
+
+    if success:
+        print("\n✅ Discovery test PASSED!")
+    else:
+        print("\n❌ Discovery test FAILED!")
+
+    print("\n✅ Test completed!")
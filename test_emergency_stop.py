@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the emergency STOP reaches the controller ahead of queued commands and GUI work
+"""
+
+import sys
+import time
+import socket
+import threading
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QTimer, QEventLoop
+
+class StreamingController:
+    """Streams samples as fast as the link takes them and timestamps every received line"""
+
+    def __init__(self):
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.bind(("127.0.0.1", 0))
+        self.listener.listen(1)
+        self.port = self.listener.getsockname()[1]
+        self.client = None
+        self.received = []  # (perf_counter, line)
+        self.running = True
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def run(self):
+        try:
+            self.client, _ = self.listener.accept()
+        except OSError:
+            return
+        threading.Thread(target=self.read, daemon=True).start()
+        timestamp = 0
+        try:
+            while self.running:
+                burst = []
+                for _ in range(200):
+                    timestamp += 100
+                    burst.append(f"{1000 + timestamp % 50},{timestamp}@")
+                self.client.sendall("".join(burst).encode())
+                time.sleep(0.002)
+        except OSError:
+            pass
+
+    def read(self):
+        buffer = ""
+        try:
+            while True:
+                data = self.client.recv(4096)
+                if not data:
+                    return
+                arrived = time.perf_counter()
+                buffer += data.decode()
+                while "\n" in buffer:
+                    line, buffer = buffer.split("\n", 1)
+                    self.received.append((arrived, line))
+                    self.client.sendall(b"ACK: " + line.encode() + b"\n")
+        except OSError:
+            pass
+
+    def lines(self):
+        return [line for _, line in self.received]
+
+    def stop(self):
+        self.running = False
+        if self.client:
+            self.client.close()
+        self.listener.close()
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        loop = QEventLoop()
+        QTimer.singleShot(20, loop.quit)
+        loop.exec_()
+    return condition()
+
+def test_stop_bypasses_busy_gui():
+    """STOP from another thread goes out while the GUI thread is blocked; stale commands are dropped"""
+
+    print("🧪 Testing Emergency Stop")
+    print("=" * 40)
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    from backend import ESP32Backend
+
+    controller = StreamingController()
+    backend = ESP32Backend("127.0.0.1", controller.port, timeout=2.0, reconnect_attempts=0)
+    stops = []
+    backend.emergency_stopped.connect(lambda reason, latency: stops.append((reason, latency)))
+    try:
+        assert backend.connect()
+        assert backend.client.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY), "TCP_NODELAY must be set"
+
+        # The GUI thread is stuck (a long redraw or a modal dialog) when a watchdog thread stops the test
+        clicked = []
+        def watchdog():
+            time.sleep(0.05)
+            clicked.append(time.perf_counter())
+            backend.emergency_stop("Watchdog")
+        threading.Thread(target=watchdog).start()
+        time.sleep(0.3)  # Busy GUI thread
+        assert "STOP" in controller.lines(), "STOP must not wait for the GUI thread"
+        arrived = next(t for t, line in controller.received if line == "STOP")
+        print(f"✅ STOP on the wire {(arrived - clicked[0]) * 1000:.2f}ms after the request, GUI thread busy")
+        assert arrived - clicked[0] < 0.1
+        assert wait_for(lambda: stops and stops[0][0] == "Watchdog")
+
+        # A command that was waiting to be written when the stop came is dropped, not sent after it
+        backend.send_lock.acquire()
+        queued = []
+        sender = threading.Thread(target=lambda: queued.append(backend.start_temperature_test(16)))
+        sender.start()
+        time.sleep(0.05)
+        stopper = threading.Thread(target=backend.emergency_stop)
+        stopper.start()
+        time.sleep(0.05)
+        backend.send_lock.release()
+        sender.join(2)
+        stopper.join(2)
+        assert queued == [False], "Command overtaken by the stop must be dropped"
+        assert wait_for(lambda: controller.lines().count("STOP") == 2)
+        assert not any(line.startswith("TEST:TEMPERATURE") for line in controller.lines())
+        print("✅ Command still waiting to be written was dropped by the stop")
+    finally:
+        backend.disconnect()
+        controller.stop()
+
+    return True
+
+def test_current_limit_trip():
+    """The receive loop stops the test itself, once, when the calculated current exceeds the limit"""
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    from backend import ESP32Backend
+
+    controller = StreamingController()
+    backend = ESP32Backend("127.0.0.1", controller.port, timeout=2.0, reconnect_attempts=0)
+    stops = []
+    backend.emergency_stopped.connect(lambda reason, latency: stops.append(reason))
+    try:
+        assert backend.connect()
+        backend.set_current_limit(10.0)
+        backend.start_short_circuit_test(1000, 0.8)
+        assert wait_for(lambda: "STOP" in controller.lines())
+        assert wait_for(lambda: len(stops) == 1)
+        assert stops[0].startswith("Current limit exceeded")
+        time.sleep(0.1)
+        assert controller.lines().count("STOP") == 1, "The limit trip is latched"
+        print(f"✅ Limit trip from the receive loop: {stops[0]}")
+
+        backend.start_short_circuit_test(1000, 0.8)  # A new test re-arms it
+        assert wait_for(lambda: controller.lines().count("STOP") == 2)
+    finally:
+        backend.disconnect()
+        controller.stop()
+
+    return True
+
+def test_process_backend_stop():
+    """The acquisition process writes STOP from its emergency thread, not behind queued requests"""
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    from acquisition_process import ProcessBackend
+
+    controller = StreamingController()
+    backend = ProcessBackend("127.0.0.1", controller.port, capacity=1 << 16)
+    stops = []
+    backend.emergency_stopped.connect(lambda reason, latency: stops.append(reason))
+    try:
+        backend.connect()
+        assert wait_for(lambda: backend.connected, timeout=15)
+        future = backend.stop_test()
+        assert future and wait_for(lambda: "STOP" in controller.lines())
+        assert wait_for(future.done) and future.result() == "ACK: STOP"
+        assert wait_for(lambda: stops == ["Operator stop"])
+        print("✅ STOP sent by the acquisition process and acknowledged")
+    finally:
+        backend.shutdown()
+        controller.stop()
+
+    return True
+
+def test_frontend_stop_finishes_once():
+    """An operator stop finishes the test once without an error; a limit trip finishes it with one"""
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    import frontend
+    from backend import ESP32Backend
+
+    controller = StreamingController()
+    backend = ESP32Backend("127.0.0.1", controller.port, timeout=2.0, reconnect_attempts=0)
+    window = frontend.MCBTestingSoftware(backend)
+    finished = []
+    banners = []
+    finish_test = window.finish_test
+    window.finish_test = lambda: (finished.append(window.test_running), finish_test())
+    notify = window.notifications.notify
+    window.notifications.notify = lambda message, level='error': (banners.append((level, message)),
+                                                                   notify(message, level))
+    information = frontend.QMessageBox.information
+    frontend.QMessageBox.information = lambda *args: None
+    try:
+        assert backend.connect()
+        window.current_test_name = "Short-Circuit Test"
+        window.test_running = True
+        window.stop_test()
+        assert wait_for(lambda: "STOP" in controller.lines())
+        app.processEvents()
+        assert len(finished) == 1, f"finish_test() ran {len(finished)} times for one operator stop"
+        assert not window.test_running
+        assert not [banner for banner in banners if banner[0] == 'error'], banners
+        print("✅ Operator stop finished the test once, without an error banner")
+
+        window.test_running = True
+        backend.set_current_limit(10.0)
+        backend.start_short_circuit_test(1000, 0.8)
+        assert wait_for(lambda: len(finished) == 2)
+        app.processEvents()
+        assert len(finished) == 2 and not window.test_running
+        assert any(level == 'error' and message.startswith("Test stopped: Current limit exceeded")
+                   for level, message in banners)
+        print("✅ Limit trip finished the test once, with an error banner")
+
+        backend.disconnect()
+        window.test_running = True
+        window.stop_test()
+        assert window.test_running and len(finished) == 2, "A STOP that was not sent leaves the test running"
+    finally:
+        frontend.QMessageBox.information = information
+        backend.disconnect()
+        controller.stop()
+        window.close()
+        window.deleteLater()
+
+    return True
+
+if __name__ == "__main__":
+    success = (test_stop_bypasses_busy_gui() and test_current_limit_trip() and test_process_backend_stop()
+               and test_frontend_stop_finishes_once())
+
+    if success:
+        print("\n✅ Emergency stop test PASSED!")
+    else:
+        print("\n❌ Emergency stop test FAILED!")
+
+    print("\n✅ Test completed!")
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the ESP32 simulator speaks each firmware's command set and injects faults
+"""
+
+import sys
+import time
+import socket
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QTimer, QEventLoop
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        loop = QEventLoop()
+        QTimer.singleShot(20, loop.quit)
+        loop.exec_()
+    return condition()
+
+def read_line(sock, timeout=2.0):
+    sock.settimeout(timeout)
+    data = b""
+    while not data.endswith(b"\r\n"):
+        data += sock.recv(1)
+    return data.decode().strip()
+
+def test_firmware_commands():
+    """Replies, relay paths and client rules match abcd.ino, esp32_controller.ino and esp32_receiver.ino"""
+
+    print("🧪 Testing ESP32 Simulator")
+    print("=" * 40)
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    from esp32_simulator import SimulatorFleet, scan_floats
+    from backend import ESP32Backend
+    from command_channel import CommandError
+
+    assert scan_floats("6.0,0.6", ("", ",")) == [6.0, 0.6]
+    assert scan_floats("1000.0", ("", ",")) == [1000.0], "sscanf stops at the missing comma"
+    assert scan_floats("R:25.5,L:0.03", ("R:", ",L:")) == [25.5, 0.03]
+    assert scan_floats("STATUS", ("", ",")) == []
+
+    with SimulatorFleet() as fleet:
+        abcd = fleet.add('abcd', rate=2000, capture_samples=50)
+        backend = ESP32Backend(abcd.host, abcd.port, timeout=2.0, reconnect_attempts=0)
+        samples = []
+        backend.real_time_waveform.connect(lambda data: samples.append(data['timestamp']))
+        try:
+            assert backend.connect()
+            assert backend.get_status().result(3) == "STATUS|Relay6:INACTIVE|Path_L:-1|Path_R:-1|LastCapture:0"
+            assert backend.send_command("R:25.0,L:0.03").result(3) == "ACK: R-L command processed."
+            assert backend.start_short_circuit_test(10, 0.8).result(3) == "ACK: Power Factor command processed."
+            assert isinstance(backend.send_command("BOGUS").exception(3), CommandError)
+            assert isinstance(backend.set_power_factor(10, 0.8).exception(3), CommandError), \
+                "abcd.ino cannot parse a lone number"
+            assert "Relay6:ACTIVE" in backend.get_status().result(3), "Auto-trigger after the power factor command"
+            time.sleep(0.3)
+            assert backend.get_status().result(3) == "STATUS|Relay6:INACTIVE|Path_L:0|Path_R:0|LastCapture:50"
+            assert wait_for(lambda: len(samples) > 200)
+            assert samples == sorted(samples)
+            print(f"✅ abcd.ino: replies, relay paths and {len(samples)} streamed samples")
+
+            # A second client takes the controller over
+            intruder = socket.create_connection((abcd.host, abcd.port))
+            assert wait_for(lambda: not backend.connected)
+            intruder.close()
+            assert abcd.kicked == 1
+            print("✅ abcd.ino dropped the connected client for a new one")
+        finally:
+            backend.disconnect()
+
+        controller = fleet.add('esp32_controller', rate=0)
+        first = socket.create_connection((controller.host, controller.port))
+        first.sendall(b"6.0,0.6\n")
+        assert read_line(first) == "Data received and processed."
+        # 230V / 6A at pf 0.6: R 23Ω, L 97.6 (XL / 0.31416) -> 70mH path, then 24Ω resistor
+        assert fleet.call(lambda: (controller.path_l, controller.path_r)) == (2, 1)
+        second = socket.create_connection((controller.host, controller.port))
+        second.sendall(b"STATUS\n")
+        try:
+            read_line(second, timeout=0.3)
+            assert False, "A second client waits while the first is connected"
+        except socket.timeout:
+            pass
+        first.close()
+        assert read_line(second) == "Data received and processed.", "STATUS is treated as a command"
+        second.close()
+        assert fleet.call(lambda: controller.received) == ["6.0,0.6", "STATUS"]
+        print("✅ esp32_controller.ino: any line acknowledged, one client at a time")
+
+        receiver = fleet.add('esp32_receiver')
+        udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        udp.settimeout(2)
+        udp.sendto(b"R:25,L:50", (receiver.host, receiver.port))
+        reply = udp.recv(1024).decode()
+        assert reply.startswith("CONFIRMATION:") and reply.endswith("R-L_CONFIG_COMPLETE")
+        assert "Actual R: 25.0000 Ohms" in reply and "Actual L: 50.0000 H" in reply
+        udp.sendto(b"6.0,0.6", (receiver.host, receiver.port))
+        try:
+            udp.recv(1024)
+            assert False, "Current,Pf is not answered over UDP"
+        except socket.timeout:
+            pass
+        udp.close()
+        print("✅ esp32_receiver.ino: UDP R-L confirmation")
+
+    return True
+
+def test_fault_injection():
+    """micros() wrap, sample loss and forced disconnects reach the backend as on a flaky bench"""
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    from esp32_simulator import SimulatorFleet
+    from backend import ESP32Backend
+
+    with SimulatorFleet() as fleet:
+        flaky = fleet.add('abcd', rate=2000, jitter_ms=5, loss=0.05, disconnect_every=0.3,
+                          micros_start=(1 << 32) - 200_000, seed=3)
+        backend = ESP32Backend(flaky.host, flaky.port, timeout=2.0, reconnect_attempts=5)
+        backend.reconnect_delay = lambda attempt: 0.05
+        samples = []
+        backend.real_time_waveform.connect(lambda data: samples.append(data['timestamp']))
+        try:
+            assert backend.connect()
+            assert wait_for(lambda: backend.connection_stats()['reconnects'] >= 1 and len(samples) > 1000)
+            stats = backend.connection_stats()
+            assert stats['clock']['wraps'] == 1
+            assert flaky.samples_lost > 0 and flaky.forced_disconnects >= 1
+            gaps = sum(1 for a, b in zip(samples, samples[1:]) if b - a > 500)
+            assert gaps > 0, "Lost samples leave gaps in the timestamps"
+            print(f"✅ {len(samples)} samples across a micros() wrap, {flaky.samples_lost} lost, "
+                  f"{flaky.forced_disconnects} forced disconnects, {stats['reconnects']} reconnects")
+        finally:
+            backend.disconnect()
+
+    return True
+
+def test_fleet_scale():
+    """Many simulated controllers serve a StationManager at once"""
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    from esp32_simulator import SimulatorFleet
+    from station_manager import StationManager
+
+    stations = 24
+    with SimulatorFleet() as fleet:
+        simulators = fleet.spawn(stations, 'abcd', rate=500)
+        manager = StationManager()
+        counts = {}
+        for index, simulator in enumerate(simulators):
+            backend = manager.add_station(f"bench{index}", simulator.host, simulator.port, reconnect_attempts=0)
+            backend.real_time_waveform.connect(
+                lambda data, name=index: counts.__setitem__(name, counts.get(name, 0) + 1))
+            backend.connect()
+        try:
+            assert wait_for(lambda: manager.connected_count() == stations)
+            assert wait_for(lambda: len(counts) == stations and min(counts.values()) > 100)
+            print(f"✅ {stations} simulated stations streaming, ≥{min(counts.values())} samples each")
+        finally:
+            manager.stop()
+
+    return True
+
+if __name__ == "__main__":
+    success = test_firmware_commands() and test_fault_injection() and test_fleet_scale()
+
+    if success:
+        print("\n✅ ESP32 simulator test PASSED!")
+    else:
+        print("\n❌ ESP32 simulator test FAILED!")
+
+    print("\n✅ Test completed!")
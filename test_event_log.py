@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the capped, batched event log model
+"""
+
+import os
+import sys
+import tempfile
+from PyQt5.QtWidgets import QApplication
+
+def test_event_log_batching_and_cap():
+    """Lines are batched per flush and the in-memory window stays capped"""
+
+    print("🧪 Testing Event Log Model")
+    print("=" * 40)
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    from event_log import EventLogModel
+
+    with tempfile.TemporaryDirectory() as log_dir:
+        model = EventLogModel(max_rows=100, log_directory=log_dir)
+        model.flush_timer.stop()  # Flush by hand
+        model.clear("Short-Circuit Test")
+
+        inserts = []
+        model.rowsInserted.connect(lambda parent, first, last: inserts.append(last - first + 1))
+
+        for i in range(250):
+            model.append(f"line {i}")
+
+        assert model.rowCount() == 0, "Lines should wait for the next flush"
+        model.flush()
+
+        print(f"✅ Insert batches: {inserts}")
+        assert inserts == [100], "All queued lines should arrive in one capped batch"
+        assert model.rowCount() == 100
+        assert model.rows[-1].endswith("line 249")
+
+        for i in range(250, 300):
+            model.append(f"line {i}")
+        model.flush()
+
+        assert model.rowCount() == 100, "Window must stay capped"
+        assert model.rows[0].endswith("line 200")
+        print(f"✅ In-memory window capped at {model.rowCount()} rows")
+
+        # Every line is kept in the on-disk tail
+        tail_path = model.tail_path
+        model.close_tail()
+        with open(tail_path, encoding="utf-8") as f:
+            tail_lines = f.read().splitlines()
+
+        print(f"✅ Tail file {os.path.basename(tail_path)}: {len(tail_lines)} lines")
+        assert len(tail_lines) == 300
+        assert tail_lines[0].endswith("line 0")
+
+    return True
+
+if __name__ == "__main__":
+    success = test_event_log_batching_and_cap()
+
+    if success:
+        print("\n✅ Event log test PASSED!")
+    else:
+        print("\n❌ Event log test FAILED!")
+
+    print("\n✅ Test completed!")
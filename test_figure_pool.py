@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Test script to verify PowerFactorWindow releases figures, canvases and timers on close
+"""
+
+import gc
+import sys
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QCoreApplication, QEvent
+
+def count_instances(cls):
+    return sum(1 for obj in gc.get_objects() if isinstance(obj, cls))
+
+def test_power_factor_window_memory_is_flat():
+    """Memory, figures and windows stay flat across 100 open/close cycles"""
+
+    print("🧪 Testing Figure Pool (100 open/close cycles)")
+    print("=" * 40)
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    from matplotlib.figure import Figure
+    from frontend import MCBTestingSoftware, PowerFactorWindow
+    from figure_pool import waveform_figure_pool
+
+    main_window = MCBTestingSoftware()
+    figures_before = count_instances(Figure)
+
+    def cycle():
+        main_window.show_power_factor_window(1000, 0.8)
+        window = main_window.pf_window
+        for i in range(50):
+            main_window.backend.real_time_waveform.emit(
+                {'voltage': float(i), 'current': float(i) / 2, 'timestamp': i * 100})
+        window.draw_waveform()
+        window.close()
+        QCoreApplication.sendPostedEvents(None, QEvent.DeferredDelete)
+        app.processEvents()
+
+    # Warm up caches (fonts, tick formatters, first canvas)
+    for _ in range(10):
+        cycle()
+    gc.collect()
+    baseline = sys.getallocatedblocks()
+
+    for _ in range(100):
+        cycle()
+    gc.collect()
+    growth = sys.getallocatedblocks() - baseline
+    figures = count_instances(Figure) - figures_before
+    windows = count_instances(PowerFactorWindow)
+    receivers = main_window.backend.receivers(main_window.backend.real_time_waveform)
+
+    print(f"✅ Python heap growth over 100 cycles: {growth} blocks")
+    print(f"✅ New live figures: {figures}, canvases created: {waveform_figure_pool.created}")
+    print(f"✅ Live PowerFactorWindow objects: {windows}, waveform receivers: {receivers}")
+
+    assert main_window.pf_window is None
+    assert waveform_figure_pool.created == 1, "The pooled canvas should be reused"
+    assert figures <= 1, "Figures must not accumulate"
+    assert windows == 0, "Closed windows must be released"
+    assert receivers == 1, "Only the main window should stay connected"
+    assert growth < 2000, "Memory should stay flat across cycles"
+
+    # Leave no widgets behind for tests that create their own QApplication
+    waveform_figure_pool.clear()
+    main_window.close()
+    main_window.deleteLater()
+    QCoreApplication.sendPostedEvents(None, QEvent.DeferredDelete)
+    # matplotlib's Qt backend caches the QApplication; drop it so the next
+    # script-style test can create its own
+    from matplotlib.backends import backend_qt
+    backend_qt._create_qApp.cache_clear()
+
+    return True
+
+if __name__ == "__main__":
+    success = test_power_factor_window_memory_is_flat()
+
+    if success:
+        print("\n✅ Figure pool test PASSED!")
+    else:
+        print("\n❌ Figure pool test FAILED!")
+
+    print("\n✅ Test completed!")
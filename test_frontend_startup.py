@@ -3,7 +3,9 @@
 Test script to verify frontend.py starts without errors
 """
 
+import os
 import sys
+import subprocess
 from PyQt5.QtWidgets import QApplication
 
 def test_frontend_startup():
@@ -31,11 +33,22 @@ def test_frontend_startup():
         print(f"❌ Error: {e}")
         return False
 
+def test_startup_stays_lazy():
+    """bench_startup.py: no heavy module (NumPy, matplotlib) is loaded before the first paint"""
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    result = subprocess.run([sys.executable, "bench_startup.py", "--runs", "1"],
+                            cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stdout[-500:] + result.stderr[-500:]
+    print("✅ Startup budget met with heavy modules deferred")
+    
+    return True
+
 if __name__ == "__main__":
     print("🧪 Testing Frontend Startup")
     print("=" * 30)
     
-    success = test_frontend_startup()
+    success = test_frontend_startup() and test_startup_stays_lazy()
     
     if success:
         print("\n🎉 All tests passed!")
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Test script to verify sample-to-pixel latency tracing from the socket to the drawn frame
+"""
+
+import sys
+import time
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QTimer, QEventLoop, QCoreApplication, QEvent
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        loop = QEventLoop()
+        QTimer.singleShot(20, loop.quit)
+        loop.exec_()
+    return condition()
+
+def test_tracer_legs():
+    """Each block's legs come from its own stamps; one frame closes every block delivered before it"""
+
+    print("🧪 Testing Latency Tracer")
+    print("=" * 40)
+
+    from latency_tracer import LatencyTracer
+
+    tracer = LatencyTracer(max_pending=3)
+    assert tracer.painted(10_000_000) is None, "No frame latency without a traced block"
+    tracer.delivered({'voltage': 1.0})
+    assert not tracer.pending, "Untraced samples are ignored"
+
+    ms = 1_000_000
+    tracer.delivered({'trace': (0, 1 * ms), 'host_ns': -20 * ms}, now_ns=3 * ms)
+    tracer.delivered({'trace': (10 * ms, 12 * ms), 'host_ns': 0}, now_ns=15 * ms)
+    latest = tracer.painted(now_ns=40 * ms)
+    assert latest == {'process': 2.0, 'deliver': 3.0, 'paint': 25.0, 'total': 30.0, 'sample_age': 40.0}
+    summary = tracer.summary()
+    assert summary['legs']['total']['count'] == 2 and summary['legs']['total']['max_us'] == 40_000
+    assert summary['legs']['paint']['max_us'] == 37_000, "The older block waited longer for the frame"
+    print(f"✅ Legs of the newest block: {latest}")
+
+    for i in range(5):
+        tracer.delivered({'trace': (i, i)}, now_ns=i)
+    assert len(tracer.pending) == 3, "Pending blocks are bounded while nothing is drawn"
+    tracer.reset()
+    assert tracer.summary()['latest_ms'] is None and not tracer.pending
+
+    return True
+
+def test_backend_stamps():
+    """With tracing on, exactly the last sample of each received block carries (recv, processed)"""
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    from backend import ESP32Backend
+
+    backend = ESP32Backend()
+    samples = []
+    backend.real_time_waveform.connect(samples.append)
+
+    def chunk(first):
+        return "".join(f"{2048 + i:.2f},{i * 1000}@" for i in range(first, first + 10)).encode()
+
+    backend.feed(chunk(0), 1_000)
+    assert not any('trace' in sample for sample in samples), "Tracing is off by default"
+
+    backend.enable_tracing(True)
+    before = time.monotonic_ns()
+    backend.feed(chunk(10), 5_000)
+    backend.feed(b"ACK: TRIGGER command received.\r\n", 6_000)
+    backend.feed(chunk(20), 7_000)
+    traced = [(index, sample['trace']) for index, sample in enumerate(samples) if 'trace' in sample]
+    assert [index for index, _ in traced] == [19, 29]
+    assert [trace[0] for _, trace in traced] == [5_000, 7_000], "recv stamp is the block's arrival"
+    assert all(trace[1] >= before for _, trace in traced), "processed stamp is taken after processing"
+
+    backend.enable_tracing(False)
+    backend.feed(chunk(30), 9_000)
+    assert 'trace' not in samples[-1]
+    print("✅ Backend stamps one sample per block while tracing")
+
+    return True
+
+def check_window_latency(backend, label):
+    """Open a PowerFactorWindow on a connected backend and wait for its latency readout"""
+    from frontend import PowerFactorWindow
+
+    window = PowerFactorWindow(10, 0.8, backend)
+    window.show()  # The latency is stamped when the canvas paints, so it has to be on screen
+    try:
+        tracer = window.latency_tracer
+        assert wait_for(lambda: tracer.histograms['total'].count > 20
+                        and window.latency_label.text().startswith("Display latency: ") and "p99" in
+                        window.latency_label.text())
+        summary = tracer.summary()
+        legs = summary['legs']
+        latest = summary['latest_ms']
+        assert legs['process']['count'] == legs['paint']['count'] == legs['total']['count']
+        assert abs(latest['process'] + latest['deliver'] + latest['paint'] - latest['total']) < 1e-6
+        assert min(latest.values()) >= 0, "All stamps are on one monotonic clock"
+        print(f"✅ {label}: {window.latency_label.text()}; "
+              f"process p50 {legs['process']['p50_us'] / 1000:.2f} ms, "
+              f"deliver p50 {legs['deliver']['p50_us'] / 1000:.2f} ms, "
+              f"paint p50 {legs['paint']['p50_us'] / 1000:.1f} ms")
+    finally:
+        window.close()
+        window.deleteLater()
+
+def test_window_latency():
+    """PowerFactorWindow shows the receive-to-drawn latency of the thread and process pipelines"""
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    from backend import ESP32Backend
+    from acquisition_process import ProcessBackend
+    from esp32_simulator import SimulatorFleet
+
+    with SimulatorFleet() as fleet:
+        simulator = fleet.add('abcd', rate=2000)
+
+        backend = ESP32Backend(simulator.host, simulator.port, reconnect_attempts=0)
+        try:
+            assert backend.connect()
+            assert not backend.tracing
+            check_window_latency(backend, "Receive thread")
+            assert not backend.tracing, "Closing the window stops tracing"
+        finally:
+            backend.disconnect()
+
+        backend = ProcessBackend(simulator.host, simulator.port, reconnect_attempts=0)
+        try:
+            backend.connect()
+            assert wait_for(lambda: backend.connected)
+            check_window_latency(backend, "Acquisition process")
+        finally:
+            backend.shutdown()
+
+    # Leave no widgets behind for tests that create their own QApplication
+    from figure_pool import waveform_figure_pool
+    from matplotlib.backends import backend_qt
+    waveform_figure_pool.clear()
+    QCoreApplication.sendPostedEvents(None, QEvent.DeferredDelete)
+    backend_qt._create_qApp.cache_clear()
+
+    return True
+
+if __name__ == "__main__":
+    success = test_tracer_legs() and test_backend_stamps() and test_window_latency()
+
+    if success:
+        print("\n✅ Latency tracer test PASSED!")
+    else:
+        print("\n❌ Latency tracer test FAILED!")
+
+    print("\n✅ Test completed!")
@@ -30,7 +30,7 @@ def test_command_formatting():
         
         # Create a mock client
         class MockClient:
-            def send(self, data):
+            def sendall(self, data):
                 sent_commands.append(data.decode('utf-8'))
                 return len(data)
         
@@ -86,7 +86,7 @@ def test_double_newline_prevention():
         sent_commands = []
         
         class MockClient:
-            def send(self, data):
+            def sendall(self, data):
                 sent_commands.append(data.decode('utf-8'))
                 return len(data)
         
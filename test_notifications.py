@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Test script to verify errors are queued in the non-modal notification area
+"""
+
+import sys
+from PyQt5.QtWidgets import QApplication
+
+def test_error_deduplication():
+    """Repeated errors collapse into one counted entry without modal dialogs"""
+
+    print("🧪 Testing Error Notifications")
+    print("=" * 40)
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    from frontend import MCBTestingSoftware
+
+    window = MCBTestingSoftware()
+
+    for _ in range(500):
+        window.backend.error_occurred.emit("Send error: [Errno 32] Broken pipe")
+    window.backend.error_occurred.emit("Not connected. Cannot send command.")
+
+    entries = window.notifications.entries
+    print(f"✅ Entries: {[(msg, e['count']) for msg, e in entries.items()]}")
+    assert len(entries) == 2, "Repeated errors should be de-duplicated"
+    assert entries["Send error: [Errno 32] Broken pipe"]['count'] == 500
+    assert window.fatal_dialog is None, "Errors outside a test must not escalate"
+
+    window.notifications.refresh()
+    shown = [b.text() for b in window.notifications.banners if not b.isHidden()]
+    print(f"✅ Banners: {shown}")
+    assert shown[0].startswith("⚠ Not connected"), "Most recent error is shown first"
+    assert "(×500)" in shown[1]
+
+    # Losing the link during a test is escalated once
+    window.test_running = True
+    window.backend.error_occurred.emit("Receive error: [Errno 104] Connection reset by peer")
+    window.backend.error_occurred.emit("Receive error: [Errno 104] Connection reset by peer")
+    assert window.fatal_dialog is not None and not window.fatal_dialog.isModal()
+    assert not window.test_running
+    print("✅ Connection loss during test escalated")
+
+    return True
+
+if __name__ == "__main__":
+    success = test_error_deduplication()
+
+    if success:
+        print("\n✅ Notification test PASSED!")
+    else:
+        print("\n❌ Notification test FAILED!")
+
+    print("\n✅ Test completed!")
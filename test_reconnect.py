@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Test script to verify dropped controller links are reconnected with bounded backoff
+"""
+
+import sys
+import math
+import time
+import socket
+import threading
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QTimer, QEventLoop
+
+class FlakyController:
+    """Accepts one client at a time and streams a 50Hz waveform until dropped"""
+
+    def __init__(self):
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind(("127.0.0.1", 0))
+        self.listener.listen(1)
+        self.port = self.listener.getsockname()[1]
+        self.client = None
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        timestamp = 0
+        while self.running:
+            try:
+                client, _ = self.listener.accept()
+            except OSError:
+                return
+            self.client = client
+            try:
+                while self.running and self.client is client:
+                    # Ten samples per 10ms: "voltage,timestamp@" on one device clock
+                    burst = []
+                    for _ in range(10):
+                        timestamp += 1000
+                        voltage = 1000 + 500 * math.sin(2 * math.pi * 50 * timestamp / 1e6)
+                        burst.append(f"{voltage:.2f},{timestamp}@")
+                    client.sendall("".join(burst).encode())
+                    time.sleep(0.01)
+            except OSError:
+                pass
+
+    def drop(self):
+        client, self.client = self.client, None
+        if client:
+            client.close()
+
+    def stop(self):
+        """Close the listener too, so reconnect attempts are refused"""
+        self.running = False
+        self.drop()
+        self.listener.close()
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        loop = QEventLoop()
+        QTimer.singleShot(20, loop.quit)
+        loop.exec_()
+    return condition()
+
+def test_backoff_delays():
+    """Exponential, capped and jittered into the upper half"""
+
+    print("🧪 Testing Reconnect")
+    print("=" * 40)
+
+    from backend import ESP32Backend
+
+    backend = ESP32Backend(reconnect_attempts=5)
+    for attempt in range(1, 12):
+        nominal = min(backend.reconnect_max_delay, backend.reconnect_base_delay * 2 ** (attempt - 1))
+        delays = [backend.reconnect_delay(attempt) for _ in range(50)]
+        assert all(nominal / 2 <= d <= nominal for d in delays)
+        assert len(set(delays)) > 1, "Delays must be jittered"
+    print(f"✅ Backoff {backend.reconnect_delay(1):.2f}s ... capped at {backend.reconnect_max_delay:.0f}s, jittered")
+
+    backend = ESP32Backend.from_config({'ip_address': '192.168.1.100', 'port': 5000,
+                                        'timeout': 5, 'reconnect_attempts': 3})
+    assert (backend.esp_ip, backend.port, backend.timeout, backend.reconnect_attempts) == \
+        ('192.168.1.100', 5000, 5.0, 3)
+    print("✅ Timeout and reconnect_attempts taken from the config file layout")
+
+    return True
+
+def test_reconnect_resumes_stream():
+    """A drop mid-test reconnects, keeps the captured cycle and the session, and is counted"""
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    from backend import ESP32Backend
+    from frontend import MCBTestingSoftware
+
+    controller = FlakyController()
+    backend = ESP32Backend("127.0.0.1", controller.port, timeout=2.0, reconnect_attempts=3)
+    backend.reconnect_base_delay = 0.1
+    window = MCBTestingSoftware(backend)
+    events = []
+    samples = []
+    backend.reconnecting.connect(lambda attempt, attempts, delay: events.append(('retry', attempt)))
+    backend.reconnect_finished.connect(lambda resumed, attempts, outage: events.append(('done', resumed)))
+    backend.connection_status_changed.connect(lambda connected, message: events.append(('status', connected)))
+    backend.real_time_waveform.connect(lambda data: samples.append(data['timestamp']))
+    try:
+        assert backend.connect()
+        assert wait_for(lambda: backend.cycle_captured and len(samples) > 200)
+        window.test_running = True
+        window.current_test_name = "Short-Circuit Breaking Capacity"
+
+        controller.drop()
+        assert wait_for(lambda: ('done', True) in events)
+        assert wait_for(lambda: events[-1] == ('status', True))
+        assert events[-4:] == [('retry', 1), ('status', False), ('done', True), ('status', True)]
+        assert backend.cycle_captured and backend.dc_offset is not None, "DSP state survives a short outage"
+        count = len(samples)
+        assert wait_for(lambda: len(samples) > count + 100), "Streaming must resume"
+        assert wait_for(lambda: window.link_resuming is False)
+        assert window.fatal_dialog is None, "A reconnected drop is not fatal"
+        assert len(window.waveform_history) > 0, "Session history kept across the reconnect"
+        stats = backend.connection_stats()
+        print(f"✅ Reconnected after drop: {stats['reconnects']} reconnect, {stats['downtime'] * 1000:.0f}ms downtime")
+        assert stats['link_drops'] == 1 and stats['reconnects'] == 1 and not stats['reconnecting']
+
+        # Controller gone for good: bounded attempts, then the drop is fatal
+        events.clear()
+        controller.stop()
+        assert wait_for(lambda: ('done', False) in events, timeout=15)
+        assert [e for e in events if e[0] == 'retry'] == [('retry', 1), ('retry', 2), ('retry', 3)]
+        assert wait_for(lambda: events[-1] == ('status', False)) and not backend.connected
+        assert wait_for(lambda: window.fatal_dialog is not None)
+        stats = backend.connection_stats()
+        assert stats['link_drops'] == 2 and stats['reconnect_attempts'] == 4 and not stats['reconnecting']
+        print(f"✅ Gave up after 3 attempts; {stats['downtime']:.2f}s total downtime reported")
+    finally:
+        window.test_running = False
+        backend.disconnect()
+        window.close()
+        window.deleteLater()
+        controller.stop()
+
+    return True
+
+if __name__ == "__main__":
+    success = test_backoff_delays() and test_reconnect_resumes_stream()
+
+    if success:
+        print("\n✅ Reconnect test PASSED!")
+    else:
+        print("\n❌ Reconnect test FAILED!")
+
+    print("\n✅ Test completed!")
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Test script to verify bounded per-sample buffers and the soak harness's growth checks
+"""
+
+import os
+import sys
+import json
+import tempfile
+import tracemalloc
+import subprocess
+from PyQt5.QtWidgets import QApplication
+
+def run_soak(*options):
+    """Short bench_soak.py run; returns (exit code, JSON report)"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "soak.json")
+        env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+        result = subprocess.run([sys.executable, "bench_soak.py", "--duration", "8", "--warmup", "2",
+                                 "--interval", "1", "--snapshot-every", "3", "--reopen-every", "3",
+                                 "--trigger-every", "2", "--session-minutes", "0.07", "--rate", "500",
+                                 "--json", path, *options],
+                                cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+                                capture_output=True, text=True, timeout=120)
+        with open(path) as f:
+            return result.returncode, json.load(f)
+
+def test_bounded_buffers():
+    """The backend keeps a fixed RMS window; the session history reports its storage"""
+
+    print("🧪 Testing Soak Harness")
+    print("=" * 40)
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    from backend import ESP32Backend, RMS_WINDOW
+    from waveform_history import WaveformHistory
+
+    backend = ESP32Backend()
+    currents = []
+    backend.real_time_waveform.connect(lambda data: currents.append(data['current']))
+    backend.feed("".join(f"{2048 + (i % 20) * 50:.2f},{i * 1000}@" for i in range(5000)).encode())
+    assert len(currents) == 5000
+    assert len(backend.voltage_readings) == len(backend.timestamps) == RMS_WINDOW
+    assert currents[-1] != 0.0, "Current is still calculated from the RMS window"
+    print(f"✅ 5000 samples kept {len(backend.voltage_readings)} voltage readings")
+
+    history = WaveformHistory()
+    empty = history.nbytes
+    assert history.written_nbytes == 0
+    tracemalloc.start()
+    try:
+        traced = tracemalloc.get_traced_memory()[0]
+        for i in range(20000):
+            history.add_sample(i / 1000, 1.0, 2.0)
+        history.flush()
+        traced = tracemalloc.get_traced_memory()[0] - traced
+    finally:
+        tracemalloc.stop()
+    written = history.written_nbytes
+    assert 20000 * 8 + 2 * 20000 * 4 <= written < 20000 * 8 * 3, "Samples plus about a third for the pyramid"
+    assert history.nbytes >= written, "Capacity includes the spare room of doubled arrays"
+    assert traced < written / 4, f"{traced} bytes traced: the arrays are mapped, not malloc'd"
+    history.clear()
+    assert history.nbytes == empty and history.written_nbytes == 0
+    print(f"✅ History storage: {written} bytes written ({traced} traced), {empty} bytes empty, "
+          f"back to it after clear()")
+
+    return True
+
+def test_soak_run():
+    """A short soak drives reopens, triggers and sessions and reports every series"""
+
+    code, report = run_soak("--max-rss-mb-per-hour", "1e9", "--max-traced-mb-per-hour", "1e9",
+                            "--max-objects-per-hour", "1e12", "--max-frame-ms-per-hour", "1e12")
+    assert code == 0, report['checks']
+    assert set(report['checks']) == {'rss_mb', 'traced_mb', 'objects', 'frame_p99_ms'}
+    # Frames take several hundred ms under tracemalloc, so a one-second interval may have none
+    assert all(report['checks'][key]['slope_per_hour'] is not None for key in ('rss_mb', 'traced_mb', 'objects'))
+    assert report['sessions'] >= 2 and report['reopens'] >= 1 and report['triggers'] >= 1
+    assert not report['errors'], report['errors']
+    assert report['top_lines'], "tracemalloc growth is attributed to source lines"
+    assert len(report['samples']) >= 4 and max(sample['delivered_per_s'] for sample in report['samples']) > 0
+    print(f"✅ {len(report['samples'])} measurements, {report['sessions']} sessions, "
+          f"{report['reopens']} reopens, {report['triggers']} triggers")
+
+    return True
+
+def test_soak_catches_leak():
+    """An injected leak fails the RSS slope"""
+
+    code, report = run_soak("--no-tracemalloc", "--leak-kb-per-second", "8192",
+                            "--max-objects-per-hour", "1e12", "--max-frame-ms-per-hour", "1e12")
+    assert code == 1
+    rss = report['checks']['rss_mb']
+    assert not rss['passed'] and rss['slope_per_hour'] > 8 * 3600 / 2, rss
+    assert report['checks']['traced_mb']['slope_per_hour'] is None, "Nothing traced with --no-tracemalloc"
+    print(f"✅ Injected 8 MB/s leak measured at {rss['slope_per_hour']:,.0f} MB/h")
+
+    return True
+
+if __name__ == "__main__":
+    success = test_bounded_buffers() and test_soak_run() and test_soak_catches_leak()
+
+    if success:
+        print("\n✅ Soak harness test PASSED!")
+    else:
+        print("\n❌ Soak harness test FAILED!")
+
+    print("\n✅ Test completed!")
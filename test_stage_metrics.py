@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Test script to verify per-stage hot-path metrics and the diagnostics panel
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QTimer, QEventLoop, QCoreApplication, QEvent
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        loop = QEventLoop()
+        QTimer.singleShot(20, loop.quit)
+        loop.exec_()
+    return condition()
+
+def stream(first, count, junk=""):
+    """count samples of "voltage,micros@" starting at sample `first` (1kHz)"""
+    return ("".join(f"{2048 + (i % 20) * 10:.2f},{i * 1000}@" for i in range(first, first + count)) + junk).encode()
+
+def test_histogram():
+    """Log-linear buckets keep percentiles within 25%; rates come from snapshot differences"""
+
+    print("🧪 Testing Stage Metrics")
+    print("=" * 40)
+
+    from stage_metrics import LatencyHistogram, StageMetrics, rates
+
+    histogram = LatencyHistogram()
+    for us in range(1, 10001):
+        histogram.record(us * 1000)
+    summary = histogram.summary()
+    assert summary['count'] == 10000 and summary['max_us'] == 10000
+    assert abs(summary['mean_us'] - 5000.5) < 1e-6, "Mean is exact"
+    assert 5000 <= summary['p50_us'] <= 5000 * 1.25
+    assert 9900 <= summary['p99_us'] <= 10000
+    histogram.record(-5)
+    assert histogram.percentile_ns(0.0) == 0, "Clock steps backwards count as zero"
+    print(f"✅ Histogram p50 {summary['p50_us']:.0f}µs, p99 {summary['p99_us']:.0f}µs of a uniform 1-10000µs")
+
+    metrics = StageMetrics()
+    metrics.count('samples', 10)
+    first = metrics.snapshot()
+    metrics.count('samples', 100)
+    time.sleep(0.05)
+    second = metrics.snapshot()
+    per_second = rates(first, second)['samples']
+    assert 100 / (second['elapsed_s'] - first['elapsed_s']) == per_second
+    assert rates(second, second) == {}
+    json.dumps(second)
+    print(f"✅ Rates from snapshots: {per_second:,.0f} samples/s")
+
+    return True
+
+def test_backend_stages():
+    """ESP32Backend times every stage when enabled and records nothing when disabled"""
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    from backend import ESP32Backend
+    from stage_metrics import BACKEND_STAGES
+
+    backend = ESP32Backend()
+    backend.feed(stream(0, 100))
+    snapshot = backend.metrics_snapshot()
+    assert not snapshot['enabled'] and snapshot['counters'] == {}
+    assert all(stage['count'] == 0 for stage in snapshot['stages'].values())
+
+    backend.enable_metrics(True)
+    chunk = stream(100, 200, junk="1,2,3@")
+    backend.feed(chunk)
+    backend.feed(stream(300, 100))
+    snapshot = backend.metrics_snapshot()
+    assert snapshot['counters'] == {'chunks': 2, 'bytes': len(chunk) + len(stream(300, 100)),
+                                    'samples': 300, 'parse_errors': 1}
+    assert snapshot['stages']['parse']['count'] == 2
+    for stage in BACKEND_STAGES[1:]:
+        assert snapshot['stages'][stage]['count'] == 300, stage
+    print("✅ Backend: " + ", ".join(f"{stage} {snapshot['stages'][stage]['mean_us']:.1f}µs"
+                                     for stage in BACKEND_STAGES))
+
+    backend.enable_metrics(False)
+    backend.feed(stream(400, 100))
+    assert backend.metrics_snapshot()['counters']['samples'] == 300, "Nothing counted once disabled"
+    backend.enable_metrics(True)
+    assert backend.metrics_snapshot()['counters'] == {}, "Enabling starts from zero"
+
+    # Cost left in the hot path while disabled: compare with an enabled run
+    backend.enable_metrics(False)
+    data = stream(500, 5000)
+    started = time.perf_counter()
+    backend.feed(data)
+    disabled = time.perf_counter() - started
+    backend.enable_metrics(True)
+    data = stream(5500, 5000)
+    started = time.perf_counter()
+    backend.feed(data)
+    enabled = time.perf_counter() - started
+    print(f"✅ 5000 samples: {disabled * 1e3:.1f}ms disabled, {enabled * 1e3:.1f}ms enabled")
+
+    return True
+
+def test_diagnostics_panel():
+    """The panel shows rates, errors, queue depth and frame time, and exports them as JSON"""
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    from backend import ESP32Backend
+    from frontend import MCBTestingSoftware
+    from stage_metrics import gui_metrics
+
+    backend = ESP32Backend()
+    window = MCBTestingSoftware(backend)
+    window.show_diagnostics_window()
+    panel = window.diagnostics_window
+    assert backend.metrics.enabled and gui_metrics.enabled
+
+    window.show_power_factor_window(10, 0.8)
+    backend.feed(stream(0, 500, junk="7,8,9@"))
+    backend.feed(stream(500, 500))
+    window.pf_window.draw_waveform()
+    panel.refresh()
+    report = panel.report()
+    assert report['backend']['counters']['samples'] == 1000
+    assert report['gui']['counters']['delivered'] == 1000, "ESP32Backend signals are delivered directly here"
+    assert report['queue_depth'] == 0
+    assert report['gui']['stages']['frame']['count'] >= 1
+    assert report['rates']['samples'] > 0
+    assert panel.value_labels['parse_errors'].text() == "1"
+    assert panel.value_labels['frame'].text().endswith(" ms")
+    assert "cycle_loop" in panel.stage_table.text() and "frame" in panel.stage_table.text()
+    print(f"✅ Panel: {panel.value_labels['samples'].text()} samples/s, "
+          f"frame {panel.value_labels['frame'].text()} (p50 / p99)")
+
+    with tempfile.TemporaryDirectory() as directory:
+        from stage_metrics import export_json
+        path = os.path.join(directory, "nested", "diagnostics.json")
+        export_json(path, panel.report())
+        with open(path) as f:
+            exported = json.load(f)
+        assert exported['backend']['counters']['parse_errors'] == 1
+        assert set(exported) >= {'backend', 'gui', 'rates', 'queue_depth', 'connection', 'commands'}
+    print("✅ Report exported as JSON")
+
+    window.pf_window.close()
+    panel.close()
+    assert not backend.metrics.enabled and not gui_metrics.enabled, "Closing the panel stops collection"
+
+    # Leave no widgets behind for tests that create their own QApplication
+    from figure_pool import waveform_figure_pool
+    from matplotlib.backends import backend_qt
+    waveform_figure_pool.clear()
+    window.close()
+    window.deleteLater()
+    QCoreApplication.sendPostedEvents(None, QEvent.DeferredDelete)
+    backend_qt._create_qApp.cache_clear()
+
+    return True
+
+def test_process_backend_metrics():
+    """The acquisition process reports its stage metrics while they are enabled"""
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    from acquisition_process import ProcessBackend
+    from esp32_simulator import SimulatorFleet
+
+    with SimulatorFleet() as fleet:
+        simulator = fleet.add('abcd', rate=2000)
+        backend = ProcessBackend(simulator.host, simulator.port, reconnect_attempts=0)
+        try:
+            backend.connect()
+            assert wait_for(lambda: backend.connected, timeout=10)
+            assert not backend.metrics_snapshot()['enabled']
+            backend.enable_metrics(True)
+            assert wait_for(lambda: backend.metrics_snapshot()['counters'].get('samples', 0) > 500)
+            snapshot = backend.metrics_snapshot()
+            assert snapshot['enabled'] and snapshot['stages']['emit']['count'] > 0
+            print(f"✅ Acquisition process: {snapshot['counters']['samples']} samples timed, "
+                  f"emit (ring write) p99 {snapshot['stages']['emit']['p99_us']:.1f}µs, backlog {backend.backlog()}")
+        finally:
+            backend.shutdown()
+
+    return True
+
+if __name__ == "__main__":
+    success = (test_histogram() and test_backend_stages() and test_diagnostics_panel()
+               and test_process_backend_metrics())
+
+    if success:
+        print("\n✅ Stage metrics test PASSED!")
+    else:
+        print("\n❌ Stage metrics test FAILED!")
+
+    print("\n✅ Test completed!")
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Test script to verify one StationManager thread drives many controller connections
+"""
+
+import sys
+import time
+import socket
+import selectors
+import threading
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QTimer, QEventLoop
+
+STATIONS = 24
+
+class FakeBenches:
+    """N listening sockets; each accepted bench streams its own constant voltage"""
+
+    def __init__(self, count):
+        self.listeners = []
+        self.received = {}  # bench index -> bytes from the station
+        self.clients = {}
+        self.drops = set()  # Bench indices whose client the bench thread should close
+        for i in range(count):
+            listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            listener.bind(("127.0.0.1", 0))
+            listener.listen(1)
+            listener.setblocking(False)
+            self.listeners.append(listener)
+            self.received[i] = b""
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def port(self, i):
+        return self.listeners[i].getsockname()[1]
+
+    def run(self):
+        selector = selectors.DefaultSelector()
+        for i, listener in enumerate(self.listeners):
+            selector.register(listener, selectors.EVENT_READ, ("listen", i))
+        timestamp = 0
+        while self.running:
+            for key, _ in selector.select(timeout=0.01):
+                kind, i = key.data
+                if kind == "listen":
+                    client, _ = key.fileobj.accept()
+                    self.clients[i] = client
+                    selector.register(client, selectors.EVENT_READ, ("client", i))
+                else:
+                    try:
+                        data = key.fileobj.recv(4096)
+                    except OSError:
+                        data = b""
+                    if not data:
+                        selector.unregister(key.fileobj)
+                        self.clients.pop(i, None)
+                    self.received[i] += data
+            for i in list(self.drops):
+                self.drops.discard(i)
+                client = self.clients.pop(i, None)
+                if client:
+                    selector.unregister(client)
+                    client.close()
+            timestamp += 10000
+            for i, client in list(self.clients.items()):
+                # Ten samples per 10ms tick: "voltage,timestamp@"
+                burst = "".join(f"{100 + i},{timestamp + k * 1000}@" for k in range(10))
+                try:
+                    client.sendall(burst.encode())
+                except OSError:
+                    pass
+
+    def drop(self, i):
+        self.drops.add(i)
+
+    def stop(self):
+        self.running = False
+        self.thread.join(timeout=2)
+        for client in self.clients.values():
+            client.close()
+        for listener in self.listeners:
+            listener.close()
+
+def wait_for(app, condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        loop = QEventLoop()
+        QTimer.singleShot(20, loop.quit)
+        loop.exec_()
+    return condition()
+
+def test_station_manager_scales():
+    """24 stations on one loop thread, each with its own pipeline and signals"""
+
+    print("🧪 Testing Station Manager")
+    print("=" * 40)
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    from station_manager import StationManager
+
+    benches = FakeBenches(STATIONS)
+    threads_before = threading.active_count()
+    manager = StationManager(connect_timeout=5.0)
+
+    samples = {}
+    statuses = []
+    manager.station_status_changed.connect(lambda name, connected, message: statuses.append((name, connected)))
+    backends = []
+    for i in range(STATIONS):
+        name = f"Bench{i:02d}"
+        backend = manager.add_station(name, "127.0.0.1", benches.port(i))
+        samples[name] = []
+        backend.real_time_waveform.connect(
+            lambda data, name=name: samples[name].append(data['raw_voltage']))
+        backends.append(backend)
+
+    start = time.perf_counter()
+    for backend in backends:
+        backend.connect()
+    assert wait_for(app, lambda: manager.connected_count() == STATIONS)
+    print(f"✅ {STATIONS} stations connected in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+    threads_used = threading.active_count() - threads_before
+    print(f"✅ Threads added for {STATIONS} stations: {threads_used}")
+    assert threads_used == 1, "All stations must share the single manager thread"
+
+    assert wait_for(app, lambda: all(len(v) >= 200 for v in samples.values()))
+    for i, backend in enumerate(backends):
+        values = samples[backend.station_name]
+        assert set(values) == {100.0 + i}, "Samples must reach only their own station"
+    total = sum(len(v) for v in samples.values())
+    print(f"✅ {total:,} samples routed to the right stations")
+
+    # Commands go out on each station's own socket
+    backends[3].send_command("STATUS")
+    backends[17].send_command("TRIGGER")
+    assert wait_for(app, lambda: benches.received[3] == b"STATUS\n" and benches.received[17] == b"TRIGGER\n")
+    assert benches.received[4] == b""
+    print("✅ Commands delivered per station")
+
+    # A bench dropping the link only affects its own station, which reconnects
+    benches.drop(5)
+    assert wait_for(app, lambda: ("Bench05", False) in statuses)
+    assert all(backend.connected for i, backend in enumerate(backends) if i != 5)
+    assert wait_for(app, lambda: backends[5].connected and statuses[-1] == ("Bench05", True))
+    samples["Bench05"].clear()
+    assert wait_for(app, lambda: len(samples["Bench05"]) >= 50)
+    stats = backends[5].connection_stats()
+    assert stats['link_drops'] == 1 and stats['reconnects'] == 1 and stats['downtime'] > 0
+    assert backends[6].connection_stats()['link_drops'] == 0
+    print(f"✅ Dropped bench reconnected after {stats['downtime']:.2f}s, the others stayed online")
+
+    backends[0].disconnect()
+    assert wait_for(app, lambda: not backends[0].connected)
+
+    manager.stop()
+    benches.stop()
+    assert manager.connected_count() == 0
+    assert not manager.thread
+
+    return True
+
+def test_station_session_and_writes():
+    """A fresh station session restarts the device clock; station writes survive a full send buffer"""
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    from station_manager import StationManager
+    from backend import send_all
+
+    # Non-blocking socket with a full send buffer: sendall() would raise after a partial write
+    writer, reader = socket.socketpair()
+    writer.setblocking(False)
+    data = bytes(range(256)) * 16384  # 4 MB, far more than the socket buffers hold
+    try:
+        send_all(writer, data, 0.2)
+        assert False, "Nothing reads: the write must time out"
+    except socket.timeout:
+        pass
+    writer.close()
+    reader.close()
+
+    writer, reader = socket.socketpair()
+    writer.setblocking(False)
+    received = []
+    def drain():
+        while True:
+            chunk = reader.recv(65536)
+            if not chunk:
+                break
+            received.append(chunk)
+    drainer = threading.Thread(target=drain, daemon=True)
+    drainer.start()
+    send_all(writer, data, 5.0)
+    writer.close()
+    drainer.join(timeout=5)
+    reader.close()
+    assert b"".join(received) == data, "Every byte arrives in order across partial writes"
+    print("✅ send_all() waits for room in a non-blocking socket's send buffer")
+
+    manager = StationManager(connect_timeout=5.0)
+    benches = FakeBenches(1)
+    backend = manager.add_station("Bench00", "127.0.0.1", benches.port(0), reconnect_attempts=0)
+    samples = []
+    backend.real_time_waveform.connect(samples.append)
+    try:
+        backend.connect()
+        assert wait_for(app, lambda: len(samples) >= 100)
+        backend.disconnect()
+        assert wait_for(app, lambda: not backend.connected)
+        benches.stop()
+
+        # Another controller on the same address: its micros() starts over
+        benches = FakeBenches(1)
+        backend.port = benches.port(0)
+        samples.clear()
+        backend.connect()
+        assert wait_for(app, lambda: len(samples) >= 100)
+        clock = backend.connection_stats()['clock']
+        assert clock['restarts'] == 0, "A new session must not continue the previous clock fit"
+        assert samples[0]['timestamp'] < 1_000_000, "Device time starts over with the session"
+        print(f"✅ Fresh station session restarted the device clock ({clock['fit_points']} fit points)")
+    finally:
+        manager.stop()
+        benches.stop()
+
+    return True
+
+if __name__ == "__main__":
+    success = test_station_manager_scales() and test_station_session_and_writes()
+
+    if success:
+        print("\n✅ Station manager test PASSED!")
+    else:
+        print("\n❌ Station manager test FAILED!")
+
+    print("\n✅ Test completed!")
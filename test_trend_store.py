@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the on-disk trend store and its 1 s / 10 s / 60 s rollups
+"""
+
+import os
+import time
+import tempfile
+import numpy as np
+
+def test_rollups_match_raw():
+    """Incremental rollups equal min/max/mean of the raw samples in each bucket"""
+
+    print("🧪 Testing Trend Store")
+    print("=" * 40)
+
+    from trend_store import TrendStore
+
+    rng = np.random.default_rng(5)
+    # Four-hour temperature-rise run sampled at 2 Hz
+    t = np.arange(0, 4 * 3600, 0.5) + rng.uniform(0, 0.01, 4 * 3600 * 2)
+    temperature = 25 + 40 * (1 - np.exp(-t / 1800)) + rng.normal(0, 0.2, len(t))
+    current = 16 + rng.normal(0, 0.05, len(t))
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "trends", "run.sqlite")
+        store = TrendStore(path, batch_size=777)  # Flushes land mid-bucket
+        start = time.perf_counter()
+        for ti, temp, cur in zip(t, temperature, current):
+            store.add(float(ti), {'temperature': temp, 'current': cur})
+        store.flush()
+        per_sample_us = (time.perf_counter() - start) / len(t) * 1e6
+        print(f"✅ Ingested {len(t):,} samples x 2 channels ({per_sample_us:.1f}µs per sample)")
+
+        for resolution in (1, 10, 60):
+            buckets = (t // resolution).astype(int)
+            rows = store.conn.execute(
+                "SELECT bucket, vmin, vmax, vsum, count FROM rollup WHERE channel = 'temperature' "
+                "AND resolution = ? ORDER BY bucket", (resolution,)).fetchall()
+            assert len(rows) == len(np.unique(buckets))
+            for bucket, vmin, vmax, vsum, count in rows[::97]:
+                chunk = temperature[buckets == bucket]
+                assert count == len(chunk)
+                assert abs(vmin - chunk.min()) < 1e-9 and abs(vmax - chunk.max()) < 1e-9
+                assert abs(vsum / count - chunk.mean()) < 1e-9
+            print(f"✅ {resolution:>2} s rollups: {len(rows):,} buckets match the raw samples")
+        trend = store.query('temperature', 0, t[-1], max_points=14400)
+        assert trend['resolution'] == 1 and len(trend['t']) == 14400
+
+        # Whole run for a trend plot: coarse enough to stay under max_points
+        trend = store.query('temperature', max_points=2000)
+        print(f"✅ Whole run: {len(trend['t'])} points at {trend['resolution']} s")
+        assert trend['resolution'] == 10 and len(trend['t']) <= 2000
+        assert min(trend['min']) == temperature.min() and max(trend['max']) == temperature.max()
+
+        trend = store.query('temperature', max_points=200)
+        assert trend['resolution'] == 60 and len(trend['t']) == 240
+
+        trend = store.query('current', 600, 1200, max_points=1000)
+        assert trend['resolution'] == 1 and len(trend['t']) == 601
+
+        trend = store.query('current', 100, 110, max_points=2000)
+        assert trend['resolution'] == 0 and len(trend['t']) == len(store.raw('current', 100, 110))
+        print("✅ Short windows fall back to raw samples")
+
+        store.close()
+        reopened = TrendStore(path)
+        assert sorted(reopened.channels()) == ['current', 'temperature']
+        assert reopened.query('temperature', max_points=200)['resolution'] == 60
+        reopened.close()
+
+    return True
+
+def test_block_extend():
+    """extend() writes the same raw rows and rollups as add() per sample, blocks split mid-bucket"""
+
+    from trend_store import TrendStore
+
+    rng = np.random.default_rng(7)
+    t = np.cumsum(rng.uniform(0.0005, 0.0015, 30000))
+    current = rng.normal(10, 2, len(t))
+    voltage = rng.normal(230, 5, len(t))
+
+    with tempfile.TemporaryDirectory() as directory:
+        per_sample = TrendStore(os.path.join(directory, "add.sqlite"), batch_size=333)
+        for ti, cur, volt in zip(t, current, voltage):
+            per_sample.add(float(ti), {'current': cur, 'voltage': volt})
+        blocks = TrendStore(os.path.join(directory, "extend.sqlite"), batch_size=333)
+        start = time.perf_counter()
+        edges = [0, *sorted(rng.choice(len(t), 40, replace=False)), len(t)]
+        for first, last in zip(edges, edges[1:]):
+            blocks.extend(t[first:last], {'current': current[first:last], 'voltage': voltage[first:last]})
+        blocks.extend([], {'current': []})
+        per_sample_us = (time.perf_counter() - start) / len(t) * 1e6
+        assert blocks.samples == per_sample.samples == len(t)
+
+        for store in (per_sample, blocks):
+            store.flush()
+        select = "SELECT channel, resolution, bucket, vmin, vmax, vsum, count FROM rollup ORDER BY 1, 2, 3"
+        expected = per_sample.conn.execute(select).fetchall()
+        actual = blocks.conn.execute(select).fetchall()
+        assert len(actual) == len(expected)
+        for row, reference in zip(actual, expected):
+            assert row[:3] == reference[:3] and row[6] == reference[6]
+            assert all(abs(a - b) < 1e-6 for a, b in zip(row[3:6], reference[3:6]))
+        assert blocks.raw('voltage', 0, 1) == per_sample.raw('voltage', 0, 1)
+        print(f"✅ {len(edges) - 1} blocks match per-sample add() ({per_sample_us:.1f}µs per sample)")
+        per_sample.close()
+        blocks.close()
+
+    return True
+
+def test_trend_report():
+    """The trend report reads rollups, not the raw stream, for a long run"""
+
+    from trend_store import TrendStore
+    from analysis_executor import trend_report, JobContext
+
+    t = np.arange(0, 2 * 3600, 0.1)
+    with tempfile.TemporaryDirectory() as directory:
+        store_path = os.path.join(directory, "run.sqlite")
+        store = TrendStore(store_path)
+        store.extend(t, {'current': 16 + np.sin(t / 600), 'voltage': np.full(len(t), 230.0)})
+        store.close()
+
+        path = os.path.join(directory, "reports", "run_trend.png")
+        result = trend_report(JobContext(1, 0), store_path, path, title="Temperature Rise - Trend")
+        assert os.path.getsize(path) > 0
+        assert result['resolution'] == 10 and result['points'] == 2 * 720
+        print(f"✅ Trend report of {len(t):,} samples per channel drawn from {result['points']} rollup rows")
+
+        empty_path = os.path.join(directory, "empty.sqlite")
+        TrendStore(empty_path).close()
+        assert trend_report(JobContext(2, 0), empty_path, path)['path'] is None
+
+    return True
+
+def test_frontend_trend_feed():
+    """The main window queues waveform samples and writes them in blocks keyed by host time"""
+
+    import sys
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication(sys.argv)
+    from backend import ESP32Backend
+    from frontend import MCBTestingSoftware
+
+    backend = ESP32Backend()
+    window = MCBTestingSoftware(backend)
+    samples = []
+    backend.real_time_waveform.connect(samples.append)
+    window.open_trend_store("Trend Feed")
+    store = window.trend_store
+    backend.feed("".join(f"{2048 + i % 20:.2f},{i * 1000}@" for i in range(2000)).encode())
+    assert store.samples == 0 and len(window.trend_pending) == 2000, "Samples wait for the flush timer"
+    window.flush_trend()
+    assert store.samples == 2000 and not window.trend_pending
+    assert sorted(store.channels()) == ['current', 'voltage'], "No placeholder temperature channel"
+    first = store.raw('current', float('-inf'), float('inf'))[0]
+    assert abs(first[0] - (samples[0]['host_ns'] - window.trend_start_ns) / 1e9) < 1e-6, \
+        "Trend time comes from the sample's host_ns"
+    path = window.close_trend_store()
+    assert os.path.exists(path) and window.trend_store is None and not window.trend_timer.isActive()
+    assert window.close_trend_store() is None
+    os.remove(path)
+    print("✅ 2000 samples written in one block, keyed by host time")
+    window.close()
+
+    return True
+
+if __name__ == "__main__":
+    success = (test_rollups_match_raw() and test_block_extend() and test_trend_report()
+               and test_frontend_trend_feed())
+
+    if success:
+        print("\n✅ Trend store test PASSED!")
+    else:
+        print("\n❌ Trend store test FAILED!")
+
+    print("\n✅ Test completed!")
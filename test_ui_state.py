@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Test script to verify that bound labels are updated once per frame and only when they change
+"""
+
+import sys
+import time
+from PyQt5.QtWidgets import QApplication, QLabel
+from PyQt5.QtCore import QTimer, QEventLoop
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        loop = QEventLoop()
+        QTimer.singleShot(5, loop.quit)
+        loop.exec_()
+    return condition()
+
+class CountingLabel(QLabel):
+    """QLabel that records every text and style sheet it is given"""
+
+    def __init__(self, text=""):
+        super().__init__(text)
+        self.texts = []
+        self.styles = []
+
+    def setText(self, text):
+        self.texts.append(text)
+        super().setText(text)
+
+    def setStyleSheet(self, style):
+        self.styles.append(style)
+        super().setStyleSheet(style)
+
+def test_changed_values_only():
+    """Many set() calls between frames cost one setText; styles are only set on a state change"""
+
+    print("🧪 Testing UI State Binder")
+    print("=" * 40)
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    from ui_state import UIStateBinder
+
+    binder = UIStateBinder()
+    binder.stop()  # Frames by hand
+    label = CountingLabel("Cycle: Waiting")
+    binder.bind('cycle', label)
+
+    binder.apply()
+    assert label.texts == [] and label.styles == [], "Nothing changed since bind()"
+
+    for samples in range(1000):
+        binder.set('cycle', f"Cycle: Looping ({samples} samples)", "color: green;")
+    assert label.texts == [], "set() only records the value"
+    binder.apply()
+    assert label.texts == ["Cycle: Looping (999 samples)"], "Only the latest value reaches the label"
+    assert label.styles == ["color: green;"]
+    assert label.text() == "Cycle: Looping (999 samples)"
+
+    binder.set('cycle', "Cycle: Looping (999 samples)", "color: green;")
+    binder.apply()
+    assert len(label.texts) == 1 and len(label.styles) == 1, "Unchanged text and style are not re-applied"
+
+    for samples in range(1000, 1010):
+        binder.set('cycle', f"Cycle: Looping ({samples} samples)", "color: green;")
+        binder.apply()
+    assert len(label.texts) == 11 and len(label.styles) == 1, "Per-sample text changes keep the style"
+
+    binder.set('cycle', style="color: orange;")
+    binder.apply()
+    assert label.styles[-1] == "color: orange;" and len(label.styles) == 2
+    assert len(label.texts) == 11, "A style-only change leaves the text alone"
+    print(f"✅ 1010 updates: {len(label.texts)} setText, {len(label.styles)} setStyleSheet")
+
+    return True
+
+def test_frame_cadence():
+    """The timer applies the latest value once per interval, not per set()"""
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    from ui_state import UIStateBinder
+
+    binder = UIStateBinder(interval=50)
+    label = CountingLabel()
+    binder.bind('dc_offset', label)
+    try:
+        binder.set('dc_offset', "DC Offset: 1.0V")
+        binder.set('dc_offset', "DC Offset: 2.0V")
+        assert label.texts == [], "Nothing is applied before the next frame"
+        assert wait_for(lambda: label.texts)
+        assert label.texts == ["DC Offset: 2.0V"]
+
+        started = time.monotonic()
+        while time.monotonic() - started < 0.5:
+            binder.set('dc_offset', f"DC Offset: {time.monotonic():.6f}V")
+            app.processEvents()
+        frames = len(label.texts) - 1
+        assert 2 <= frames <= 12, f"{frames} frames in 0.5s at a 50ms interval"
+        print(f"✅ {frames} label updates in 0.5s of continuous set() calls")
+    finally:
+        binder.stop()
+
+    return True
+
+if __name__ == "__main__":
+    success = test_changed_values_only() and test_frame_cadence()
+
+    if success:
+        print("\n✅ UI state test PASSED!")
+    else:
+        print("\n❌ UI state test FAILED!")
+
+    print("\n✅ Test completed!")
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Test script to verify waveform exports render in the background without stalling the GUI thread
+"""
+
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QTimer, QEventLoop
+
+def test_background_export():
+    """PNG and PDF exports of a long history finish while the event loop keeps ticking"""
+
+    print("🧪 Testing Background Waveform Export")
+    print("=" * 40)
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    from waveform_history import WaveformHistory
+    from waveform_export import WaveformExporter, snapshot_history, snapshot_live
+
+    # One hour at 1 kHz
+    history = WaveformHistory()
+    n = 3600 * 1000
+    t = np.arange(n) / 1000.0
+    voltage = 325 * np.sin(2 * np.pi * 50 * t)
+    history.times.extend(t)
+    history.pyramids['voltage'].extend(voltage)
+    history.pyramids['current'].extend(voltage * 0.1)
+
+    start = time.perf_counter()
+    snapshot = snapshot_history(history, "Session - Waveform History")
+    snapshot_ms = (time.perf_counter() - start) * 1000
+    print(f"✅ Snapshot of {n:,} samples on the GUI thread: {len(snapshot['x'])} bins in {snapshot_ms:.1f}ms")
+    assert len(snapshot['x']) <= 4 * 12 * 300 + 1
+
+    live = snapshot_live([0.0, 0.001, 0.002], [1.0, 2.0, 1.0], [0.5, 1.0, 0.5], "Live")
+
+    exporter = WaveformExporter()
+    finished, failed = [], []
+    exporter.export_finished.connect(lambda path, seconds: finished.append((path, seconds)))
+    exporter.export_failed.connect(lambda path, error: failed.append((path, error)))
+
+    # Measure the longest gap between 10ms timer ticks while exporting
+    ticks = []
+    tick_timer = QTimer()
+    tick_timer.timeout.connect(lambda: ticks.append(time.perf_counter()))
+    tick_timer.start(10)
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = [os.path.join(directory, "history.png"),
+                 os.path.join(directory, "history.pdf"),
+                 os.path.join(directory, "nested", "live.png")]
+        exporter.export(snapshot, paths[0])
+        exporter.export(snapshot, paths[1])
+        exporter.export(live, paths[2])
+        exporter.export(live, os.path.join(directory, "live.bmp"))
+
+        loop = QEventLoop()
+        done = lambda *args: None if exporter.is_busy() else loop.quit()
+        exporter.export_finished.connect(done)
+        exporter.export_failed.connect(done)
+        QTimer.singleShot(120000, loop.quit)
+        loop.exec_()
+        app.processEvents()
+        tick_timer.stop()
+        exporter.shutdown()
+
+        gaps = np.diff(ticks) * 1000 if len(ticks) > 1 else np.array([0.0])
+        print(f"✅ Exports finished: {len(finished)}, failed: {len(failed)}")
+        for path, seconds in finished:
+            print(f"   {os.path.basename(path)}: {os.path.getsize(path) // 1024} KB in {seconds:.2f}s")
+        print(f"✅ GUI timer ticks: {len(ticks)}, longest gap {gaps.max():.0f}ms")
+
+        assert sorted(p for p, _ in finished) == sorted(paths)
+        assert len(failed) == 1 and failed[0][0].endswith(".bmp")
+        with open(paths[0], "rb") as f:
+            assert f.read(8) == b"\x89PNG\r\n\x1a\n"
+        with open(paths[1], "rb") as f:
+            assert f.read(5) == b"%PDF-"
+        assert gaps.max() < 250, "The GUI thread must keep running during exports"
+
+    return True
+
+if __name__ == "__main__":
+    success = test_background_export()
+
+    if success:
+        print("\n✅ Waveform export test PASSED!")
+    else:
+        print("\n❌ Waveform export test FAILED!")
+
+    print("\n✅ Test completed!")
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the min/max pyramid behind the waveform history view
+"""
+
+import time
+import numpy as np
+
+def test_pyramid_matches_brute_force():
+    """Every bin returned by the pyramid equals min/max of the raw samples it covers"""
+
+    print("🧪 Testing Min/Max Pyramid")
+    print("=" * 40)
+
+    from waveform_history import MinMaxPyramid
+
+    rng = np.random.default_rng(1)
+    data = rng.normal(size=100003).astype(np.float32)
+
+    pyramid = MinMaxPyramid(factor=4)
+    # Uneven blocks, like samples arriving in bursts
+    position = 0
+    for size in [1, 7, 300, 4096, 95599]:
+        pyramid.extend(data[position:position + size])
+        position += size
+    assert len(pyramid) == len(data)
+
+    for start, stop, max_points in [(0, len(data), 800), (1234, 56789, 1000), (50, 90, 1000), (99000, 100003, 64)]:
+        indices, ymin, ymax = pyramid.query(start, stop, max_points)
+        block = indices[1] - indices[0]
+        bounds = list(indices[1:]) + [indices[-1] + block]
+        for i, (lo, hi) in enumerate(zip(indices, bounds)):
+            hi = min(hi, len(data))
+            assert ymin[i] == data[lo:hi].min() and ymax[i] == data[lo:hi].max()
+        print(f"✅ [{start}, {stop}) -> {len(indices)} bins (max {max_points})")
+        assert len(indices) <= 4 * max_points + 1
+
+    return True
+
+def test_history_window_scales():
+    """Querying a window costs about the same regardless of history length"""
+
+    from waveform_history import WaveformHistory
+
+    history = WaveformHistory()
+    sample_rate = 10000.0
+    n = 2000000
+    t = np.arange(n) / sample_rate
+    voltage = 325 * np.sin(2 * np.pi * 50 * t)
+
+    start = time.perf_counter()
+    history.times.extend(t)
+    history.pyramids['voltage'].extend(voltage)
+    history.pyramids['current'].extend(voltage * 0.1)
+    print(f"✅ Ingested {n:,} samples in {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    x, envelopes = history.window(0.0, t[-1], 1200)
+    full_time = time.perf_counter() - start
+    ymin, ymax = envelopes['voltage']
+    print(f"✅ Full-history window: {len(x)} bins in {full_time * 1000:.1f}ms")
+    assert len(x) <= 4 * 1200 + 1
+    assert abs(ymax.max() - 325) < 1 and abs(ymin.min() + 325) < 1
+
+    x, envelopes = history.window(10.0, 10.01, 1200)
+    assert len(x) >= 100, "Short windows fall back to raw samples"
+    print(f"✅ Zoomed window: {len(x)} raw samples")
+
+    return True
+
+if __name__ == "__main__":
+    success = test_pyramid_matches_brute_force() and test_history_window_scales()
+
+    if success:
+        print("\n✅ Waveform history test PASSED!")
+    else:
+        print("\n❌ Waveform history test FAILED!")
+
+    print("\n✅ Test completed!")
@@ -0,0 +1,210 @@
+"""
+Trend Store for MCB Testing System
+On-disk raw samples plus min/max/mean rollups at 1 s, 10 s and 60 s for long runs
+"""
+
+import itertools
+import os
+import sqlite3
+import time
+
+ROLLUP_RESOLUTIONS = (1, 10, 60)  # Seconds per rollup bucket
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS raw (
+    channel TEXT NOT NULL,
+    t REAL NOT NULL,
+    value REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS raw_channel_t ON raw (channel, t);
+CREATE TABLE IF NOT EXISTS rollup (
+    channel TEXT NOT NULL,
+    resolution INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    vmin REAL NOT NULL,
+    vmax REAL NOT NULL,
+    vsum REAL NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (channel, resolution, bucket)
+) WITHOUT ROWID;
+"""
+
+# Partial buckets are merged into what is already on disk, so a bucket can be
+# written several times (once per flush) without double counting
+UPSERT_ROLLUP = """
+INSERT INTO rollup (channel, resolution, bucket, vmin, vmax, vsum, count)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (channel, resolution, bucket) DO UPDATE SET
+    vmin = min(vmin, excluded.vmin),
+    vmax = max(vmax, excluded.vmax),
+    vsum = vsum + excluded.vsum,
+    count = count + excluded.count
+"""
+
+
+class TrendStore:
+    """
+    SQLite file holding every raw sample and incremental rollups.
+
+    add() and extend() (a block of samples, reduced with NumPy) only update
+    in-memory accumulators for the open bucket of each (channel, resolution);
+    rows are written in one transaction per flush (every `batch_size` samples
+    or `flush_interval` seconds). query() reads
+    the coarsest data that still gives `max_points` over the requested span,
+    so a four-hour run is plotted from a few thousand rollup rows.
+    """
+
+    def __init__(self, path, resolutions=ROLLUP_RESOLUTIONS, batch_size=500, flush_interval=1.0):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.resolutions = tuple(sorted(resolutions))
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.pending_raw = []
+        self.open_buckets = {}  # (channel, resolution) -> [bucket, vmin, vmax, vsum, count]
+        self.closed_buckets = []
+        self.last_flush = time.monotonic()
+        self.samples = 0
+
+    def add(self, t, values):
+        """Record one sample time with a value per channel, e.g. {'temperature': 41.5}"""
+        for channel, value in values.items():
+            value = float(value)
+            self.pending_raw.append((channel, t, value))
+            for resolution in self.resolutions:
+                self._accumulate(channel, resolution, int(t // resolution), value, value, value, 1)
+        self.samples += 1
+        self._maybe_flush()
+
+    def extend(self, t, values):
+        """Record a block of sample times with an array per channel, e.g. {'current': [...]}"""
+        import numpy as np
+
+        t = np.asarray(t, dtype=np.float64)
+        if not len(t):
+            return
+        times = t.tolist()
+        for channel, column in values.items():
+            column = np.asarray(column, dtype=np.float64)
+            self.pending_raw.extend(zip(itertools.repeat(channel), times, column.tolist()))
+            for resolution in self.resolutions:
+                # One accumulator update per run of samples in the same bucket
+                buckets = np.floor_divide(t, resolution).astype(np.int64)
+                starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+                runs = zip(buckets[starts].tolist(),
+                           np.minimum.reduceat(column, starts).tolist(),
+                           np.maximum.reduceat(column, starts).tolist(),
+                           np.add.reduceat(column, starts).tolist(),
+                           np.diff(np.r_[starts, len(t)]).tolist())
+                for bucket, vmin, vmax, vsum, count in runs:
+                    self._accumulate(channel, resolution, bucket, vmin, vmax, vsum, count)
+        self.samples += len(t)
+        self._maybe_flush()
+
+    def _accumulate(self, channel, resolution, bucket, vmin, vmax, vsum, count):
+        key = (channel, resolution)
+        acc = self.open_buckets.get(key)
+        if acc is None or acc[0] != bucket:
+            # Out-of-order samples reopen a bucket; the upsert merges both parts
+            if acc is not None and acc[4]:
+                self.closed_buckets.append(key + tuple(acc))
+            self.open_buckets[key] = [bucket, vmin, vmax, vsum, count]
+        else:
+            if vmin < acc[1]:
+                acc[1] = vmin
+            if vmax > acc[2]:
+                acc[2] = vmax
+            acc[3] += vsum
+            acc[4] += count
+
+    def _maybe_flush(self):
+        if (len(self.pending_raw) >= self.batch_size
+                or time.monotonic() - self.last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """Write queued raw rows and every touched bucket in one transaction"""
+        self.last_flush = time.monotonic()
+        rollups = self.closed_buckets
+        self.closed_buckets = []
+        for key, acc in self.open_buckets.items():
+            if acc[4]:
+                rollups.append(key + tuple(acc))
+                # The open bucket keeps accumulating from empty; the upsert merges it later
+                acc[1], acc[2], acc[3], acc[4] = float('inf'), float('-inf'), 0.0, 0
+        if not self.pending_raw and not rollups:
+            return
+        with self.conn:
+            self.conn.executemany("INSERT INTO raw (channel, t, value) VALUES (?, ?, ?)",
+                                  self.pending_raw)
+            self.conn.executemany(UPSERT_ROLLUP, rollups)
+        self.pending_raw = []
+
+    def query(self, channel, t_start=None, t_stop=None, max_points=2000):
+        """
+        Trend of one channel between two times, with at most about max_points rows.
+
+        Returns {'resolution', 't', 'min', 'max', 'mean'}; resolution is 0 when
+        the raw samples fit in max_points (then min == max == mean). For rollups
+        't' is the bucket start.
+        """
+        self.flush()
+        if t_start is None or t_stop is None:
+            first, last = self.time_range(channel)
+            t_start = first if t_start is None else t_start
+            t_stop = last if t_stop is None else t_stop
+        result = {'resolution': 0, 't': [], 'min': [], 'max': [], 'mean': []}
+        if t_start is None or t_stop is None:
+            return result
+
+        rows = self.conn.execute(
+            "SELECT t, value FROM raw WHERE channel = ? AND t >= ? AND t <= ? ORDER BY t LIMIT ?",
+            (channel, t_start, t_stop, max_points + 1)).fetchall()
+        if len(rows) <= max_points:
+            values = [v for _, v in rows]
+            result.update(t=[t for t, _ in rows], min=values, max=values, mean=values)
+            return result
+
+        span = t_stop - t_start
+        resolution = next((r for r in self.resolutions if span / r <= max_points), self.resolutions[-1])
+        rows = self.conn.execute(
+            "SELECT bucket, vmin, vmax, vsum, count FROM rollup "
+            "WHERE channel = ? AND resolution = ? AND bucket >= ? AND bucket <= ? ORDER BY bucket",
+            (channel, resolution, int(t_start // resolution), int(t_stop // resolution))).fetchall()
+        result['resolution'] = resolution
+        result['t'] = [bucket * resolution for bucket, _, _, _, _ in rows]
+        result['min'] = [vmin for _, vmin, _, _, _ in rows]
+        result['max'] = [vmax for _, _, vmax, _, _ in rows]
+        result['mean'] = [vsum / count for _, _, _, vsum, count in rows]
+        return result
+
+    def raw(self, channel, t_start, t_stop):
+        """Every raw sample of a channel between two times, as (t, value) rows"""
+        self.flush()
+        return self.conn.execute(
+            "SELECT t, value FROM raw WHERE channel = ? AND t >= ? AND t <= ? ORDER BY t",
+            (channel, t_start, t_stop)).fetchall()
+
+    def time_range(self, channel):
+        self.flush()
+        return self.conn.execute("SELECT min(t), max(t) FROM raw WHERE channel = ?",
+                                 (channel,)).fetchone()
+
+    def channels(self):
+        self.flush()
+        return [row[0] for row in self.conn.execute("SELECT DISTINCT channel FROM rollup")]
+
+    def close(self):
+        if self.conn is None:
+            return
+        try:
+            self.flush()
+        finally:
+            self.conn.close()
+            self.conn = None
@@ -0,0 +1,58 @@
+"""
+UI State Layer for MCB Testing System
+Coalesces high-rate label updates and applies them once per frame
+"""
+
+from PyQt5.QtCore import QObject, QTimer
+
+
+class LabelState:
+    """Latest requested and last applied text/style of one QLabel"""
+
+    def __init__(self, label):
+        self.label = label
+        self.text = label.text()
+        self.style = label.styleSheet()
+        self.applied_text = self.text
+        self.applied_style = self.style
+
+
+class UIStateBinder(QObject):
+    """
+    Stores the latest value for each bound label and pushes it to the widget
+    at the frame cadence. Text is only set when it changed since the last
+    frame, and setStyleSheet (which re-polishes the widget) only runs when the
+    style actually changes, i.e. on a state transition.
+    """
+
+    def __init__(self, interval=33, parent=None):
+        super().__init__(parent)
+        self.states = {}
+        self.timer = QTimer(self)
+        self.timer.setInterval(interval)
+        self.timer.timeout.connect(self.apply)
+        self.timer.start()
+
+    def bind(self, name, label):
+        self.states[name] = LabelState(label)
+
+    def set(self, name, text=None, style=None):
+        """Record the latest value; cheap enough to call per sample"""
+        state = self.states[name]
+        if text is not None:
+            state.text = text
+        if style is not None:
+            state.style = style
+
+    def apply(self):
+        """Push changed text and style to the widgets"""
+        for state in self.states.values():
+            if state.style != state.applied_style:
+                state.label.setStyleSheet(state.style)
+                state.applied_style = state.style
+            if state.text != state.applied_text:
+                state.label.setText(state.text)
+                state.applied_text = state.text
+
+    def stop(self):
+        self.timer.stop()
@@ -0,0 +1,176 @@
+"""
+Waveform Export for MCB Testing System
+Renders PNG/PDF snapshots of waveform views outside the GUI process
+"""
+
+import os
+import threading
+import time
+from PyQt5.QtCore import QObject, pyqtSignal
+
+EXPORT_DIRECTORY = "./test_results/exports"
+EXPORT_DPI = 300                # High resolution for test reports
+EXPORT_FIGSIZE = (12, 5)        # Inches
+EXPORT_FORMATS = ('.png', '.pdf')
+
+VOLTAGE_COLOR = '#f38ba8'
+CURRENT_COLOR = '#a6e3a1'
+
+
+def default_export_path(prefix, extension='.png'):
+    """Timestamped file name in the export directory"""
+    stamp = time.strftime("%Y%m%d_%H%M%S")
+    return os.path.join(EXPORT_DIRECTORY, f"{prefix}_{stamp}{extension}")
+
+
+# ===== Snapshots (taken on the GUI thread, cheap copies only) =====
+
+def snapshot_live(time_data, voltage_data, current_data, title):
+    """Copy the live PowerFactorWindow buffers so the worker never touches them"""
+    import numpy as np
+
+    return {
+        'title': title,
+        'x': np.array(time_data, dtype=np.float64),
+        'series': [
+            ('Voltage (Real)', VOLTAGE_COLOR, np.array(voltage_data, dtype=np.float64), None),
+            ('Current (Calculated)', CURRENT_COLOR, np.array(current_data, dtype=np.float64), None),
+        ],
+    }
+
+
+def snapshot_history(history, title, dpi=EXPORT_DPI, figsize=EXPORT_FIGSIZE):
+    """
+    Copy the whole-session envelope from a WaveformHistory.
+
+    The pyramid is queried at about one bin per output pixel, so the snapshot
+    size depends on the image resolution, not on how long the session ran.
+    """
+    import numpy as np
+
+    t_start, t_end = history.time_range()
+    max_points = int(figsize[0] * dpi)
+    x, envelopes = history.window(t_start, t_end, max_points)
+    series = []
+    for label, color, name in (('Voltage', VOLTAGE_COLOR, 'voltage'),
+                               ('Current', CURRENT_COLOR, 'current')):
+        ymin, ymax = envelopes[name]
+        series.append((label, color, np.array(ymin, dtype=np.float64), np.array(ymax, dtype=np.float64)))
+    return {
+        'title': title,
+        'x': np.array(x, dtype=np.float64),
+        'series': series,
+    }
+
+
+# ===== Rendering (runs in the worker process) =====
+
+def render_snapshot(snapshot, path, dpi=EXPORT_DPI, figsize=EXPORT_FIGSIZE):
+    """
+    Draw a snapshot into an offscreen figure and save it as PNG or PDF.
+
+    Uses matplotlib.figure.Figure with the Agg canvas directly (no pyplot, no
+    Qt), so nothing here is shared with the live canvases.
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    import numpy as np
+
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format '{extension}' (use PNG or PDF)")
+
+    figure = Figure(figsize=figsize, facecolor='#1e1e2e')
+    FigureCanvasAgg(figure)
+    ax = figure.add_subplot(111)
+    ax.set_facecolor('#313244')
+
+    x = snapshot['x']
+    for label, color, ymin, ymax in snapshot['series']:
+        if ymax is None or np.array_equal(ymin, ymax):
+            ax.plot(x, ymin, color=color, linewidth=1.2, label=label, alpha=0.9)
+        else:
+            # One filled band instead of a zigzag polyline: Agg rasterises a
+            # dense zigzag about 50x slower at report resolution
+            ax.fill_between(x, ymin, ymax, color=color, edgecolor=color,
+                            linewidth=0.6, label=label, alpha=0.9)
+
+    if len(x) == 0:
+        ax.text(0.5, 0.5, 'No waveform data recorded', ha='center', va='center',
+                color='#cdd6f4', fontsize=14, transform=ax.transAxes)
+    elif len(x) > 1:
+        ax.set_xlim(x[0], x[-1])
+
+    ax.set_xlabel("Time (s)", fontsize=12, color='#cdd6f4', fontweight='bold')
+    ax.set_ylabel("Amplitude (V/A)", fontsize=12, color='#cdd6f4', fontweight='bold')
+    ax.set_title(snapshot['title'], fontsize=14, color='#89b4fa', pad=15, fontweight='bold')
+    ax.grid(True, alpha=0.3, linestyle='--', linewidth=0.5)
+    if len(x):
+        ax.legend(loc='upper right', framealpha=0.9, facecolor='#313244',
+                  edgecolor='#89b4fa', fontsize=11, frameon=True)
+    ax.tick_params(colors='#cdd6f4', labelsize=10)
+    figure.tight_layout()
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    figure.savefig(path, dpi=dpi, facecolor=figure.get_facecolor())
+    return path
+
+
+class WaveformExporter(QObject):
+    """
+    Runs render_snapshot() in a worker process.
+
+    Agg holds the GIL while it rasterises a path, so a worker thread would
+    still stall the live plots for the length of a high-resolution export.
+    A single spawned process keeps the GUI thread free; results come back
+    through signals emitted from the executor's callback thread and are
+    delivered to GUI-thread slots through queued connections.
+    """
+    export_finished = pyqtSignal(str, float)  # path, seconds
+    export_failed = pyqtSignal(str, str)      # path, error message
+
+    def __init__(self, dpi=EXPORT_DPI, figsize=EXPORT_FIGSIZE, parent=None):
+        super().__init__(parent)
+        self.dpi = dpi
+        self.figsize = figsize
+        self.executor = None
+        self.pending = 0
+        self.lock = threading.Lock()
+
+    def export(self, snapshot, path):
+        """Queue a snapshot for rendering; returns immediately"""
+        if self.executor is None:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            # spawn: forking a process that has Qt running is not safe
+            self.executor = ProcessPoolExecutor(max_workers=1,
+                                                mp_context=multiprocessing.get_context('spawn'))
+        with self.lock:
+            self.pending += 1
+        submitted = time.perf_counter()
+        future = self.executor.submit(render_snapshot, snapshot, path, self.dpi, self.figsize)
+        future.add_done_callback(lambda f: self._on_done(f, path, submitted))
+        return future
+
+    def is_busy(self):
+        with self.lock:
+            return self.pending > 0
+
+    def shutdown(self):
+        """Stop the worker once queued exports are written"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+
+    def _on_done(self, future, path, submitted):
+        # Update the count first so slots calling is_busy() see this job as done
+        with self.lock:
+            self.pending -= 1
+        try:
+            future.result()
+        except Exception as e:
+            self.export_failed.emit(path, str(e))
+        else:
+            self.export_finished.emit(path, time.perf_counter() - submitted)
@@ -0,0 +1,239 @@
+"""
+Waveform History for MCB Testing System
+Whole-session sample store with a multi-resolution min/max pyramid for zoomable views
+"""
+
+import mmap
+import numpy as np
+
+
+def mapped_empty(capacity, dtype):
+    """
+    Uninitialised array in its own anonymous mapping.
+
+    Pages only become resident once written, and the mapping goes back to
+    the OS as soon as the array is freed. Session-long arrays allocated with
+    np.empty land in the malloc heap instead, where every outgrown copy
+    leaves a hole the next, larger copy does not fit in.
+    """
+    dtype = np.dtype(dtype)
+    return np.frombuffer(mmap.mmap(-1, max(capacity, 1) * dtype.itemsize), dtype=dtype, count=capacity)
+
+
+class GrowableArray:
+    """Append-only numpy array with amortised O(1) appends"""
+
+    def __init__(self, dtype, capacity=4096):
+        self.data = mapped_empty(capacity, dtype)
+        self.size = 0
+
+    def extend(self, values):
+        values = np.asarray(values, dtype=self.data.dtype)
+        needed = self.size + len(values)
+        if needed > len(self.data):
+            new_capacity = max(needed, 2 * len(self.data))
+            grown = mapped_empty(new_capacity, self.data.dtype)
+            grown[:self.size] = self.data[:self.size]
+            self.data = grown
+        self.data[self.size:needed] = values
+        self.size = needed
+
+    def view(self):
+        return self.data[:self.size]
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def nbytes(self):
+        """Mapped bytes, including spare capacity"""
+        return self.data.nbytes
+
+    @property
+    def written_nbytes(self):
+        """Bytes holding samples; spare capacity is never touched, so it stays out of RSS"""
+        return self.size * self.data.itemsize
+
+
+class MinMaxPyramid:
+    """
+    Min/max summary of a growing 1-D signal.
+
+    Level 0 is the raw samples; each level k above it stores the min and max
+    of consecutive blocks of factor**k samples. Levels are extended
+    incrementally as samples arrive, so ingest stays amortised O(1) and any
+    window can be summarised by reading at most ~max_points bins.
+    """
+
+    def __init__(self, factor=4, dtype=np.float32):
+        self.factor = factor
+        self.raw = GrowableArray(dtype)
+        self.mins = []  # mins[k - 1] summarises blocks of factor**k samples
+        self.maxs = []
+
+    def __len__(self):
+        return len(self.raw)
+
+    @property
+    def nbytes(self):
+        return self.raw.nbytes + sum(level.nbytes for level in self.mins + self.maxs)
+
+    @property
+    def written_nbytes(self):
+        return self.raw.written_nbytes + sum(level.written_nbytes for level in self.mins + self.maxs)
+
+    def extend(self, values):
+        self.raw.extend(values)
+        lower_min = lower_max = self.raw.view()
+        level = 0
+        while len(lower_min) >= self.factor:
+            if level == len(self.mins):
+                self.mins.append(GrowableArray(self.raw.data.dtype))
+                self.maxs.append(GrowableArray(self.raw.data.dtype))
+            mins, maxs = self.mins[level], self.maxs[level]
+            complete = len(lower_min) // self.factor
+            done = len(mins)
+            if complete > done:
+                start, stop = done * self.factor, complete * self.factor
+                mins.extend(lower_min[start:stop].reshape(-1, self.factor).min(axis=1))
+                maxs.extend(lower_max[start:stop].reshape(-1, self.factor).max(axis=1))
+            lower_min, lower_max = mins.view(), maxs.view()
+            level += 1
+
+    def level_for(self, span, max_points):
+        """Coarsest level whose bins still give at least max_points across span samples"""
+        level = 0
+        while (level < len(self.mins)
+               and span // (self.factor ** (level + 1)) >= max_points):
+            level += 1
+        return level
+
+    def query(self, start, stop, max_points):
+        """
+        Summarise samples [start, stop) with about max_points bins.
+        Returns (bin_start_indices, mins, maxs) as numpy arrays.
+        """
+        start = max(0, int(start))
+        stop = min(len(self.raw), int(stop))
+        if stop <= start:
+            empty = np.empty(0)
+            return empty.astype(np.int64), empty, empty
+
+        level = self.level_for(stop - start, max(1, max_points))
+        if level == 0:
+            values = self.raw.view()[start:stop]
+            return np.arange(start, stop), values, values
+
+        block = self.factor ** level
+        mins, maxs = self.mins[level - 1].view(), self.maxs[level - 1].view()
+        first_bin = start // block
+        last_bin = min(-(-stop // block), len(mins))  # Ceil, limited to complete bins
+        indices = np.arange(first_bin, last_bin) * block
+        ymin, ymax = mins[first_bin:last_bin], maxs[first_bin:last_bin]
+
+        # Samples after the last complete bin are summarised from raw data
+        tail_start = max(last_bin * block, start)
+        if tail_start < stop:
+            tail = self.raw.view()[tail_start:stop]
+            indices = np.append(indices, tail_start)
+            ymin = np.append(ymin, tail.min())
+            ymax = np.append(ymax, tail.max())
+        return indices, ymin, ymax
+
+
+class WaveformHistory:
+    """
+    Whole-session voltage/current history.
+
+    Samples are buffered in plain lists by add_sample() (cheap enough to call
+    from a per-sample slot) and moved into the pyramids in vectorised blocks.
+    """
+
+    CHANNELS = ('voltage', 'current')
+
+    def __init__(self, factor=4, flush_size=256):
+        self.factor = factor
+        self.flush_size = flush_size
+        self.clear()
+
+    def clear(self):
+        self.times = GrowableArray(np.float64)
+        self.pyramids = {name: MinMaxPyramid(self.factor) for name in self.CHANNELS}
+        self.pending_times = []
+        self.pending = {name: [] for name in self.CHANNELS}
+
+    def add_sample(self, time_s, voltage, current):
+        self.pending_times.append(time_s)
+        self.pending['voltage'].append(voltage)
+        self.pending['current'].append(current)
+        if len(self.pending_times) >= self.flush_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending_times:
+            return
+        self.times.extend(self.pending_times)
+        for name in self.CHANNELS:
+            self.pyramids[name].extend(self.pending[name])
+            self.pending[name] = []
+        self.pending_times = []
+
+    def __len__(self):
+        return len(self.times) + len(self.pending_times)
+
+    @property
+    def nbytes(self):
+        """NumPy storage of the session so far (grows with the session by design)"""
+        return self.times.nbytes + sum(pyramid.nbytes for pyramid in self.pyramids.values())
+
+    @property
+    def written_nbytes(self):
+        """Part of nbytes that holds samples (what the session adds to RSS; tracemalloc sees none of it)"""
+        return self.times.written_nbytes + sum(pyramid.written_nbytes for pyramid in self.pyramids.values())
+
+    def time_range(self):
+        self.flush()
+        if len(self.times) == 0:
+            return 0.0, 0.0
+        times = self.times.view()
+        return float(times[0]), float(times[-1])
+
+    def capture(self, t_start, t_stop):
+        """Raw samples between two times as (times, {channel: values}) views, no copies"""
+        self.flush()
+        times = self.times.view()
+        start = int(np.searchsorted(times, t_start, side='left'))
+        stop = int(np.searchsorted(times, t_stop, side='right'))
+        return times[start:stop], {name: self.pyramids[name].raw.view()[start:stop]
+                                   for name in self.CHANNELS}
+
+    def window(self, t_start, t_stop, max_points):
+        """
+        Envelope of every channel between two times, at the level that gives
+        about max_points bins. Returns (x, {channel: (ymin, ymax)}).
+        """
+        self.flush()
+        times = self.times.view()
+        start = int(np.searchsorted(times, t_start, side='left'))
+        stop = int(np.searchsorted(times, t_stop, side='right'))
+        # Include one sample either side so lines reach the plot edges
+        start = max(0, start - 1)
+        stop = min(len(times), stop + 1)
+
+        envelopes = {}
+        indices = np.empty(0, dtype=np.int64)
+        for name in self.CHANNELS:
+            indices, ymin, ymax = self.pyramids[name].query(start, stop, max_points)
+            envelopes[name] = (ymin, ymax)
+        return times[indices], envelopes
+
+
+def envelope_to_line(x, ymin, ymax):
+    """Interleave min/max so one polyline draws the envelope as a vertical stroke per bin"""
+    if len(x) == 0 or np.array_equal(ymin, ymax):
+        return x, ymin
+    xs = np.repeat(x, 2)
+    ys = np.empty(2 * len(ymin), dtype=np.float64)
+    ys[0::2] = ymin
+    ys[1::2] = ymax
+    return xs, ys